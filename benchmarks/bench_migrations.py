@@ -0,0 +1,114 @@
+"""
+Benchmark da verificação de schema na abertura: auditoria antiga (DDL + SELECT por coluna +
+conferência de FTS/agregados a cada início) contra o executor versionado (db_version).
+
+- primeira migração: banco antigo com dados (só tabelas e colunas) até a versão atual, uma vez;
+- abertura em dia: cada rodada numa conexão nova, como o main.py e o servidor fazem.
+
+Uso:
+    python benchmarks/bench_migrations.py --products 100000 --moves 1000000 --rounds 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app.db.migrations import (
+    CATALOG_VERSION_DDL, LEGACY_TABLES, REQUIRED_COLUMNS, STORAGE_MIGRATIONS, MigrationEngine, _add_missing_columns,
+)
+from app.db.rollups import ensure_rollups
+from app.db.search_index import ensure_product_search_index
+
+
+def legacy_startup(path: str) -> None:
+    """O que o MigrationEngine antigo fazia a cada abertura (sem os prints)."""
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    for ddl in LEGACY_TABLES + ["CREATE TABLE IF NOT EXISTS db_version (version INTEGER)"] + CATALOG_VERSION_DDL[:4]:
+        cursor.execute(ddl)
+    conn.commit()
+    for table, columns in REQUIRED_COLUMNS:
+        for col, _ in columns:
+            cursor.execute(f"SELECT {col} FROM {table} LIMIT 1")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_products_row_version ON products (row_version)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_stock_moves_created_at_id ON stock_moves (created_at, id)")
+    conn.commit()
+    if ensure_product_search_index(cursor):
+        conn.commit()
+    if ensure_rollups(cursor):
+        conn.commit()
+    conn.close()
+
+
+def seed(path: str, n_products: int, n_moves: int) -> None:
+    """Banco de antes das migrações: tabelas e colunas, nenhum índice/FTS/agregado."""
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    for ddl in LEGACY_TABLES:
+        conn.execute(ddl)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for table, columns in REQUIRED_COLUMNS:
+            _add_missing_columns(conn.cursor(), table, columns)
+    conn.executemany(
+        "INSERT INTO products (id, name, sku, price, stock_qty, min_stock) VALUES (?, ?, ?, ?, ?, 5)",
+        ((i, f"Produto {i} linha {rng.choice('ABCDEFGH')}", f"SKU{i:07d}", rng.uniform(1, 500), rng.randint(0, 200))
+         for i in range(1, n_products + 1)),
+    )
+    start = datetime.now() - timedelta(days=365)
+    conn.executemany(
+        "INSERT INTO stock_moves (product_id, delta, reason, created_at) VALUES (?, ?, 'sale', ?)",
+        ((rng.randint(1, n_products), rng.choice((-3, -2, -1, 1, 5)),
+          (start + timedelta(seconds=i * 31_536_000 // max(n_moves, 1))).isoformat(sep=" ", timespec="seconds"))
+         for i in range(n_moves)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, *args) -> float:
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+    return time.perf_counter() - t0
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as work:
+        base = os.path.join(work, "antigo.db")
+        t0 = time.perf_counter()
+        seed(base, args.products, args.moves)
+        print(f"banco antigo: {args.products} produtos, {args.moves} movimentos "
+              f"({os.path.getsize(base) / 2**20:.0f} MiB, {time.perf_counter() - t0:.1f}s para gerar)")
+
+        path = os.path.join(work, "storage.db")
+        shutil.copy(base, path)
+        cold = timed(MigrationEngine.check_and_migrate, path, STORAGE_MIGRATIONS)
+        conn = sqlite3.connect(path)
+        version = MigrationEngine.current_version(conn)
+        conn.close()
+        print(f"primeira migração (0 -> {version}): {cold * 1000:9.1f} ms")
+
+        legacy = [timed(legacy_startup, path) for _ in range(args.rounds)]
+        warm = [timed(MigrationEngine.check_and_migrate, path, STORAGE_MIGRATIONS) for _ in range(args.rounds)]
+        for label, samples in (("auditoria antiga", legacy), ("db_version em dia", warm)):
+            print(f"{label:>18}: mediana {statistics.median(samples) * 1000:7.2f} ms | "
+                  f"máx {max(samples) * 1000:7.2f} ms ({args.rounds} aberturas)")
+        print(f"ganho na abertura: {statistics.median(legacy) / statistics.median(warm):.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--moves", type=int, default=1_000_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    main(parser.parse_args())
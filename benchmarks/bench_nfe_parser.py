@@ -0,0 +1,133 @@
+"""
+Benchmark da leitura de XML de NFe: ET.parse + findall/find (telas antigas)
+contra o NFeParser (iterparse + limpeza dos <det> já lidos) e o modo pasta com pool de processos.
+
+Uso:
+    python benchmarks/bench_nfe_parser.py --items 5000 --files 1000 --file-items 30
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app.utils.nfe_parser import NFeParser
+
+NS = "http://www.portalfiscal.inf.br/nfe"
+
+
+def write_nfe(path: str, n_items: int, numero: int, rng: random.Random) -> None:
+    """Nota sintética com a mesma estrutura do XML autorizado (nfeProc/NFe/infNFe)."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?><nfeProc xmlns="{NS}" versao="4.00"><NFe>')
+        f.write(f'<infNFe Id="NFe3524{numero:040d}" versao="4.00">')
+        f.write(f"<ide><cUF>35</cUF><nNF>{numero}</nNF><serie>1</serie></ide>")
+        f.write("<emit><CNPJ>12345678000199</CNPJ><xNome>Distribuidora Teste LTDA</xNome>"
+                "<xFant>Distribuidora Teste</xFant><enderEmit><xLgr>Rua A</xLgr><nro>1</nro></enderEmit></emit>")
+        total = 0.0
+        for i in range(1, n_items + 1):
+            qty = rng.randint(1, 48)
+            unit = rng.randint(100, 50000) / 100
+            total += qty * unit
+            f.write(
+                f'<det nItem="{i}"><prod><cProd>SKU{rng.randint(1, 20000):06d}</cProd><cEAN>789{i:010d}</cEAN>'
+                f"<xProd>Produto sintético {i} embalagem economica</xProd><NCM>22021000</NCM><CFOP>5102</CFOP>"
+                f"<uCom>UN</uCom><qCom>{qty:.4f}</qCom><vUnCom>{unit:.10f}</vUnCom><vProd>{qty * unit:.2f}</vProd>"
+                f"</prod><imposto><ICMS><ICMS00><orig>0</orig><CST>00</CST><vBC>{qty * unit:.2f}</vBC>"
+                f"<pICMS>18.00</pICMS><vICMS>{qty * unit * 0.18:.2f}</vICMS></ICMS00></ICMS></imposto></det>"
+            )
+        f.write(f"<total><ICMSTot><vNF>{total:.2f}</vNF></ICMSTot></total></infNFe></NFe></nfeProc>")
+
+
+def legacy_parse(path: str) -> list[dict]:
+    """Cópia da leitura que ImportPage/PurchasesPage faziam."""
+    root = ET.parse(path).getroot()
+    ns = {"nfe": NS}
+    emit = root.find(".//nfe:emit", ns)
+    _ = emit.find("nfe:CNPJ", ns).text
+    out = []
+    for det in root.findall(".//nfe:det", ns):
+        prod = det.find("nfe:prod", ns)
+        out.append({
+            "name": prod.find("nfe:xProd", ns).text,
+            "sku": prod.find("nfe:cProd", ns).text,
+            "ncm_code": prod.find("nfe:NCM", ns).text,
+            "stock_qty": int(float(prod.find("nfe:qCom", ns).text)),
+            "cost_price": float(prod.find("nfe:vUnCom", ns).text),
+        })
+    return out
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    res = fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return res, elapsed, peak / 1024 / 1024
+
+
+def count_streaming(path: str) -> int:
+    # uso em streaming puro (sem guardar a lista): mostra o teto de memória do iterparse
+    return sum(1 for _ in NFeParser.iter_items(path))
+
+
+def bench_single(tmp: str, n_items: int, rounds: int) -> None:
+    path = os.path.join(tmp, "grande.xml")
+    write_nfe(path, n_items, 1, random.Random(1))
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"Nota única: {n_items} itens, {size_mb:.1f} MB")
+    for label, fn in (("ET.parse+findall", legacy_parse), ("NFeParser.parse", lambda p: NFeParser.parse(p)["itens"]),
+                      ("NFeParser.iter_items", count_streaming)):
+        best, peak = float("inf"), 0.0
+        for _ in range(rounds):
+            _, elapsed, peak = measure(fn, path)
+            best = min(best, elapsed)
+        print(f"  {label:<22} {best * 1000:8.1f} ms   pico {peak:6.1f} MB")
+
+
+def bench_folder(tmp: str, n_files: int, file_items: int, workers: int | None) -> None:
+    folder = os.path.join(tmp, "notas")
+    os.makedirs(folder)
+    rng = random.Random(2)
+    for i in range(n_files):
+        write_nfe(os.path.join(folder, f"nfe_{i:05d}.xml"), file_items, 1000 + i, rng)
+    paths = NFeParser.list_folder(folder)
+    print(f"Pasta: {n_files} notas x {file_items} itens")
+
+    t0 = time.perf_counter()
+    for p in paths:
+        legacy_parse(p)
+    print(f"  {'ET.parse sequencial':<22} {time.perf_counter() - t0:8.2f} s")
+
+    t0 = time.perf_counter()
+    NFeParser.parse_many(paths, workers=1)
+    print(f"  {'NFeParser sequencial':<22} {time.perf_counter() - t0:8.2f} s")
+
+    t0 = time.perf_counter()
+    notas = NFeParser.parse_many(paths, workers=workers)
+    elapsed = time.perf_counter() - t0
+    print(f"  {'NFeParser pool':<22} {elapsed:8.2f} s  ({workers or min(os.cpu_count() or 2, 8)} processos)")
+
+    t0 = time.perf_counter()
+    produtos, entradas = NFeParser.to_bulk(notas)
+    print(f"  {'to_bulk':<22} {time.perf_counter() - t0:8.2f} s  -> {len(produtos)} SKUs, {len(entradas)} entradas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--file-items", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_single(tmp, args.items, args.rounds)
+        bench_folder(tmp, args.files, args.file_items, args.workers)
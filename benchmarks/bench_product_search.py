@@ -0,0 +1,83 @@
+"""
+Benchmark da busca do PDV: filtro antigo (varredura em Python sobre o catálogo)
+contra o índice FTS5 trigram usado por GET /products/search.
+
+Uso:
+    python benchmarks/bench_product_search.py --sizes 1000 10000 40000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app.db.search_index import build_match_query, ensure_product_search_index
+
+WORDS = ["coca", "cola", "lata", "arroz", "feijao", "oleo", "soja", "cafe", "leite", "integral",
+         "biscoito", "sabao", "po", "detergente", "agua", "mineral", "suco", "uva", "laranja", "pao"]
+QUERIES = ["coc", "coca lata", "arroz", "SKU0012", "leite integral", "xyz"]
+
+
+def seed(path: str, n: int) -> None:
+    rng = random.Random(1)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, sku TEXT UNIQUE, stock_qty INTEGER)")
+    conn.executemany(
+        "INSERT INTO products (id, name, sku, stock_qty) VALUES (?, ?, ?, ?)",
+        [(i, " ".join(rng.sample(WORDS, 3)).title(), f"SKU{i:07d}", rng.randint(0, 100)) for i in range(1, n + 1)],
+    )
+    ensure_product_search_index(conn.cursor())
+    conn.commit()
+    conn.close()
+
+
+def legacy_filter(products: list[dict], q: str) -> list[dict]:
+    q = q.strip().lower()
+    return [p for p in products if q in p["name"].lower() or q in p["sku"].lower()]
+
+
+def fts_search(conn: sqlite3.Connection, q: str, limit: int = 50) -> list:
+    match = build_match_query(q)
+    if not match:
+        return []
+    ids = [r[0] for r in conn.execute(
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH ? LIMIT ?", (match, limit)
+    )]
+    marks = ",".join("?" * len(ids))
+    return conn.execute(f"SELECT id, name, sku, stock_qty FROM products WHERE id IN ({marks})", ids).fetchall()
+
+
+def bench(n: int, rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "search.db")
+        seed(path, n)
+        conn = sqlite3.connect(path)
+        products = [{"id": r[0], "name": r[1], "sku": r[2]} for r in conn.execute("SELECT id, name, sku FROM products")]
+
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for q in QUERIES:
+                legacy_filter(products, q)
+        legacy_ms = (time.perf_counter() - t0) * 1000 / (rounds * len(QUERIES))
+
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for q in QUERIES:
+                fts_search(conn, q)
+        fts_ms = (time.perf_counter() - t0) * 1000 / (rounds * len(QUERIES))
+        conn.close()
+
+    print(f"{n:>8} produtos | varredura {legacy_ms:8.3f} ms/tecla | FTS5 {fts_ms:8.3f} ms/tecla")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 40000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    for n in args.sizes:
+        bench(n, args.rounds)
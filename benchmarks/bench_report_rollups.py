@@ -0,0 +1,153 @@
+"""
+Benchmark dos relatórios do dashboard: agregação direta em stock_moves/products
+contra os agregados mantidos por trigger (stock_move_daily / product_summary).
+
+Também confere que os agregados batem com a conta feita na hora depois de vendas,
+ajustes, exclusões e mudanças de min_stock, e mede o custo extra dos triggers por INSERT.
+
+Uso:
+    python benchmarks/bench_report_rollups.py --moves 100000 1000000 --products 5000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from app.db.rollups import ensure_rollups
+
+SCHEMA = [
+    """CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, sku TEXT, stock_qty INTEGER NOT NULL DEFAULT 0,
+                              min_stock INTEGER NOT NULL DEFAULT 5)""",
+    """CREATE TABLE stock_moves (id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, delta INTEGER NOT NULL,
+                                 reason TEXT, created_at DATETIME NOT NULL)""",
+    "CREATE INDEX ix_stock_moves_created_at ON stock_moves (created_at)",
+]
+
+LEGACY_SUMMARY = [
+    "SELECT count(id) FROM products",
+    "SELECT coalesce(sum(stock_qty), 0) FROM products",
+    "SELECT count(id) FROM products WHERE stock_qty <= 5",
+]
+LIVE_SUMMARY = """
+    SELECT count(id), coalesce(sum(stock_qty), 0), count(id) FILTER (WHERE stock_qty <= min_stock) FROM products
+"""
+LEGACY_7D = """
+    SELECT date(created_at) AS d, coalesce(sum(delta), 0) FROM stock_moves
+    WHERE created_at >= ? GROUP BY date(created_at) ORDER BY date(created_at)
+"""
+ROLLUP_SUMMARY = "SELECT total_products, total_stock, low_stock FROM product_summary WHERE id = 1"
+ROLLUP_7D = "SELECT day, sum(net) FROM stock_move_daily WHERE day >= ? GROUP BY day"
+RAW_DAILY = """
+    SELECT date(created_at), product_id, sum(delta), sum(max(delta, 0)), sum(max(-delta, 0)), count(*)
+    FROM stock_moves GROUP BY 1, 2 ORDER BY 1, 2
+"""
+ROLLUP_DAILY = """
+    SELECT day, product_id, net, qty_in, qty_out, moves FROM stock_move_daily WHERE moves > 0 ORDER BY 1, 2
+"""
+
+
+def seed(path: str, n_products: int, n_moves: int, days: int, with_rollups: bool) -> float:
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    for ddl in SCHEMA:
+        conn.execute(ddl)
+    if with_rollups:
+        ensure_rollups(conn.cursor())
+    conn.executemany(
+        "INSERT INTO products (id, name, sku, stock_qty, min_stock) VALUES (?, ?, ?, ?, ?)",
+        [(i, f"Produto {i}", f"SKU{i}", rng.randint(0, 200), rng.choice([0, 5, 10])) for i in range(1, n_products + 1)],
+    )
+    start = datetime.now() - timedelta(days=days)
+    span = days * 86400
+    t0 = time.perf_counter()
+    batch = []
+    for _ in range(n_moves):
+        batch.append((rng.randint(1, n_products), rng.choice([-3, -2, -1, -1, -1, 5, 12]), "BENCH",
+                      (start + timedelta(seconds=rng.randint(0, span))).isoformat(sep=" ")))
+        if len(batch) == 50000:
+            conn.executemany("INSERT INTO stock_moves (product_id, delta, reason, created_at) VALUES (?, ?, ?, ?)", batch)
+            batch = []
+    if batch:
+        conn.executemany("INSERT INTO stock_moves (product_id, delta, reason, created_at) VALUES (?, ?, ?, ?)", batch)
+    conn.commit()
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return elapsed
+
+
+def timed(conn, fn, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(conn)
+    return (time.perf_counter() - t0) * 1000 / rounds
+
+
+def legacy_dashboard(conn):
+    for sql in LEGACY_SUMMARY:
+        conn.execute(sql).fetchone()
+    conn.execute(LEGACY_7D, ((date.today() - timedelta(days=6)).isoformat(),)).fetchall()
+
+
+def rollup_dashboard(conn):
+    conn.execute(ROLLUP_SUMMARY).fetchone()
+    conn.execute(ROLLUP_7D, ((date.today() - timedelta(days=6)).isoformat(),)).fetchall()
+
+
+def check_consistency(path: str) -> None:
+    """Escritas variadas e depois compara agregado x conta na hora."""
+    rng = random.Random(11)
+    conn = sqlite3.connect(path)
+    n = conn.execute("SELECT max(id) FROM products").fetchone()[0]
+    now = datetime.now().isoformat(sep=" ")
+    for _ in range(2000):
+        pid = rng.randint(1, n)
+        delta = rng.choice([-2, -1, 4])
+        conn.execute("UPDATE products SET stock_qty = stock_qty + ? WHERE id = ?", (delta, pid))
+        conn.execute("INSERT INTO stock_moves (product_id, delta, reason, created_at) VALUES (?, ?, 'CHK', ?)", (pid, delta, now))
+    conn.execute("UPDATE products SET min_stock = 50 WHERE id % 7 = 0")
+    conn.execute("DELETE FROM stock_moves WHERE id % 97 = 0")
+    conn.execute("UPDATE stock_moves SET delta = delta * 2 WHERE id % 89 = 0")
+    conn.execute("DELETE FROM products WHERE id % 101 = 0")
+    conn.execute("INSERT INTO products (name, sku, stock_qty, min_stock) VALUES ('Novo', 'NOVO1', 1, 5)")
+    conn.commit()
+
+    live = conn.execute(LIVE_SUMMARY).fetchone()
+    rolled = conn.execute(ROLLUP_SUMMARY).fetchone()
+    daily_ok = conn.execute(RAW_DAILY).fetchall() == conn.execute(ROLLUP_DAILY).fetchall()
+    conn.close()
+    assert tuple(live) == tuple(rolled), (live, rolled)
+    assert daily_ok, "stock_move_daily divergiu de stock_moves"
+    print(f"  consistência OK (resumo {tuple(rolled)})")
+
+
+def bench(n_moves: int, n_products: int, days: int, rounds: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        plain, rolled = os.path.join(tmp, "plain.db"), os.path.join(tmp, "rolled.db")
+        ins_plain = seed(plain, n_products, n_moves, days, with_rollups=False)
+        ins_rolled = seed(rolled, n_products, n_moves, days, with_rollups=True)
+
+        c1, c2 = sqlite3.connect(plain), sqlite3.connect(rolled)
+        legacy_ms = timed(c1, legacy_dashboard, rounds)
+        rollup_ms = timed(c2, rollup_dashboard, rounds)
+        c1.close(); c2.close()
+
+        print(f"{n_moves:>9} movimentos | dashboard direto {legacy_ms:8.2f} ms | agregados {rollup_ms:6.3f} ms"
+              f" | carga {n_moves / ins_plain:,.0f} -> {n_moves / ins_rolled:,.0f} mov/s com triggers")
+        check_consistency(rolled)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--moves", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    for m in args.moves:
+        bench(m, args.products, args.days, args.rounds)
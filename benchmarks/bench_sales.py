@@ -0,0 +1,149 @@
+"""
+Benchmark do POST /sales: motor novo (UPDATE condicional + INSERT em lote)
+contra o caminho antigo (carrega Product no ORM, valida em Python, flush por linha).
+
+Também dispara vendas concorrentes nos mesmos produtos e confere que nenhum
+estoque fica negativo e que o saldo bate com os movimentos gravados.
+
+Uso:
+    python benchmarks/bench_sales.py --products 200 --sales 500 --workers 16
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.db.models import Base, Product, Sale, SaleItem, StockMove
+from app.utils.sale_engine import SaleEngine, SaleError
+
+
+async def legacy_create_sale(db: AsyncSession, items) -> int:
+    """Cópia do create_sale antigo, mantida aqui só como referência de desempenho."""
+    ids = [it.product_id for it in items]
+    res = await db.execute(select(Product).where(Product.id.in_(ids)))
+    by_id = {p.id: p for p in res.scalars().all()}
+    for it in items:
+        p = by_id.get(it.product_id)
+        if not p or int(p.stock_qty) < int(it.qty):
+            raise SaleError(400, "Estoque insuficiente")
+
+    now = datetime.utcnow()
+    sale = Sale(created_at=now)
+    db.add(sale)
+    await db.flush()
+    for it in items:
+        p = by_id[it.product_id]
+        p.stock_qty = int(p.stock_qty) - int(it.qty)
+        db.add(SaleItem(sale_id=sale.id, product_id=p.id, qty=int(it.qty)))
+        db.add(StockMove(product_id=p.id, delta=-int(it.qty), reason=f"VENDA #{sale.id}", created_at=now))
+    await db.commit()
+    return sale.id
+
+
+async def new_create_sale(db: AsyncSession, items) -> int:
+    return await SaleEngine.criar_venda(db, items)
+
+
+def random_cart(n_products: int, rng: random.Random) -> list:
+    return [
+        SimpleNamespace(product_id=rng.randint(1, n_products), qty=rng.randint(1, 3))
+        for _ in range(rng.randint(1, 5))
+    ]
+
+
+async def setup_db(path: str, n_products: int, stock: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}", connect_args={"timeout": 30})
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Product),
+            [{"name": f"Produto {i}", "sku": f"SKU{i:06d}", "stock_qty": stock} for i in range(1, n_products + 1)],
+        )
+    return engine, async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def run_sequential(label: str, fn, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = await setup_db(os.path.join(tmp, "bench.db"), args.products, 10**9)
+        rng = random.Random(42)
+        carts = [random_cart(args.products, rng) for _ in range(args.sales)]
+        t0 = time.perf_counter()
+        for cart in carts:
+            async with Session() as db:
+                await fn(db, cart)
+        elapsed = time.perf_counter() - t0
+        await engine.dispose()
+    print(f"{label:<10} {args.sales} vendas em {elapsed:.3f}s -> {args.sales / elapsed:,.0f} vendas/s")
+
+
+async def run_batch(args) -> None:
+    """Mesmas vendas enviadas de uma vez pelo caminho de POST /sales/batch."""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = await setup_db(os.path.join(tmp, "batch.db"), args.products, 10**9)
+        rng = random.Random(42)
+        vendas = [SimpleNamespace(items=random_cart(args.products, rng)) for _ in range(args.sales)]
+        t0 = time.perf_counter()
+        async with Session() as db:
+            results = await SaleEngine.criar_lote(db, vendas, chunk_size=100)
+        elapsed = time.perf_counter() - t0
+        await engine.dispose()
+    assert all(r["ok"] for r in results)
+    print(f"{'lote':<10} {args.sales} vendas em {elapsed:.3f}s -> {args.sales / elapsed:,.0f} vendas/s")
+
+
+async def run_concurrency(args) -> None:
+    """Vendas em paralelo disputando poucos produtos com pouco estoque."""
+    hot_products, stock = 5, 50
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, Session = await setup_db(os.path.join(tmp, "race.db"), hot_products, stock)
+        rng = random.Random(7)
+        carts = [random_cart(hot_products, rng) for _ in range(args.sales)]
+        sem = asyncio.Semaphore(args.workers)
+        ok = rejected = 0
+
+        async def sell(cart):
+            nonlocal ok, rejected
+            async with sem, Session() as db:
+                try:
+                    await SaleEngine.criar_venda(db, cart)
+                    ok += 1
+                except SaleError:
+                    rejected += 1
+
+        await asyncio.gather(*(sell(c) for c in carts))
+
+        async with Session() as db:
+            negatives = (await db.execute(select(func.count()).where(Product.stock_qty < 0))).scalar_one()
+            remaining = (await db.execute(select(func.sum(Product.stock_qty)))).scalar_one()
+            moved = (await db.execute(select(func.coalesce(func.sum(StockMove.delta), 0)))).scalar_one()
+        await engine.dispose()
+
+    print(f"concorrência: {ok} aceitas, {rejected} recusadas, estoque final {remaining}")
+    assert negatives == 0, f"{negatives} produtos com estoque negativo"
+    assert remaining == hot_products * stock + moved, "estoque não bate com stock_moves"
+    print("✅ nenhum estoque negativo e saldo consistente com os movimentos")
+
+
+async def main(args) -> None:
+    await run_sequential("antigo", legacy_create_sale, args)
+    await run_sequential("novo", new_create_sale, args)
+    await run_batch(args)
+    await run_concurrency(args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--sales", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
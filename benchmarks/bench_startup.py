@@ -0,0 +1,135 @@
+"""
+Benchmark de abertura do desktop: tempo até a tela de login e até o PDV (Frente de Caixa).
+
+Cada rodada é um processo novo (imports frios de verdade) que refaz o caminho do main.py:
+QApplication, schema local, servidor uvicorn numa thread, sonda do /health e MainWindow.
+Os tempos contam desde o início do processo filho:
+  - login: tela de login pintada;
+  - servidor: /health respondeu (api_ready);
+  - pdv: login imediato -> workspace "vendas" -> PosPage pintada (pior caso: quem digita a senha
+    enquanto o servidor sobe não espera nada);
+  - busca: primeira busca de produtos do PDV respondida (ou falhou, se a API não tem banco).
+
+--eager reproduz o comportamento antigo para comparação: todas as páginas do PAGE_REGISTRY
+montadas antes do login, mais a espera fixa de 1s pelo servidor.
+
+Uso (sem janela na tela; diálogos de erro das telas viram print):
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_startup.py --rounds 5
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_startup.py --rounds 5 --eager
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def child(args) -> None:
+    t_start = time.perf_counter()
+    sys.path.insert(0, SRC)
+    import threading
+
+    from PySide6.QtCore import QEvent, QEventLoop, QObject, QTimer
+    from PySide6.QtWidgets import QApplication, QMessageBox
+
+    # janela modal travaria o processo sem tela: registra e segue
+    for name in ("critical", "warning", "information", "question"):
+        setattr(QMessageBox, name, staticmethod(lambda *a, _n=name, **k: print(f"[{_n}] {a[1:3]}", file=sys.stderr)))
+
+    class PaintProbe(QObject):
+        """Marca quando o widget recebe o primeiro Paint."""
+
+        def __init__(self):
+            super().__init__()
+            self.painted = set()
+
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                self.painted.add(obj)
+            return False
+
+    qt_app = QApplication(sys.argv)
+    probe = PaintProbe()
+    import app.main as entry
+
+    entry.API_PORT = args.port
+    entry.API_URL = f"http://{entry.API_HOST}:{args.port}"
+    entry.run_database_migrations()
+    api_ready = threading.Event()
+    if args.eager:
+        threading.Thread(target=entry.start_server, daemon=True).start()
+        time.sleep(1)  # espera fixa antiga
+        api_ready.set()
+
+    from app.ui.main_window import PAGE_REGISTRY, MainWindow
+
+    window = MainWindow(api_base_url=entry.API_URL, api_ready=api_ready)
+    if args.eager:
+        for name in PAGE_REGISTRY:
+            window.page(name)
+    window.login_page.installEventFilter(probe)
+    window.show()
+    if not args.eager:
+        QTimer.singleShot(0, lambda: entry.start_background(api_ready))
+
+    def pump_until(cond, timeout=60.0):
+        deadline = time.perf_counter() + timeout
+        while not cond() and time.perf_counter() < deadline:
+            qt_app.processEvents(QEventLoop.AllEvents, 10)
+        return time.perf_counter() - t_start
+
+    t_login = pump_until(lambda: window.login_page in probe.painted)
+    window.handle_login("admin", "vendas,financeiro,fiscal,estoque")
+    window.open_workspace("vendas")
+    pos = window.page("pos_page")
+    pos.installEventFilter(probe)
+    t_ready = pump_until(api_ready.is_set)
+    t_pos = pump_until(lambda: pos in probe.painted)
+    t_search = pump_until(lambda: not pos.tasks.is_running("search"))
+    print(json.dumps({"login": t_login, "servidor": t_ready, "pdv": t_pos, "busca": t_search, "pages": len(window._pages)}))
+    sys.stdout.flush()
+    os._exit(0)  # servidor e threads daemon não precisam de encerramento limpo aqui
+
+
+def main(args) -> None:
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    mode = "eager (antigo)" if args.eager else "lazy"
+    results = []
+    for r in range(args.rounds):
+        with tempfile.TemporaryDirectory() as work:
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", "--port", str(free_port())]
+            if args.eager:
+                cmd.append("--eager")
+            out = subprocess.run(cmd, cwd=work, env=env, capture_output=True, text=True, timeout=300)
+        line = next((l for l in reversed(out.stdout.splitlines()) if l.startswith("{")), None)
+        if line is None:
+            print(out.stdout[-2000:], out.stderr[-2000:])
+            raise SystemExit(f"rodada {r + 1} falhou (código {out.returncode})")
+        res = json.loads(line)
+        results.append(res)
+        print(f"{mode:>14} rodada {r + 1}: login {res['login'] * 1000:6.0f} ms | servidor {res['servidor'] * 1000:6.0f} ms | "
+              f"PDV {res['pdv'] * 1000:6.0f} ms | 1ª busca {res['busca'] * 1000:6.0f} ms | páginas montadas {res['pages']}")
+    for key in ("login", "servidor", "pdv", "busca"):
+        print(f"{mode:>14} mediana {key:>8}: {statistics.median(r[key] for r in results) * 1000:7.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--eager", action="store_true", help="monta todas as páginas antes do login (comportamento antigo)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    child(args) if args.child else main(args)
@@ -0,0 +1,207 @@
+"""
+Carga do servidor da loja (app.api.store_server): N caixas simultâneos contra a API em rede.
+
+Cada caixa é uma thread com o seu httpx.Client (conexão keep-alive, como o ApiClient) repetindo o
+ciclo do PDV: busca pelo nome, consulta do produto, POST /sales e, de vez em quando, o histórico.
+Parte dos carrinhos sai de um grupo pequeno de produtos (--hot): caixas diferentes baixando o
+mesmo SKU ao mesmo tempo, que é onde a escrita concorrente aparece. Junto, --backoffice clientes
+lançam entradas de estoque (POST /products/{id}/stock) nesses mesmos produtos: rota que lê o
+produto e depois grava, o caso em que transação deferred falha com "database is locked".
+
+Para cada quantidade de workers: banco semeado novo, servidor num processo à parte, --duration
+segundos de carga. Sai throughput de vendas, p50/p95/p99 por operação, erros por status e a
+conferência do estoque (saldo dos produtos == carga inicial - itens vendidos + entradas lançadas;
+nada perdido nem duplicado).
+
+Uso:
+    python benchmarks/bench_store_server.py --tills 10 --backoffice 2 --workers 1 4 --duration 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from bench_suite import SRC, WORDS, percentiles, seed  # noqa: E402
+
+import httpx  # noqa: E402
+
+from app.clients.api_client import wait_until_ready  # noqa: E402
+
+
+ENTRY_REASON = "ENTRADA carga"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def till(base_url: str, args, idx: int, deadline: float, samples: dict, errors: Counter, lock: threading.Lock):
+    """Um caixa: ciclo do PDV até o prazo acabar."""
+    rng = random.Random(args.seed * 1000 + idx)
+    local: dict[str, list[float]] = {}
+    local_errors: Counter = Counter()
+
+    def call(op: str, method: str, url: str, **kw):
+        t0 = time.perf_counter()
+        try:
+            r = client.request(method, url, **kw)
+            status = r.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        local.setdefault(op, []).append(time.perf_counter() - t0)
+        if status != 200:
+            local_errors[f"{op}: {status}"] += 1
+
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        n = 0
+        while time.perf_counter() < deadline:
+            n += 1
+            call("GET /products/search", "GET", "/products/search", params={"q": rng.choice(WORDS), "limit": 20})
+            call("GET /products/{id}", "GET", f"/products/{rng.randint(1, args.products)}")
+            pool = args.hot if rng.random() < 0.5 else args.products
+            cart = [{"product_id": rng.randint(1, pool), "qty": rng.randint(1, 3)} for _ in range(rng.randint(1, 5))]
+            call("POST /sales", "POST", "/sales", json={"items": cart})
+            if n % 10 == 0:
+                call("GET /sales", "GET", "/sales", params={"limit": 50})
+    with lock:
+        for op, values in local.items():
+            samples.setdefault(op, []).extend(values)
+        errors.update(local_errors)
+
+
+def backoffice(base_url: str, args, idx: int, deadline: float, samples: dict, errors: Counter, lock: threading.Lock):
+    """Retaguarda: entradas de estoque nos produtos disputados, sem parar."""
+    rng = random.Random(args.seed * 2000 + idx)
+    local: list[float] = []
+    local_errors: Counter = Counter()
+    with httpx.Client(base_url=base_url, timeout=30) as client:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                status = client.post(f"/products/{rng.randint(1, args.hot)}/stock",
+                                     json={"delta": rng.randint(1, 10), "reason": ENTRY_REASON}).status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            local.append(time.perf_counter() - t0)
+            if status != 200:
+                local_errors[f"POST /products/{{id}}/stock: {status}"] += 1
+    with lock:
+        samples.setdefault("POST /products/{id}/stock", []).extend(local)
+        errors.update(local_errors)
+
+
+def stock_check(db: str, products: int, seeded_sales: int) -> tuple[int, int]:
+    """(saldo somado dos produtos, saldo esperado pelas vendas e entradas gravadas): têm que bater."""
+    conn = sqlite3.connect(db)
+    try:
+        # o seed começa todo produto com 1_000_000 e vendas do seed não mexeram em stock_qty
+        balance = conn.execute("SELECT sum(stock_qty) FROM products").fetchone()[0]
+        sold = conn.execute("SELECT coalesce(sum(qty), 0) FROM sale_items WHERE sale_id > ?",
+                            (seeded_sales,)).fetchone()[0]
+        entered = conn.execute("SELECT coalesce(sum(delta), 0) FROM stock_moves WHERE reason = ?",
+                               (ENTRY_REASON,)).fetchone()[0]
+    finally:
+        conn.close()
+    return balance, products * 1_000_000 - sold + entered
+
+
+def run_round(template: str, work: str, store: dict, workers: int, args) -> bool:
+    cwd = os.path.join(work, f"w{workers}")
+    os.makedirs(cwd)
+    db = os.path.join(cwd, "storage.db")
+    shutil.copy(template, db)
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{db}", DB_FILE_PATH=db,
+               PYTHONPATH=os.pathsep.join(filter(None, [os.path.abspath(SRC), os.environ.get("PYTHONPATH")])))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.api.store_server", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers)],
+        cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        if not wait_until_ready(base_url, timeout=60):
+            print(f"❌ servidor com {workers} workers não subiu:\n{server.stderr.read()[-2000:] if server.poll() is not None else ''}")
+            return False
+        time.sleep(1.0)  # /health responde no primeiro worker; dá tempo dos outros subirem
+
+        samples: dict[str, list[float]] = {}
+        errors: Counter = Counter()
+        lock = threading.Lock()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        threads = [threading.Thread(target=till, args=(base_url, args, i, deadline, samples, errors, lock))
+                   for i in range(args.tills)]
+        threads += [threading.Thread(target=backoffice, args=(base_url, args, i, deadline, samples, errors, lock))
+                    for i in range(args.backoffice)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if os.name == "nt":
+            server.terminate()
+        else:
+            server.send_signal(signal.SIGINT)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    sales_ok = len(samples.get("POST /sales", [])) - sum(v for k, v in errors.items() if k.startswith("POST /sales"))
+    print(f"\n{workers} worker(s), {args.tills} caixas + {args.backoffice} retaguarda, {elapsed:.1f}s: "
+          f"{sales_ok / elapsed:.1f} vendas/s, {sum(len(v) for v in samples.values()) / elapsed:.1f} req/s")
+    for op, values in sorted(samples.items()):
+        p50, p95, p99 = percentiles(values)
+        print(f"  {op:<26} n={len(values):>6} | p50 {p50 * 1000:8.2f} ms | p95 {p95 * 1000:8.2f} ms | "
+              f"p99 {p99 * 1000:8.2f} ms")
+    for err, count in errors.most_common():
+        print(f"  ⚠️ {err}: {count}")
+
+    balance, expected = stock_check(db, store["products"], store["sales"])
+    ok = balance == expected
+    print(f"  estoque: saldo {balance} x esperado {expected} -> {'OK' if ok else 'DIVERGENTE'}")
+    # recusa por estoque (400) não acontece com o saldo do seed; qualquer erro aqui é falha do servidor
+    return ok and not errors
+
+
+def main(args) -> None:
+    with tempfile.TemporaryDirectory() as work:
+        template = os.path.join(work, "loja_semeada.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            store = seed(template, args)
+        print(f"loja sintética: {store['products']} produtos, {store['sales']} vendas ({store['size_mb']} MB)")
+        results = [run_round(template, work, store, workers, args) for workers in args.workers]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tills", type=int, default=10, help="caixas simultâneos")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="uma rodada por valor")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos de carga por rodada")
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--backoffice", type=int, default=2, help="clientes lançando entradas de estoque")
+    parser.add_argument("--hot", type=int, default=50, help="produtos disputados por todos os caixas")
+    parser.add_argument("--years", type=float, default=0.25)
+    parser.add_argument("--sales-per-day", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
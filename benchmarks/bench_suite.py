@@ -0,0 +1,613 @@
+"""
+Suíte dos caminhos quentes do ERP, com resultado em JSON comparável entre execuções.
+
+Semeia uma loja sintética (produtos, anos de vendas com itens e movimentos de estoque) num
+storage.db temporário e roda cada cenário num processo próprio, sobre uma cópia do banco semeado:
+um cenário não herda as vendas do outro e o pico de RSS medido é só dele.
+
+  vendas      POST /sales e POST /sales/batch (fila offline)
+  produtos    GET /products (catálogo inteiro e 304 com ETag), GET /products/search
+  historico   GET /sales paginado por cursor
+  relatorios  GET /reports/summary, /dashboard, /stock_moves_7d, /stock_moves_range (json e csv)
+  planilha    ImportEngine.run: CSV -> POST /products/bulk, por bloco
+  nfe         NFeParser.parse_many + ImportEngine.import_nfe (cadastro + entradas de estoque)
+  backup      BackupEngine.snapshot (inicial e incremental), SecurityVault (cifrar/decifrar)
+  sync        ChangeFeed.next_batch + POST /api/sync/changes (gzip) + ack, POST /api/sync
+  pdf         PDFGenerator.gerar_inventario_pdf do catálogo
+
+O app FastAPI roda no próprio processo, sem rede: httpx.ASGITransport nas rotas chamadas direto
+e o TestClient (o mesmo app) onde o código do desktop usa o ApiClient/httpx síncrono.
+Cada operação sai com ops, itens, throughput (itens/s) e p50/p95/p99 (ms); cada cenário com o
+pico de RSS do processo (MB). --compare aponta regressões entre duas execuções (código de saída 1).
+
+Uso:
+    python benchmarks/bench_suite.py --out base.json
+    python benchmarks/bench_suite.py --products 20000 --years 3 --sales-per-day 300 --out novo.json
+    python benchmarks/bench_suite.py --only vendas relatorios --out novo.json
+    python benchmarks/bench_suite.py --compare base.json novo.json --tolerance 0.10
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(BENCH_DIR, "..", "src")
+sys.path.insert(0, SRC)
+
+SCENARIOS = ["vendas", "produtos", "historico", "relatorios", "planilha", "nfe", "backup", "sync", "pdf"]
+
+WORDS = ["arroz", "feijao", "oleo", "soja", "cafe", "leite", "integral", "acucar", "refrigerante", "cola",
+         "lata", "pet", "sabao", "po", "detergente", "biscoito", "recheado", "macarrao", "espaguete", "molho"]
+PAYMENTS = ["DINHEIRO", "PIX", "CREDITO", "DEBITO"]
+
+
+def peak_rss_mb() -> float | None:
+    """Pico de memória residente do processo (None se a plataforma não informa)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return _windows_peak_rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024  # bytes no macOS, KB no Linux
+
+
+def _windows_peak_rss_mb() -> float | None:
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage",
+                )
+            ]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / 2**20
+    except Exception:
+        return None
+
+
+def percentiles(samples: list[float]) -> tuple[float, float, float]:
+    if len(samples) == 1:
+        return samples[0], samples[0], samples[0]
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return q[49], q[94], q[98]
+
+
+def stats(samples: list[float], items: int | None = None, unit: str = "ops") -> dict:
+    total = sum(samples)
+    items = len(samples) if items is None else items
+    p50, p95, p99 = percentiles(samples)
+    return {
+        "ops": len(samples), "items": items, "unit": unit, "seconds": round(total, 4),
+        "throughput": round(items / total, 2) if total else None,
+        "p50_ms": round(p50 * 1000, 3), "p95_ms": round(p95 * 1000, 3), "p99_ms": round(p99 * 1000, 3),
+    }
+
+
+# ==========================================
+#  loja sintética
+# ==========================================
+def seed(path: str, args) -> dict:
+    """Schema pelas migrações e carga direta em sqlite3 (triggers de FTS/agregados ligados, como na loja)."""
+    from app.db.migrations import STORAGE_MIGRATIONS, MigrationEngine
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        MigrationEngine.check_and_migrate(path, STORAGE_MIGRATIONS)
+    rng = random.Random(args.seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executemany(
+        "INSERT INTO products (id, name, sku, price, cost_price, stock_qty, min_stock, type, ncm_code, ipi_rate, "
+        "icms_rate, row_version) VALUES (?, ?, ?, ?, ?, ?, 5, 'PRODUTO', '22021000', 0, 18, 0)",
+        ((i, " ".join(rng.sample(WORDS, 3)) + f" {i}", f"SKU{i:07d}", round(rng.uniform(2, 300), 2),
+          round(rng.uniform(1, 150), 2), 1_000_000) for i in range(1, args.products + 1)),
+    )
+
+    days = max(1, int(args.years * 365))
+    start = datetime.combine(date.today() - timedelta(days=days), datetime.min.time())
+    sales, items, moves = [], [], []
+    sale_id = item_id = 0
+
+    def flush():
+        conn.executemany("INSERT INTO sales (id, created_at, payment_method, total) VALUES (?, ?, ?, ?)", sales)
+        conn.executemany("INSERT INTO sale_items (id, sale_id, product_id, qty) VALUES (?, ?, ?, ?)", items)
+        conn.executemany("INSERT INTO stock_moves (product_id, delta, reason, created_at) VALUES (?, ?, ?, ?)", moves)
+        sales.clear()
+        items.clear()
+        moves.clear()
+
+    for day in range(days):
+        base = start + timedelta(days=day, hours=8)
+        for ts in sorted(rng.randrange(0, 12 * 3600) for _ in range(args.sales_per_day)):
+            sale_id += 1
+            created = (base + timedelta(seconds=ts)).isoformat(sep=" ")
+            total = 0.0
+            for _ in range(rng.randint(1, 5)):
+                item_id += 1
+                pid, qty = rng.randint(1, args.products), rng.randint(1, 3)
+                items.append((item_id, sale_id, pid, qty))
+                moves.append((pid, -qty, f"VENDA #{sale_id}", created))
+                total += qty * 10
+            sales.append((sale_id, created, rng.choice(PAYMENTS), total))
+        if day % 7 == 0:  # reposição semanal de parte do catálogo
+            for pid in rng.sample(range(1, args.products + 1), min(args.products, 50)):
+                moves.append((pid, rng.randint(10, 100), "ENTRADA NF", (base - timedelta(hours=1)).isoformat(sep=" ")))
+        if len(items) > 50_000:
+            flush()
+    flush()
+    conn.commit()
+    n_moves = conn.execute("SELECT count(*) FROM stock_moves").fetchone()[0]
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return {"products": args.products, "sales": sale_id, "sale_items": item_id, "stock_moves": n_moves,
+            "days": days, "size_mb": round(os.path.getsize(path) / 2**20, 1)}
+
+
+# ==========================================
+#  cenários (rodam no processo filho)
+# ==========================================
+def asgi_client():
+    import httpx
+
+    from app.api.server import create_app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app()), base_url="http://bench", timeout=None)
+
+
+def test_client():
+    from fastapi.testclient import TestClient
+
+    from app.api.server import create_app
+
+    return TestClient(create_app())
+
+
+async def measure(n: int, call, warmup: int = 0) -> list[float]:
+    """Chama `call(i)` n vezes (depois de `warmup` chamadas fora da conta); erro HTTP derruba a rodada."""
+    samples = []
+    for i in range(-warmup, n):
+        t0 = time.perf_counter()
+        r = await call(i)
+        elapsed = time.perf_counter() - t0
+        if r.status_code >= 400:
+            raise RuntimeError(f"{r.request.method} {r.request.url.path}: HTTP {r.status_code} {r.text[:200]}")
+        if i >= 0:
+            samples.append(elapsed)
+    return samples
+
+
+def random_cart(rng: random.Random, n_products: int) -> list[dict]:
+    return [{"product_id": rng.randint(1, n_products), "qty": rng.randint(1, 3)} for _ in range(rng.randint(1, 5))]
+
+
+def scenario_vendas(args, rng) -> dict:
+    async def run():
+        async with asgi_client() as c:
+            single = await measure(args.requests, lambda i: c.post("/sales", json={"items": random_cart(rng, args.products)}),
+                                   warmup=args.warmup)
+            n_batches, per_batch = max(1, args.requests // 50), 50
+            batch = await measure(n_batches, lambda i: c.post(
+                "/sales/batch", json={"sales": [{"items": random_cart(rng, args.products)} for _ in range(per_batch)]}))
+        return {
+            "POST /sales": stats(single),
+            "POST /sales/batch (50 vendas)": stats(batch, n_batches * per_batch, "vendas"),
+        }
+
+    return asyncio.run(run())
+
+
+def scenario_produtos(args, rng) -> dict:
+    async def run():
+        async with asgi_client() as c:
+            n_full = max(3, args.requests // 20)
+            full = await measure(n_full, lambda i: c.get("/products"), warmup=1)
+            etag = (await c.get("/products")).headers.get("ETag")
+            cond = await measure(args.requests, lambda i: c.get("/products", headers={"If-None-Match": etag or ""}))
+            terms = [rng.choice(WORDS)[:rng.randint(3, 6)] for _ in range(args.requests)]
+            search = await measure(args.requests, lambda i: c.get("/products/search", params={"q": terms[i]}),
+                                   warmup=args.warmup)
+            one = await measure(args.requests, lambda i: c.get(f"/products/{rng.randint(1, args.products)}"))
+        return {
+            "GET /products (catálogo)": stats(full, n_full * args.products, "produtos"),
+            "GET /products (304 ETag)": stats(cond),
+            "GET /products/search": stats(search),
+            "GET /products/{id}": stats(one),
+        }
+
+    return asyncio.run(run())
+
+
+def scenario_historico(args, rng) -> dict:
+    async def run():
+        async with asgi_client() as c:
+            state = {"cursor": None}
+
+            async def page(i):
+                params = {"limit": 100}
+                if state["cursor"]:
+                    params["cursor"] = state["cursor"]
+                r = await c.get("/sales", params=params)
+                state["cursor"] = r.json().get("next_cursor") if r.status_code == 200 else None
+                return r
+
+            pages = await measure(args.requests, page, warmup=1)
+            state["cursor"] = None
+            with_items = await measure(max(1, args.requests // 5), lambda i: c.get(
+                "/sales", params={"limit": 100, "include_items": True}))
+        return {
+            "GET /sales (páginas de 100)": stats(pages, len(pages) * 100, "vendas"),
+            "GET /sales?include_items": stats(with_items, len(with_items) * 100, "vendas"),
+        }
+
+    return asyncio.run(run())
+
+
+def scenario_relatorios(args, rng) -> dict:
+    today = date.today()
+    month = {"start": (today - timedelta(days=30)).isoformat(), "end": today.isoformat()}
+    year = {"start": (today - timedelta(days=365)).isoformat(), "end": today.isoformat(), "format": "csv"}
+
+    async def run():
+        async with asgi_client() as c:
+            out = {}
+            for name, url, params in (
+                ("GET /reports/summary", "/reports/summary", None),
+                ("GET /reports/dashboard", "/reports/dashboard", None),
+                ("GET /reports/stock_moves_7d", "/reports/stock_moves_7d", None),
+                ("GET /reports/stock_moves_range (30 dias)", "/reports/stock_moves_range", month),
+            ):
+                out[name] = stats(await measure(args.requests, lambda i: c.get(url, params=params), warmup=args.warmup))
+            sizes = []
+
+            async def export(i):
+                r = await c.get("/reports/stock_moves_range", params=year)
+                sizes.append(len(r.content))
+                # arquivo com menos linhas que o COUNT do período = cursor pulando movimentos
+                rows = r.text.count("\r\n") - 1
+                if rows != int(r.headers["X-Row-Count"]):
+                    raise RuntimeError(f"exportação com {rows} de {r.headers['X-Row-Count']} movimentos")
+                return r
+
+            csv = await measure(3, export)
+            out["GET /reports/stock_moves_range csv (1 ano)"] = stats(csv, round(sum(sizes) / 2**20, 2), "MB")
+        return out
+
+    return asyncio.run(run())
+
+
+def _api_client(http):
+    """ApiClient do desktop falando com o app no próprio processo (TestClient no lugar do pool httpx)."""
+    from app.clients.api_client import ApiClient
+
+    api = ApiClient("http://testserver", retries=0)
+    api.client.close()
+    api.client = http
+    return api
+
+
+def scenario_planilha(args, rng) -> dict:
+    from app.utils.import_engine import ImportEngine
+
+    path = os.path.abspath("cadastro.csv")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Descricao;Preco;Custo;Codigo;Estoque;NCM\n")
+        for i in range(args.import_rows):
+            # metade atualiza SKUs existentes, metade cadastra
+            sku = f"SKU{rng.randint(1, args.products):07d}" if i % 2 else f"IMP{i:07d}"
+            f.write(f"{' '.join(rng.sample(WORDS, 2))} {i};{rng.uniform(1, 99):.2f}".replace(".", ",")
+                    + f";{rng.uniform(1, 50):.2f}".replace(".", ",") + f";{sku};{rng.randint(0, 500)};22021000\n")
+    mapping = {"name": "Descricao", "price": "Preco", "cost_price": "Custo", "sku": "Codigo",
+               "stock_qty": "Estoque", "ncm_code": "NCM"}
+    marks = [time.perf_counter()]
+    with test_client() as http:
+        report = ImportEngine.run(_api_client(http), path, mapping, progress=lambda *a: marks.append(time.perf_counter()))
+    if report["errors"]:
+        raise RuntimeError(f"importação com erros: {report['errors'][:3]}")
+    chunks = [b - a for a, b in zip(marks, marks[1:])]
+    return {"ImportEngine.run (bloco de 1000 linhas)": stats(chunks, report["rows"], "linhas")}
+
+
+def scenario_nfe(args, rng) -> dict:
+    from bench_nfe_parser import write_nfe
+
+    from app.utils.import_engine import ImportEngine
+    from app.utils.nfe_parser import NFeParser
+
+    folder = os.path.abspath("notas")
+    os.makedirs(folder)
+    for n in range(args.nfe_files):
+        write_nfe(os.path.join(folder, f"nfe_{n:05d}.xml"), 30, n + 1, rng)
+    paths = NFeParser.list_folder(folder)
+    t0 = time.perf_counter()
+    notas = NFeParser.parse_many(paths)
+    parse = time.perf_counter() - t0
+    with test_client() as http:
+        t0 = time.perf_counter()
+        report = ImportEngine.import_nfe(_api_client(http), notas)
+        send = time.perf_counter() - t0
+    if report["errors"]:
+        raise RuntimeError(f"importação de NFe com erros: {report['errors'][:3]}")
+    return {
+        "NFeParser.parse_many": stats([parse], len(paths), "notas"),
+        "ImportEngine.import_nfe": stats([send], report["upserted"] + report["entries"], "linhas"),
+    }
+
+
+def scenario_backup(args, rng) -> dict:
+    from app.core.config import settings
+    from app.core.security_vault import SecurityVault
+    from app.utils.backup_engine import BackupEngine
+
+    db, store = settings.db_file_path, os.path.abspath("backups")
+    size_mb = os.path.getsize(db) / 2**20
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        BackupEngine.snapshot(db, store)
+        first = time.perf_counter() - t0
+        incremental = []
+        for _ in range(5):
+            conn = sqlite3.connect(db)
+            now = datetime.now().isoformat(sep=" ")
+            conn.executemany("INSERT INTO stock_moves (product_id, delta, reason, created_at) VALUES (?, -1, 'VENDA', ?)",
+                             [(rng.randint(1, args.products), now) for _ in range(200)])
+            conn.commit()
+            conn.close()
+            t0 = time.perf_counter()
+            BackupEngine.snapshot(db, store)
+            incremental.append(time.perf_counter() - t0)
+
+        key = SecurityVault.gerar_chave_mestre()
+        enc, dec = [], []
+        for i in range(3):
+            t0 = time.perf_counter()
+            vault = SecurityVault.criptografar_arquivo(db, key, destino=os.path.abspath(f"storage_{i}.vault"))
+            enc.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            SecurityVault.descriptografar_arquivo(vault, key, destino=os.path.abspath(f"restaurado_{i}.db"))
+            dec.append(time.perf_counter() - t0)
+    return {
+        "BackupEngine.snapshot (inicial)": stats([first], round(size_mb, 2), "MB"),
+        "BackupEngine.snapshot (incremental)": stats(incremental, round(size_mb * len(incremental), 2), "MB"),
+        "SecurityVault.criptografar_arquivo": stats(enc, round(size_mb * len(enc), 2), "MB"),
+        "SecurityVault.descriptografar_arquivo": stats(dec, round(size_mb * len(dec), 2), "MB"),
+    }
+
+
+def scenario_sync(args, rng) -> dict:
+    from app.core.config import settings
+    from app.core.local_db import get_local_db
+    from app.utils.cloud_sync import ChangeFeed, CloudSyncEngine
+
+    store = get_local_db(os.path.abspath("loja.db"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        store.ensure_schema()
+    now = datetime.now()
+    store.executemany(
+        "INSERT INTO sales (total_value, payment_method, items, timestamp) VALUES (?, ?, ?, ?)",
+        [(round(rng.uniform(5, 500), 2), rng.choice(PAYMENTS), json.dumps(random_cart(rng, args.products)),
+          (now - timedelta(seconds=i)).isoformat()) for i in range(args.sync_rows)],
+    )
+    feed = ChangeFeed(store)
+    batches, sent = [], 0
+    # hub do próprio processo: a loja do lote e as 20 dos pulsos com token
+    settings.hub_unit_tokens = {unit: "bench" for unit in ["BENCH"] + [f"U{i}" for i in range(20)]}
+    with test_client() as http, contextlib.redirect_stdout(io.StringIO()):
+        engine = CloudSyncEngine(store.path, hub_url="http://testserver/api/sync", unit_id="BENCH", token="bench",
+                                 http=http)
+        while True:
+            t0 = time.perf_counter()
+            batch = feed.next_batch(settings.sync_batch_size)
+            if batch is None:
+                break
+            if engine.enviar_lote(http, batch) < batch["to_seq"]:
+                raise RuntimeError("hub não confirmou o lote inteiro")
+            feed.ack(batch["to_seq"])
+            batches.append(time.perf_counter() - t0)
+            sent += len(batch["changes"])
+
+        def pulse(i):
+            t0 = time.perf_counter()
+            unit = f"U{i % 20}"
+            r = http.post("/api/sync", json={"unit_id": unit, "total_sales": float(i)},
+                          headers={"X-Unit-Id": unit, "Authorization": "Bearer bench"})
+            r.raise_for_status()
+            return time.perf_counter() - t0
+
+        pulses = [pulse(i) for i in range(args.requests)]
+    return {
+        f"sync_changes (lote de {settings.sync_batch_size})": stats(batches, sent, "alterações"),
+        "POST /api/sync (pulso)": stats(pulses),
+    }
+
+
+def scenario_pdf(args, rng) -> dict:
+    from app.core.config import settings
+    from app.utils.pdf_generator import PDFGenerator
+
+    conn = sqlite3.connect(settings.db_file_path)
+    produtos = conn.execute(
+        "SELECT id, name, cost_price, price, stock_qty, min_stock FROM products ORDER BY name LIMIT ?", (args.pdf_rows,)
+    ).fetchall()
+    conn.close()
+    samples = []
+    for i in range(3):
+        t0 = time.perf_counter()
+        PDFGenerator.gerar_inventario_pdf(produtos, filename=os.path.abspath(f"estoque_{i}.pdf"))
+        samples.append(time.perf_counter() - t0)
+    return {"PDFGenerator.gerar_inventario_pdf": stats(samples, len(produtos) * len(samples), "linhas")}
+
+
+# ==========================================
+#  execução
+# ==========================================
+def child(args) -> None:
+    rng = random.Random(args.seed)
+    base_rss = peak_rss_mb()
+    fn = globals()[f"scenario_{args.child}"]
+    with contextlib.redirect_stdout(sys.stderr):  # prints do app não se misturam com o JSON
+        ops = fn(args, rng)
+    print(json.dumps({"ops": ops, "peak_rss_mb": peak_rss_mb(), "base_rss_mb": base_rss}))
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args) -> None:
+    scenarios = args.only or SCENARIOS
+    params = {k: getattr(args, k) for k in (
+        "products", "years", "sales_per_day", "requests", "warmup", "import_rows", "nfe_files", "sync_rows",
+        "pdf_rows", "seed")}
+    result = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "sqlite": sqlite3.sqlite_version, "cpus": os.cpu_count(), "params": params,
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as work:
+        template = os.path.join(work, "loja_semeada.db")
+        t0 = time.perf_counter()
+        result["meta"]["store"] = store = seed(template, args)
+        print(f"loja sintética: {store['products']} produtos, {store['sales']} vendas, {store['stock_moves']} "
+              f"movimentos em {store['days']} dias ({store['size_mb']} MB, {time.perf_counter() - t0:.1f}s)")
+
+        for name in scenarios:
+            cwd = os.path.join(work, name)
+            os.makedirs(cwd)
+            db = os.path.join(cwd, "storage.db")
+            shutil.copy(template, db)
+            env = dict(os.environ, DATABASE_URL=f"sqlite+aiosqlite:///{db}", DB_FILE_PATH=db)
+            cmd = [sys.executable, os.path.abspath(__file__), "--child", name,
+                   *[f"--{k.replace('_', '-')}={v}" for k, v in params.items()]]
+            t0 = time.perf_counter()
+            try:
+                out = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True, timeout=args.timeout)
+            except subprocess.TimeoutExpired:
+                print(f"❌ {name}: passou de {args.timeout:.0f}s")
+                result["scenarios"][name] = {"error": f"timeout ({args.timeout:.0f}s)"}
+                continue
+            line = next((l for l in reversed(out.stdout.splitlines()) if l.startswith("{")), None)
+            if out.returncode != 0 or line is None:
+                print(f"❌ {name}: falhou (código {out.returncode})\n{out.stderr[-3000:]}")
+                result["scenarios"][name] = {"error": out.stderr[-3000:]}
+                continue
+            res = result["scenarios"][name] = json.loads(line)
+            rss = f"{res['peak_rss_mb']:.0f} MB" if res["peak_rss_mb"] else "n/d"
+            print(f"\n{name} ({time.perf_counter() - t0:.1f}s, pico de RSS {rss})")
+            for op, s in res["ops"].items():
+                print(f"  {op:<44} {s['throughput'] or 0:>10.1f} {s['unit'] + '/s':<13} | p50 {s['p50_ms']:>9.2f} ms | "
+                      f"p95 {s['p95_ms']:>9.2f} ms | p99 {s['p99_ms']:>9.2f} ms | n={s['ops']}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\nresultado gravado em {args.out}")
+    if any("error" in s for s in result["scenarios"].values()):
+        sys.exit(1)
+
+
+def _delta(base, new) -> float | None:
+    return (new - base) / base if base and new is not None else None
+
+
+def compare(args) -> None:
+    """Diferença operação a operação; p95 ou RSS acima da tolerância, ou throughput abaixo, é regressão."""
+    with open(args.compare[0], encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.compare[1], encoding="utf-8") as f:
+        new = json.load(f)
+    tol = args.tolerance
+    print(f"base: {base['meta'].get('commit')} ({base['meta']['created']})  novo: {new['meta'].get('commit')} "
+          f"({new['meta']['created']})  tolerância {tol:.0%}")
+    if base["meta"].get("params") != new["meta"].get("params"):
+        print("⚠️ parâmetros diferentes entre as execuções: comparação só indicativa")
+
+    missing = sorted(set(base["scenarios"]) ^ set(new["scenarios"]))
+    if missing:
+        print(f"cenários só em uma das execuções: {', '.join(missing)}")
+    regressions = []
+    for name, b in base["scenarios"].items():
+        n = new["scenarios"].get(name)
+        if n is None:
+            continue
+        if "error" in n or "error" in b:
+            print(f"\n{name}: com erro em uma das execuções")
+            continue
+        d_rss = _delta(b.get("peak_rss_mb"), n.get("peak_rss_mb"))
+        flag = " ⚠️" if d_rss is not None and d_rss > tol else ""
+        if flag:
+            regressions.append(f"{name}: pico de RSS")
+        rss = f"{d_rss:+.0%}" if d_rss is not None else "n/d"
+        print(f"\n{name} (pico de RSS {b.get('peak_rss_mb') or 0:.0f} -> {n.get('peak_rss_mb') or 0:.0f} MB, {rss}){flag}")
+        for op, sb in b["ops"].items():
+            sn = n["ops"].get(op)
+            if sn is None:
+                print(f"  {op:<44} ausente no novo")
+                continue
+            d_p95 = _delta(sb["p95_ms"], sn["p95_ms"])
+            d_tp = _delta(sb["throughput"], sn["throughput"])
+            bad = (d_p95 is not None and d_p95 > tol) or (d_tp is not None and d_tp < -tol)
+            if bad:
+                regressions.append(f"{name} / {op}")
+            print(f"  {op:<44} p95 {sb['p95_ms']:>9.2f} -> {sn['p95_ms']:>9.2f} ms ({d_p95 or 0:+6.0%}) | "
+                  f"{sb['throughput'] or 0:>10.1f} -> {sn['throughput'] or 0:>10.1f} {sb['unit']}/s ({d_tp or 0:+6.0%})"
+                  f"{'  ⚠️ REGRESSÃO' if bad else ''}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regressão(ões): " + "; ".join(regressions))
+        sys.exit(1)
+    print("\n✅ nenhuma regressão acima da tolerância")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--years", type=float, default=1.0, help="anos de histórico de vendas")
+    parser.add_argument("--sales-per-day", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=300, help="requisições medidas por operação HTTP")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--import-rows", type=int, default=20000, help="linhas da planilha importada")
+    parser.add_argument("--nfe-files", type=int, default=200, help="notas de 30 itens importadas")
+    parser.add_argument("--sync-rows", type=int, default=20000, help="vendas locais enviadas ao hub")
+    parser.add_argument("--pdf-rows", type=int, default=2000, help="linhas do PDF de inventário")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=900, help="limite por cenário (segundos)")
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="só estes cenários")
+    parser.add_argument("--out", help="arquivo JSON do resultado")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NOVO"), help="compara dois resultados JSON")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="variação aceita antes de apontar regressão")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.compare:
+        compare(args)
+    elif args.child:
+        child(args)
+    else:
+        run(args)
@@ -0,0 +1,77 @@
+"""
+Benchmark da grade de produtos: rebuild com QTableWidget (setRowCount(0) + insertRow/setItem)
+contra ProductTableModel.set_rows em um QTableView, e RSS ao longo de vários refreshes.
+
+Uso (sem janela na tela):
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_table_model.py --rows 50000 --refreshes 10
+"""
+import argparse
+import os
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+
+from PySide6.QtWidgets import QApplication, QTableWidget, QTableWidgetItem
+
+from app.ui.table_models import ProductTableModel, make_table_view
+from bench_suite import peak_rss_mb  # resource no Linux/macOS, psapi no Windows
+
+
+def rss_mb() -> str:
+    peak = peak_rss_mb()
+    return f"{peak:7.1f} MB" if peak is not None else "    n/d"
+
+
+def fake_products(n: int, version: int) -> list[dict]:
+    return [{"id": i, "name": f"Produto {i}", "sku": f"SKU{i:07d}", "stock_qty": (i + version) % 50} for i in range(n)]
+
+
+def legacy_refresh(table: QTableWidget, products: list[dict]) -> None:
+    table.setRowCount(0)
+    for p in products:
+        row = table.rowCount()
+        table.insertRow(row)
+        table.setItem(row, 0, QTableWidgetItem(str(p["id"])))
+        table.setItem(row, 1, QTableWidgetItem(p["name"]))
+        table.setItem(row, 2, QTableWidgetItem(p["sku"]))
+        table.setItem(row, 3, QTableWidgetItem(str(p["stock_qty"])))
+
+
+def main(args) -> None:
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    model = ProductTableModel()
+    view = make_table_view(model)
+    view.resize(800, 600)
+    view.show()
+    for v in range(args.refreshes):
+        data = fake_products(args.rows, v)
+        t0 = time.perf_counter()
+        model.set_rows(data)
+        app.processEvents()
+        print(f"modelo    refresh {v + 1:>2}: {(time.perf_counter() - t0) * 1000:8.1f} ms | RSS máx {rss_mb()}")
+
+    t0 = time.perf_counter()
+    model.apply_stock(args.rows // 2, 999)
+    app.processEvents()
+    print(f"modelo    linha única (stock_updated): {(time.perf_counter() - t0) * 1000:.3f} ms")
+
+    table = QTableWidget(0, 4)
+    table.resize(800, 600)
+    table.show()
+    for v in range(min(args.refreshes, 3)):
+        data = fake_products(args.rows, v)
+        t0 = time.perf_counter()
+        legacy_refresh(table, data)
+        app.processEvents()
+        print(f"QTableWidget refresh {v + 1:>2}: {(time.perf_counter() - t0) * 1000:8.1f} ms | RSS máx {rss_mb()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--refreshes", type=int, default=10)
+    main(parser.parse_args())
@@ -1,7 +1,37 @@
+import asyncio
 from collections.abc import AsyncGenerator
+from fastapi import HTTPException, Request
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.db.session import SessionLocal, WriteSessionLocal
+
+def is_db_locked(exc: Exception) -> bool:
+    return isinstance(exc, OperationalError) and "database is locked" in str(exc)
 
 async def db_session() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
+
+async def db_write_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sessão das rotas que gravam. Dentro do processo, uma escrita por vez na fila do app
+    (app.state.write_lock, por ordem de chegada); entre workers, a trava do próprio SQLite,
+    pedida com BEGIN IMMEDIATE antes da rota rodar. Cada tentativa espera o busy_timeout no
+    driver; se outro worker ainda segurar o banco, tenta de novo sem bloquear o event loop e,
+    no fim, devolve 503 (nada foi gravado, o caixa pode reenviar).
+    """
+    async with request.app.state.write_lock, WriteSessionLocal() as session:
+        for attempt in range(settings.db_write_retries + 1):
+            try:
+                await session.connection()
+                break
+            except OperationalError as e:
+                await session.rollback()
+                if not is_db_locked(e):
+                    raise
+                if attempt >= settings.db_write_retries:
+                    raise HTTPException(status_code=503, detail="banco ocupado, tente de novo",
+                                        headers={"Retry-After": "1"})
+                await asyncio.sleep(0.05 * 2 ** attempt)
+        yield session
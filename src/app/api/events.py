@@ -0,0 +1,40 @@
+"""
+Pub/sub em memória para os fluxos SSE do hub (GET /api/sync/events).
+
+Cada conexão ganha uma fila; publish() é chamado no event loop logo depois da escrita no banco.
+Assinante lento que enche a fila perde os eventos pendentes e recebe um "resync": o endpoint
+manda um snapshot novo no lugar, então o painel nunca fica com estado pela metade.
+"""
+import asyncio
+
+
+class Broadcaster:
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_queue)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, data) -> None:
+        """Entrega para todos os assinantes sem esperar (só do event loop: asyncio.Queue não é thread-safe)."""
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait((event, data))
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("resync", None))
+
+
+# Eventos de telemetria/sincronização das lojas para o painel Master
+telemetry_events = Broadcaster()
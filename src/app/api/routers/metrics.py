@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from app.core.metrics import CONTENT_TYPE, render
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def metrics():
+    """Histogramas de latência (API, SQL, ApiClient) no formato de texto do Prometheus."""
+    return Response(render(), media_type=CONTENT_TYPE)
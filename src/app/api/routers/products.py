@@ -1,32 +1,221 @@
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import case, insert, or_, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import db_session
-from app.api.schemas.product import ProductCreate, ProductRead, ProductUpdate, StockAdjust
+from app.api.deps import db_session, db_write_session
+from app.api.schemas.product import (
+    ProductBulkIn, ProductBulkOut, ProductChanges, ProductCreate, ProductRead, ProductUpdate, StockAdjust,
+    StockEntryIn, StockEntryOut,
+)
+from app.db.catalog_version import current_catalog_version, next_catalog_version
+from app.db.models.catalog import ProductDeletion
 from app.db.models.product import Product
 from app.db.models.stock_move import StockMove
+from app.db.search_index import build_match_query
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
+def _catalog_etag(version: int) -> str:
+    return f'W/"catalog-{version}"'
+
+
 @router.post("", response_model=ProductRead)
-async def create_product(payload: ProductCreate, db: AsyncSession = Depends(db_session)):
+async def create_product(payload: ProductCreate, db: AsyncSession = Depends(db_write_session)):
     p = Product(name=payload.name, sku=payload.sku)
+    p.row_version = await next_catalog_version(db)
     db.add(p)
     await db.commit()
     await db.refresh(p)
     return p
 
 
+# colunas que um SKU já cadastrado pode ter sobrescritas pelo lote (estoque nunca)
+BULK_UPDATE_COLUMNS = ("name", "price", "cost_price", "min_stock", "type", "ncm_code")
+
+
+@router.post("/bulk", response_model=ProductBulkOut)
+async def bulk_upsert_products(payload: ProductBulkIn, db: AsyncSession = Depends(db_write_session)):
+    """
+    Importação em lote: INSERT ... ON CONFLICT (sku) DO UPDATE, um por conjunto de campos enviados
+    (planilha manda o mesmo conjunto em todas as linhas, então é um só por requisição).
+    SKU existente tem atualizados só os campos presentes no item: coluna que a planilha não mapeou
+    não volta para o default. `update_fields` restringe ainda mais (entrada de NFe: só o custo).
+    SKU novo ou vazio é inserido com os defaults do ProductBulkItem.
+    SKU repetido dentro do mesmo lote: vale a última linha.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        insert_for = postgresql.insert
+    elif dialect == "sqlite":
+        insert_for = sqlite.insert
+    else:
+        raise HTTPException(status_code=501, detail=f"Upsert em lote não suportado em {dialect}")
+
+    # última linha de cada SKU, na posição da primeira; sem SKU entra sempre
+    latest: dict = {}
+    for n, item in enumerate(payload.items):
+        sku = (item.sku or "").strip() or None
+        latest[sku if sku is not None else n] = (sku, item)
+
+    version = await next_catalog_version(db)
+    groups: dict[tuple[str, ...], list[dict]] = {}
+    for sku, item in latest.values():
+        row = item.model_dump()
+        row["sku"] = sku
+        row["row_version"] = version
+        fields = tuple(
+            col for col in BULK_UPDATE_COLUMNS
+            if col in item.model_fields_set and (payload.update_fields is None or col in payload.update_fields)
+        )
+        groups.setdefault(fields, []).append(row)
+
+    try:
+        for fields, rows in groups.items():
+            stmt = insert_for(Product)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Product.sku],
+                set_={col: stmt.excluded[col] for col in fields + ("row_version",)},
+            )
+            await db.execute(stmt, rows)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return {"received": len(payload.items), "upserted": len(latest), "version": version}
+
+
+@router.post("/stock-entries", response_model=StockEntryOut)
+async def bulk_stock_entries(payload: StockEntryIn, db: AsyncSession = Depends(db_write_session)):
+    """
+    Entrada de mercadoria em lote (XML de NFe): soma as quantidades por SKU com um UPDATE só
+    e grava um movimento de estoque por linha recebida, tudo numa transação.
+    """
+    skus = {it.sku for it in payload.items}
+    res = await db.execute(select(Product.id, Product.sku).where(Product.sku.in_(list(skus))))
+    id_by_sku = {r.sku: r.id for r in res.all()}
+    missing = sorted(skus - set(id_by_sku))
+
+    entradas = [it for it in payload.items if it.sku in id_by_sku]
+    if not entradas:
+        return {"updated": 0, "missing": missing, "version": await current_catalog_version(db)}
+
+    qty_by_id: dict[int, int] = {}
+    for it in entradas:
+        pid = id_by_sku[it.sku]
+        qty_by_id[pid] = qty_by_id.get(pid, 0) + it.qty
+
+    now = datetime.utcnow()
+    try:
+        version = await next_catalog_version(db)
+        await db.execute(
+            update(Product)
+            .where(Product.id.in_(list(qty_by_id)))
+            .values(stock_qty=Product.stock_qty + case(qty_by_id, value=Product.id), row_version=version)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(
+            insert(StockMove),
+            [
+                {"product_id": id_by_sku[it.sku], "delta": it.qty, "reason": it.reason, "created_at": now}
+                for it in entradas
+            ],
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return {"updated": len(qty_by_id), "missing": missing, "version": version}
+
+
 @router.get("", response_model=list[ProductRead])
-async def list_products(db: AsyncSession = Depends(db_session)):
+async def list_products(request: Request, response: Response, db: AsyncSession = Depends(db_session)):
+    """Catálogo completo. Com If-None-Match igual à versão atual responde 304 sem corpo."""
+    version = await current_catalog_version(db)
+    etag = _catalog_etag(version)
+    headers = {"ETag": etag, "X-Catalog-Version": str(version)}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
     res = await db.execute(select(Product).order_by(Product.id.desc()))
+    response.headers.update(headers)
     return list(res.scalars().all())
 
 
+@router.get("/changes", response_model=ProductChanges)
+async def product_changes(
+    since: int = Query(..., ge=0, description="X-Catalog-Version que o cliente já tem"),
+    db: AsyncSession = Depends(db_session),
+):
+    """Feed de delta: só as linhas escritas (e as excluídas) depois de `since`."""
+    version = await current_catalog_version(db)
+    changed = (await db.execute(
+        select(Product).where(Product.row_version > since).order_by(Product.row_version)
+    )).scalars().all()
+    deleted = (await db.execute(
+        select(ProductDeletion.product_id).where(ProductDeletion.row_version > since)
+    )).scalars().all()
+    return {"version": version, "changed": list(changed), "deleted": list(deleted)}
+
+
+@router.get("/search", response_model=list[ProductRead])
+async def search_products(
+    q: str = Query("", max_length=120),
+    limit: int = Query(30, ge=1, le=200),
+    db: AsyncSession = Depends(db_session),
+):
+    """
+    Busca do PDV: SKU/código de barras exato primeiro, depois nome/SKU pelo índice FTS.
+    Custo por tecla depende do limit, não do tamanho do catálogo.
+    """
+    q = q.strip()
+    if not q:
+        res = await db.execute(select(Product).order_by(Product.name).limit(limit))
+        return list(res.scalars().all())
+
+    # 1. leitura do scanner: bate direto no índice único de sku
+    exact = (await db.execute(select(Product).where(Product.sku == q))).scalar_one_or_none()
+    out = [exact] if exact else []
+    seen = {exact.id} if exact else set()
+
+    # 2. FTS5 trigram (SQLite); sem índice ou termo curto, cai no LIKE por prefixo
+    ranked = None
+    match = build_match_query(q)
+    if match and db.bind.dialect.name == "sqlite":
+        try:
+            # sem ORDER BY rank: o bm25 teria de pontuar todos os casamentos e o LIMIT
+            # deixaria de cortar cedo (custo voltaria a crescer com o catálogo)
+            res = await db.execute(
+                text("SELECT rowid FROM products_fts WHERE products_fts MATCH :m LIMIT :n"),
+                {"m": match, "n": limit + 1},
+            )
+            ids = [r[0] for r in res.all()]
+            res = await db.execute(select(Product).where(Product.id.in_(ids)))
+            by_id = {p.id: p for p in res.scalars().all()}
+            ranked = [by_id[i] for i in ids if i in by_id]
+        except OperationalError:
+            ranked = None
+    if ranked is None:
+        like = f"{q}%"
+        res = await db.execute(
+            select(Product)
+            .where(or_(Product.name.ilike(like), Product.sku.ilike(like)))
+            .order_by(Product.name)
+            .limit(limit + 1)
+        )
+        ranked = list(res.scalars().all())
+
+    for p in ranked:
+        if p.id not in seen:
+            out.append(p)
+            seen.add(p.id)
+    return out[:limit]
+
+
 @router.get("/{product_id}", response_model=ProductRead)
 async def get_product(product_id: int, db: AsyncSession = Depends(db_session)):
     res = await db.execute(select(Product).where(Product.id == product_id))
@@ -37,7 +226,7 @@ async def get_product(product_id: int, db: AsyncSession = Depends(db_session)):
 
 
 @router.put("/{product_id}", response_model=ProductRead)
-async def update_product(product_id: int, payload: ProductUpdate, db: AsyncSession = Depends(db_session)):
+async def update_product(product_id: int, payload: ProductUpdate, db: AsyncSession = Depends(db_write_session)):
     res = await db.execute(select(Product).where(Product.id == product_id))
     p = res.scalar_one_or_none()
     if not p:
@@ -45,31 +234,34 @@ async def update_product(product_id: int, payload: ProductUpdate, db: AsyncSessi
 
     p.name = payload.name
     p.sku = payload.sku
+    p.row_version = await next_catalog_version(db)
     await db.commit()
     await db.refresh(p)
     return p
 
 
 @router.delete("/{product_id}")
-async def delete_product(product_id: int, db: AsyncSession = Depends(db_session)):
+async def delete_product(product_id: int, db: AsyncSession = Depends(db_write_session)):
     res = await db.execute(select(Product).where(Product.id == product_id))
     p = res.scalar_one_or_none()
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    db.add(ProductDeletion(product_id=p.id, row_version=await next_catalog_version(db)))
     await db.delete(p)
     await db.commit()
     return {"ok": True}
 
 
 @router.post("/{product_id}/stock")
-async def adjust_stock(product_id: int, payload: StockAdjust, db: AsyncSession = Depends(db_session)):
+async def adjust_stock(product_id: int, payload: StockAdjust, db: AsyncSession = Depends(db_write_session)):
     res = await db.execute(select(Product).where(Product.id == product_id))
     p = res.scalar_one_or_none()
     if not p:
         raise HTTPException(status_code=404, detail="Product not found")
 
     p.stock_qty = int(p.stock_qty) + int(payload.delta)
+    p.row_version = await next_catalog_version(db)
 
     db.add(StockMove(
         product_id=p.id,
@@ -1,69 +1,329 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import time
 from datetime import datetime, timedelta, date
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import db_session
+from app.db.catalog_version import current_catalog_version
+from app.db.keyset import day_key, stored_text
 from app.db.models.product import Product
+from app.db.models.rollups import ProductSummary, StockMoveDaily
+from app.db.models.sales import Sale, SaleItem
 from app.db.models.stock_move import StockMove
+from app.db.session import SessionLocal
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
+async def _summary_rollup(db: AsyncSession) -> dict | None:
+    """Linha de product_summary (None se os agregados não existem neste banco)."""
+    if db.bind.dialect.name != "sqlite":
+        return None
+    try:
+        row = (await db.execute(select(ProductSummary).where(ProductSummary.id == 1))).scalar_one_or_none()
+    except OperationalError:
+        return None
+    if row is None:
+        return None
+    return {"total_products": row.total_products, "total_stock": row.total_stock, "low_stock": row.low_stock}
+
+
+async def _summary(db: AsyncSession) -> dict:
+    out = await _summary_rollup(db)
+    if out is None:
+        # uma varredura só, e "baixo" respeita o min_stock de cada produto
+        res = await db.execute(select(
+            func.count(Product.id),
+            func.coalesce(func.sum(Product.stock_qty), 0),
+            func.count(Product.id).filter(Product.stock_qty <= Product.min_stock),
+        ))
+        total_products, total_stock, low_stock = res.one()
+        out = {"total_products": total_products, "total_stock": total_stock, "low_stock": low_stock}
+    return {k: int(v or 0) for k, v in out.items()}
+
+
+async def _stock_moves_series(db: AsyncSession, start: date) -> list[dict]:
+    """Saldo líquido por dia de `start` até hoje (dias sem movimento saem com 0)."""
+    rows = None
+    if db.bind.dialect.name == "sqlite":
+        try:
+            # agregado diário: lê no máximo 7 dias x produtos movimentados, não o histórico
+            res = await db.execute(
+                select(StockMoveDaily.day.label("d"), func.sum(StockMoveDaily.net).label("net"))
+                .where(StockMoveDaily.day >= start.isoformat())
+                .group_by(StockMoveDaily.day)
+            )
+            rows = res.all()
+        except OperationalError:
+            rows = None
+    if rows is None:
+        res = await db.execute(
+            select(func.date(StockMove.created_at).label("d"), func.coalesce(func.sum(StockMove.delta), 0).label("net"))
+            .where(stored_text(StockMove.created_at) >= day_key(start))
+            .group_by(func.date(StockMove.created_at))
+            .order_by(func.date(StockMove.created_at))
+        )
+        rows = res.all()
+    by_day = {r.d: int(r.net) for r in rows}
+
+    days = (date.today() - start).days + 1
+    return [
+        {"day": (start + timedelta(days=i)).isoformat(), "net": by_day.get((start + timedelta(days=i)).isoformat(), 0)}
+        for i in range(days)
+    ]
+
+
 @router.get("/summary")
 async def summary(db: AsyncSession = Depends(db_session)):
-    total_products = (await db.execute(select(func.count(Product.id)))).scalar_one()
-    total_stock = (await db.execute(select(func.coalesce(func.sum(Product.stock_qty), 0)))).scalar_one()
-    low_stock = (await db.execute(select(func.count(Product.id)).where(Product.stock_qty <= 5))).scalar_one()
-    return {
-        "total_products": int(total_products),
-        "total_stock": int(total_stock),
-        "low_stock": int(low_stock),
-    }
+    """Resumo do catálogo: leitura de uma linha (product_summary); sem agregados, conta na hora."""
+    return await _summary(db)
 
 
 @router.get("/stock_moves_7d")
 async def stock_moves_7d(db: AsyncSession = Depends(db_session)):
-    # últimos 7 dias incluindo hoje (UTC)
+    # últimos 7 dias incluindo hoje (UTC); UI usa índice 0..6, então só manda net
+    return {"series": await _stock_moves_series(db, date.today() - timedelta(days=6))}
+
+
+# --- DASHBOARD (uma chamada só, com cache curto) ---
+DASHBOARD_TTL = 10.0  # segundos
+_dashboard_cache: dict[int, tuple[int, float, dict]] = {}  # low_limit -> (versão, instante, resposta)
+_local_sales_cache: tuple[float, float] | None = None  # (instante, soma das vendas do banco local)
+log = logging.getLogger("app.reports")
+
+
+def _network_revenue() -> float | None:
+    """
+    Vendas do banco local + faturamento das filiais recebido por /api/sync.
+    Fica fora do cache do dashboard: no hub chegam pulsos o tempo todo, e o total das filiais é
+    uma linha só (network_summary, mantida pelos triggers). A soma das vendas locais varre a
+    tabela, então ela é que fica em cache por DASHBOARD_TTL.
+    None se o banco local não responder (a tela mostra o card como indisponível, não R$ 0,00).
+    O schema do banco local é preparado no startup da API, não aqui.
+    """
+    global _local_sales_cache
+    from app.core.local_db import local_db
+    from app.db.telemetry import NETWORK_QUERY
+
+    try:
+        now = time.monotonic()
+        if _local_sales_cache is None or now - _local_sales_cache[0] >= DASHBOARD_TTL:
+            local = local_db.query_one("SELECT COALESCE(SUM(total_value), 0) FROM sales")
+            _local_sales_cache = (now, float(local[0] or 0))
+        network = local_db.query_one(NETWORK_QUERY)
+        return round(_local_sales_cache[1] + float(network[1] if network else 0), 2)
+    except Exception:
+        log.exception("Faturamento da rede indisponível (banco local %s)", local_db.path)
+        return None
+
+
+async def _build_dashboard(db: AsyncSession, low_limit: int) -> dict:
     today = date.today()
     start = today - timedelta(days=6)
-    start_dt = datetime.combine(start, datetime.min.time())
 
-    res = await db.execute(
-        select(func.date(StockMove.created_at).label("d"), func.coalesce(func.sum(StockMove.delta), 0).label("net"))
-        .where(StockMove.created_at >= start_dt)
-        .group_by(func.date(StockMove.created_at))
-        .order_by(func.date(StockMove.created_at))
+    out = await _summary(db)
+
+    res = await db.execute(select(
+        func.coalesce(func.sum(Product.price * Product.stock_qty), 0),
+        func.coalesce(func.sum(Product.cost_price * Product.stock_qty), 0),
+    ).where(Product.stock_qty > 0))
+    inventory_value, inventory_cost = res.one()
+
+    top = await db.execute(
+        select(Product.id, Product.name, Product.stock_qty).order_by(Product.stock_qty.desc()).limit(5)
+    )
+    low = await db.execute(
+        select(Product.id, Product.name, Product.sku, Product.ncm_code, Product.stock_qty, Product.min_stock)
+        .where(Product.stock_qty <= Product.min_stock)
+        .order_by(Product.stock_qty, Product.id)
+        .limit(low_limit)
     )
-    rows = res.all()
-    by_day = {r.d: int(r.net) for r in rows}
 
-    series = []
+    # valor da venda pelo preço atual (sale_items não guarda o preço praticado)
+    res = await db.execute(
+        select(
+            func.date(Sale.created_at).label("d"),
+            func.count(func.distinct(Sale.id)).label("n"),
+            func.coalesce(func.sum(SaleItem.qty * Product.price), 0).label("value"),
+        )
+        .join(SaleItem, SaleItem.sale_id == Sale.id)
+        .join(Product, Product.id == SaleItem.product_id)
+        .where(stored_text(Sale.created_at) >= day_key(start))
+        .group_by(func.date(Sale.created_at))
+    )
+    sales_by_day = {r.d: (int(r.n), float(r.value)) for r in res.all()}
+    sales_7d = []
     for i in range(7):
-        d = start + timedelta(days=i)
-        key = d.isoformat()
-        series.append({"day": key, "net": int(by_day.get(key, 0))})
+        key = (start + timedelta(days=i)).isoformat()
+        n, value = sales_by_day.get(key, (0, 0.0))
+        sales_7d.append({"day": key, "count": n, "value": round(value, 2)})
+    sales_today_count, sales_today_value = sales_by_day.get(today.isoformat(), (0, 0.0))
+
+    out.update({
+        "inventory_value": round(float(inventory_value), 2),
+        "inventory_cost": round(float(inventory_cost), 2),
+        "sales_today_count": sales_today_count,
+        "sales_today_value": round(sales_today_value, 2),
+        "top_stock": [{"id": r.id, "name": r.name, "stock_qty": int(r.stock_qty or 0)} for r in top.all()],
+        "low_stock_items": [
+            {"id": r.id, "name": r.name, "sku": r.sku, "ncm_code": r.ncm_code,
+             "stock_qty": int(r.stock_qty or 0), "min_stock": int(r.min_stock or 0)}
+            for r in low.all()
+        ],
+        "stock_moves_7d": await _stock_moves_series(db, start),
+        "sales_7d": sales_7d,
+    })
+    return out
+
+
+@router.get("/dashboard")
+async def dashboard(
+    low_limit: int = Query(10, ge=1, le=100, description="quantos itens abaixo do mínimo listar"),
+    db: AsyncSession = Depends(db_session),
+):
+    """
+    Todos os cards, séries e alertas do dashboard numa resposta, calculados no banco.
+    Cache em memória por DASHBOARD_TTL segundos, amarrado à versão do catálogo:
+    venda, ajuste ou entrada de estoque incrementam a versão e a próxima chamada recalcula.
+    network_revenue é lido a cada chamada, fora do cache (ver _network_revenue).
+    """
+    version = await current_catalog_version(db)
+    now = time.monotonic()
+    hit = _dashboard_cache.get(low_limit)
+    if hit and hit[0] == version and now - hit[1] < DASHBOARD_TTL:
+        data = hit[2]
+    else:
+        data = await _build_dashboard(db, low_limit)
+        data["version"] = version
+        data["generated_at"] = datetime.now().isoformat(timespec="seconds")
+        _dashboard_cache[low_limit] = (version, now, data)
+    return {**data, "network_revenue": await asyncio.to_thread(_network_revenue)}
+
+
+EXPORT_PAGE = 2000
+EXPORT_COLUMNS = ["created_at", "product_id", "sku", "product_name", "delta", "reason"]
+
 
-    # UI usa índice 0..6, então só manda net
-    return {"series": [{"day": s["day"], "net": s["net"]} for s in series]}
+def _range_bounds(start: str, end: str) -> tuple[str, str]:
+    """Limites do período no formato gravado (ver app.db.keyset); fim exclusivo."""
+    try:
+        start_d = date.fromisoformat(start)
+        end_d = date.fromisoformat(end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="datas no formato YYYY-MM-DD")
+    return day_key(start_d), day_key(end_d + timedelta(days=1))
+
+
+def _in_range(start_key: str, end_key: str, max_id: int):
+    created = stored_text(StockMove.created_at)
+    # max_id: o que for lançado durante o download fica fora, e a contagem do cabeçalho bate com o arquivo
+    return created >= start_key, created < end_key, StockMove.id <= max_id
+
+
+async def _iter_stock_moves(start_key: str, end_key: str, max_id: int):
+    """
+    Percorre o período em ordem cronológica, de EXPORT_PAGE em EXPORT_PAGE linhas,
+    com cursor (created_at, id) sobre ix_stock_moves_created_at_id.
+    O cursor compara o texto gravado: created_at tem linhas com e sem microssegundos
+    (CURRENT_TIMESTAMP x ORM), e comparar com datetime pulava linhas na virada de página.
+    Cada página abre e fecha a própria leitura: o banco não fica preso durante o download
+    e a memória não depende do tamanho do período.
+    """
+    created = stored_text(StockMove.created_at)
+    last = None
+    while True:
+        stmt = (
+            select(StockMove.id, StockMove.created_at, created.label("created_key"), StockMove.product_id,
+                   StockMove.delta, StockMove.reason, Product.sku, Product.name)
+            .join(Product, Product.id == StockMove.product_id)
+            .where(*_in_range(start_key, end_key, max_id))
+            .order_by(StockMove.created_at, StockMove.id)
+            .limit(EXPORT_PAGE)
+        )
+        if last is not None:
+            stmt = stmt.where(tuple_(created, StockMove.id) > tuple_(*last))
+        async with SessionLocal() as db:
+            rows = (await db.execute(stmt)).all()
+        if not rows:
+            return
+        yield [
+            {
+                "created_at": r.created_at.isoformat(sep=" ", timespec="seconds"),
+                "product_id": int(r.product_id),
+                "sku": r.sku or "",
+                "product_name": r.name,
+                "delta": int(r.delta),
+                "reason": r.reason,
+            }
+            for r in rows
+        ]
+        if len(rows) < EXPORT_PAGE:
+            return
+        last = (rows[-1].created_key, rows[-1].id)
+
+
+async def _csv_stream(pages):
+    # ';' e BOM: abre direto no Excel em português (mesmo padrão do relatório de erros da importação)
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";", lineterminator="\r\n")
+    writer.writerow(EXPORT_COLUMNS)
+    yield "\ufeff" + buf.getvalue()
+    async for page in pages:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([it[c] for c in EXPORT_COLUMNS] for it in page)
+        yield buf.getvalue()
+
+
+async def _ndjson_stream(pages):
+    async for page in pages:
+        yield "".join(json.dumps(it, ensure_ascii=False) + "\n" for it in page)
 
 
 @router.get("/stock_moves_range")
 async def stock_moves_range(
     start: str = Query(..., description="YYYY-MM-DD"),
     end: str = Query(..., description="YYYY-MM-DD"),
+    format: str = Query("json", pattern="^(json|csv|ndjson)$",
+                        description="json: prévia da tela (500 mais recentes); csv/ndjson: período inteiro em streaming"),
     db: AsyncSession = Depends(db_session),
 ):
-    start_d = date.fromisoformat(start)
-    end_d = date.fromisoformat(end)
-    start_dt = datetime.combine(start_d, datetime.min.time())
-    end_dt = datetime.combine(end_d + timedelta(days=1), datetime.min.time())  # exclusivo
+    start_key, end_key = _range_bounds(start, end)
+
+    if format != "json":
+        max_id = (await db.execute(select(func.max(StockMove.id)))).scalar() or 0
+        # mesmo filtro e mesmo join da exportação: o cliente confere o arquivo contra X-Row-Count
+        total = (await db.execute(
+            select(func.count())
+            .select_from(StockMove)
+            .join(Product, Product.id == StockMove.product_id)
+            .where(*_in_range(start_key, end_key, max_id))
+        )).scalar()
+        pages = _iter_stock_moves(start_key, end_key, max_id)
+        filename = f"movimentos_{start}_{end}.{format}"
+        if format == "csv":
+            body, media_type = _csv_stream(pages), "text/csv; charset=utf-8"
+        else:
+            body, media_type = _ndjson_stream(pages), "application/x-ndjson"
+        return StreamingResponse(
+            body, media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Row-Count": str(total)},
+        )
 
+    created = stored_text(StockMove.created_at)
     res = await db.execute(
         select(StockMove, Product)
         .join(Product, Product.id == StockMove.product_id)
-        .where(StockMove.created_at >= start_dt, StockMove.created_at < end_dt)
+        .where(created >= start_key, created < end_key)
         .order_by(StockMove.created_at.desc())
         .limit(500)
     )
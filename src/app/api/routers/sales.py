@@ -1,58 +1,101 @@
-from datetime import datetime
+from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_
 
-from app.api.deps import db_session
-from app.api.schemas.sales import SaleCreate
-from app.db.models.product import Product
-from app.db.models.stock_move import StockMove
+from app.api.deps import db_session, db_write_session
+from app.api.schemas.sales import SaleBatchCreate, SaleBatchOut, SaleCreate, SalesPage
+from app.db.keyset import day_key, decode_cursor, encode_cursor, stored_text
 from app.db.models.sales import Sale, SaleItem
+from app.utils.sale_engine import SaleEngine, SaleError
 
 router = APIRouter(prefix="/sales", tags=["sales"])
 
 
 @router.post("")
-async def create_sale(payload: SaleCreate, db: AsyncSession = Depends(db_session)):
-    if not payload.items:
-        raise HTTPException(status_code=400, detail="items vazio")
-
-    ids = [it.product_id for it in payload.items]
-    res = await db.execute(select(Product).where(Product.id.in_(ids)))
-    products = res.scalars().all()
-    by_id = {p.id: p for p in products}
-
-    # valida
-    for it in payload.items:
-        p = by_id.get(it.product_id)
-        if not p:
-            raise HTTPException(status_code=404, detail=f"Produto {it.product_id} não existe")
-        if it.qty <= 0:
-            raise HTTPException(status_code=400, detail="qty inválido")
-        if int(p.stock_qty) < int(it.qty):
-            raise HTTPException(status_code=400, detail=f"Estoque insuficiente: {p.name}")
-
-    now = datetime.utcnow()
-
-    sale = Sale(created_at=now)
-    db.add(sale)
-    await db.flush()  # garante sale.id
-
-    for it in payload.items:
-        p = by_id[it.product_id]
-        p.stock_qty = int(p.stock_qty) - int(it.qty)
-
-        db.add(SaleItem(sale_id=sale.id, product_id=p.id, qty=int(it.qty)))
-        db.add(StockMove(product_id=p.id, delta=-int(it.qty), reason=f"VENDA #{sale.id}", created_at=now))
-
-    await db.commit()
-    return {"id": sale.id}
-
-# --- NOVO ENDPOINT: LISTAGEM DE VENDAS ---
-# Isso resolve o erro 405 Method Not Allowed
-@router.get("")
-async def list_sales(db: AsyncSession = Depends(db_session)):
-    """Retorna o histórico de todas as vendas"""
-    result = await db.execute(select(Sale).order_by(Sale.created_at.desc()))
-    return result.scalars().all()
\ No newline at end of file
+async def create_sale(payload: SaleCreate, db: AsyncSession = Depends(db_write_session)):
+    # baixa atômica: UPDATE ... WHERE stock_qty >= qty (sem overselling entre caixas)
+    try:
+        sale_id = await SaleEngine.criar_venda(db, payload.items)
+    except SaleError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    return {"id": sale_id}
+
+# --- LISTAGEM DE VENDAS (paginação por cursor em created_at, id) ---
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="cursor inválido")
+
+
+@router.get("", response_model=SalesPage)
+async def list_sales(
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str | None = Query(None, description="next_cursor da página anterior"),
+    start: date | None = Query(None, description="YYYY-MM-DD"),
+    end: date | None = Query(None, description="YYYY-MM-DD (inclusivo)"),
+    payment_method: str | None = None,
+    include_items: bool = False,
+    db: AsyncSession = Depends(db_session),
+):
+    """Histórico de vendas, mais recentes primeiro, uma página por vez (usa ix_sales_created_at_id)."""
+    item_count = (
+        select(func.count(SaleItem.id)).where(SaleItem.sale_id == Sale.id).correlate(Sale).scalar_subquery()
+    )
+    # texto gravado de created_at: cursor e limites no mesmo formato (app.db.keyset)
+    created = stored_text(Sale.created_at)
+    # só colunas: não dispara o selectin de Sale.items
+    stmt = select(Sale.id, Sale.created_at, created.label("created_key"), Sale.payment_method,
+                  item_count.label("item_count"))
+
+    if start:
+        stmt = stmt.where(created >= day_key(start))
+    if end:
+        stmt = stmt.where(created < day_key(end + timedelta(days=1)))  # exclusivo
+    if payment_method:
+        stmt = stmt.where(Sale.payment_method == payment_method)
+    if cursor:
+        stmt = stmt.where(tuple_(created, Sale.id) < tuple_(*_decode_cursor(cursor)))
+
+    # busca limit+1 para saber se existe próxima página sem fazer COUNT
+    stmt = stmt.order_by(Sale.created_at.desc(), Sale.id.desc()).limit(limit + 1)
+    rows = (await db.execute(stmt)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items_by_sale: dict[int, list[dict]] = {}
+    if include_items and rows:
+        res = await db.execute(
+            select(SaleItem.sale_id, SaleItem.product_id, SaleItem.qty)
+            .where(SaleItem.sale_id.in_([r.id for r in rows]))
+            .order_by(SaleItem.id)
+        )
+        for it in res.all():
+            items_by_sale.setdefault(it.sale_id, []).append({"product_id": it.product_id, "qty": it.qty})
+
+    return {
+        "items": [
+            {
+                "id": r.id,
+                "created_at": r.created_at.isoformat(sep=" ", timespec="seconds"),
+                "payment_method": r.payment_method,
+                "item_count": int(r.item_count),
+                "items": items_by_sale.get(r.id, []) if include_items else None,
+            }
+            for r in rows
+        ],
+        "next_cursor": encode_cursor(rows[-1].created_key, rows[-1].id) if has_more else None,
+    }
+
+@router.post("/batch", response_model=SaleBatchOut)
+async def create_sales_batch(
+    payload: SaleBatchCreate,
+    chunk_size: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(db_write_session),
+):
+    """Recebe a fila de vendas feitas offline; cada venda volta com seu próprio resultado."""
+    results = await SaleEngine.criar_lote(db, payload.sales, chunk_size=chunk_size)
+    accepted = sum(1 for r in results if r["ok"])
+    return {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.api.deps import db_session
+from app.api.deps import db_session, db_write_session
 from app.api.schemas.supplier import SupplierCreate, SupplierRead, SupplierUpdate
 from app.db.models.supplier import Supplier
 
@@ -19,7 +19,7 @@ async def list_suppliers(db: AsyncSession = Depends(db_session)):
 
 
 @router.post("", response_model=SupplierRead)
-async def create_supplier(payload: SupplierCreate, db: AsyncSession = Depends(db_session)):
+async def create_supplier(payload: SupplierCreate, db: AsyncSession = Depends(db_write_session)):
     # bloqueia nome duplicado
     exists = (await db.execute(select(Supplier).where(Supplier.name == payload.name))).scalar_one_or_none()
     if exists:
@@ -33,7 +33,7 @@ async def create_supplier(payload: SupplierCreate, db: AsyncSession = Depends(db
 
 
 @router.put("/{supplier_id}", response_model=SupplierRead)
-async def update_supplier(supplier_id: int, payload: SupplierUpdate, db: AsyncSession = Depends(db_session)):
+async def update_supplier(supplier_id: int, payload: SupplierUpdate, db: AsyncSession = Depends(db_write_session)):
     s = (await db.execute(select(Supplier).where(Supplier.id == supplier_id))).scalar_one_or_none()
     if not s:
         raise HTTPException(status_code=404, detail="Fornecedor não encontrado.")
@@ -60,7 +60,7 @@ async def update_supplier(supplier_id: int, payload: SupplierUpdate, db: AsyncSe
 
 
 @router.delete("/{supplier_id}")
-async def delete_supplier(supplier_id: int, db: AsyncSession = Depends(db_session)):
+async def delete_supplier(supplier_id: int, db: AsyncSession = Depends(db_write_session)):
     s = (await db.execute(select(Supplier).where(Supplier.id == supplier_id))).scalar_one_or_none()
     if not s:
         raise HTTPException(status_code=404, detail="Fornecedor não encontrado.")
@@ -0,0 +1,224 @@
+import asyncio
+import hmac
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+from app.api.events import telemetry_events
+from app.api.schemas.sync import SyncBatch, TelemetryBatch, TelemetrySample
+from app.core.config import settings
+from app.core.local_db import local_db
+from app.db.change_log import HUB_ADVANCE, HUB_APPLY, SYNC_TABLES
+from app.db.telemetry import (
+    NETWORK_COLUMNS, NETWORK_QUERY, TELEMETRY_INSERT, TELEMETRY_PRUNE, UNIT_STATUS_COLUMNS, UNIT_STATUS_QUERY,
+    UNIT_STATUS_SELECT, ensure_telemetry_store,
+)
+
+router = APIRouter()
+
+# Corpo descompactado acima disso é recusado (lote da loja tem no máximo algumas centenas de linhas)
+MAX_BATCH_BYTES = 32 * 1024 * 1024
+
+# Limpeza da série bruta de telemetria no máximo uma vez por intervalo (segundos)
+TELEMETRY_PRUNE_EVERY = 3600.0
+_last_prune = 0.0
+
+# Comentário SSE de keep-alive (proxies e o cliente derrubam conexão muda)
+SSE_PING_S = 15.0
+
+
+def _parse_samples(payload) -> list[TelemetrySample]:
+    """Aceita um pulso só (formato antigo), uma lista de pulsos ou {"unit_id", "samples": [...]}."""
+    if isinstance(payload, list):
+        batch = TelemetryBatch(samples=payload)
+    elif isinstance(payload, dict) and "samples" in payload:
+        batch = TelemetryBatch.model_validate(payload)
+    elif isinstance(payload, dict):
+        batch = TelemetryBatch(samples=[payload])
+    else:
+        raise ValueError("esperado objeto ou lista de pulsos")
+    for sample in batch.samples:
+        sample.unit_id = sample.unit_id or batch.unit_id
+        if not sample.unit_id:
+            raise ValueError("pulso sem unit_id")
+    return batch.samples
+
+
+def _record_telemetry(samples: list[TelemetrySample]) -> tuple[dict, dict | None]:
+    """Grava os pulsos numa transação; resumos por loja/rede saem dos triggers. Roda no executor."""
+    global _last_prune
+    ensure_telemetry_store(local_db)
+    now = datetime.now()
+    received_at = now.isoformat(timespec="microseconds")
+    rows = []
+    for sample in samples:
+        ts = sample.timestamp or now
+        if ts.tzinfo is not None:
+            ts = ts.astimezone().replace(tzinfo=None)  # tudo no horário local do hub, comparável como texto
+        extra = sample.model_extra or {}
+        rows.append((sample.unit_id, ts.isoformat(timespec="microseconds"), received_at, sample.total_sales,
+                     sample.sync_cursor, json.dumps(extra, default=str) if extra else None))
+
+    units = sorted({sample.unit_id for sample in samples})
+    with local_db.connection() as conn:
+        stored = conn.executemany(TELEMETRY_INSERT, rows).rowcount
+        changed = []
+        if stored:
+            # estado novo só das lojas que pulsaram: vira o evento do painel
+            for i in range(0, len(units), 500):
+                part = units[i:i + 500]
+                changed += conn.execute(f"{UNIT_STATUS_SELECT} WHERE unit_id IN ({','.join('?' * len(part))})", part).fetchall()
+            network = conn.execute(NETWORK_QUERY).fetchone()
+        if time.monotonic() - _last_prune > TELEMETRY_PRUNE_EVERY:
+            _last_prune = time.monotonic()
+            cutoff = (now - timedelta(days=settings.telemetry_retention_days)).isoformat()
+            conn.execute(TELEMETRY_PRUNE, (cutoff,))
+    event = None
+    if changed:
+        event = {
+            "units": [dict(zip(UNIT_STATUS_COLUMNS, row)) for row in changed],
+            "network": dict(zip(NETWORK_COLUMNS, network)),
+        }
+    return {"received": len(rows), "stored": stored}, event
+
+
+def _telemetry_snapshot() -> dict:
+    ensure_telemetry_store(local_db)
+    network = local_db.query_one(NETWORK_QUERY)
+    return {
+        "units": [dict(zip(UNIT_STATUS_COLUMNS, row)) for row in local_db.query(UNIT_STATUS_QUERY)],
+        "network": dict(zip(NETWORK_COLUMNS, network)) if network else None,
+    }
+
+
+def _bearer_matches(request: Request, expected: str | None) -> bool:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return bool(expected) and scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), expected.encode())
+
+
+def _authenticated_unit(request: Request) -> str:
+    """Loja que assina o envio: X-Unit-Id + Authorization: Bearer <token da loja em HUB_UNIT_TOKENS>."""
+    unit_id = request.headers.get("x-unit-id", "")
+    if not _bearer_matches(request, settings.hub_unit_tokens.get(unit_id)):
+        raise HTTPException(status_code=401, detail="Loja não autenticada no hub",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return unit_id
+
+
+def _require_monitor(request: Request) -> None:
+    """Painel Master: Authorization: Bearer <HUB_MONITOR_TOKEN>. Sem token configurado ninguém lê."""
+    if not _bearer_matches(request, settings.hub_monitor_token):
+        raise HTTPException(status_code=401, detail="Painel não autenticado no hub",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _apply_batch(batch: SyncBatch) -> dict:
+    """Aplica o lote numa transação só; roda fora do event loop (asyncio.to_thread)."""
+    local_db.ensure_schema()
+    now = datetime.now().isoformat(timespec="seconds")
+    rows = [
+        (batch.unit_id, c.tbl, c.pk, c.v, 1 if c.op == "D" else 0,
+         None if c.op == "D" else json.dumps(c.row, ensure_ascii=False), now)
+        for c in batch.changes
+    ]
+    with local_db.connection() as conn:
+        before = conn.total_changes
+        conn.executemany(HUB_APPLY, rows)
+        applied = conn.total_changes - before
+        conn.execute(HUB_ADVANCE, (batch.unit_id, batch.to_seq, now))
+        ack = conn.execute("SELECT last_seq FROM sync_units WHERE unit_id = ?", (batch.unit_id,)).fetchone()[0]
+    return {"status": "success", "ack": ack, "received": len(rows), "applied": applied}
+
+
+@router.post("")
+async def receive_sync(request: Request):
+    """Telemetria das lojas (faturamento acumulado, cursor de sincronização) para o painel Master."""
+    unit_id = _authenticated_unit(request)
+    try:
+        samples = _parse_samples(await request.json())
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Pulso inválido: {e}")
+    if any(sample.unit_id != unit_id for sample in samples):
+        raise HTTPException(status_code=403, detail=f"Pulso de outra loja (token da unidade {unit_id})")
+
+    result, event = await asyncio.to_thread(_record_telemetry, samples)
+    if event is not None:
+        telemetry_events.publish("telemetry", event)
+
+    if len(samples) == 1:
+        print(f"📡 [CLOUD] Dados recebidos da Unidade {samples[0].unit_id}: R$ {samples[0].total_sales}")
+    else:
+        print(f"📡 [CLOUD] {result['stored']}/{result['received']} pulsos recebidos em lote")
+    return {"status": "success", "message": "Dados integrados ao Hub Master", **result}
+
+
+@router.post("/changes")
+async def receive_changes(request: Request):
+    """Lote do log de alterações de uma loja (JSON, opcionalmente gzip). Responde com o cursor confirmado."""
+    # antes de ler/descompactar o corpo: envio anônimo não custa nada ao hub
+    unit_id = _authenticated_unit(request)
+    body = await request.body()
+    try:
+        if request.headers.get("content-encoding", "").lower() == "gzip":
+            # descompacta com teto: gzip malicioso não estoura a memória do hub
+            body = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(body, MAX_BATCH_BYTES + 1)
+        if len(body) > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail="Lote grande demais")
+        batch = SyncBatch.model_validate_json(body)
+    except (zlib.error, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Lote inválido: {e}")
+
+    if batch.unit_id != unit_id:
+        raise HTTPException(status_code=403, detail=f"Lote de outra loja (token da unidade {unit_id})")
+    unknown = {c.tbl for c in batch.changes} - set(SYNC_TABLES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Tabelas fora da sincronização: {sorted(unknown)}")
+
+    result = await asyncio.to_thread(_apply_batch, batch)
+    if result["applied"]:
+        telemetry_events.publish("changes", {"unit_id": batch.unit_id, "applied": result["applied"], "ack": result["ack"]})
+        print(f"📡 [CLOUD] Unidade {batch.unit_id}: {result['applied']}/{result['received']} alterações (cursor {result['ack']})")
+    return result
+
+
+@router.get("/events")
+async def telemetry_stream(request: Request):
+    """
+    Fluxo SSE do painel Master: `snapshot` ao conectar, depois `telemetry` (só as lojas que pulsaram
+    + total da rede) e `changes` (lotes aplicados). Entre eventos não há consulta nenhuma ao banco.
+    """
+    # antes de assinar e do snapshot: conexão anônima não custa consulta nem fila
+    _require_monitor(request)
+    # assina antes do snapshot: nada que chegue no meio se perde (estado por loja é absoluto)
+    queue = telemetry_events.subscribe()
+
+    async def stream():
+        try:
+            yield _sse("snapshot", await asyncio.to_thread(_telemetry_snapshot))
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), SSE_PING_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if event == "resync":
+                    event, data = "snapshot", await asyncio.to_thread(_telemetry_snapshot)
+                yield _sse(event, data)
+        finally:
+            telemetry_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -17,6 +19,7 @@ class ProductUpdate(ProductBase):
 class ProductRead(ProductBase):
     id: int
     stock_qty: int = 0
+    row_version: int = 0
 
     class Config:
         from_attributes = True
@@ -25,3 +28,53 @@ class ProductRead(ProductBase):
 class StockAdjust(BaseModel):
     delta: int
     reason: str = Field(default="Ajuste", max_length=200)
+
+
+class ProductChanges(BaseModel):
+    # versão atual do catálogo: use como `since` na próxima chamada
+    version: int
+    changed: list[ProductRead]
+    deleted: list[int]
+
+
+class ProductBulkItem(BaseModel):
+    name: str = Field(min_length=1, max_length=120)
+    sku: str | None = Field(default=None, max_length=60)
+    price: float = 0.0
+    cost_price: float = 0.0
+    # estoque inicial: só vale para produto novo (em SKU existente o saldo não é sobrescrito)
+    stock_qty: int = 0
+    min_stock: int = 5
+    type: str = Field(default="PRODUTO", max_length=20)
+    ncm_code: str | None = Field(default="00000000", max_length=8)
+
+
+class ProductBulkIn(BaseModel):
+    items: list[ProductBulkItem] = Field(min_length=1, max_length=5000)
+    # SKU já cadastrado: só estes campos podem ser sobrescritos (None = os que vieram em cada item).
+    # Produto novo é inserido com tudo o que veio no item.
+    update_fields: list[Literal["name", "price", "cost_price", "min_stock", "type", "ncm_code"]] | None = None
+
+
+class ProductBulkOut(BaseModel):
+    received: int
+    upserted: int
+    # versão do catálogo depois do lote (clientes com cache puxam o delta)
+    version: int
+
+
+class StockEntryItem(BaseModel):
+    sku: str = Field(min_length=1, max_length=60)
+    qty: int = Field(gt=0)
+    reason: str = Field(default="ENTRADA", max_length=200)
+
+
+class StockEntryIn(BaseModel):
+    items: list[StockEntryItem] = Field(min_length=1, max_length=5000)
+
+
+class StockEntryOut(BaseModel):
+    updated: int
+    # SKUs que não existem no cadastro (nada foi lançado para eles)
+    missing: list[str]
+    version: int
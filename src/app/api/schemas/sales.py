@@ -12,3 +12,42 @@ class SaleCreate(BaseModel):
 
 class SaleCreated(BaseModel):
     id: int
+
+
+class SaleBatchCreate(BaseModel):
+    # vendas acumuladas pelo PDV enquanto estava offline, na ordem em que ocorreram
+    sales: list[SaleCreate] = Field(min_length=1, max_length=5000)
+
+
+class SaleBatchResult(BaseModel):
+    index: int
+    ok: bool
+    id: int | None = None
+    status_code: int | None = None
+    detail: str | None = None
+
+
+class SaleBatchOut(BaseModel):
+    accepted: int
+    rejected: int
+    results: list[SaleBatchResult]
+
+
+class SaleItemRow(BaseModel):
+    product_id: int
+    qty: int
+
+
+class SaleRow(BaseModel):
+    # linha enxuta do histórico (itens só com include_items=true)
+    id: int
+    created_at: str
+    payment_method: str
+    item_count: int
+    items: list[SaleItemRow] | None = None
+
+
+class SalesPage(BaseModel):
+    items: list[SaleRow]
+    # passe de volta em ?cursor= para buscar a próxima página (None = acabou)
+    next_cursor: str | None = None
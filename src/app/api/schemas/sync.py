@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SyncChange(BaseModel):
+    tbl: str
+    pk: int
+    op: Literal["U", "D"]
+    v: int                               # seq do log na loja = versão da linha
+    row: dict[str, Any] | None = None    # estado atual da linha (None quando op = D)
+
+
+class SyncBatch(BaseModel):
+    unit_id: str = Field(min_length=1, max_length=64)
+    from_seq: int = 0
+    to_seq: int
+    changes: list[SyncChange] = []
+
+
+class TelemetrySample(BaseModel):
+    """Pulso de uma loja. Campos extras (versão do app, caixa aberto...) vão para `data`."""
+    model_config = ConfigDict(extra="allow")
+
+    unit_id: str | None = Field(default=None, max_length=64)
+    timestamp: datetime | None = None
+    total_sales: float = 0.0
+    sync_cursor: int | None = None
+
+
+class TelemetryBatch(BaseModel):
+    unit_id: str | None = Field(default=None, max_length=64)
+    samples: list[TelemetrySample] = Field(max_length=1000)
@@ -1,8 +1,10 @@
-from fastapi import FastAPI, APIRouter, Request
+import asyncio
+
+from fastapi import FastAPI, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.base import Base, engine
-import sqlite3
-from datetime import datetime
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.db.migrations import MigrationEngine
 
 # Função Mágica: Cria rotas vazias se o arquivo falhar (Mantendo sua lógica original)
 def create_dummy_router(name):
@@ -15,7 +17,11 @@ def create_dummy_router(name):
     return router
 
 def create_app() -> FastAPI:
+    """Fábrica da API: cada worker do uvicorn monta a sua (rotas, engine e pool do SQLAlchemy)."""
     app = FastAPI(title="Bertolini ERP API", version="3.0.0")
+    # fila de escrita do processo (app.api.deps.db_write_session): os caixas esperam a vez aqui,
+    # não no busy handler do SQLite, que dorme em intervalos e não respeita ordem de chegada
+    app.state.write_lock = asyncio.Lock()
 
     app.add_middleware(
         CORSMiddleware,
@@ -24,61 +30,43 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # latência por rota, requisições em andamento e consultas SQL por requisição (GET /metrics)
+    app.add_middleware(MetricsMiddleware)
 
     @app.on_event("startup")
     async def startup():
-        print(">>> [SERVIDOR] Banco OK")
-        # Tentativa de criar tabelas na nuvem se não existirem
-        try:
-            async with engine.begin() as conn:
-                await conn.run_sync(Base.metadata.create_all)
-        except Exception as e:
-            print(f"⚠️ Aviso no startup do banco: {e}")
-
-    # --- NOVO: ROTA DE SINCRONIZAÇÃO (TELEMETRIA MASTER) ---
-    # Esta rota recebe os dados que o 'CloudSyncEngine' envia
-    @app.post("/api/sync")
-    async def receive_sync(request: Request):
-        try:
-            data = await request.json()
-            unit_id = data.get("unit_id")
-            total_sales = data.get("total_sales", 0.0)
-            
-            # Aqui gravamos no banco MASTER para aparecer na sua MonitoringPage
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            
-            # Garante que a tabela de vendas existe no Master
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sales (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    total_value REAL,
-                    payment_method TEXT,
-                    timestamp TEXT
-                )
-            """)
-            
-            # Insere o registro vindo da nuvem
-            cursor.execute("""
-                INSERT INTO sales (total_value, payment_method, timestamp)
-                VALUES (?, ?, ?)
-            """, (total_sales, f"SYNC_FROM_{unit_id}", datetime.now().isoformat()))
-            
-            conn.commit()
-            conn.close()
-            
-            print(f"📡 [CLOUD] Dados recebidos da Unidade {unit_id}: R$ {total_sales}")
-            return {"status": "success", "message": "Dados integrados ao Hub Master"}
-        except Exception as e:
-            print(f"❌ [CLOUD ERROR] Falha na sincronização: {e}")
-            return {"status": "error", "detail": str(e)}
+        # Schema do storage.db pelas migrações versionadas: em dia, só a leitura de db_version
+        # (servidor rodando sozinho, sem o main.py, também fica atualizado)
+        version = await asyncio.to_thread(MigrationEngine.check_and_migrate, settings.db_file_path)
+        print(f">>> [SERVIDOR] Banco OK (versão {version})")
+        # banco local (vendas das telas, telemetria do hub): migra aqui, não no primeiro GET /reports/dashboard
+        from app.core.local_db import local_db
+        from app.db.telemetry import ensure_telemetry_store
+
+        await asyncio.to_thread(ensure_telemetry_store, local_db)
+
+    # --- SAÚDE (sondado pelo main.py para liberar as telas quando o servidor sobe) ---
+    from app.api.routers.health import router as health_router
+    app.include_router(health_router, tags=["health"])
+
+    # --- MÉTRICAS (Prometheus) ---
+    from app.api.routers.metrics import router as metrics_router
+    app.include_router(metrics_router, tags=["metrics"])
+
+    # --- SINCRONIZAÇÃO (TELEMETRIA MASTER + LOG DE ALTERAÇÕES DAS LOJAS) ---
+    # POST /api/sync recebe os pulsos que o 'CloudSyncEngine' envia; /api/sync/changes os lotes
+    try:
+        from app.api.routers.sync import router as sync_router
+        app.include_router(sync_router, prefix="/api/sync", tags=["sync"])
+    except Exception as e:
+        print(f"❌ Erro Sincronização: {e}")
 
     # --- IMPORTAÇÃO DE ROTAS ORIGINAIS ---
     
     # 1. Produtos
     try:
         from app.api.routers.products import router as products_router
-        app.include_router(products_router, prefix="/products", tags=["products"])
+        app.include_router(products_router)  # prefixo "/products" vem do próprio router
     except Exception as e:
         print(f"❌ Erro Produtos: {e}")
         app.include_router(create_dummy_router("products"), prefix="/products")
@@ -86,7 +74,7 @@ def create_app() -> FastAPI:
     # 2. Vendas
     try:
         from app.api.routers.sales import router as sales_router
-        app.include_router(sales_router, prefix="/sales", tags=["sales"])
+        app.include_router(sales_router)  # prefixo "/sales" vem do próprio router
     except Exception as e:
         print(f"❌ Erro Vendas: {e}")
         app.include_router(create_dummy_router("sales"), prefix="/sales")
@@ -94,7 +82,7 @@ def create_app() -> FastAPI:
     # 3. Fornecedores
     try:
         from app.api.routers.suppliers import router as suppliers_router
-        app.include_router(suppliers_router, prefix="/suppliers", tags=["suppliers"])
+        app.include_router(suppliers_router)  # prefixo "/suppliers" vem do próprio router
     except Exception as e:
         print(f"❌ Erro Fornecedores: {e}")
         app.include_router(create_dummy_router("suppliers"), prefix="/suppliers")
@@ -104,7 +92,7 @@ def create_app() -> FastAPI:
         from app.api.routers import reports
         r = getattr(reports, "router", getattr(reports, "reports_router", None))
         if r:
-            app.include_router(r, prefix="/reports", tags=["reports"])
+            app.include_router(r)  # prefixo "/reports" vem do próprio router
             print("✅ Rota de Relatórios (Dashboard) carregada!")
         else:
             raise ImportError("Não foi encontrado o objeto 'router' dentro de reports.py")
@@ -117,5 +105,5 @@ def create_app() -> FastAPI:
 
     return app
 
-# Cria a instância global que o main.py procura
-app = create_app()
\ No newline at end of file
+# Sem instância global: importar este módulo não abre banco nem carrega rotas. Quem sobe o
+# servidor chama create_app() (main.py) ou passa a fábrica ao uvicorn (app.api.store_server).
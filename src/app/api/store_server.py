@@ -0,0 +1,43 @@
+"""
+Servidor da loja: a API em vários processos do uvicorn para os caixas da rede.
+
+O main.py sobe um uvicorn só, numa thread do processo das telas: serve o próprio caixa, mas
+vários caixas apontando para um terminal ficam presos a um processo (e ao GIL dele). Aqui cada
+worker monta a sua API pela fábrica (create_app) e todos abrem o mesmo storage.db:
+- WAL: as leituras (catálogo, busca, relatórios) rodam em paralelo nos workers;
+- escrita com BEGIN IMMEDIATE + busy_timeout (app.db.session / app.api.deps.db_write_session):
+  uma de cada vez no arquivo, quem chega espera em vez de falhar com "database is locked".
+
+Por processo, não compartilhado entre workers: o /metrics (cada raspagem vê um worker) e o
+fluxo SSE do painel Master (GET /api/sync/events). O hub de sincronização continua com 1 worker.
+
+Uso:
+    python -m app.api.store_server --host 0.0.0.0 --port 8765 --workers 4
+"""
+import argparse
+
+from app.core.config import settings
+from app.db.migrations import MigrationEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API do ERP em vários workers para os caixas da loja")
+    parser.add_argument("--host", default="0.0.0.0", help="0.0.0.0 para aceitar os caixas da rede")
+    parser.add_argument("--port", type=int, default=settings.api_port)
+    parser.add_argument("--workers", type=int, default=settings.server_workers)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    # migra uma vez aqui; no startup de cada worker sobra só a leitura de db_version
+    version = MigrationEngine.check_and_migrate(settings.db_file_path)
+    print(f"🏪 Servidor da loja em http://{args.host}:{args.port} ({args.workers} workers, banco v{version})")
+
+    import uvicorn
+    uvicorn.run(
+        "app.api.server:create_app", factory=True,
+        host=args.host, port=args.port, workers=args.workers, log_level=args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    main()
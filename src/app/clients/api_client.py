@@ -1,24 +1,192 @@
+"""
+Cliente HTTP da API local.
+
+- ApiClient (síncrono): um por URL no processo inteiro (get_api_client), então todas as telas
+  dividem o mesmo pool de conexões keep-alive. Pode ser usado de várias threads (TaskRunner).
+- AsyncApiClient: mesma API em httpx.AsyncClient, para disparar várias consultas ao mesmo tempo
+  (dashboard/relatórios). Fora de código async, use run_async(), que roda num loop compartilhado.
+
+Timeouts por tipo de chamada ficam em TIMEOUTS; falhas transitórias são repetidas com backoff
+(conexão recusada em qualquer método; timeout de leitura e 502/503/504 só em GET).
+Cada chamada termina nos REQUEST_HOOKS com o tempo total (padrão: histograma do /metrics).
+"""
+import asyncio
+import csv
+import json
+import random
+import threading
+import time
+
 import httpx
 
+from app.core.config import settings
+from app.core.metrics import observe_client_request
+
+TIMEOUTS = {
+    "health": 2.0,
+    "read": 5.0,                       # consultas curtas (busca, produto, delta do catálogo)
+    "default": settings.api_timeout,
+    "bulk": 60.0,                      # lotes de importação / vendas offline
+    "export": httpx.Timeout(10.0, read=None),  # download em streaming, sem limite de leitura
+    "stream": httpx.Timeout(10.0, read=45.0),  # SSE: o servidor manda keep-alive a cada 15s
+}
+
+LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=30.0)
+
+SAFE_METHODS = {"GET", "HEAD"}
+RETRY_STATUS = {502, 503, 504}
+
+# fn(method, url, status, segundos, tentativas) ao fim de cada chamada; status é o código HTTP
+# ou o nome da exceção de transporte. Gancho que falha não derruba a chamada.
+REQUEST_HOOKS = [observe_client_request]
+
+
+def _http2() -> bool:
+    if not settings.api_http2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _should_retry(method: str, error: Exception | None = None, status: int | None = None) -> bool:
+    if error is not None:
+        # nada chegou ao servidor: seguro repetir até POST
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        return method in SAFE_METHODS and isinstance(error, (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError))
+    return method in SAFE_METHODS and status in RETRY_STATUS
+
+
+def _backoff(attempt: int) -> float:
+    # exponencial com jitter: caixas reconectando não batem no servidor todos juntos
+    return min(settings.api_backoff * (2 ** attempt), 4.0) * random.uniform(0.5, 1.0)
+
+
+def _report(method: str, url: str, status, started: float, attempts: int) -> None:
+    elapsed = time.perf_counter() - started
+    for hook in REQUEST_HOOKS:
+        try:
+            hook(method, url, status, elapsed, attempts)
+        except Exception as e:
+            print(f"⚠️ Gancho de tempo do ApiClient falhou: {e}")
+
+
+def iter_sse(lines):
+    """Parser de text/event-stream: recebe as linhas da resposta e devolve (evento, dados JSON)."""
+    event, data = "message", []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith(":"):
+            continue  # comentário (keep-alive)
+        else:
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+
+
+def count_export_rows(path: str, fmt: str) -> int:
+    """Linhas de dados de um arquivo de GET /reports/stock_moves_range (lido em streaming, sem cabeçalho)."""
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            return max(sum(1 for _ in csv.reader(f, delimiter=";")) - 1, 0)
+        return sum(1 for line in f if line.strip())
+
+
 class ApiClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, retries: int | None = None):
         self.base_url = base_url.rstrip("/")
-        # Usando um Client persistente para melhor performance nas requisições
-        self.client = httpx.Client(base_url=self.base_url, timeout=10.0)
+        self.retries = settings.api_retries if retries is None else retries
+        # Client persistente: conexões keep-alive reaproveitadas entre as chamadas
+        self.client = httpx.Client(
+            base_url=self.base_url, timeout=TIMEOUTS["default"], limits=LIMITS, http2=_http2()
+        )
 
     def close(self):
         """Fecha a conexão do cliente."""
         self.client.close()
 
+    def _request(self, method: str, url: str, timeout="default", **kwargs) -> httpx.Response:
+        timeout = TIMEOUTS[timeout] if isinstance(timeout, str) else timeout
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                r = self.client.request(method, url, timeout=timeout, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.retries or not _should_retry(method, error=e):
+                    _report(method, url, type(e).__name__, started, attempt + 1)
+                    raise
+            else:
+                if attempt >= self.retries or not _should_retry(method, status=r.status_code):
+                    _report(method, url, r.status_code, started, attempt + 1)
+                    return r
+            time.sleep(_backoff(attempt))
+            attempt += 1
+
+    def _get(self, url: str, timeout="default", **kwargs) -> httpx.Response:
+        return self._request("GET", url, timeout, **kwargs)
+
+    def _post(self, url: str, timeout="default", **kwargs) -> httpx.Response:
+        return self._request("POST", url, timeout, **kwargs)
+
+    def _put(self, url: str, timeout="default", **kwargs) -> httpx.Response:
+        return self._request("PUT", url, timeout, **kwargs)
+
+    def _delete(self, url: str, timeout="default", **kwargs) -> httpx.Response:
+        return self._request("DELETE", url, timeout, **kwargs)
+
     # -------- health --------
     def health(self) -> dict:
-        r = self.client.get("/health", timeout=2.0)
+        r = self._get("/health", timeout="health")
         r.raise_for_status()
         return r.json()
 
     # -------- products --------
     def list_products(self) -> list[dict]:
-        r = self.client.get("/products", timeout=5.0)
+        r = self._get("/products", timeout="read")
+        r.raise_for_status()
+        return r.json()
+
+    def fetch_catalog(self, etag: str | None = None) -> dict | None:
+        """
+        GET /products condicional (If-None-Match).
+        Retorna None se o catálogo não mudou (304), senão {"products", "etag", "version"}.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        r = self._get("/products", headers=headers)
+        if r.status_code == 304:
+            return None
+        r.raise_for_status()
+        version = r.headers.get("X-Catalog-Version")
+        return {
+            "products": r.json(),
+            "etag": r.headers.get("ETag"),
+            "version": int(version) if version is not None else None,
+        }
+
+    def product_changes(self, since: int) -> dict:
+        """Delta do catálogo: {"version", "changed": [...], "deleted": [ids]}."""
+        r = self._get("/products/changes", params={"since": since}, timeout="read")
+        r.raise_for_status()
+        return r.json()
+
+    def get_product(self, product_id: int) -> dict:
+        r = self._get(f"/products/{product_id}", timeout="read")
+        r.raise_for_status()
+        return r.json()
+
+    def search_products(self, q: str, limit: int = 30) -> list[dict]:
+        """Busca do PDV no servidor (SKU exato primeiro, depois nome/SKU)."""
+        r = self._get("/products/search", params={"q": q, "limit": limit}, timeout="read")
         r.raise_for_status()
         return r.json()
 
@@ -40,7 +208,29 @@ class ApiClient:
             "ipi_rate": ipi_rate,
             "icms_rate": icms_rate
         }
-        r = self.client.post("/products", json=data)
+        r = self._post("/products", json=data)
+        r.raise_for_status()
+        return r.json()
+
+    def bulk_upsert_products(self, items: list[dict], update_fields: list[str] | None = None) -> dict:
+        """
+        POST /products/bulk: insere ou atualiza (chave = sku) até 5000 produtos de uma vez.
+        SKU existente só tem sobrescritos os campos enviados (e, com update_fields, só esses).
+        Retorna {"received", "upserted", "version"}.
+        """
+        payload = {"items": items}
+        if update_fields is not None:
+            payload["update_fields"] = update_fields
+        r = self._post("/products/bulk", json=payload, timeout="bulk")
+        r.raise_for_status()
+        return r.json()
+
+    def stock_entries(self, items: list[dict]) -> dict:
+        """
+        POST /products/stock-entries: [{"sku", "qty", "reason"}] (até 5000 por chamada).
+        Retorna {"updated", "missing", "version"}.
+        """
+        r = self._post("/products/stock-entries", json={"items": items}, timeout="bulk")
         r.raise_for_status()
         return r.json()
 
@@ -49,16 +239,16 @@ class ApiClient:
         Atualiza um produto. Aceita argumentos dinâmicos (nome, sku, preco, etc).
         Ex: client.update_product(1, price=50.0, stock_qty=10)
         """
-        r = self.client.put(f"/products/{product_id}", json=kwargs)
+        r = self._put(f"/products/{product_id}", json=kwargs)
         r.raise_for_status()
         return r.json()
 
     def delete_product(self, product_id: int) -> None:
-        r = self.client.delete(f"/products/{product_id}")
+        r = self._delete(f"/products/{product_id}")
         r.raise_for_status()
 
     def adjust_stock(self, product_id: int, delta: int, reason: str) -> dict:
-        r = self.client.post(
+        r = self._post(
             f"/products/{product_id}/stock",
             json={"delta": int(delta), "reason": reason}
         )
@@ -67,16 +257,52 @@ class ApiClient:
 
     # -------- sales --------
     def create_sale(self, items: list[dict]) -> dict:
-        r = self.client.post("/sales", json={"items": items})
+        r = self._post("/sales", json={"items": items})
         r.raise_for_status()
         return r.json()
 
-    def list_sales(self) -> list[dict]:
-        """Recupera o histórico de vendas."""
-        try:
-            r = self.client.get("/sales")
+    def create_sales_batch(self, sales: list[list[dict]], chunk_size: int = 100, per_request: int = 1000) -> list[dict]:
+        """
+        Reenvia a fila de vendas feitas offline em poucas requisições.
+        `sales` é uma lista de carrinhos (cada um no formato de create_sale).
+        Retorna um resultado por venda, na mesma ordem: {"ok", "id"} ou {"ok": False, "detail"}.
+        """
+        results: list[dict] = []
+        for start in range(0, len(sales), per_request):
+            part = sales[start:start + per_request]
+            r = self._post(
+                "/sales/batch",
+                params={"chunk_size": chunk_size},
+                json={"sales": [{"items": items} for items in part]},
+                timeout="bulk",
+            )
             r.raise_for_status()
-            return r.json()
+            for res in r.json()["results"]:
+                res["index"] += start
+                results.append(res)
+        return results
+
+    def list_sales_page(self, limit: int = 100, cursor: str | None = None, start: str | None = None,
+                        end: str | None = None, payment_method: str | None = None,
+                        include_items: bool = False) -> dict:
+        """Uma página do histórico: {"items": [...], "next_cursor": str | None}."""
+        params = {"limit": limit, "include_items": include_items}
+        if cursor:
+            params["cursor"] = cursor
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+        if payment_method:
+            params["payment_method"] = payment_method
+        r = self._get("/sales", params=params)
+        r.raise_for_status()
+        return r.json()
+
+    def list_sales(self, limit: int = 100) -> list[dict]:
+        """Recupera as vendas mais recentes (primeira página do histórico)."""
+        try:
+            return self.list_sales_page(limit=limit)["items"]
         except httpx.HTTPStatusError as e:
             if e.response.status_code == 405:
                 print("⚠️ Erro 405: Rota /sales não aceita GET. Verifique o router no backend.")
@@ -84,29 +310,56 @@ class ApiClient:
 
     # -------- reports --------
     def reports_summary(self) -> dict:
-        r = self.client.get("/reports/summary")
+        r = self._get("/reports/summary")
+        r.raise_for_status()
+        return r.json()
+
+    def reports_dashboard(self, low_limit: int = 10) -> dict:
+        """Cards, séries de 7 dias, top de estoque e alertas numa chamada só (GET /reports/dashboard)."""
+        r = self._get("/reports/dashboard", params={"low_limit": low_limit})
         r.raise_for_status()
         return r.json()
 
     def reports_stock_moves_7d(self) -> dict:
-        r = self.client.get("/reports/stock_moves_7d")
+        r = self._get("/reports/stock_moves_7d")
         r.raise_for_status()
         return r.json()
 
     def reports_stock_moves_range(self, start: str, end: str) -> dict:
-        r = self.client.get("/reports/stock_moves_range", params={"start": start, "end": end})
+        r = self._get("/reports/stock_moves_range", params={"start": start, "end": end})
         r.raise_for_status()
         return r.json()
 
+    def export_stock_moves(self, start: str, end: str, path: str, fmt: str = "csv") -> int:
+        """
+        Baixa o período inteiro (csv/ndjson) direto para o arquivo, em streaming. Retorna os bytes gravados.
+        ValueError se o arquivo não tiver as X-Row-Count linhas anunciadas pelo servidor.
+        """
+        params = {"start": start, "end": end, "format": fmt}
+        written = 0
+        # sem timeout de leitura: um ano de movimentos pode levar mais que os 10s padrão
+        with self.client.stream("GET", "/reports/stock_moves_range", params=params, timeout=TIMEOUTS["export"]) as r:
+            r.raise_for_status()
+            expected = r.headers.get("X-Row-Count")
+            with open(path, "wb") as f:
+                for chunk in r.iter_bytes():
+                    f.write(chunk)
+                    written += len(chunk)
+        if expected is not None:
+            rows = count_export_rows(path, fmt)
+            if rows != int(expected):
+                raise ValueError(f"Exportação incompleta: {rows} de {expected} movimentos no arquivo")
+        return written
+
     # -------- suppliers --------
     def list_suppliers(self) -> list[dict]:
-        r = self.client.get("/suppliers")
+        r = self._get("/suppliers")
         r.raise_for_status()
         return r.json()
 
     def create_supplier(self, name: str, document: str | None = None, 
                         phone: str | None = None, email: str | None = None) -> dict:
-        r = self.client.post(
+        r = self._post(
             "/suppliers",
             json={"name": name, "document": document, "phone": phone, "email": email}
         )
@@ -114,11 +367,183 @@ class ApiClient:
         return r.json()
 
     def update_supplier(self, supplier_id: int, **kwargs) -> dict:
-        r = self.client.put(f"/suppliers/{supplier_id}", json=kwargs)
+        r = self._put(f"/suppliers/{supplier_id}", json=kwargs)
         r.raise_for_status()
         return r.json()
 
     def delete_supplier(self, supplier_id: int) -> dict:
-        r = self.client.delete(f"/suppliers/{supplier_id}")
+        r = self._delete(f"/suppliers/{supplier_id}")
         r.raise_for_status()
-        return r.json()
\ No newline at end of file
+        return r.json()
+
+class AsyncApiClient:
+    """
+    Versão assíncrona das consultas de leitura (relatórios, dashboard, vendas, produtos).
+    As corrotinas podem ir juntas num asyncio.gather: saem em paralelo pelo mesmo pool keep-alive.
+    """
+
+    def __init__(self, base_url: str, retries: int | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.retries = settings.api_retries if retries is None else retries
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url, timeout=TIMEOUTS["default"], limits=LIMITS, http2=_http2()
+        )
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def _request(self, method: str, url: str, timeout="default", **kwargs) -> httpx.Response:
+        timeout = TIMEOUTS[timeout] if isinstance(timeout, str) else timeout
+        attempt = 0
+        started = time.perf_counter()
+        while True:
+            try:
+                r = await self.client.request(method, url, timeout=timeout, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.retries or not _should_retry(method, error=e):
+                    _report(method, url, type(e).__name__, started, attempt + 1)
+                    raise
+            else:
+                if attempt >= self.retries or not _should_retry(method, status=r.status_code):
+                    _report(method, url, r.status_code, started, attempt + 1)
+                    return r
+            await asyncio.sleep(_backoff(attempt))
+            attempt += 1
+
+    async def _get_json(self, url: str, timeout="default", **kwargs):
+        r = await self._request("GET", url, timeout, **kwargs)
+        r.raise_for_status()
+        return r.json()
+
+    async def health(self) -> dict:
+        return await self._get_json("/health", timeout="health")
+
+    async def get_product(self, product_id: int) -> dict:
+        return await self._get_json(f"/products/{product_id}", timeout="read")
+
+    async def search_products(self, q: str, limit: int = 30) -> list[dict]:
+        return await self._get_json("/products/search", params={"q": q, "limit": limit}, timeout="read")
+
+    async def list_sales_page(self, limit: int = 100, cursor: str | None = None) -> dict:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        return await self._get_json("/sales", params=params)
+
+    async def reports_summary(self) -> dict:
+        return await self._get_json("/reports/summary")
+
+    async def reports_dashboard(self, low_limit: int = 10) -> dict:
+        return await self._get_json("/reports/dashboard", params={"low_limit": low_limit})
+
+    async def reports_stock_moves_7d(self) -> dict:
+        return await self._get_json("/reports/stock_moves_7d")
+
+    async def reports_stock_moves_range(self, start: str, end: str) -> dict:
+        return await self._get_json("/reports/stock_moves_range", params={"start": start, "end": end})
+
+
+# --- instâncias compartilhadas ---
+_lock = threading.Lock()
+_clients: dict[str, ApiClient] = {}
+_default_url: str | None = None
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_thread: threading.Thread | None = None
+_async_clients: dict[str, AsyncApiClient] = {}
+
+
+def get_api_client(base_url: str | None = None) -> ApiClient:
+    """
+    ApiClient único por URL. Sem URL, usa a da primeira chamada (a da MainWindow)
+    ou, antes disso, settings.api_base_url.
+    """
+    global _default_url
+    with _lock:
+        if base_url is None:
+            base_url = _default_url or settings.api_base_url
+        base_url = base_url.rstrip("/")
+        if _default_url is None:
+            _default_url = base_url
+        client = _clients.get(base_url)
+        if client is None:
+            client = _clients[base_url] = ApiClient(base_url)
+        return client
+
+
+def wait_until_ready(base_url: str, timeout: float = 20.0, interval: float = 0.05) -> bool:
+    """
+    Sonda GET /health até o servidor responder 200 (ou estourar o prazo). Substitui a espera fixa
+    no início do app: devolve assim que o uvicorn sobe e não libera a interface antes da hora.
+    """
+    deadline = time.monotonic() + timeout
+    with httpx.Client(base_url=base_url.rstrip("/"), timeout=TIMEOUTS["health"]) as probe:
+        while True:
+            try:
+                if probe.get("/health").status_code == 200:
+                    return True
+            except httpx.TransportError:
+                pass  # ainda subindo
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(target=_loop.run_forever, name="api-async", daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+def run_async(fn, base_url: str | None = None, timeout: float | None = None):
+    """
+    Roda fn(cliente_async) -> corrotina no loop compartilhado e devolve o resultado.
+    Bloqueia quem chama: use de uma thread do TaskRunner, nunca da thread da interface.
+
+        run_async(lambda ac: asyncio.gather(ac.reports_summary(), ac.reports_stock_moves_7d()))
+    """
+    url = (base_url or get_api_client().base_url).rstrip("/")
+
+    async def call():
+        # o AsyncClient nasce dentro do loop em que vai ser usado
+        client = _async_clients.get(url)
+        if client is None:
+            client = _async_clients[url] = AsyncApiClient(url)
+        return await fn(client)
+
+    return asyncio.run_coroutine_threadsafe(call(), _event_loop()).result(timeout)
+
+
+def close_api_clients() -> None:
+    """Fecha os pools (chamado no encerramento do app)."""
+    global _loop, _loop_thread
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        loop, thread = _loop, _loop_thread
+        _loop = _loop_thread = None
+    if loop is None:
+        return
+
+    async def shutdown():
+        for client in _async_clients.values():
+            await client.aclose()
+        _async_clients.clear()
+
+    try:
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result(5)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
@@ -0,0 +1,66 @@
+import threading
+
+import httpx
+
+
+class CatalogCache:
+    """
+    Cache do catálogo de produtos compartilhado por todas as telas do processo.
+    A primeira carga baixa tudo; depois só o delta (GET /products/changes?since=versão).
+    Se o servidor não tiver o feed, cai no GET /products com If-None-Match (304 = nada mudou).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: dict[int, dict] = {}
+        self.version: int | None = None
+        self.etag: str | None = None
+
+    def products(self, client) -> list[dict]:
+        """Catálogo atualizado, na mesma ordem do GET /products (id decrescente)."""
+        self.refresh(client)
+        with self._lock:
+            return [self._by_id[pid] for pid in sorted(self._by_id, reverse=True)]
+
+    def get(self, product_id: int) -> dict | None:
+        with self._lock:
+            return self._by_id.get(product_id)
+
+    def refresh(self, client, full: bool = True) -> None:
+        """full=False só aplica delta se o cache já foi carregado (nunca baixa tudo)."""
+        with self._lock:
+            if self.version is None and not full:
+                return
+            if self.version is not None:
+                try:
+                    delta = client.product_changes(self.version)
+                    self._apply_delta(delta)
+                    return
+                except httpx.HTTPStatusError:
+                    pass  # servidor antigo sem /products/changes
+            data = client.fetch_catalog(self.etag)
+            if data is None:
+                return  # 304: o que temos ainda vale
+            self._by_id = {int(p["id"]): p for p in data["products"]}
+            self.etag = data["etag"]
+            self.version = data["version"]
+
+    def invalidate(self) -> None:
+        """Força a próxima leitura a baixar o catálogo inteiro."""
+        with self._lock:
+            self._by_id = {}
+            self.version = None
+            self.etag = None
+
+    def _apply_delta(self, delta: dict) -> None:
+        # exclusões primeiro: um id recriado depois volta em `changed`
+        for pid in delta.get("deleted", []):
+            self._by_id.pop(int(pid), None)
+        for p in delta.get("changed", []):
+            self._by_id[int(p["id"])] = p
+        self.version = delta["version"]
+        self.etag = None  # a ETag antiga já não corresponde a esta versão
+
+
+# Instância global usada por todas as telas
+catalog_cache = CatalogCache()
@@ -22,11 +22,41 @@ class Settings(BaseSettings):
     api_host: str = Field(default="127.0.0.1", validation_alias="API_HOST")
     api_port: int = Field(default=8765, validation_alias="API_PORT")
     api_base_url: str = Field(default="http://127.0.0.1:8765", validation_alias="API_BASE_URL")
+
+    # Cliente HTTP das telas (ApiClient / AsyncApiClient)
+    api_timeout: float = Field(default=10.0, validation_alias="API_TIMEOUT")
+    api_retries: int = Field(default=2, validation_alias="API_RETRIES")
+    api_backoff: float = Field(default=0.25, validation_alias="API_BACKOFF")
+    api_http2: bool = Field(default=False, validation_alias="API_HTTP2")  # só vale em https (hub remoto)
     
+    # Sincronização com o hub (Bertolini Cloud): desligada até a loja configurar o hub E o token dela.
+    # O log de alterações leva o cadastro de clientes (dados pessoais); nada sai da máquina por padrão.
+    cloud_hub_url: str = Field(default="", validation_alias="CLOUD_HUB_URL")
+    unit_id: str = Field(default="001", validation_alias="UNIT_ID")
+    cloud_sync_token: str = Field(default="", validation_alias="CLOUD_SYNC_TOKEN")  # token desta loja no hub
+    # Lado do hub: token de cada loja, JSON no .env ({"001": "..."}). Loja fora da lista é recusada.
+    hub_unit_tokens: dict[str, str] = Field(default_factory=dict, validation_alias="HUB_UNIT_TOKENS")
+    # Leitura do painel Master (GET /api/sync/events, faturamento da rede); vazio = fluxo fechado
+    hub_monitor_token: str = Field(default="", validation_alias="HUB_MONITOR_TOKEN")
+    sync_batch_size: int = Field(default=500, validation_alias="SYNC_BATCH_SIZE")
+    telemetry_retention_days: int = Field(default=30, validation_alias="TELEMETRY_RETENTION_DAYS")  # hub
+
+    # Instrumentação da API (GET /metrics): consulta SQL acima disso vai para o log "app.db.slow"
+    slow_query_ms: float = Field(default=250.0, validation_alias="SLOW_QUERY_MS")
+
+    # Servidor da loja (vários caixas na rede): workers do uvicorn e escrita concorrente no SQLite
+    server_workers: int = Field(default=4, validation_alias="SERVER_WORKERS")
+    db_busy_timeout_ms: int = Field(default=5000, validation_alias="DB_BUSY_TIMEOUT_MS")
+    db_write_retries: int = Field(default=3, validation_alias="DB_WRITE_RETRIES")
+
     # URL usada pelo SQLAlchemy (Async)
     database_url: str = Field(default=f"sqlite+aiosqlite:///{DB_FILE}", validation_alias="DATABASE_URL")
     
     # Caminho físico usado pelo MigrationEngine (SQLite puro)
     db_file_path: str = DB_FILE
 
+    @property
+    def cloud_sync_enabled(self) -> bool:
+        return bool(self.cloud_hub_url and self.cloud_sync_token)
+
 settings = Settings()
\ No newline at end of file
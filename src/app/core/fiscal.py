@@ -1,5 +1,4 @@
 # Arquivo: src/app/core/fiscal.py
-import requests
 import json
 import logging
 
@@ -41,6 +40,7 @@ def emitir_nfce(venda_id, total, itens, cpf_cliente=None):
     url = f"{URL_BASE}/nfce?ref={venda_id}"
     
     try:
+        import requests
         response = requests.post(url, auth=(API_KEY, ""), json=dados_nota, timeout=10)
         
         if response.status_code in [200, 201, 202]:
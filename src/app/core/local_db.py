@@ -0,0 +1,221 @@
+"""
+Acesso ao banco SQLite local das telas (clientes, agenda, fornecedores, licenças...).
+
+Antes cada ação abria um `sqlite3.connect("test.db")`, rodava CREATE TABLE IF NOT EXISTS
+e fechava: abertura de arquivo + fsync no commit, tudo na thread da interface.
+Aqui as conexões ficam abertas num pool pequeno, com WAL/synchronous=NORMAL aplicados
+uma vez por conexão, e o cache de statements do sqlite3 reaproveita as consultas preparadas.
+O schema é conferido uma única vez, na inicialização (ensure_schema).
+"""
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+LOCAL_DB_FILE = "test.db"
+
+# Pragmas por conexão (journal_mode=WAL fica gravado no arquivo, os outros valem por conexão)
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",      # em WAL: sem fsync a cada commit, só no checkpoint
+    "PRAGMA mmap_size=268435456",     # 256 MB de leitura via mmap
+    "PRAGMA cache_size=-16000",       # ~16 MB de páginas em cache
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+]
+
+# Tabelas locais que as telas usavam criar por conta própria
+LOCAL_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS clients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        razao_social TEXT, nome_fantasia TEXT, cnpj TEXT, ie TEXT, im TEXT,
+        cep TEXT, endereco TEXT, numero TEXT, bairro TEXT, cidade TEXT, uf TEXT,
+        telefone TEXT, email TEXT, login TEXT, password TEXT,
+        business_type TEXT, expiry_date TEXT, license_key TEXT, status TEXT DEFAULT 'Ativo'
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_clients_login ON clients (login)",
+    """
+    CREATE TABLE IF NOT EXISTS customers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        phone TEXT,
+        email TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS suppliers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT, document TEXT, phone TEXT, email TEXT, address TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS appointments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_name TEXT,
+        service TEXT,
+        phone TEXT,
+        date_str TEXT,
+        time_str TEXT,
+        status TEXT DEFAULT 'Agendado'
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_appointments_date ON appointments (date_str, time_str)",
+    """
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        total_value REAL,
+        payment_method TEXT,
+        items TEXT,
+        timestamp TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME,
+        user_name TEXT,
+        user_role TEXT,
+        action TEXT,
+        detail TEXT,
+        level TEXT
+    )
+    """,
+]
+
+
+class LocalDatabase:
+    """
+    Pool de conexões sqlite3 para um arquivo.
+    Uso:
+        rows = local_db.query("SELECT ... WHERE id = ?", (cid,))
+        local_db.execute("UPDATE ...", params)
+        with local_db.connection() as conn:   # várias instruções numa transação
+            ...
+    """
+
+    def __init__(self, path: str, pool_size: int = 4):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool: queue.LifoQueue = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._created = 0
+        self._schema_ok = False
+
+    # --- pool ---
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, cached_statements=256)
+        for pragma in PRAGMAS:
+            try:
+                conn.execute(pragma)
+            except sqlite3.DatabaseError as e:
+                print(f"⚠️ Pragma ignorado ({pragma}): {e}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.pool_size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        # pool cheio: espera alguém devolver
+        return self._pool.get(timeout=10)
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._pool.put_nowait(conn)
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão; commit no fim, rollback se der erro."""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """Fecha as conexões ociosas (chamado ao sair do app)."""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+    # --- atalhos ---
+    def query(self, sql: str, params=()) -> list[tuple]:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql: str, params=()) -> tuple | None:
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def execute(self, sql: str, params=()) -> int:
+        """Escrita simples; retorna o lastrowid (útil em INSERT)."""
+        with self.connection() as conn:
+            return conn.execute(sql, params).lastrowid
+
+    def executemany(self, sql: str, seq_params) -> int:
+        with self.connection() as conn:
+            return conn.executemany(sql, seq_params).rowcount
+
+    # --- schema ---
+    def ensure_schema(self) -> bool:
+        """
+        Migrações pendentes do arquivo (app.db.migrations), uma vez por processo.
+        Banco em dia custa só a leitura de db_version.
+        """
+        if self._schema_ok:
+            return True
+        from app.db.migrations import MigrationEngine, migrations_for
+
+        try:
+            migrations = migrations_for(self.path)
+            with self.connection() as conn:
+                version = MigrationEngine.migrate(conn, migrations, label=self.path)
+            self._schema_ok = version >= migrations[-1][0]
+        except Exception as e:
+            print(f"⚠️ Erro ao preparar banco local ({self.path}): {e}")
+        return self._schema_ok
+
+
+_registry: dict[str, LocalDatabase] = {}
+_registry_lock = threading.Lock()
+
+
+def get_local_db(path: str = LOCAL_DB_FILE) -> LocalDatabase:
+    """Um pool por arquivo (test.db das telas, storage.db do painel admin)."""
+    with _registry_lock:
+        db = _registry.get(path)
+        if db is None:
+            db = _registry[path] = LocalDatabase(path)
+        return db
+
+
+def close_all():
+    with _registry_lock:
+        for db in _registry.values():
+            db.close()
+
+
+# Banco local padrão das telas
+local_db = get_local_db()
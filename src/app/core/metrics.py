@@ -0,0 +1,272 @@
+"""
+Métricas do processo em formato de texto do Prometheus (GET /metrics).
+
+- http_request_duration_seconds{method,route,status}: latência por rota. O rótulo é o molde da
+  rota (/products/{product_id}), não a URL, então o número de séries não cresce com os ids;
+- http_requests_in_flight{method}: requisições em andamento;
+- http_request_db_queries{method,route}: consultas SQL por requisição (N+1 aparece aqui);
+- db_query_duration_seconds{statement}: cada execução do SQLAlchemy (before/after_cursor_execute);
+- db_slow_queries_total{statement}: acima de settings.slow_query_ms, com o SQL no log "app.db.slow";
+- api_client_request_duration_seconds{method,route,status}: o mesmo visto pelo ApiClient (tempo
+  total da chamada, tentativas repetidas incluídas).
+
+Histogramas de baldes fixos: o p95 sai no Prometheus com histogram_quantile(0.95, ...) ou aqui
+mesmo com Histogram.quantile(). O caixa roda servidor e telas no mesmo processo, então um /metrics
+só mostra os dois lados do POST /sales.
+"""
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from app.core.config import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+slow_log = logging.getLogger("app.db.slow")
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_fmt(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    """Contagem por balde (não acumulada na memória; acumulada só na exposição)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.label_names = name, doc, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}  # labels -> [contagens por balde (+Inf no fim), soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def quantile(self, q: float, *labels) -> float | None:
+        """Estimativa igual à do histogram_quantile do Prometheus (interpolação dentro do balde)."""
+        with self._lock:
+            series = self._series.get(labels)
+            counts = list(series[0]) if series else None
+        if not counts or not sum(counts):
+            return None
+        rank = q * sum(counts)
+        seen = 0
+        for i, n in enumerate(counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # acima do último balde: só dá para dizer "pelo menos"
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, n) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = f'le="{_fmt(float(bound))}"'
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_fmt(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {n}"
+
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latência das requisições da API por rota.", ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "Requisições da API em andamento.", ("method",))
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Consultas SQL por requisição.", ("method", "route"), buckets=COUNT_BUCKETS,
+)
+DB_LATENCY = Histogram(
+    "db_query_duration_seconds", "Tempo de cada execução SQL do SQLAlchemy.", ("statement",), buckets=QUERY_BUCKETS,
+)
+DB_SLOW = Counter("db_slow_queries_total", "Consultas acima de settings.slow_query_ms.", ("statement",))
+CLIENT_LATENCY = Histogram(
+    "api_client_request_duration_seconds", "Chamadas do ApiClient vistas pelo desktop (com novas tentativas).",
+    ("method", "route", "status"),
+)
+CLIENT_RETRIES = Counter("api_client_retries_total", "Tentativas repetidas pelo ApiClient.", ("method", "route"))
+
+REGISTRY = [HTTP_LATENCY, HTTP_IN_FLIGHT, HTTP_DB_QUERIES, DB_LATENCY, DB_SLOW, CLIENT_LATENCY, CLIENT_RETRIES]
+
+
+def render() -> str:
+    """Todas as métricas no formato de exposição de texto do Prometheus."""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.doc}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# --- servidor: middleware ASGI ---
+# [consultas SQL, scope] da requisição corrente: o hook do SQLAlchemy roda no mesmo contexto
+_request: ContextVar[list | None] = ContextVar("metrics_request", default=None)
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI puro (não BaseHTTPMiddleware): não bufferiza a resposta nem atrapalha o SSE.
+    Fluxos text/event-stream entram só no gauge; a duração deles é a da conexão, não latência.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        method = scope["method"]
+        response = {"status": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                headers = dict(message.get("headers") or ())
+                response["stream"] = headers.get(b"content-type", b"").startswith(b"text/event-stream")
+            await send(message)
+
+        current = [0, scope]
+        token = _request.set(current)
+        HTTP_IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method)
+            _request.reset(token)
+            if not response["stream"]:
+                route = _route(scope)
+                HTTP_LATENCY.observe(elapsed, method, route, str(response["status"]))
+                HTTP_DB_QUERIES.observe(current[0], method, route)
+
+
+# --- servidor: eventos do SQLAlchemy ---
+STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+def _statement_kind(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in STATEMENTS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_started"].pop()
+    kind = _statement_kind(statement)
+    DB_LATENCY.observe(elapsed, kind)
+    current = _request.get()
+    if current is not None:
+        current[0] += 1
+    if elapsed * 1000 >= settings.slow_query_ms:
+        DB_SLOW.inc(kind)
+        where = f"{current[1]['method']} {_route(current[1])}" if current is not None else "fora de requisição"
+        slow_log.warning("%.1f ms [%s] %s", elapsed * 1000, where, " ".join(statement.split())[:2000])
+
+
+def _handle_error(exception_context):
+    # execução que falhou não passa pelo after_cursor_execute: descarta o início pendente
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_started"):
+        conn.info["metrics_started"].pop()
+
+
+def instrument_engine(engine) -> None:
+    """Liga os hooks de tempo/contagem num Engine (ou AsyncEngine) do SQLAlchemy."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# --- desktop: ApiClient ---
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def client_route(url: str) -> str:
+    """/products/12/stock?x=1 -> /products/{id}/stock (mesma série para todos os ids)."""
+    path = url.split("?", 1)[0]
+    if "://" in path:
+        path = "/" + path.split("://", 1)[1].partition("/")[2]
+    return _ID_SEGMENT.sub("/{id}", path) or "/"
+
+
+def observe_client_request(method: str, url: str, status, seconds: float, attempts: int) -> None:
+    """Gancho padrão do ApiClient: status é o código HTTP ou o nome da exceção de transporte."""
+    route = client_route(url)
+    CLIENT_LATENCY.observe(seconds, method, route, str(status))
+    if attempts > 1:
+        CLIENT_RETRIES.inc(method, route, amount=attempts - 1)
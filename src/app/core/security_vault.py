@@ -1,5 +1,89 @@
-from cryptography.fernet import Fernet
+"""
+Cofre de arquivos (.vault) com criptografia em segmentos.
+
+Formato v2 (streaming, memória constante):
+
+    cabeçalho (28 bytes)  b"BVLT" | versão | kdf | reservado | tamanho do segmento | sal (16)
+    segmento 0..n-1       AES-256-GCM(texto[i*seg:(i+1)*seg]) + tag de 16 bytes
+    índice (64 bytes)     AES-256-GCM(tamanho original, nº de segmentos, blake2b do original)
+
+- A chave de cada arquivo sai da chave mestre (a mesma chave Fernet de sempre) por HKDF com o sal.
+- O nonce do segmento é o número dele + marca de "último"; o cabeçalho entra como dado autenticado.
+  Trocar, cortar ou reordenar segmentos quebra a tag.
+- Tamanho fixo: o segmento i está em CABEÇALHO + i * (seg + 16), então dá para conferir ou
+  restaurar um trecho sem decifrar o resto.
+
+Arquivos antigos (token Fernet único) continuam abrindo em descriptografar_arquivo; para
+converter de vez:
+    python -m app.core.security_vault --migrate cloud_backups/*.vault --key <chave>
+"""
+import argparse
+import base64
+import hashlib
 import os
+import struct
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+MAGIC = b"BVLT"
+VERSION = 2
+KDF_HKDF_FERNET = 1
+SEGMENT_SIZE = 1024 * 1024
+TAG_SIZE = 16
+
+_HEADER = struct.Struct(">4sBBHI16s")
+_INDEX = struct.Struct(">QQ32s")
+INDEX_SIZE = _INDEX.size + TAG_SIZE
+_INDEX_NONCE = b"\xff" * 8 + b"\x00\x00\x00\x02"
+
+
+def _nonce(indice: int, ultimo: bool) -> bytes:
+    return struct.pack(">QI", indice, 1 if ultimo else 0)
+
+
+def _chave_arquivo(chave, sal: bytes) -> AESGCM:
+    mestre = base64.urlsafe_b64decode(chave)
+    if len(mestre) != 32:
+        raise ValueError("Chave mestre inválida (esperado formato Fernet, 32 bytes em Base64).")
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=sal, info=b"bertolini-vault-v2")
+    return AESGCM(hkdf.derive(mestre))
+
+
+class VaultInfo:
+    """Cabeçalho + índice de um .vault v2 (já autenticado)."""
+
+    def __init__(self, caminho_vault, chave):
+        self.caminho = caminho_vault
+        with open(caminho_vault, "rb") as file:
+            self.header = file.read(_HEADER.size)
+            if len(self.header) < _HEADER.size or not self.header.startswith(MAGIC):
+                raise ValueError(f"{caminho_vault} não é um cofre v2.")
+            _, versao, kdf, _, self.segment_size, sal = _HEADER.unpack(self.header)
+            if versao != VERSION or kdf != KDF_HKDF_FERNET:
+                raise ValueError(f"Versão de cofre não suportada: {versao}/{kdf}")
+            self.aead = _chave_arquivo(chave, sal)
+            file.seek(-INDEX_SIZE, os.SEEK_END)
+            indice = self.aead.decrypt(_INDEX_NONCE, file.read(INDEX_SIZE), self.header)
+        self.tamanho, self.segmentos, self.digest = _INDEX.unpack(indice)
+
+    def offset(self, i: int) -> int:
+        return _HEADER.size + i * (self.segment_size + TAG_SIZE)
+
+    def tamanho_segmento(self, i: int) -> int:
+        if i == self.segmentos - 1:
+            return self.tamanho - i * self.segment_size
+        return self.segment_size
+
+    def ler(self, file, i: int) -> bytes:
+        if not 0 <= i < self.segmentos:
+            raise IndexError(f"Segmento {i} fora do cofre ({self.segmentos} segmentos)")
+        file.seek(self.offset(i))
+        bloco = file.read(self.tamanho_segmento(i) + TAG_SIZE)
+        return self.aead.decrypt(_nonce(i, i == self.segmentos - 1), bloco, self.header)
+
 
 class SecurityVault:
     @staticmethod
@@ -8,30 +92,154 @@ class SecurityVault:
         return Fernet.generate_key()
 
     @staticmethod
-    def criptografar_arquivo(caminho_arquivo, chave):
-        """Lê o banco de dados e gera uma versão blindada."""
-        f = Fernet(chave)
-        with open(caminho_arquivo, "rb") as file:
-            dados_originais = file.read()
-        
-        dados_criptografados = f.encrypt(dados_originais)
-        
-        with open(caminho_arquivo + ".vault", "wb") as file:
-            file.write(dados_criptografados)
-        
-        return caminho_arquivo + ".vault"
-
-    @staticmethod
-    def descriptografar_arquivo(caminho_vault, chave):
-        """Restaura o banco de dados original a partir do arquivo blindado."""
+    def criptografar_arquivo(caminho_arquivo, chave, destino=None, segment_size=SEGMENT_SIZE):
+        """Lê o banco de dados em segmentos e gera uma versão blindada (.vault v2)."""
+        destino = destino or caminho_arquivo + ".vault"
+        sal = os.urandom(16)
+        header = _HEADER.pack(MAGIC, VERSION, KDF_HKDF_FERNET, 0, segment_size, sal)
+        aead = _chave_arquivo(chave, sal)
+        digest = hashlib.blake2b(digest_size=32)
+        total = os.path.getsize(caminho_arquivo)
+        segmentos = max(1, -(-total // segment_size))
+
+        tmp = destino + ".tmp"
+        with open(caminho_arquivo, "rb") as origem, open(tmp, "wb") as saida:
+            saida.write(header)
+            tamanho = 0
+            for i in range(segmentos):
+                dados = origem.read(segment_size)
+                digest.update(dados)
+                tamanho += len(dados)
+                saida.write(aead.encrypt(_nonce(i, i == segmentos - 1), dados, header))
+            if origem.read(1) or tamanho != total:
+                raise IOError(f"{caminho_arquivo} mudou durante a criptografia; use uma cópia (snapshot).")
+            saida.write(aead.encrypt(_INDEX_NONCE, _INDEX.pack(tamanho, segmentos, digest.digest()), header))
+        os.replace(tmp, destino)
+        return destino
+
+    @staticmethod
+    def descriptografar_arquivo(caminho_vault, chave, destino=None):
+        """Restaura o banco de dados original a partir do arquivo blindado (v2 ou Fernet antigo)."""
+        destino = destino or caminho_vault.replace(".vault", "")
+        if not SecurityVault.is_v2(caminho_vault):
+            return SecurityVault._descriptografar_legado(caminho_vault, chave, destino)
+
+        info = VaultInfo(caminho_vault, chave)
+        digest = hashlib.blake2b(digest_size=32)
+        tmp = destino + ".tmp"
+        try:
+            with open(caminho_vault, "rb") as file, open(tmp, "wb") as saida:
+                for i in range(info.segmentos):
+                    dados = info.ler(file, i)
+                    digest.update(dados)
+                    saida.write(dados)
+            if digest.digest() != info.digest:
+                raise ValueError("Cofre inconsistente: hash do conteúdo não confere.")
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        os.replace(tmp, destino)
+        return destino
+
+    @staticmethod
+    def is_v2(caminho_vault) -> bool:
+        with open(caminho_vault, "rb") as file:
+            return file.read(len(MAGIC)) == MAGIC
+
+    @staticmethod
+    def ler_segmento(caminho_vault, chave, indice: int) -> bytes:
+        """Decifra só o segmento pedido (autenticado pela própria tag)."""
+        info = VaultInfo(caminho_vault, chave)
+        with open(caminho_vault, "rb") as file:
+            return info.ler(file, indice)
+
+    @staticmethod
+    def verificar(caminho_vault, chave, segmentos=None) -> list[int]:
+        """
+        Confere as tags (todas, ou só os índices pedidos) e devolve a lista de segmentos corrompidos.
+        Com a lista vazia e sem filtro, o hash do conteúdo inteiro também é conferido.
+        """
+        info = VaultInfo(caminho_vault, chave)
+        alvo = range(info.segmentos) if segmentos is None else segmentos
+        digest = hashlib.blake2b(digest_size=32)
+        ruins = []
+        with open(caminho_vault, "rb") as file:
+            for i in alvo:
+                try:
+                    digest.update(info.ler(file, i))
+                except Exception:
+                    ruins.append(i)
+        if segmentos is None and not ruins and digest.digest() != info.digest:
+            raise ValueError("Cofre inconsistente: hash do conteúdo não confere.")
+        return ruins
+
+    @staticmethod
+    def restaurar_segmento(caminho_vault, chave, indice: int, destino) -> int:
+        """Regrava no arquivo `destino` (já existente) só o trecho do segmento. Retorna o offset."""
+        info = VaultInfo(caminho_vault, chave)
+        with open(caminho_vault, "rb") as file:
+            dados = info.ler(file, indice)
+        offset = indice * info.segment_size
+        with open(destino, "r+b") as saida:
+            saida.seek(offset)
+            saida.write(dados)
+        return offset
+
+    @staticmethod
+    def migrar_vault(caminho_vault, chave) -> bool:
+        """
+        Converte um .vault antigo (token Fernet único) para o formato v2, no mesmo caminho.
+        A leitura do token antigo ainda é inteira em memória, uma única vez.
+        """
+        if SecurityVault.is_v2(caminho_vault):
+            return False
+        plano = caminho_vault + ".migrate"
+        try:
+            SecurityVault._descriptografar_legado(caminho_vault, chave, plano)
+            SecurityVault.criptografar_arquivo(plano, chave, destino=caminho_vault)
+        finally:
+            if os.path.exists(plano):
+                os.remove(plano)
+        return True
+
+    @staticmethod
+    def _descriptografar_legado(caminho_vault, chave, destino):
         f = Fernet(chave)
         with open(caminho_vault, "rb") as file:
             dados_blindados = file.read()
-        
+
         dados_restaurados = f.decrypt(dados_blindados)
-        
-        caminho_original = caminho_vault.replace(".vault", "")
-        with open(caminho_original, "wb") as file:
+
+        with open(destino, "wb") as file:
             file.write(dados_restaurados)
-            
-        return caminho_original
\ No newline at end of file
+
+        return destino
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cofre .vault (formato em segmentos)")
+    parser.add_argument("--key", default=os.environ.get("VAULT_KEY"), help="chave mestre (ou VAULT_KEY)")
+    parser.add_argument("--migrate", nargs="+", metavar="VAULT", help="converte .vault antigos para o v2")
+    parser.add_argument("--verify", nargs="+", metavar="VAULT", help="confere as tags de todos os segmentos")
+    args = parser.parse_args()
+    if not args.key:
+        parser.error("informe --key ou VAULT_KEY")
+    chave = args.key.encode()
+
+    for caminho in args.migrate or []:
+        try:
+            migrado = SecurityVault.migrar_vault(caminho, chave)
+            print(f"{'✅ Migrado' if migrado else '⏭️ Já está no v2'}: {caminho}")
+        except Exception as e:
+            print(f"❌ Falha ao migrar {caminho}: {e}")
+    for caminho in args.verify or []:
+        try:
+            ruins = SecurityVault.verificar(caminho, chave)
+            print(f"{'✅ Íntegro' if not ruins else f'❌ Segmentos corrompidos {ruins}'}: {caminho}")
+        except Exception as e:
+            print(f"❌ {caminho}: {e}")
+
+
+if __name__ == "__main__":
+    main()
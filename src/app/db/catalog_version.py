@@ -0,0 +1,29 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models.catalog import CatalogVersion
+
+
+async def next_catalog_version(db: AsyncSession) -> int:
+    """
+    Incrementa o contador do catálogo dentro da transação corrente e devolve o novo valor.
+    O lock da linha vai até o commit, então as versões ficam na mesma ordem dos commits
+    (o feed /products/changes?since= não pula escrita de ninguém).
+    """
+    res = await db.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+        .returning(CatalogVersion.version)
+        .execution_options(synchronize_session=False)
+    )
+    version = res.scalar_one_or_none()
+    if version is None:
+        await db.execute(insert(CatalogVersion).values(id=1, version=1))
+        version = 1
+    return int(version)
+
+
+async def current_catalog_version(db: AsyncSession) -> int:
+    res = await db.execute(select(CatalogVersion.version).where(CatalogVersion.id == 1))
+    return int(res.scalar_one_or_none() or 0)
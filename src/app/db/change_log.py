@@ -0,0 +1,112 @@
+"""
+Log de alterações para a sincronização incremental com o hub (change data capture).
+
+Lado loja (test.db):
+- sync_changes: uma linha por INSERT/UPDATE/DELETE nas tabelas sincronizadas, gravada por trigger
+  (qualquer caminho de escrita entra: telas, importação, SQL cru). `seq` é crescente e serve de
+  versão da linha: o hub só aplica uma mudança se ela for mais nova que a que já tem.
+- sync_state: cursor do último lote confirmado pelo hub. Linhas até o cursor são apagadas do log.
+
+Lado hub:
+- sync_replica: última versão de cada linha de cada loja (JSON), chave (unit_id, tbl, pk).
+- sync_units: cursor por loja. Lote repetido (ack perdido no caminho) não muda nada.
+"""
+
+# Tabelas da loja que sobem para o hub. `clients` (logins/licenças) e `audit_logs` ficam de fora.
+SYNC_TABLES = ("sales", "customers", "suppliers", "appointments")
+
+CHANGE_LOG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS sync_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        tbl TEXT NOT NULL,
+        pk INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)",
+]
+
+
+def change_log_triggers(table: str) -> list[str]:
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sync_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO sync_changes (tbl, pk, op) VALUES ('{table}', new.id, 'I');
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sync_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO sync_changes (tbl, pk, op) VALUES ('{table}', new.id, 'U');
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_sync_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO sync_changes (tbl, pk, op) VALUES ('{table}', old.id, 'D');
+        END
+        """,
+    ]
+
+
+def ensure_change_log(cursor, tables=SYNC_TABLES) -> bool:
+    """
+    Cria log/triggers que faltarem (cursor sqlite3). Tabela que ganhou trigger agora tem as linhas
+    existentes registradas uma vez, para o primeiro envio levar o histórico.
+    """
+    try:
+        for ddl in CHANGE_LOG_DDL:
+            cursor.execute(ddl)
+        for table in tables:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?", (f"{table}_sync_ai",))
+            if cursor.fetchone():
+                continue
+            for ddl in change_log_triggers(table):
+                cursor.execute(ddl)
+            cursor.execute(f"INSERT INTO sync_changes (tbl, pk, op) SELECT '{table}', id, 'I' FROM {table} ORDER BY id")
+        return True
+    except Exception as e:
+        print(f"⚠️ Log de sincronização indisponível: {e}")
+        return False
+
+
+HUB_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS sync_replica (
+        unit_id TEXT NOT NULL,
+        tbl TEXT NOT NULL,
+        pk INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        data TEXT,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (unit_id, tbl, pk)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sync_units (
+        unit_id TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT NOT NULL
+    )
+    """,
+]
+
+# Idempotente: versão igual ou mais velha (lote reenviado, fora de ordem) não sobrescreve
+HUB_APPLY = """
+    INSERT INTO sync_replica (unit_id, tbl, pk, version, deleted, data, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (unit_id, tbl, pk) DO UPDATE SET
+        version = excluded.version,
+        deleted = excluded.deleted,
+        data = excluded.data,
+        updated_at = excluded.updated_at
+    WHERE excluded.version > sync_replica.version
+"""
+
+HUB_ADVANCE = """
+    INSERT INTO sync_units (unit_id, last_seq, updated_at) VALUES (?, ?, ?)
+    ON CONFLICT (unit_id) DO UPDATE SET
+        last_seq = max(sync_units.last_seq, excluded.last_seq),
+        updated_at = excluded.updated_at
+"""
@@ -0,0 +1,36 @@
+"""
+Cursor (created_at, id) sobre colunas DateTime do SQLite.
+
+O SQLite guarda a data como texto em dois formatos: 'YYYY-MM-DD HH:MM:SS' (server_default e
+CURRENT_TIMESTAMP) e 'YYYY-MM-DD HH:MM:SS.ffffff' (datetime gravado pelo ORM). Comparar a coluna
+com um datetime do Python liga o parâmetro sempre com microssegundos, e '10:00:00' < '10:00:00.000000'
+é verdadeiro: a página seguinte volta linhas já entregues (ou pula linhas, no sentido crescente).
+
+Aqui os dois lados ficam no mesmo formato: o cursor carrega o texto exatamente como está gravado
+e os limites de período são só a data ('YYYY-MM-DD'), que compara certo com os dois formatos.
+A ordem de texto continua sendo a do índice (created_at, id), então nada de ordenar por expressão.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import String, type_coerce
+
+
+def stored_text(column):
+    """A coluna como o texto gravado (sem o parse/bind do DateTime do SQLAlchemy)."""
+    return type_coerce(column, String)
+
+
+def day_key(d: date) -> str:
+    """Limite de período: '2026-01-31' <= qualquer horário desse dia, nos dois formatos."""
+    return d.isoformat()
+
+
+def encode_cursor(created_text: str, row_id: int) -> str:
+    return f"{created_text}|{row_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """ValueError se o cursor não for 'data|id'. Cursor antigo (isoformat com 'T') vira o texto gravado."""
+    created_text, row_id = cursor.rsplit("|", 1)
+    datetime.fromisoformat(created_text)
+    return created_text.replace("T", " "), int(row_id)
@@ -1,70 +1,422 @@
-import sqlite3
+"""
+Migrações versionadas dos bancos SQLite do desktop (storage.db da API e test.db das telas).
+
+Cada banco tem uma lista ordenada de passos (versão, revisão Alembic equivalente, descrição,
+função(cursor)). A versão aplicada fica em `db_version`: com o banco em dia a abertura custa um
+SELECT e nenhum outro I/O de schema. Passos pendentes rodam numa transação só (BEGIN IMMEDIATE),
+então o banco sobe de versão inteiro ou não muda; dois processos abrindo juntos não aplicam o
+mesmo passo duas vezes.
+
+Os passos de storage.db seguem a cadeia do Alembic (db/migrations/versions) a partir de
+0eed094cc00b e usam as mesmas constantes de DDL das revisões. Banco que já passou pelo Alembic
+(tabela alembic_version) começa da versão correspondente à revisão gravada lá.
+
+Passo que devolve False é recurso opcional que este SQLite não tem (ex.: FTS5): o que ele fez é
+desfeito (SAVEPOINT) e a versão é registrada mesmo assim. Erro de verdade desfaz o lote inteiro.
+Mudança de schema nova = passo novo no fim da lista; passo já publicado não se edita.
+"""
 import os
+import sqlite3
+from datetime import datetime
+
+from app.db.change_log import HUB_DDL, ensure_change_log
+from app.db.rollups import ensure_rollups
+from app.db.search_index import ensure_product_search_index
+from app.db.telemetry import ensure_telemetry
+
+# db_version antigo (só a coluna version) ganha as demais colunas no primeiro passo pendente
+VERSION_COLUMNS = [("revision", "TEXT"), ("description", "TEXT"), ("applied_at", "TEXT")]
+VERSION_DDL = "CREATE TABLE IF NOT EXISTS db_version (version INTEGER, revision TEXT, description TEXT, applied_at TEXT)"
+VERSION_QUERY = "SELECT max(version) FROM db_version"
+
+
+def _required(ok: bool, what: str) -> None:
+    # as funções ensure_* avisam e devolvem False; aqui falha de verdade desfaz o lote
+    if not ok:
+        raise sqlite3.OperationalError(f"{what}: não foi possível criar")
+
+
+def _add_missing_columns(cursor, table: str, columns) -> None:
+    """ALTER TABLE só das colunas ausentes (um PRAGMA por tabela, em vez de um SELECT por coluna)."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    for col, definition in columns:
+        if col not in existing:
+            print(f"   ⚠️ Coluna '{col}' ausente em '{table}'. Criando...")
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {definition}")
+
+
+# ==========================================
+#  storage.db (API: catálogo, vendas, estoque)
+# ==========================================
+LEGACY_TABLES = [
+    "CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY AUTOINCREMENT)",
+    "CREATE TABLE IF NOT EXISTS sales (id INTEGER PRIMARY KEY AUTOINCREMENT)",
+    "CREATE TABLE IF NOT EXISTS employees (id INTEGER PRIMARY KEY, name TEXT)",
+    """
+    CREATE TABLE IF NOT EXISTS stock_moves (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        reason TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(product_id) REFERENCES products(id)
+    )
+    """,
+]
+
+# Colunas que bancos antigos podem não ter: (tabela, [(coluna, tipo/default)])
+REQUIRED_COLUMNS = [
+    ("products", [
+        ("name", "TEXT DEFAULT 'Novo Produto'"),
+        ("sku", "TEXT"),
+        ("price", "REAL DEFAULT 0"),
+        ("cost_price", "REAL DEFAULT 0"),
+        ("stock_qty", "REAL DEFAULT 0"),
+        ("min_stock", "REAL DEFAULT 0"),
+        ("type", "TEXT DEFAULT 'product'"),
+        ("ncm_code", "TEXT"),
+        ("ipi_rate", "REAL DEFAULT 0"),
+        ("icms_rate", "REAL DEFAULT 0"),
+        ("row_version", "INTEGER NOT NULL DEFAULT 0"),
+    ]),
+    ("sales", [
+        ("total", "REAL DEFAULT 0"),
+        ("created_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
+        ("branch_id", "INTEGER DEFAULT 1"),
+        ("payment_method", "TEXT DEFAULT 'DINHEIRO'"),
+    ]),
+]
+
+CATALOG_VERSION_DDL = [
+    "CREATE TABLE IF NOT EXISTS catalog_version (id INTEGER PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0)",
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)",
+    """
+    CREATE TABLE IF NOT EXISTS product_deletions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        product_id INTEGER NOT NULL,
+        row_version INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_product_deletions_row_version ON product_deletions (row_version)",
+    "CREATE INDEX IF NOT EXISTS ix_products_row_version ON products (row_version)",
+]
+
+# revisão 5a1e5c0d2f31: cursor do histórico de vendas + busca dos itens por venda (item_count)
+SALES_PAGING_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_sales_created_at_id ON sales (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_sale_items_sale_id ON sale_items (sale_id)",
+    "CREATE INDEX IF NOT EXISTS ix_sale_items_product_id ON sale_items (product_id)",
+]
+
+# revisão a7d2e5f90b36: licenças dos clientes (painel admin grava no banco oficial)
+CLIENTS_DDL = """
+    CREATE TABLE IF NOT EXISTS clients (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        razao_social TEXT, nome_fantasia TEXT, cnpj TEXT, ie TEXT,
+        cep TEXT, endereco TEXT, numero TEXT, bairro TEXT, cidade TEXT, uf TEXT,
+        telefone TEXT, email TEXT, business_type TEXT, login TEXT UNIQUE, password TEXT,
+        license_key TEXT, expiry_date TEXT, status TEXT DEFAULT 'Ativo'
+    )
+"""
+
+
+# revisão c5f18b3e9a27: o upsert em lote (ON CONFLICT (sku)) precisa de índice único em sku.
+# Banco criado pelo MigrationEngine antigo tem sku como coluna solta (ALTER TABLE), sem UNIQUE:
+# SKU vazio vira NULL e repetido ganha o sufixo -<id> (o primeiro cadastrado fica com o código).
+SKU_DUPLICATES = "SELECT count(*) - count(DISTINCT sku) FROM products WHERE sku IS NOT NULL"
+SKU_BLANK_TO_NULL = "UPDATE products SET sku = NULL WHERE trim(sku) = ''"
+SKU_DEDUP_DDL = [
+    # renomeado é alteração de catálogo: clientes com cache recebem no próximo delta
+    "UPDATE catalog_version SET version = version + 1 WHERE id = 1",
+    """
+    UPDATE products
+       SET sku = sku || '-' || id,
+           row_version = (SELECT version FROM catalog_version WHERE id = 1)
+     WHERE sku IS NOT NULL
+       AND id NOT IN (SELECT min(id) FROM products WHERE sku IS NOT NULL GROUP BY sku)
+    """,
+]
+SKU_UNIQUE_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS ux_products_sku ON products (sku)"
+
+
+# Passo 1 congelado: o schema que o create_all dos modelos gerava quando o passo foi publicado.
+# Texto fixo de propósito; mudança nos modelos entra como passo novo, não altera bancos já criados.
+STORAGE_BASE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS catalog_version (
+        id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product_deletions (
+        id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        row_version INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product_summary (
+        id INTEGER NOT NULL,
+        total_products INTEGER NOT NULL,
+        total_stock INTEGER NOT NULL,
+        low_stock INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER NOT NULL,
+        name VARCHAR(120) NOT NULL,
+        sku VARCHAR(60),
+        price FLOAT NOT NULL,
+        cost_price FLOAT NOT NULL,
+        stock_qty INTEGER NOT NULL,
+        min_stock INTEGER NOT NULL,
+        type VARCHAR(20) NOT NULL,
+        ncm_code VARCHAR(8),
+        ipi_rate FLOAT NOT NULL,
+        icms_rate FLOAT NOT NULL,
+        row_version INTEGER DEFAULT '0' NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (sku)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sales (
+        id INTEGER NOT NULL,
+        created_at DATETIME DEFAULT (datetime('now')) NOT NULL,
+        payment_method VARCHAR(20) DEFAULT 'cash' NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stock_move_daily (
+        day VARCHAR(10) NOT NULL,
+        product_id INTEGER NOT NULL,
+        net INTEGER NOT NULL,
+        qty_in INTEGER NOT NULL,
+        qty_out INTEGER NOT NULL,
+        moves INTEGER NOT NULL,
+        PRIMARY KEY (day, product_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS suppliers (
+        id INTEGER NOT NULL,
+        name VARCHAR(120) NOT NULL,
+        document VARCHAR(30),
+        phone VARCHAR(30),
+        email VARCHAR(120),
+        PRIMARY KEY (id),
+        UNIQUE (name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sale_items (
+        id INTEGER NOT NULL,
+        sale_id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        qty INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(sale_id) REFERENCES sales (id),
+        FOREIGN KEY(product_id) REFERENCES products (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS stock_moves (
+        id INTEGER NOT NULL,
+        product_id INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        reason VARCHAR(200) NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(product_id) REFERENCES products (id)
+    )
+    """,
+]
+
+# depois das colunas: banco antigo só ganha row_version no _add_missing_columns
+STORAGE_BASE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_product_deletions_row_version ON product_deletions (row_version)",
+    "CREATE INDEX IF NOT EXISTS ix_products_name ON products (name)",
+    "CREATE INDEX IF NOT EXISTS ix_products_row_version ON products (row_version)",
+    "CREATE INDEX IF NOT EXISTS ix_sales_created_at_id ON sales (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS ix_sale_items_product_id ON sale_items (product_id)",
+    "CREATE INDEX IF NOT EXISTS ix_sale_items_sale_id ON sale_items (sale_id)",
+    "CREATE INDEX IF NOT EXISTS ix_stock_moves_created_at_id ON stock_moves (created_at, id)",
+]
+
+
+def _storage_base(cursor) -> None:
+    _run_all(cursor, STORAGE_BASE_TABLES + LEGACY_TABLES)
+    for table, columns in REQUIRED_COLUMNS:
+        _add_missing_columns(cursor, table, columns)
+    _run_all(cursor, STORAGE_BASE_INDEXES)
+
+
+def _run_all(cursor, ddls) -> None:
+    for ddl in ddls:
+        cursor.execute(ddl)
+
+
+def _catalog_version(cursor) -> None:
+    _run_all(cursor, CATALOG_VERSION_DDL)
+
+
+def _has_unique_sku(cursor) -> bool:
+    """UNIQUE (sku) da tabela (sqlite_autoindex) ou índice único criado depois."""
+    for _, name, unique, *_ in cursor.execute("PRAGMA index_list(products)").fetchall():
+        if unique and [r[2] for r in cursor.execute(f"PRAGMA index_info({name})")] == ["sku"]:
+            return True
+    return False
+
+
+def _unique_sku(cursor) -> None:
+    if _has_unique_sku(cursor):
+        return
+    cursor.execute(SKU_BLANK_TO_NULL)
+    duplicates = cursor.execute(SKU_DUPLICATES).fetchone()[0]
+    if duplicates:
+        print(f"   ⚠️ {duplicates} SKU(s) repetido(s) em 'products'. Renomeando as cópias (SKU-id)...")
+        _run_all(cursor, SKU_DEDUP_DDL)
+    cursor.execute(SKU_UNIQUE_INDEX)
+
+
+STORAGE_MIGRATIONS = [
+    (1, "0eed094cc00b", "tabelas do catálogo, vendas e estoque", _storage_base),
+    (2, "5a1e5c0d2f31", "índices de paginação de vendas", lambda c: _run_all(c, SALES_PAGING_INDEXES)),
+    (3, "7c3f9a2b8e14", "índice de busca FTS5 dos produtos", ensure_product_search_index),
+    (4, "9d4e1b7a6c52", "row_version do catálogo e deleções", _catalog_version),
+    (5, "b4e7d2a9c013", "agregados de relatório", lambda c: _required(ensure_rollups(c), "agregados de relatório")),
+    (6, "e3a8c6f1d420", "índice de período do stock_moves",
+     lambda c: c.execute("CREATE INDEX IF NOT EXISTS ix_stock_moves_created_at_id ON stock_moves (created_at, id)")),
+    (7, "a7d2e5f90b36", "licenças dos clientes", lambda c: c.execute(CLIENTS_DDL)),
+    (8, "c5f18b3e9a27", "SKU único nos produtos", _unique_sku),
+]
+
+
+# ==========================================
+#  test.db (telas locais, log de sincronização, hub)
+# ==========================================
+def _local_tables(cursor) -> None:
+    from app.core.local_db import LOCAL_SCHEMA
+
+    for ddl in LOCAL_SCHEMA:
+        cursor.execute(ddl)
+
+
+def _hub_replica(cursor) -> None:
+    for ddl in HUB_DDL:
+        cursor.execute(ddl)
+
+
+LOCAL_MIGRATIONS = [
+    (1, None, "tabelas locais das telas", _local_tables),
+    (2, None, "log de alterações da sincronização", lambda c: _required(ensure_change_log(c), "log de sincronização")),
+    (3, None, "telemetria das unidades", lambda c: _required(ensure_telemetry(c), "telemetria das unidades")),
+    (4, None, "réplica das lojas no hub", _hub_replica),
+]
+
+
+def migrations_for(db_path: str):
+    """storage.db (settings.db_file_path) tem o schema da API; qualquer outro arquivo é banco local."""
+    from app.core.config import settings
+
+    if os.path.abspath(db_path) == os.path.abspath(settings.db_file_path):
+        return STORAGE_MIGRATIONS
+    return LOCAL_MIGRATIONS
+
 
 class MigrationEngine:
     @staticmethod
-    def check_and_migrate(db_path):
-        # Garante o caminho absoluto
+    def current_version(conn) -> int:
+        """Versão gravada (0 se o banco nunca passou pelo executor)."""
+        try:
+            return conn.execute(VERSION_QUERY).fetchone()[0] or 0
+        except sqlite3.OperationalError:
+            return 0
+
+    @staticmethod
+    def _alembic_baseline(cursor, migrations) -> int:
+        """Banco gerido pelo Alembic: versão do passo com a mesma revisão (0 se não tiver)."""
+        try:
+            row = cursor.execute("SELECT version_num FROM alembic_version").fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        by_revision = {revision: version for version, revision, _, _ in migrations if revision}
+        return by_revision.get(row[0], 0) if row else 0
+
+    @staticmethod
+    def migrate(conn, migrations, label: str = "banco") -> int:
+        """
+        Aplica os passos pendentes numa transação na conexão sqlite3 dada e devolve a versão final.
+        Banco em dia: só o SELECT da versão.
+        """
+        head = migrations[-1][0]
+        version = MigrationEngine.current_version(conn)
+        if version >= head:
+            return version
+
+        isolation = conn.isolation_level
+        conn.isolation_level = None  # BEGIN/COMMIT na mão: DDL e DML na mesma transação
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            # com a trava de escrita: outro processo pode ter migrado enquanto esperávamos
+            cursor.execute(VERSION_DDL)
+            _add_missing_columns(cursor, "db_version", VERSION_COLUMNS)
+            version = MigrationEngine.current_version(conn)
+            if version == 0:
+                version = MigrationEngine._alembic_baseline(cursor, migrations)
+            pending = [m for m in migrations if m[0] > version]
+            if pending:
+                print(f"🛠️ {label}: versão {version} -> {head} ({len(pending)} passo(s))")
+            now = datetime.now().isoformat(timespec="seconds")
+            for step, revision, description, apply in pending:
+                cursor.execute("SAVEPOINT migration_step")
+                if apply(cursor) is False:
+                    cursor.execute("ROLLBACK TO migration_step")
+                    description += " (indisponível neste SQLite)"
+                cursor.execute("RELEASE migration_step")
+                cursor.execute(
+                    "INSERT INTO db_version (version, revision, description, applied_at) VALUES (?, ?, ?, ?)",
+                    (step, revision, description, now),
+                )
+                print(f"   ✅ {step}: {description}")
+                version = step
+            revisions = [m[1] for m in pending if m[1]]
+            if revisions and MigrationEngine._has_table(cursor, "alembic_version"):
+                # quem também usa o Alembic enxerga a mesma revisão
+                cursor.execute("UPDATE alembic_version SET version_num = ?", (revisions[-1],))
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        finally:
+            conn.isolation_level = isolation
+        return version
+
+    @staticmethod
+    def _has_table(cursor, name: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def check_and_migrate(db_path, migrations=None):
+        """Entrada do main.py/servidor: abre o arquivo, migra o que faltar e fecha."""
         abs_path = os.path.abspath(db_path)
-        print(f"🔍 Auditando banco de dados em: {abs_path}")
-        
         conn = sqlite3.connect(abs_path)
-        cursor = conn.cursor()
-        
-        # 1. Garante Tabelas Essenciais (INCLUINDO stock_moves)
-        cursor.execute("CREATE TABLE IF NOT EXISTS products (id INTEGER PRIMARY KEY AUTOINCREMENT)")
-        cursor.execute("CREATE TABLE IF NOT EXISTS sales (id INTEGER PRIMARY KEY AUTOINCREMENT)")
-        cursor.execute("CREATE TABLE IF NOT EXISTS employees (id INTEGER PRIMARY KEY, name TEXT)")
-        cursor.execute("CREATE TABLE IF NOT EXISTS db_version (version INTEGER)")
-        
-        # Criação da tabela que faltava: stock_moves
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stock_moves (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                product_id INTEGER NOT NULL,
-                delta INTEGER NOT NULL,
-                reason TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(product_id) REFERENCES products(id)
-            )
-        """)
-        conn.commit()
-
-        # 2. LISTA DE COLUNAS OBRIGATÓRIAS
-        # Formato: (Tabela, Coluna, Tipo/Default)
-        required_columns = [
-            ("products", "name", "TEXT DEFAULT 'Novo Produto'"),
-            ("products", "sku", "TEXT"),
-            ("products", "price", "REAL DEFAULT 0"),
-            ("products", "cost_price", "REAL DEFAULT 0"),
-            ("products", "stock_qty", "REAL DEFAULT 0"),
-            ("products", "min_stock", "REAL DEFAULT 0"),
-            ("products", "type", "TEXT DEFAULT 'product'"),
-            ("products", "ncm_code", "TEXT"),
-            ("products", "ipi_rate", "REAL DEFAULT 0"),
-            ("products", "icms_rate", "REAL DEFAULT 0"),
-            
-            ("sales", "total", "REAL DEFAULT 0"),
-            ("sales", "created_at", "TIMESTAMP DEFAULT CURRENT_TIMESTAMP"),
-            ("sales", "branch_id", "INTEGER DEFAULT 1"),
-            ("sales", "payment_method", "TEXT DEFAULT 'DINHEIRO'") # <--- Coluna Nova
-        ]
-
-        print("🛠️ Iniciando verificação coluna-por-coluna...")
-        
-        for table, col, definition in required_columns:
-            try:
-                # Tenta ler a coluna
-                cursor.execute(f"SELECT {col} FROM {table} LIMIT 1")
-            except sqlite3.OperationalError:
-                # Se falhar, cria a coluna
-                print(f"   ⚠️ Coluna '{col}' ausente em '{table}'. Criando...")
-                try:
-                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {definition}")
-                    conn.commit()
-                    print(f"   ✅ Coluna '{col}' criada com sucesso!")
-                except Exception as e:
-                    print(f"   ❌ Erro ao criar '{col}': {e}")
-
-        conn.close()
-        print("✅ Auditoria concluída. O banco está sincronizado.")
\ No newline at end of file
+        try:
+            migrations = migrations or migrations_for(abs_path)
+            version = MigrationEngine.migrate(conn, migrations, label=os.path.basename(abs_path))
+            if version < migrations[-1][0]:
+                print(f"⚠️ {abs_path} ficou na versão {version}.")
+            return version
+        except Exception as e:
+            print(f"⚠️ Falha na migração de {abs_path}: {e}")
+            return None
+        finally:
+            conn.close()
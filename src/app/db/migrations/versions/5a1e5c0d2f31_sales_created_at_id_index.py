@@ -0,0 +1,30 @@
+"""sales (created_at, id) and sale_items (sale_id / product_id) indexes
+
+Revision ID: 5a1e5c0d2f31
+Revises: 0eed094cc00b
+Create Date: 2026-10-18 10:12:41.503112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '5a1e5c0d2f31'
+down_revision: Union[str, None] = '0eed094cc00b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # índice composto para a paginação por cursor de GET /sales
+    op.create_index('ix_sales_created_at_id', 'sales', ['created_at', 'id'], unique=False)
+    # item_count de cada linha da página (subconsulta por sale_id) e include_items;
+    # IF NOT EXISTS: bancos que passaram pela 1094b24d3e8b já têm os dois
+    op.execute('CREATE INDEX IF NOT EXISTS ix_sale_items_sale_id ON sale_items (sale_id)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_sale_items_product_id ON sale_items (product_id)')
+
+def downgrade() -> None:
+    op.drop_index('ix_sale_items_product_id', table_name='sale_items')
+    op.drop_index('ix_sale_items_sale_id', table_name='sale_items')
+    op.drop_index('ix_sales_created_at_id', table_name='sales')
@@ -0,0 +1,33 @@
+"""products FTS5 search index
+
+Revision ID: 7c3f9a2b8e14
+Revises: 5a1e5c0d2f31
+Create Date: 2026-10-18 11:03:27.918455
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.search_index import PRODUCTS_FTS_DDL, PRODUCTS_FTS_DROP, PRODUCTS_FTS_REBUILD
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3f9a2b8e14'
+down_revision: Union[str, None] = '5a1e5c0d2f31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # FTS5 só existe no SQLite; em outros bancos a busca usa LIKE por prefixo
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for ddl in PRODUCTS_FTS_DDL:
+        op.execute(ddl)
+    op.execute(PRODUCTS_FTS_REBUILD)
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for ddl in PRODUCTS_FTS_DROP:
+        op.execute(ddl)
@@ -0,0 +1,45 @@
+"""catalog row_version, version counter and deletions
+
+Revision ID: 9d4e1b7a6c52
+Revises: 7c3f9a2b8e14
+Create Date: 2026-10-18 14:21:09.337820
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4e1b7a6c52'
+down_revision: Union[str, None] = '7c3f9a2b8e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.add_column(sa.Column("row_version", sa.Integer(), nullable=False, server_default="0"))
+    op.create_index(op.f('ix_products_row_version'), 'products', ['row_version'], unique=False)
+
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(catalog_version, [{"id": 1, "version": 0}])
+
+    op.create_table('product_deletions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('row_version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_product_deletions_row_version'), 'product_deletions', ['row_version'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_product_deletions_row_version'), table_name='product_deletions')
+    op.drop_table('product_deletions')
+    op.drop_table('catalog_version')
+    op.drop_index(op.f('ix_products_row_version'), table_name='products')
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("row_version")
@@ -0,0 +1,37 @@
+"""clients (licenses managed by the admin panel)
+
+Revision ID: a7d2e5f90b36
+Revises: e3a8c6f1d420
+Create Date: 2026-10-18 16:40:52.216093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d2e5f90b36'
+down_revision: Union[str, None] = 'e3a8c6f1d420'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # mesmo schema do CLIENTS_DDL (passo 7 do MigrationEngine); o painel admin grava aqui por SQL direto
+    op.create_table('clients',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    *[sa.Column(col, sa.Text(), nullable=True) for col in (
+        'razao_social', 'nome_fantasia', 'cnpj', 'ie', 'cep', 'endereco', 'numero', 'bairro', 'cidade',
+        'uf', 'telefone', 'email', 'business_type',
+    )],
+    sa.Column('login', sa.Text(), nullable=True),
+    sa.Column('password', sa.Text(), nullable=True),
+    sa.Column('license_key', sa.Text(), nullable=True),
+    sa.Column('expiry_date', sa.Text(), nullable=True),
+    sa.Column('status', sa.Text(), server_default='Ativo', nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('login')
+    )
+
+def downgrade() -> None:
+    op.drop_table('clients')
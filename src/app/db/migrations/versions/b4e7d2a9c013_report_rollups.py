@@ -0,0 +1,34 @@
+"""report rollups (stock_move_daily, product_summary)
+
+Revision ID: b4e7d2a9c013
+Revises: 9d4e1b7a6c52
+Create Date: 2026-10-18 15:42:08.331907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.rollups import ROLLUP_DDL, ROLLUP_DROP, ROLLUP_REBUILD
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7d2a9c013'
+down_revision: Union[str, None] = '9d4e1b7a6c52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # Triggers no dialeto do SQLite; em outros bancos os relatórios agregam na hora
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for ddl in ROLLUP_DDL:
+        op.execute(ddl)
+    for sql in ROLLUP_REBUILD:
+        op.execute(sql)
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for ddl in ROLLUP_DROP:
+        op.execute(ddl)
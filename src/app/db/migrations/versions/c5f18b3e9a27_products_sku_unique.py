@@ -0,0 +1,40 @@
+"""products.sku unique index (dedup of legacy SKUs)
+
+Revision ID: c5f18b3e9a27
+Revises: a7d2e5f90b36
+Create Date: 2026-10-18 17:05:31.640218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import SKU_BLANK_TO_NULL, SKU_DEDUP_DDL, SKU_DUPLICATES, SKU_UNIQUE_INDEX
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f18b3e9a27'
+down_revision: Union[str, None] = 'a7d2e5f90b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def _has_unique_sku(bind) -> bool:
+    insp = sa.inspect(bind)
+    if any(uc["column_names"] == ["sku"] for uc in insp.get_unique_constraints("products")):
+        return True
+    return any(ix["unique"] and ix["column_names"] == ["sku"] for ix in insp.get_indexes("products"))
+
+def upgrade() -> None:
+    # POST /products/bulk faz ON CONFLICT (sku); banco que veio do schema antigo não tem o UNIQUE
+    bind = op.get_bind()
+    if _has_unique_sku(bind):
+        return
+    op.execute(SKU_BLANK_TO_NULL)
+    if bind.execute(sa.text(SKU_DUPLICATES)).scalar():
+        for ddl in SKU_DEDUP_DDL:
+            op.execute(ddl)
+    op.execute(SKU_UNIQUE_INDEX)
+
+def downgrade() -> None:
+    # os SKUs renomeados continuam renomeados
+    op.execute("DROP INDEX IF EXISTS ux_products_sku")
@@ -0,0 +1,24 @@
+"""stock_moves (created_at, id) index
+
+Revision ID: e3a8c6f1d420
+Revises: b4e7d2a9c013
+Create Date: 2026-10-18 15:02:17.884310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a8c6f1d420'
+down_revision: Union[str, None] = 'b4e7d2a9c013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+def upgrade() -> None:
+    # filtro por período e cursor da exportação de GET /reports/stock_moves_range
+    op.create_index('ix_stock_moves_created_at_id', 'stock_moves', ['created_at', 'id'], unique=False)
+
+def downgrade() -> None:
+    op.drop_index('ix_stock_moves_created_at_id', table_name='stock_moves')
@@ -5,3 +5,5 @@ from .product import Product
 from .stock_move import StockMove
 from .sales import Sale, SaleItem
 from .supplier import Supplier
+from .catalog import CatalogVersion, ProductDeletion
+from .rollups import StockMoveDaily, ProductSummary
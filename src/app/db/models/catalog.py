@@ -0,0 +1,21 @@
+from sqlalchemy import Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class CatalogVersion(Base):
+    """Contador global do catálogo (linha única id=1). Cada escrita em products pega o próximo valor."""
+    __tablename__ = "catalog_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ProductDeletion(Base):
+    """Lápide de produto excluído, para o feed /products/changes avisar os clientes."""
+    __tablename__ = "product_deletions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    row_version: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
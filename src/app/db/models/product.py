@@ -21,4 +21,8 @@ class Product(Base):
     type: Mapped[str] = mapped_column(String(20), default="PRODUTO")      # PRODUTO ou SERVICO
     ncm_code: Mapped[str | None] = mapped_column(String(8), nullable=True, default="00000000") 
     ipi_rate: Mapped[float] = mapped_column(Float, default=0.0)             # Alíquota IPI
-    icms_rate: Mapped[float] = mapped_column(Float, default=18.0)           # Alíquota ICMS padrão SP
\ No newline at end of file
+    icms_rate: Mapped[float] = mapped_column(Float, default=18.0)           # Alíquota ICMS padrão SP
+
+    # --- SINCRONIZAÇÃO DO CATÁLOGO (ETag / delta) ---
+    # valor de catalog_version na última escrita desta linha
+    row_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0", index=True)
\ No newline at end of file
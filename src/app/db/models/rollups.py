@@ -0,0 +1,27 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class StockMoveDaily(Base):
+    """Movimento de estoque somado por dia/produto (mantido pelos triggers de app.db.rollups)."""
+    __tablename__ = "stock_move_daily"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    day: Mapped[str] = mapped_column(String(10), primary_key=True)  # YYYY-MM-DD
+    product_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    net: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    qty_in: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    qty_out: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    moves: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class ProductSummary(Base):
+    """Resumo do catálogo em linha única (id=1): total, estoque total e itens abaixo do mínimo."""
+    __tablename__ = "product_summary"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    total_products: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_stock: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    low_stock: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
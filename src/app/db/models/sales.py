@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 
-from sqlalchemy import Integer, DateTime, ForeignKey, String, func
+from sqlalchemy import Integer, DateTime, ForeignKey, Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -10,6 +10,8 @@ from .base import Base
 
 class Sale(Base):
     __tablename__ = "sales"
+    # paginação por cursor do histórico: ORDER BY created_at DESC, id DESC
+    __table_args__ = (Index("ix_sales_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
@@ -37,9 +39,10 @@ class SaleItem(Base):
     __tablename__ = "sale_items"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
-    sale_id: Mapped[int] = mapped_column(ForeignKey("sales.id"), nullable=False)
+    # índices: item_count/include_items do GET /sales buscam os itens por venda
+    sale_id: Mapped[int] = mapped_column(ForeignKey("sales.id"), nullable=False, index=True)
 
-    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False, index=True)
     qty: Mapped[int] = mapped_column(Integer, nullable=False)
 
     sale: Mapped["Sale"] = relationship(back_populates="items")
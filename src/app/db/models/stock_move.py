@@ -1,12 +1,14 @@
 from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import Integer, DateTime, ForeignKey, String
+from sqlalchemy import Integer, DateTime, ForeignKey, Index, String
 
 from .base import Base
 
 
 class StockMove(Base):
     __tablename__ = "stock_moves"
+    # relatório por período e exportação paginada por (created_at, id)
+    __table_args__ = (Index("ix_stock_moves_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=False)
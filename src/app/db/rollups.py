@@ -0,0 +1,187 @@
+"""
+Agregados materializados dos relatórios (SQLite).
+
+- stock_move_daily: saldo/entradas/saídas por dia e produto, alimentado por trigger
+  a cada INSERT em stock_moves (venda, ajuste, entrada de NFe...).
+- product_summary: uma linha só com total de produtos, estoque total e itens abaixo
+  do mínimo (stock_qty <= min_stock), mantida pelos triggers de products.
+
+O dashboard lê essas tabelas, então o custo não cresce com o histórico de movimentos.
+Como no índice FTS, os triggers pegam qualquer caminho de escrita (ORM, lote, SQL cru).
+
+Reconstrução manual:
+    python -m app.db.rollups --rebuild [--db caminho/storage.db]
+"""
+import argparse
+import sqlite3
+
+ROLLUP_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS stock_move_daily (
+        day TEXT NOT NULL,
+        product_id INTEGER NOT NULL,
+        net INTEGER NOT NULL DEFAULT 0,
+        qty_in INTEGER NOT NULL DEFAULT 0,
+        qty_out INTEGER NOT NULL DEFAULT 0,
+        moves INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS product_summary (
+        id INTEGER PRIMARY KEY,
+        total_products INTEGER NOT NULL DEFAULT 0,
+        total_stock INTEGER NOT NULL DEFAULT 0,
+        low_stock INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    # --- movimentos -> stock_move_daily ---
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_moves_rollup_ai AFTER INSERT ON stock_moves BEGIN
+        INSERT INTO stock_move_daily (day, product_id, net, qty_in, qty_out, moves)
+        VALUES (COALESCE(date(new.created_at), date('now')), new.product_id,
+                new.delta, max(new.delta, 0), max(-new.delta, 0), 1)
+        ON CONFLICT (day, product_id) DO UPDATE SET
+            net = net + excluded.net,
+            qty_in = qty_in + excluded.qty_in,
+            qty_out = qty_out + excluded.qty_out,
+            moves = moves + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_moves_rollup_ad AFTER DELETE ON stock_moves BEGIN
+        UPDATE stock_move_daily SET
+            net = net - old.delta,
+            qty_in = qty_in - max(old.delta, 0),
+            qty_out = qty_out - max(-old.delta, 0),
+            moves = moves - 1
+        WHERE day = COALESCE(date(old.created_at), date('now')) AND product_id = old.product_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS stock_moves_rollup_au AFTER UPDATE OF delta, created_at, product_id ON stock_moves BEGIN
+        UPDATE stock_move_daily SET
+            net = net - old.delta,
+            qty_in = qty_in - max(old.delta, 0),
+            qty_out = qty_out - max(-old.delta, 0),
+            moves = moves - 1
+        WHERE day = COALESCE(date(old.created_at), date('now')) AND product_id = old.product_id;
+        INSERT INTO stock_move_daily (day, product_id, net, qty_in, qty_out, moves)
+        VALUES (COALESCE(date(new.created_at), date('now')), new.product_id,
+                new.delta, max(new.delta, 0), max(-new.delta, 0), 1)
+        ON CONFLICT (day, product_id) DO UPDATE SET
+            net = net + excluded.net,
+            qty_in = qty_in + excluded.qty_in,
+            qty_out = qty_out + excluded.qty_out,
+            moves = moves + 1;
+    END
+    """,
+    # --- produtos -> product_summary (linha id = 1) ---
+    """
+    CREATE TRIGGER IF NOT EXISTS products_summary_ai AFTER INSERT ON products BEGIN
+        UPDATE product_summary SET
+            total_products = total_products + 1,
+            total_stock = total_stock + COALESCE(new.stock_qty, 0),
+            low_stock = low_stock + (COALESCE(new.stock_qty, 0) <= COALESCE(new.min_stock, 0))
+        WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_summary_ad AFTER DELETE ON products BEGIN
+        UPDATE product_summary SET
+            total_products = total_products - 1,
+            total_stock = total_stock - COALESCE(old.stock_qty, 0),
+            low_stock = low_stock - (COALESCE(old.stock_qty, 0) <= COALESCE(old.min_stock, 0))
+        WHERE id = 1;
+    END
+    """,
+    # só estoque/mínimo interessam: renomear produto não mexe no resumo
+    """
+    CREATE TRIGGER IF NOT EXISTS products_summary_au AFTER UPDATE OF stock_qty, min_stock ON products BEGIN
+        UPDATE product_summary SET
+            total_stock = total_stock + COALESCE(new.stock_qty, 0) - COALESCE(old.stock_qty, 0),
+            low_stock = low_stock
+                + (COALESCE(new.stock_qty, 0) <= COALESCE(new.min_stock, 0))
+                - (COALESCE(old.stock_qty, 0) <= COALESCE(old.min_stock, 0))
+        WHERE id = 1;
+    END
+    """,
+]
+
+ROLLUP_TRIGGERS = [
+    "stock_moves_rollup_ai", "stock_moves_rollup_ad", "stock_moves_rollup_au",
+    "products_summary_ai", "products_summary_ad", "products_summary_au",
+]
+
+ROLLUP_DROP = [f"DROP TRIGGER IF EXISTS {t}" for t in ROLLUP_TRIGGERS] + [
+    "DROP TABLE IF EXISTS product_summary",
+    "DROP TABLE IF EXISTS stock_move_daily",
+]
+
+# Recalcula tudo a partir das tabelas de origem (instalação nova ou correção manual)
+ROLLUP_REBUILD = [
+    "DELETE FROM stock_move_daily",
+    """
+    INSERT INTO stock_move_daily (day, product_id, net, qty_in, qty_out, moves)
+    SELECT COALESCE(date(created_at), date('now')), product_id,
+           SUM(delta), SUM(max(delta, 0)), SUM(max(-delta, 0)), COUNT(*)
+    FROM stock_moves
+    GROUP BY 1, 2
+    """,
+    "DELETE FROM product_summary",
+    """
+    INSERT INTO product_summary (id, total_products, total_stock, low_stock)
+    SELECT 1, COUNT(*), COALESCE(SUM(stock_qty), 0),
+           COALESCE(SUM(COALESCE(stock_qty, 0) <= COALESCE(min_stock, 0)), 0)
+    FROM products
+    """,
+]
+
+
+def rebuild_rollups(cursor) -> None:
+    for sql in ROLLUP_REBUILD:
+        cursor.execute(sql)
+
+
+def ensure_rollups(cursor) -> bool:
+    """
+    Cria tabelas/triggers dos agregados se faltar algum (cursor sqlite3) e recalcula.
+    Tabela criada sem trigger (ex.: create_all do ORM) também cai aqui, senão ficaria parada.
+    """
+    marks = ",".join("?" * len(ROLLUP_TRIGGERS))
+    cursor.execute(f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})", ROLLUP_TRIGGERS)
+    if cursor.fetchone()[0] == len(ROLLUP_TRIGGERS):
+        return True
+    try:
+        for ddl in ROLLUP_DDL:
+            cursor.execute(ddl)
+        rebuild_rollups(cursor)
+        print("📊 Agregados de relatório criados e recalculados.")
+        return True
+    except Exception as e:
+        print(f"⚠️ Agregados de relatório indisponíveis: {e}")
+        return False
+
+
+def main():
+    from app.core.config import settings
+
+    parser = argparse.ArgumentParser(description="Agregados de relatório (stock_move_daily / product_summary)")
+    parser.add_argument("--db", default=settings.db_file_path, help="arquivo SQLite (padrão: storage.db)")
+    parser.add_argument("--rebuild", action="store_true", help="recalcula tudo a partir de stock_moves/products")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        cursor = conn.cursor()
+        ensure_rollups(cursor)
+        if args.rebuild:
+            rebuild_rollups(cursor)
+            print("✅ Agregados recalculados.")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
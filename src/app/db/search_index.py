@@ -0,0 +1,73 @@
+"""
+Índice de busca de produtos (SQLite FTS5, tokenizer trigram).
+
+A tabela virtual `products_fts` espelha name/sku de `products` e é mantida pelos
+triggers abaixo, então a busca do PDV não varre o catálogo a cada tecla.
+O trigram casa qualquer trecho com 3+ caracteres (mesmo comportamento do filtro antigo).
+"""
+
+PRODUCTS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        name, sku,
+        content='products', content_rowid='id',
+        tokenize='trigram case_sensitive 0'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+    END
+    """,
+    # só name/sku interessam: baixa de estoque não reescreve o índice
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, sku ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, sku) VALUES ('delete', old.id, old.name, old.sku);
+        INSERT INTO products_fts(rowid, name, sku) VALUES (new.id, new.name, new.sku);
+    END
+    """,
+]
+
+PRODUCTS_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS products_fts_au",
+    "DROP TRIGGER IF EXISTS products_fts_ad",
+    "DROP TRIGGER IF EXISTS products_fts_ai",
+    "DROP TABLE IF EXISTS products_fts",
+]
+
+# Reindexa o que já estava cadastrado antes do índice existir
+PRODUCTS_FTS_REBUILD = "INSERT INTO products_fts(products_fts) VALUES ('rebuild')"
+
+# Tokens menores que isso não geram trigramas (o router cai no LIKE por prefixo)
+MIN_TOKEN_LEN = 3
+
+
+def ensure_product_search_index(cursor) -> bool:
+    """
+    Cria o índice FTS se ainda não existir (cursor sqlite3).
+    Retorna False se o SQLite local não tiver FTS5/trigram (a busca usa LIKE).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+    if cursor.fetchone():
+        return True
+    try:
+        for ddl in PRODUCTS_FTS_DDL:
+            cursor.execute(ddl)
+        cursor.execute(PRODUCTS_FTS_REBUILD)
+        return True
+    except Exception as e:
+        print(f"⚠️ Índice de busca indisponível (FTS5/trigram): {e}")
+        return False
+
+
+def build_match_query(q: str) -> str | None:
+    """'coca lata' -> '"coca" AND "lata"' (aspas escapam a sintaxe do FTS)."""
+    tokens = [t for t in q.split() if len(t) >= MIN_TOKEN_LEN]
+    if not tokens:
+        return None
+    return " AND ".join('"' + t.replace('"', '""') + '"' for t in tokens)
@@ -1,6 +1,8 @@
 import os
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 def _ensure_sqlite_dir():
     # Atualizado para usar settings.database_url (o nome correto no config.py)
@@ -18,6 +20,36 @@ def _ensure_sqlite_dir():
 
 _ensure_sqlite_dir()
 
+# --- SQLITE COM VÁRIOS PROCESSOS (servidor da loja com N workers) ---
+# WAL: leituras seguem em paralelo com a escrita. Transação de escrita abre com BEGIN IMMEDIATE:
+# pega a trava de escrita logo no início e, se outro worker estiver gravando, espera o busy_timeout.
+# Com o BEGIN comum (deferred) a transação que lê antes de gravar (catalog_version, lote de vendas)
+# falha na hora com "database is locked" quando outro processo gravou no meio, sem esperar nada.
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA busy_timeout={int(settings.db_busy_timeout_ms)}",
+]
+
+def _sqlite_connect(dbapi_connection, connection_record):
+    # o driver não abre transação sozinho: o BEGIN sai do evento "begin" abaixo
+    dbapi_connection.isolation_level = None
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def _sqlite_begin(conn):
+    conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', 'DEFERRED')}")
+
 # Atualizado para usar settings.database_url
 engine = create_async_engine(settings.database_url, echo=False, future=True)
-SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
\ No newline at end of file
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "connect", _sqlite_connect)
+    event.listen(engine.sync_engine, "begin", _sqlite_begin)
+instrument_engine(engine)  # tempo/contagem de cada consulta para o /metrics
+SessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+# rotas que gravam (POST/PUT/DELETE): mesma pool, transações com BEGIN IMMEDIATE
+WriteSessionLocal = async_sessionmaker(
+    bind=engine.execution_options(sqlite_begin="IMMEDIATE"), class_=AsyncSession, expire_on_commit=False
+)
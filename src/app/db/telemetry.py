@@ -0,0 +1,162 @@
+"""
+Telemetria das lojas no hub (POST /api/sync).
+
+- unit_telemetry: série temporal bruta, chave (unit_id, ts). Pulso repetido (retry) cai no
+  INSERT OR IGNORE e não conta duas vezes. Amostras mais velhas que a retenção são apagadas.
+- unit_status: estado mais recente de cada loja (faturamento acumulado, cursor de sincronização,
+  último contato), mantido por trigger a cada amostra. Amostra atrasada não volta o estado.
+- network_summary: linha única com o total da rede, mantida pelos triggers de unit_status.
+
+Monitoramento e dashboard leem só as linhas de resumo: o custo não cresce com o número de pulsos.
+"""
+
+TELEMETRY_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS unit_telemetry (
+        unit_id TEXT NOT NULL,
+        ts TEXT NOT NULL,
+        received_at TEXT NOT NULL,
+        total_sales REAL NOT NULL DEFAULT 0,
+        sync_cursor INTEGER,
+        data TEXT,
+        PRIMARY KEY (unit_id, ts)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_unit_telemetry_received_at ON unit_telemetry (received_at)",
+    """
+    CREATE TABLE IF NOT EXISTS unit_status (
+        unit_id TEXT PRIMARY KEY,
+        first_seen TEXT NOT NULL,
+        last_ts TEXT NOT NULL,
+        last_received_at TEXT NOT NULL,
+        total_sales REAL NOT NULL DEFAULT 0,
+        sync_cursor INTEGER,
+        samples INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS network_summary (
+        id INTEGER PRIMARY KEY,
+        units INTEGER NOT NULL DEFAULT 0,
+        total_sales REAL NOT NULL DEFAULT 0,
+        samples INTEGER NOT NULL DEFAULT 0,
+        last_received_at TEXT
+    )
+    """,
+    # --- amostra -> unit_status (SET enxerga os valores antigos da linha) ---
+    """
+    CREATE TRIGGER IF NOT EXISTS unit_telemetry_status_ai AFTER INSERT ON unit_telemetry BEGIN
+        INSERT INTO unit_status (unit_id, first_seen, last_ts, last_received_at, total_sales, sync_cursor, samples)
+        VALUES (new.unit_id, new.received_at, new.ts, new.received_at, new.total_sales, new.sync_cursor, 1)
+        ON CONFLICT (unit_id) DO UPDATE SET
+            samples = samples + 1,
+            last_received_at = max(last_received_at, excluded.last_received_at),
+            last_ts = max(last_ts, excluded.last_ts),
+            total_sales = CASE WHEN excluded.last_ts >= last_ts THEN excluded.total_sales ELSE total_sales END,
+            sync_cursor = CASE WHEN excluded.last_ts >= last_ts
+                               THEN COALESCE(excluded.sync_cursor, sync_cursor) ELSE sync_cursor END;
+    END
+    """,
+    # --- unit_status -> network_summary (linha id = 1) ---
+    """
+    CREATE TRIGGER IF NOT EXISTS unit_status_network_ai AFTER INSERT ON unit_status BEGIN
+        UPDATE network_summary SET
+            units = units + 1,
+            total_sales = total_sales + new.total_sales,
+            samples = samples + new.samples,
+            last_received_at = max(COALESCE(last_received_at, ''), new.last_received_at)
+        WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS unit_status_network_au AFTER UPDATE ON unit_status BEGIN
+        UPDATE network_summary SET
+            total_sales = total_sales + new.total_sales - old.total_sales,
+            samples = samples + new.samples - old.samples,
+            last_received_at = max(COALESCE(last_received_at, ''), new.last_received_at)
+        WHERE id = 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS unit_status_network_ad AFTER DELETE ON unit_status BEGIN
+        UPDATE network_summary SET
+            units = units - 1,
+            total_sales = total_sales - old.total_sales,
+            samples = samples - old.samples
+        WHERE id = 1;
+    END
+    """,
+]
+
+TELEMETRY_TRIGGERS = ["unit_telemetry_status_ai", "unit_status_network_ai", "unit_status_network_au", "unit_status_network_ad"]
+
+# Recalcula os resumos a partir da série bruta (instalação nova ou correção manual)
+TELEMETRY_REBUILD = [
+    "DELETE FROM unit_status",
+    """
+    INSERT INTO unit_status (unit_id, first_seen, last_ts, last_received_at, total_sales, sync_cursor, samples)
+    SELECT t.unit_id, agg.first_seen, t.ts, agg.last_received_at, t.total_sales, t.sync_cursor, agg.samples
+    FROM unit_telemetry t
+    JOIN (
+        SELECT unit_id, max(ts) AS last_ts, min(received_at) AS first_seen,
+               max(received_at) AS last_received_at, count(*) AS samples
+        FROM unit_telemetry GROUP BY unit_id
+    ) agg ON agg.unit_id = t.unit_id AND agg.last_ts = t.ts
+    """,
+    "DELETE FROM network_summary",
+    """
+    INSERT INTO network_summary (id, units, total_sales, samples, last_received_at)
+    SELECT 1, count(*), COALESCE(sum(total_sales), 0), COALESCE(sum(samples), 0), max(last_received_at)
+    FROM unit_status
+    """,
+]
+
+# Pulsos antigos gravados como venda falsa em `sales` (SYNC_FROM_<unidade>) viram amostras
+LEGACY_IMPORT = [
+    """
+    INSERT OR IGNORE INTO unit_telemetry (unit_id, ts, received_at, total_sales)
+    SELECT substr(payment_method, 11), timestamp, timestamp, COALESCE(total_value, 0)
+    FROM sales WHERE payment_method LIKE 'SYNC_FROM_%' AND timestamp IS NOT NULL
+    """,
+    "DELETE FROM sales WHERE payment_method LIKE 'SYNC_FROM_%'",
+]
+
+TELEMETRY_INSERT = """
+    INSERT OR IGNORE INTO unit_telemetry (unit_id, ts, received_at, total_sales, sync_cursor, data)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+TELEMETRY_PRUNE = "DELETE FROM unit_telemetry WHERE received_at < ?"
+
+UNIT_STATUS_COLUMNS = ("unit_id", "last_received_at", "total_sales", "sync_cursor", "samples")
+UNIT_STATUS_SELECT = f"SELECT {', '.join(UNIT_STATUS_COLUMNS)} FROM unit_status"
+UNIT_STATUS_QUERY = UNIT_STATUS_SELECT + " ORDER BY unit_id"
+NETWORK_COLUMNS = ("units", "total_sales", "samples", "last_received_at")
+NETWORK_QUERY = f"SELECT {', '.join(NETWORK_COLUMNS)} FROM network_summary WHERE id = 1"
+
+
+def ensure_telemetry(cursor) -> bool:
+    """Cria tabelas/triggers que faltarem (cursor sqlite3), importa os pulsos legados e recalcula."""
+    marks = ",".join("?" * len(TELEMETRY_TRIGGERS))
+    cursor.execute(f"SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN ({marks})", TELEMETRY_TRIGGERS)
+    if cursor.fetchone()[0] == len(TELEMETRY_TRIGGERS):
+        return True
+    try:
+        for ddl in TELEMETRY_DDL:
+            cursor.execute(ddl)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sales'")
+        if cursor.fetchone():
+            for sql in LEGACY_IMPORT:
+                cursor.execute(sql)
+        for sql in TELEMETRY_REBUILD:
+            cursor.execute(sql)
+        print("📡 Telemetria das unidades pronta (unit_telemetry / unit_status).")
+        return True
+    except Exception as e:
+        print(f"⚠️ Telemetria das unidades indisponível: {e}")
+        return False
+
+
+def ensure_telemetry_store(db) -> None:
+    """Tabelas de telemetria num LocalDatabase (hub): vêm das migrações do banco local."""
+    db.ensure_schema()
@@ -1,9 +1,8 @@
 import sys
 import os
-import time
 import threading
+import multiprocessing
 import traceback
-import uvicorn
 import sqlite3
 from datetime import datetime
 from pathlib import Path
@@ -20,13 +19,14 @@ if BASE_DIR not in sys.path:
 # --- 2. IMPORTAÇÕES ---
 from PySide6.QtWidgets import QApplication, QMessageBox, QWidget
 from PySide6.QtGui import QIcon
+from PySide6.QtCore import QTimer
 
 try:
     from app.ui.main_window import MainWindow
-    try:
-        from app.db.migrations import MigrationEngine
-    except ImportError:
-        MigrationEngine = None
+    from app.core.local_db import local_db, close_all as close_local_db
+    from app.utils.audit_logger import AuditLogger
+    from app.core.config import settings
+    from app.db.migrations import MigrationEngine
 except ImportError as e:
     print("\n❌ ERRO CRÍTICO DE IMPORTAÇÃO:")
     print(f"Não foi possível encontrar os módulos do sistema.")
@@ -37,26 +37,39 @@ except ImportError as e:
 API_PORT = 8000
 API_HOST = "127.0.0.1"
 API_URL = f"http://{API_HOST}:{API_PORT}"
-DB_PATH = os.path.join(BASE_DIR, "storage.db")
+DB_PATH = settings.db_file_path  # o mesmo arquivo que a API abre
+API_READY_TIMEOUT = 20.0  # segundos até desistir do /health e abrir as telas mesmo assim
 
 # --- 3. AUTO-MIGRAÇÃO ---
 def run_database_migrations():
-    print("🛠️ Verificando banco de dados...")
-    if MigrationEngine:
-        try:
-            MigrationEngine.check_and_migrate(DB_PATH)
-        except Exception as e:
-            print(f"⚠️ Aviso: Falha na migração: {e}")
+    # Só os passos pendentes de cada banco (db_version); em dia, uma leitura por arquivo
+    local_db.ensure_schema()
+    MigrationEngine.check_and_migrate(DB_PATH)
 
 # --- 4. SERVIDOR API ---
 def start_server():
     print(f"🚀 Iniciando Servidor em {API_URL}...")
     try:
-        from app.api.server import app as fastapi_app
-        uvicorn.run(fastapi_app, host=API_HOST, port=API_PORT, log_level="error")
+        import uvicorn
+        from app.api.server import create_app
+        uvicorn.run(create_app(), host=API_HOST, port=API_PORT, log_level="error")
     except Exception as e:
         print(f"❌ Erro no servidor: {e}")
 
+def probe_server(api_ready: threading.Event):
+    """Sonda o /health em segundo plano e libera as telas que dependem da API."""
+    from app.clients.api_client import wait_until_ready
+
+    if wait_until_ready(API_URL, timeout=API_READY_TIMEOUT):
+        print("✅ Servidor local pronto.")
+    else:
+        print(f"⚠️ Servidor local não respondeu em {API_READY_TIMEOUT:.0f}s.")
+    api_ready.set()
+
+def start_background(api_ready: threading.Event):
+    threading.Thread(target=start_server, daemon=True).start()
+    threading.Thread(target=probe_server, args=(api_ready,), daemon=True).start()
+
 # --- 5. EXECUÇÃO PRINCIPAL ---
 def main():
     app = QApplication(sys.argv)
@@ -74,26 +87,31 @@ def main():
 
     run_database_migrations()
 
-    server_thread = threading.Thread(target=start_server, daemon=True)
-    server_thread.start()
+    # O login abre antes do servidor; as páginas que chamam a API esperam o /health
+    api_ready = threading.Event()
 
     print("⏳ Iniciando interface...")
-    time.sleep(1)
-
     try:
-        window = MainWindow(api_base_url=API_URL)
+        window = MainWindow(api_base_url=API_URL, api_ready=api_ready)
         window.show()
+        # servidor e sonda sobem depois da 1ª pintura: o import do FastAPI/SQLAlchemy não
+        # disputa o GIL com a montagem do login, e o boot corre enquanto o usuário digita
+        QTimer.singleShot(0, lambda: start_background(api_ready))
         
         # --- EXECUÇÃO DO APP ---
         exit_code = app.exec()
+        from app.clients.api_client import close_api_clients
+        close_api_clients()
+        AuditLogger.shutdown()  # grava o que ainda está na fila de auditoria
+        close_local_db()  # checkpoint do WAL antes do backup copiar o arquivo
         
         # --- GATILHO DE BACKUP DE SEGURANÇA AO FECHAR ---
         print("🛡️ Iniciando backup de segurança...")
         try:
             from app.utils.backup_engine import BackupEngine
-            path_backup = BackupEngine.realizar_backup()
-            if path_backup:
-                print(f"✅ Backup concluído: {path_backup}")
+            manifestos = BackupEngine.realizar_backup()
+            if manifestos:
+                print(f"✅ Backup concluído: {', '.join(manifestos)}")
         except Exception as be:
             print(f"⚠️ Falha no motor de backup: {be}")
         
@@ -106,4 +124,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # exe do PyInstaller: os processos do pool (leitura de pastas de NFe) reentram por aqui
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
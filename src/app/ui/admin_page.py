@@ -2,7 +2,6 @@ from __future__ import annotations
 import secrets
 import sqlite3
 import re
-import requests  # Biblioteca para consultar a API do Brasil
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QPushButton, QTableWidget, QTableWidgetItem, QComboBox, 
@@ -12,6 +11,7 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import QDate, Qt
 from PySide6.QtGui import QColor, QIcon, QCursor
 from app.core.config import settings  # <--- IMPORTAÇÃO ESSENCIAL PARA O BANCO CERTO
+from app.core.local_db import get_local_db
 
 class AdminPage(QWidget):
     def __init__(self, main_window):
@@ -275,6 +275,7 @@ class AdminPage(QWidget):
         QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
             # Consulta API gratuita
+            import requests  # API do Brasil: carregada só na consulta
             response = requests.get(f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}", timeout=3)
             if response.status_code == 200:
                 data = response.json()
@@ -306,6 +307,7 @@ class AdminPage(QWidget):
 
         QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
+            import requests
             response = requests.get(f"https://brasilapi.com.br/api/cep/v2/{cep}", timeout=3)
             if response.status_code == 200:
                 data = response.json()
@@ -321,21 +323,10 @@ class AdminPage(QWidget):
 
     # --- BANCO DE DADOS (SQLite Local) ---
     def check_database(self):
-        """Cria/Verifica a tabela no banco oficial."""
+        """Cria/Verifica a tabela no banco oficial (uma vez por processo, via pool)."""
         # USA O CAMINHO CENTRALIZADO
-        conn = sqlite3.connect(settings.db_file_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS clients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                razao_social TEXT, nome_fantasia TEXT, cnpj TEXT, ie TEXT,
-                cep TEXT, endereco TEXT, numero TEXT, bairro TEXT, cidade TEXT, uf TEXT,
-                telefone TEXT, email TEXT, business_type TEXT, login TEXT UNIQUE, password TEXT,
-                license_key TEXT, expiry_date TEXT, status TEXT DEFAULT 'Ativo'
-            )
-        """)
-        conn.commit()
-        conn.close()
+        self.db = get_local_db(settings.db_file_path)
+        self.db.ensure_schema()  # tabela clients vem das migrações do storage.db
 
     def handle_save(self):
         razao = self.inp_razao.text().strip()
@@ -364,10 +355,7 @@ class AdminPage(QWidget):
         modules_string = ",".join(modules)
 
         try:
-            # USA O CAMINHO CENTRALIZADO
-            conn = sqlite3.connect(settings.db_file_path)
-            cursor = conn.cursor()
-            cursor.execute("""
+            self.db.execute("""
                 INSERT INTO clients (
                     razao_social, nome_fantasia, cnpj, ie, 
                     cep, endereco, numero, bairro, cidade, uf, telefone, email,
@@ -380,8 +368,6 @@ class AdminPage(QWidget):
                 self.inp_fone.text(), self.inp_email.text(),
                 modules_string, login, pwd, formatted_key, self.date_expiry.date().toString("yyyy-MM-dd")
             ))
-            conn.commit()
-            conn.close()
             
             QMessageBox.information(self, "Sucesso", f"Unidade {razao} cadastrada com sucesso!")
             self.tabs.setCurrentIndex(0)
@@ -398,20 +384,12 @@ class AdminPage(QWidget):
         filter_txt = self.input_search.text().lower()
         
         try:
-            # USA O CAMINHO CENTRALIZADO
-            conn = sqlite3.connect(settings.db_file_path)
-            cursor = conn.cursor()
-            
             # Seleciona colunas (business_type agora guarda os módulos)
             try:
-                cursor.execute("SELECT id, razao_social, cnpj, business_type, login, license_key, expiry_date FROM clients")
-                rows = cursor.fetchall()
+                rows = self.db.query("SELECT id, razao_social, cnpj, business_type, login, license_key, expiry_date FROM clients")
             except sqlite3.OperationalError:
-                conn.close()
                 QMessageBox.critical(self, "Aviso de Sistema", "Banco de dados desatualizado. Exclua 'storage.db' e reinicie.")
                 return
-
-            conn.close()
             
             for row_data in rows:
                 if filter_txt:
@@ -442,11 +420,6 @@ class AdminPage(QWidget):
     def delete_client(self, cid):
         if QMessageBox.question(self, 'Excluir', "Confirmar exclusão?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
             try:
-                # USA O CAMINHO CENTRALIZADO
-                conn = sqlite3.connect(settings.db_file_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM clients WHERE id = ?", (cid,))
-                conn.commit()
-                conn.close()
+                self.db.execute("DELETE FROM clients WHERE id = ?", (cid,))
                 self.load_clients()
             except Exception as e: pass
\ No newline at end of file
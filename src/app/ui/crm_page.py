@@ -5,17 +5,19 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt, QDate, QUrl, QTime, QTimer
 from PySide6.QtGui import QDesktopServices, QColor, QIcon
-import sqlite3
 import re
 import os
 from datetime import datetime, timedelta
 
+from app.core.local_db import local_db
+from app.ui.tasks import COALESCE, TaskRunner
+
 class CRMPage(QWidget):
     def __init__(self, bus=None):
         super().__init__()
         self.bus = bus
-        self.check_database() # Garante que a tabela existe
         self.init_ui()
+        self.tasks = TaskRunner(self)
         
         # --- ROBÔ DE ALERTA (TIMER) ---
         # Verifica a agenda a cada 60 segundos (60000 ms)
@@ -23,24 +25,6 @@ class CRMPage(QWidget):
         self.timer_alerta.timeout.connect(self.verificar_agendamentos_proximos)
         self.timer_alerta.start(60000) 
 
-    def check_database(self):
-        """Cria a tabela de agendamentos se não existir"""
-        conn = sqlite3.connect("test.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS appointments (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                client_name TEXT,
-                service TEXT,
-                phone TEXT,
-                date_str TEXT,
-                time_str TEXT,
-                status TEXT DEFAULT 'Agendado'
-            )
-        """)
-        conn.commit()
-        conn.close()
-
     def init_ui(self):
         layout = QHBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -136,11 +120,10 @@ class CRMPage(QWidget):
         
         self.table_agenda.setRowCount(0)
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("SELECT time_str, client_name, service, phone, id FROM appointments WHERE date_str = ? ORDER BY time_str", (selected_date,))
-            rows = cursor.fetchall()
-            conn.close()
+            rows = local_db.query(
+                "SELECT time_str, client_name, service, phone, id FROM appointments WHERE date_str = ? ORDER BY time_str",
+                (selected_date,),
+            )
             
             # Tenta achar o ícone do WhatsApp
             icon_path = os.path.join("src", "app", "assets", "icon", "whatsapp.png")
@@ -193,14 +176,10 @@ class CRMPage(QWidget):
             return
             
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("""
+            local_db.execute("""
                 INSERT INTO appointments (client_name, service, phone, date_str, time_str)
                 VALUES (?, ?, ?, ?, ?)
             """, (cli, serv, zap, data, hora))
-            conn.commit()
-            conn.close()
             
             QMessageBox.information(self, "Agendado", f"{cli} agendada para {hora}!")
             self.inp_cliente.clear()
@@ -220,11 +199,7 @@ class CRMPage(QWidget):
         cliente = self.table_agenda.item(row, 1).text()
         
         if QMessageBox.question(self, "Excluir", f"Cancelar horário de {cliente}?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM appointments WHERE id = ?", (app_id,))
-            conn.commit()
-            conn.close()
+            local_db.execute("DELETE FROM appointments WHERE id = ?", (app_id,))
             self.load_schedule()
 
     # --- NOVAS FUNÇÕES (ESTAVAM FALTANDO) ---
@@ -270,35 +245,40 @@ class CRMPage(QWidget):
 
     # --- ROBÔ DE ALERTA ---
     def verificar_agendamentos_proximos(self):
-        """Roda a cada 1 min para ver se tem alguém chegando"""
-        try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
+        """Roda a cada 1 min para ver se tem alguém chegando (a consulta vai para o pool)"""
+        self.tasks.run(
+            "alertas", self._agendamentos_proximos, mode=COALESCE,
+            on_result=self._mostrar_alertas,
+            on_error=lambda e: print(f"Erro no robô de alerta: {e}"),
+        )
+
+    @staticmethod
+    def _agendamentos_proximos() -> list[str]:
+        hoje = datetime.now().strftime("%Y-%m-%d")
+        agora = datetime.now()
+        
+        # Pega agendamentos de hoje
+        compromissos = local_db.query("SELECT client_name, time_str FROM appointments WHERE date_str = ?", (hoje,))
+        
+        avisos = []
+        for nome, hora_str in compromissos:
+            # Converte hora do banco para objeto datetime
+            hora_agenda = datetime.strptime(f"{hoje} {hora_str}", "%Y-%m-%d %H:%M")
             
-            hoje = datetime.now().strftime("%Y-%m-%d")
-            agora = datetime.now()
+            # Calcula diferença
+            diferenca = hora_agenda - agora
             
-            # Pega agendamentos de hoje
-            cursor.execute("SELECT client_name, time_str FROM appointments WHERE date_str = ?", (hoje,))
-            compromissos = cursor.fetchall()
-            conn.close()
+            # Se faltar entre 0 e 15 minutos (900 segundos)
+            # E evita alertas passados
+            segundos_restantes = diferenca.total_seconds()
             
-            for nome, hora_str in compromissos:
-                # Converte hora do banco para objeto datetime
-                hora_agenda = datetime.strptime(f"{hoje} {hora_str}", "%Y-%m-%d %H:%M")
-                
-                # Calcula diferença
-                diferenca = hora_agenda - agora
-                
-                # Se faltar entre 0 e 15 minutos (900 segundos)
-                # E evita alertas passados
-                segundos_restantes = diferenca.total_seconds()
-                
-                if 0 < segundos_restantes <= 900:
-                    self.show_popup_alerta(f"⏰ ATENÇÃO: {nome} está agendada para {hora_str}!\nVerifique se já confirmou no WhatsApp.")
-                    
-        except Exception as e:
-            print(f"Erro no robô de alerta: {e}")
+            if 0 < segundos_restantes <= 900:
+                avisos.append(f"⏰ ATENÇÃO: {nome} está agendada para {hora_str}!\nVerifique se já confirmou no WhatsApp.")
+        return avisos
+
+    def _mostrar_alertas(self, avisos: list[str]):
+        for texto in avisos:
+            self.show_popup_alerta(texto)
 
     def show_popup_alerta(self, texto):
         """Mostra um pop-up que fica por cima de tudo"""
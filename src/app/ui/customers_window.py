@@ -1,4 +1,3 @@
-import sqlite3
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, 
     QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QGroupBox, 
@@ -7,6 +6,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon
 
+from app.core.local_db import local_db
+
 class CustomerDialog(QDialog):
     def __init__(self, parent=None, title="Cliente", name="", phone="", email=""):
         super().__init__(parent)
@@ -46,23 +47,9 @@ class CustomersWindow(QWidget):
         # Tenta carregar o ícone da aplicação
         self.setWindowIcon(QIcon("src/app/ui/assets/icon/logo.png"))
         
-        self.check_db()
         self.init_ui()
         self.load_data()
 
-    def check_db(self):
-        """Cria a tabela no banco local se não existir"""
-        conn = sqlite3.connect("test.db")
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS customers (
-                id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                name TEXT, 
-                phone TEXT, 
-                email TEXT
-            )
-        """)
-        conn.close()
-
     def init_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -123,16 +110,14 @@ class CustomersWindow(QWidget):
         """Recarrega os dados do banco local para a tabela"""
         self.table.setRowCount(0)
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.execute("SELECT id, name, phone, email FROM customers ORDER BY name ASC")
-            for row_data in cursor:
+            rows = local_db.query("SELECT id, name, phone, email FROM customers ORDER BY name ASC")
+            for row_data in rows:
                 row = self.table.rowCount()
                 self.table.insertRow(row)
                 for i, val in enumerate(row_data):
                     item = QTableWidgetItem(str(val))
                     if i == 0: item.setTextAlignment(Qt.AlignCenter)
                     self.table.setItem(row, i, item)
-            conn.close()
         except Exception as e:
             print(f"Erro ao carregar clientes: {e}")
 
@@ -146,10 +131,7 @@ class CustomersWindow(QWidget):
                 return
             
             try:
-                conn = sqlite3.connect("test.db")
-                conn.execute("INSERT INTO customers (name, phone, email) VALUES (?,?,?)", (name, phone, email))
-                conn.commit()
-                conn.close()
+                local_db.execute("INSERT INTO customers (name, phone, email) VALUES (?,?,?)", (name, phone, email))
                 self.load_data()
             except Exception as e:
                 QMessageBox.critical(self, "Erro", f"Falha ao salvar: {e}")
@@ -172,10 +154,7 @@ class CustomersWindow(QWidget):
                 return
             
             try:
-                conn = sqlite3.connect("test.db")
-                conn.execute("UPDATE customers SET name=?, phone=?, email=? WHERE id=?", (n, p, e, cid))
-                conn.commit()
-                conn.close()
+                local_db.execute("UPDATE customers SET name=?, phone=?, email=? WHERE id=?", (n, p, e, cid))
                 self.load_data()
             except Exception as e:
                 QMessageBox.critical(self, "Erro", f"Falha ao atualizar: {e}")
\ No newline at end of file
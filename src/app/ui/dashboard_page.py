@@ -1,22 +1,22 @@
 from __future__ import annotations
 import os
-import sqlite3
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
-    QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, 
+    QPushButton, QHeaderView, 
     QSizePolicy, QAbstractItemView, QApplication, QGridLayout, QMessageBox
 )
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QPainter, QColor
+from PySide6.QtGui import QPainter
 from PySide6.QtCharts import (
     QChart, QChartView, QBarSet, QBarSeries, QLineSeries,
     QBarCategoryAxis, QValueAxis, QCategoryAxis
 )
 
-from app.clients.api_client import ApiClient
-from app.utils.pdf_generator import PDFGenerator 
+from app.clients.api_client import get_api_client
 from app.core.auth import current_session 
 from app.utils.stats_engine import StatsEngine 
+from app.ui.table_models import ProductTableModel, make_table_view
+from app.ui.tasks import COALESCE, TaskRunner
 
 DASHBOARD_STYLES = """
     QFrame#Card { background-color: #ffffff; border: 1px solid #e0e0e0; border-radius: 12px; padding: 15px; }
@@ -25,7 +25,7 @@ DASHBOARD_STYLES = """
     QFrame#CardQuality { background-color: #ffffff; border-left: 8px solid #16a085; border-radius: 8px; padding: 15px; }
     QLabel#CardTitle { color: #757575; font-size: 11px; font-weight: bold; }
     QLabel#CardValue { color: #1a1a1a; font-size: 24px; font-weight: 800; }
-    QTableWidget { background-color: #ffffff; border-radius: 10px; }
+    QTableView { background-color: #ffffff; border-radius: 10px; }
     QPushButton#RefreshBtn { background-color: #2c3e50; color: white; font-weight: bold; border-radius: 5px; }
     QPushButton#ExecBtn { background-color: #2980b9; color: white; font-weight: bold; border-radius: 5px; padding: 10px; }
 """
@@ -49,7 +49,8 @@ class DashboardPage(QWidget):
         self.setStyleSheet(DASHBOARD_STYLES)
         self.bus = bus
         self.business_type = business_type 
-        self.client = ApiClient(api_base_url)
+        self.client = get_api_client(api_base_url)
+        self.tasks = TaskRunner(self)
 
         if self.bus:
             self.bus.subscribe("products_changed", self.refresh)
@@ -102,8 +103,11 @@ class DashboardPage(QWidget):
         self.lbl_table = QLabel("⚠️ ALERTAS DE ESTOQUE CRÍTICO / MÍNIMO")
         self.lbl_table.setStyleSheet("font-weight: bold; color: #c0392b;")
         
-        self.low_stock_table = QTableWidget(0, 3)
-        self.low_stock_table.setHorizontalHeaderLabels(["Produto", "NCM/Fiscal", "Qtd Atual"])
+        self.low_stock_model = ProductTableModel(
+            [("name", "Produto"), ("ncm_code", "NCM/Fiscal", lambda v, _p: v or "0000.00.00"), ("stock_qty", "Qtd Atual")],
+            parent=self,
+        )
+        self.low_stock_table = make_table_view(self.low_stock_model, stretch_column=None)
         self.low_stock_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.low_stock_table.setMaximumHeight(180)
         
@@ -139,75 +143,71 @@ class DashboardPage(QWidget):
                 self.cards_row.addWidget(c)
 
     def refresh(self):
+        # uma busca por vez; pedidos que chegam no meio (venda, estoque) viram uma só repetição
+        self.btn_refresh.setEnabled(False)
+        self.tasks.run(
+            "dashboard", self.client.reports_dashboard, mode=COALESCE,
+            on_result=self.apply_data, on_error=self._on_refresh_failed,
+        )
+
+    def _on_refresh_failed(self, error):
+        self.btn_refresh.setEnabled(True)
+        print(f"Erro Dashboard: {error}")
+
+    def apply_data(self, data: dict):
+        self.btn_refresh.setEnabled(True)
         try:
-            self.btn_refresh.setEnabled(False)
-            products = self.client.list_products()
-            summary = self.client.reports_summary() 
-            moves = self.client.reports_stock_moves_7d()
-            
-            # --- INTEGRAÇÃO BI (Lógica Real de Banco) ---
-            total_real_vendas = 0.0
-            db_conn = sqlite3.connect("test.db")
-            cursor = db_conn.cursor()
-            try:
-                # Tenta somar faturamento real se a tabela existir
-                cursor.execute("SELECT SUM(total_value) FROM sales")
-                res = cursor.fetchone()[0]
-                total_real_vendas = res if res else 0.0
-            except: pass
-            db_conn.close()
-
-            total_valuation = sum(p.get("price", 0) * p.get("stock_qty", 0) for p in products)
-            
             if self.business_type == "enterprise":
-                # Mostra o faturamento total acumulado no BI Industrial
-                self.card_main.findChild(QLabel, "CardValue").setText(f"R$ {total_real_vendas:,.2f}")
+                # Faturamento acumulado da rede (vendas sincronizadas pelas unidades)
+                total_real_vendas = data.get("network_revenue")
                 self.card_quality.findChild(QLabel, "CardValue").setText("98.4%")
                 self.card_maint.findChild(QLabel, "CardValue").setText("2")
-                
-                if current_session.has_permission("gerente"):
-                    lucro_est = total_real_vendas * 0.22 
-                    self.card_margin.findChild(QLabel, "CardValue").setText(f"{(lucro_est/total_real_vendas*100) if total_real_vendas > 0 else 0:.1f}%")
+                if total_real_vendas is None:
+                    # servidor sem acesso ao banco local: card indisponível, não um R$ 0,00 que parece real
+                    self.card_main.findChild(QLabel, "CardValue").setText("Indisponível")
+                    if current_session.has_permission("gerente"):
+                        self.card_margin.findChild(QLabel, "CardValue").setText("—")
+                else:
+                    self.card_main.findChild(QLabel, "CardValue").setText(f"R$ {total_real_vendas:,.2f}")
+                    if current_session.has_permission("gerente"):
+                        lucro_est = total_real_vendas * 0.22
+                        self.card_margin.findChild(QLabel, "CardValue").setText(f"{(lucro_est/total_real_vendas*100) if total_real_vendas > 0 else 0:.1f}%")
             else:
-                vendas_hoje = summary.get("sales_today_value", 0.0)
-                n_vendas = summary.get("sales_today_count", 1)
+                vendas_hoje = data.get("sales_today_value", 0.0)
+                n_vendas = data.get("sales_today_count", 0)
                 ticket_medio = vendas_hoje / n_vendas if n_vendas > 0 else 0
                 
                 self.card_main.findChild(QLabel, "CardValue").setText(f"R$ {vendas_hoje:,.2f}")
                 self.card_ticket.findChild(QLabel, "CardValue").setText(f"R$ {ticket_medio:,.2f}")
-                self.card_low.findChild(QLabel, "CardValue").setText(str(summary.get("low_stock", 0)))
-                self.card_valuation.findChild(QLabel, "CardValue").setText(f"R$ {total_valuation:,.2f}")
+                self.card_low.findChild(QLabel, "CardValue").setText(str(data.get("low_stock", 0)))
+                self.card_valuation.findChild(QLabel, "CardValue").setText(f"R$ {data.get('inventory_value', 0.0):,.2f}")
 
-            self.update_bar_chart(products)
-            self.update_line_chart(moves)
-            self.update_table(products)
+            self.update_bar_chart(data.get("top_stock", []))
+            self.update_line_chart(data.get("sales_7d", []))
+            self.update_table(data.get("low_stock_items", []))
 
         except Exception as e: print(f"Erro Dashboard: {e}")
-        finally: self.btn_refresh.setEnabled(True)
 
     def export_executive_report(self):
         if not current_session.has_permission("gerente"): return
         try:
             faturamento_txt = self.card_main.findChild(QLabel, "CardValue").text()
+            if not faturamento_txt.startswith("R$"):
+                QMessageBox.warning(self, "Relatório", "Faturamento da rede indisponível no momento.")
+                return
             faturamento = float(faturamento_txt.replace("R$ ","").replace(".","").replace(",","."))
             dados = {"faturamento": faturamento, "custos": faturamento * 0.65, "impostos": faturamento * 0.18}
+            from app.utils.pdf_generator import PDFGenerator  # reportlab só quando gera o PDF
             path = PDFGenerator.gerar_relatorio_lucratividade({"razao_social": "BERTOLINI CORP - SERTÃOZINHO"}, dados)
             QMessageBox.information(self, "PDF", f"Relatório Gerado: {path}")
             os.startfile(os.path.abspath(path))
         except Exception as e: QMessageBox.critical(self, "Erro", str(e))
 
-    def update_table(self, products):
-        low_items = [p for p in products if p.get("stock_qty", 0) <= p.get("min_stock", 5)]
-        self.low_stock_table.setRowCount(0)
-        for p in low_items[:10]:
-            r = self.low_stock_table.rowCount(); self.low_stock_table.insertRow(r)
-            self.low_stock_table.setItem(r, 0, QTableWidgetItem(p["name"]))
-            self.low_stock_table.setItem(r, 1, QTableWidgetItem(p.get("ncm_code", "0000.00.00")))
-            self.low_stock_table.setItem(r, 2, QTableWidgetItem(str(p["stock_qty"])))
-            if p["stock_qty"] <= 0: self.low_stock_table.item(r, 2).setForeground(QColor("red"))
-
-    def update_bar_chart(self, products):
-        top_items = sorted(products, key=lambda x: x.get("stock_qty", 0), reverse=True)[:5]
+    def update_table(self, low_items):
+        # já vem filtrado e ordenado pelo servidor; qtd <= 0 sai em vermelho pelo próprio ProductTableModel
+        self.low_stock_model.set_rows(low_items)
+
+    def update_bar_chart(self, top_items):
         series = QBarSeries(); set0 = QBarSet("Estoque"); categories = []
         for p in top_items:
             set0.append(p.get("stock_qty", 0))
@@ -223,7 +223,7 @@ class DashboardPage(QWidget):
         series = QLineSeries(); series.setName("Vendas"); categories = []
         if isinstance(moves_data, list):
             for i, p in enumerate(moves_data):
-                series.append(i, p.get("count", 0)); categories.append(p.get("date", ""))
+                series.append(i, p.get("count", 0)); categories.append(p.get("day", "")[5:])
         chart = QChart(); chart.addSeries(series); chart.setTitle("FLUXO 7 DIAS")
         chart.setTheme(QChart.ChartThemeBlueCerulean)
         axis_x = QCategoryAxis()
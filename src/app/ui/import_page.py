@@ -1,23 +1,65 @@
 from __future__ import annotations
 import json
-import xml.etree.ElementTree as ET
 from pathlib import Path
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
-    QFileDialog, QTableWidget, QTableWidgetItem, QMessageBox, 
-    QHeaderView, QFrame, QFormLayout, QComboBox, QScrollArea,
-    QGroupBox
+    QFileDialog, QMessageBox, 
+    QFrame, QFormLayout, QComboBox, QScrollArea,
+    QGroupBox, QProgressBar
 )
-from PySide6.QtCore import Qt
-from app.clients.api_client import ApiClient
+from PySide6.QtCore import Qt, QThread, Signal
+from app.clients.api_client import ApiClient, get_api_client
+from app.ui.table_models import DictTableModel, make_table_view
+from app.utils.import_engine import FIELDS, IGNORE, ImportEngine
+from app.utils.nfe_parser import NFeParser
+
+
+class ImportWorker(QThread):
+    """Roda o ImportEngine fora da thread da UI e reporta o progresso bloco a bloco."""
+    progress = Signal(int, int, int)  # linhas lidas, gravadas, erros
+    parsing = Signal(int, int)        # notas lidas, total (modo pasta)
+    finished_report = Signal(dict)
+    failed = Signal(str)
+
+    def __init__(self, client: ApiClient, file_path: str | None = None, mapping: dict | None = None,
+                 notes: list | None = None, folder: str | None = None):
+        super().__init__()
+        self.client = client
+        self.file_path = file_path
+        self.mapping = mapping
+        self.notes = notes
+        self.folder = folder
+        self._stop = False
+
+    def stop(self):
+        self._stop = True
+
+    def run(self):
+        try:
+            if self.folder is not None:
+                # pasta de XMLs: leitura distribuída no pool de processos
+                paths = NFeParser.list_folder(self.folder)
+                self.notes = NFeParser.parse_many(paths, progress=self.parsing.emit)
+            if self.notes is not None:
+                report = ImportEngine.import_nfe(self.client, self.notes, progress=self.progress.emit)
+            else:
+                report = ImportEngine.run(
+                    self.client, self.file_path, self.mapping,
+                    progress=self.progress.emit, should_stop=lambda: self._stop,
+                )
+            self.finished_report.emit(report)
+        except Exception as e:
+            self.failed.emit(str(e))
 
 class ImportPage(QWidget):
     def __init__(self, bus=None):
         super().__init__()
         self.bus = bus
-        self.client = ApiClient("http://127.0.0.1:8000")
-        self.df = None 
-        self.temp_xml_data = [] # Armazena dados do XML
+        self.client = get_api_client()  # mesmo cliente (e URL) da janela principal
+        self.file_path = None
+        self.columns = []
+        self.worker = None
+        self.nfe_notes = [] # Notas lidas do XML (NFeParser)
         self.mapping_combos = {} 
         self.mode = "SPREADSHEET" # SPREADSHEET ou XML
         self.init_ui()
@@ -51,7 +93,13 @@ class ImportPage(QWidget):
         self.btn_select_xml.clicked.connect(self.open_xml_dialog)
 
         btn_layout.addWidget(self.btn_select_sheet)
+        self.btn_select_folder = QPushButton("📂 Importar Pasta de XMLs")
+        self.btn_select_folder.setMinimumHeight(50)
+        self.btn_select_folder.setStyleSheet("background-color: #8e44ad; color: white; font-weight: bold; border-radius: 8px;")
+        self.btn_select_folder.clicked.connect(self.open_xml_folder)
+
         btn_layout.addWidget(self.btn_select_xml)
+        btn_layout.addWidget(self.btn_select_folder)
         layout.addLayout(btn_layout)
 
         # 2. ÁREA DINÂMICA: MAPEAMENTO (EXCEL)
@@ -64,9 +112,13 @@ class ImportPage(QWidget):
         layout.addWidget(self.scroll)
 
         # 3. ÁREA DINÂMICA: TABELA DE REVISÃO (XML)
-        self.xml_preview_table = QTableWidget(0, 5)
-        self.xml_preview_table.setHorizontalHeaderLabels(["SKU", "Produto", "Qtd", "Custo Unit.", "NCM"])
-        self.xml_preview_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.xml_model = DictTableModel([
+            ("sku", "SKU"), ("name", "Produto"),
+            ("qty", "Qtd", lambda v, r: f"{v:g}"),
+            ("unit_cost", "Custo Unit.", lambda v, r: f"R$ {v:.2f}"),
+            ("ncm_code", "NCM"),
+        ], key="n_item")
+        self.xml_preview_table = make_table_view(self.xml_model)
         self.xml_preview_table.hide()
         layout.addWidget(self.xml_preview_table)
 
@@ -81,22 +133,29 @@ class ImportPage(QWidget):
         self.btn_run.clicked.connect(self.process_import)
         layout.addWidget(self.btn_run)
 
+        # 5. PROGRESSO (importação roda em segundo plano, bloco a bloco)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.hide()
+        self.lbl_progress = QLabel("")
+        self.lbl_progress.setStyleSheet("color: #7f8c8d;")
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.lbl_progress)
+
     # --- LÓGICA DE EXCEL / CSV (ORIGINAL MANTIDA) ---
     def open_file_dialog(self):
-        try: import pandas as pd
-        except: 
-            QMessageBox.critical(self, "Erro", "Rode: pip install pandas openpyxl")
-            return
-
         file_path, _ = QFileDialog.getOpenFileName(self, "Abrir Planilha", "", "Dados (*.xlsx *.csv *.xls)")
         if file_path:
             try:
                 self.mode = "SPREADSHEET"
                 self.xml_preview_table.hide()
-                self.df = pd.read_csv(file_path) if file_path.endswith('.csv') else pd.read_excel(file_path)
+                # só o cabeçalho: o arquivo é lido em blocos na hora de importar
+                self.columns = ImportEngine.read_header(file_path)
+                self.file_path = file_path
                 self.setup_mapping_ui()
                 self.scroll.show()
                 self.btn_run.setEnabled(True)
+            except ModuleNotFoundError: QMessageBox.critical(self, "Erro", "Rode: pip install pandas openpyxl")
             except Exception as e: QMessageBox.critical(self, "Erro", str(e))
 
     def setup_mapping_ui(self):
@@ -104,12 +163,8 @@ class ImportPage(QWidget):
             w = self.mapping_layout.itemAt(i).widget()
             if w: w.setParent(None)
         
-        cols = ["(Não Importar)"] + list(self.df.columns)
-        self.fields_to_map = {
-            "name": "Nome do Produto*", "price": "Preço de Venda (R$)*",
-            "cost_price": "Preço de Custo (R$)", "sku": "Código / SKU",
-            "stock_qty": "Estoque Inicial", "ncm_code": "NCM (Fiscal)"
-        }
+        cols = [IGNORE] + list(self.columns)
+        self.fields_to_map = FIELDS
 
         for key, label in self.fields_to_map.items():
             combo = QComboBox()
@@ -127,71 +182,97 @@ class ImportPage(QWidget):
             try:
                 self.mode = "XML"
                 self.scroll.hide()
-                self.temp_xml_data = []
-                
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-                ns = {'nfe': 'http://www.portalfiscal.inf.br/nfe'}
-                
-                self.xml_preview_table.setRowCount(0)
-                for det in root.findall('.//nfe:det', ns):
-                    prod = det.find('nfe:prod', ns)
-                    item = {
-                        "name": prod.find('nfe:xProd', ns).text,
-                        "sku": prod.find('nfe:cProd', ns).text,
-                        "ncm_code": prod.find('nfe:NCM', ns).text,
-                        "stock_qty": int(float(prod.find('nfe:qCom', ns).text)),
-                        "cost_price": float(prod.find('nfe:vUnCom', ns).text),
-                        "price": float(prod.find('nfe:vUnCom', ns).text) * 1.5, # 50% margem padrão
-                        "type": "PRODUTO"
-                    }
-                    self.temp_xml_data.append(item)
-                    
-                    row = self.xml_preview_table.rowCount()
-                    self.xml_preview_table.insertRow(row)
-                    self.xml_preview_table.setItem(row, 0, QTableWidgetItem(item['sku']))
-                    self.xml_preview_table.setItem(row, 1, QTableWidgetItem(item['name']))
-                    self.xml_preview_table.setItem(row, 2, QTableWidgetItem(str(item['stock_qty'])))
-                    self.xml_preview_table.setItem(row, 3, QTableWidgetItem(f"R$ {item['cost_price']:.2f}"))
-                    self.xml_preview_table.setItem(row, 4, QTableWidgetItem(item['ncm_code']))
-
+                nota = NFeParser.parse(file_path)
+                self.nfe_notes = [nota]
+                self.xml_model.set_rows(nota["itens"])
                 self.xml_preview_table.show()
                 self.btn_run.setEnabled(True)
-                QMessageBox.information(self, "Sucesso", f"{len(self.temp_xml_data)} produtos lidos do XML.")
+                QMessageBox.information(self, "Sucesso", f"{len(nota['itens'])} produtos lidos do XML.")
             except Exception as e: QMessageBox.critical(self, "Erro XML", f"Arquivo inválido: {e}")
 
+    def open_xml_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Selecionar pasta com XMLs de NFe")
+        if not folder:
+            return
+        total = len(NFeParser.list_folder(folder))
+        if total == 0:
+            QMessageBox.warning(self, "Aviso", "Nenhum arquivo .xml nessa pasta.")
+            return
+        if QMessageBox.question(
+            self, "Importar Pasta", f"{total} notas encontradas.\nDar entrada em todas?", QMessageBox.Yes | QMessageBox.No
+        ) != QMessageBox.Yes:
+            return
+        self.mode = "XML_FOLDER"
+        self.scroll.hide()
+        self.xml_preview_table.hide()
+        self._start_worker(ImportWorker(self.client, folder=folder))
+
     # --- PROCESSAMENTO FINAL ---
     def process_import(self):
-        mapped_data = []
-        try:
-            if self.mode == "SPREADSHEET":
-                for _, row in self.df.iterrows():
-                    item = {}
-                    for key, combo in self.mapping_combos.items():
-                        col = combo.currentText()
-                        if col != "(Não Importar)":
-                            val = row[col]
-                            if key in ["price", "cost_price"]: val = float(str(val).replace(',','.')) if val else 0.0
-                            elif key == "stock_qty": val = int(float(val)) if val else 0
-                            item[key] = val
-                    if item.get("name"): mapped_data.append(item)
-            else:
-                mapped_data = self.temp_xml_data
-
-            # ENVIO PARA API
-            if mapped_data:
-                for data in mapped_data:
-                    self.client.create_product(
-                        name=data['name'], sku=data.get('sku'),
-                        price=data.get('price', 0.0), cost_price=data.get('cost_price', 0.0),
-                        min_stock=5, type=data.get('type', 'PRODUTO'), 
-                        ncm_code=data.get('ncm_code', '00000000')
-                    )
-                
-                QMessageBox.information(self, "Concluído", f"Sucesso! {len(mapped_data)} itens processados no Bertolini ERP.")
-                if self.bus: self.bus.publish("products_changed")
-                self.btn_run.setEnabled(False)
-                self.xml_preview_table.hide()
-                self.scroll.hide()
+        if self.worker is not None and self.worker.isRunning():
+            return
+        if self.mode == "SPREADSHEET":
+            mapping = {key: combo.currentText() for key, combo in self.mapping_combos.items()}
+            if mapping.get("name", IGNORE) == IGNORE:
+                QMessageBox.warning(self, "Atenção", "Mapeie a coluna do Nome do Produto.")
+                return
+            self.worker = ImportWorker(self.client, self.file_path, mapping)
+        else:
+            if not self.nfe_notes:
+                return
+            self.worker = ImportWorker(self.client, notes=self.nfe_notes)
+        self._start_worker(self.worker)
+
+    def _start_worker(self, worker):
+        self.worker = worker
+        self.worker.progress.connect(self._on_progress)
+        self.worker.parsing.connect(self._on_parsing)
+        self.worker.finished_report.connect(self._on_finished)
+        self.worker.failed.connect(self._on_failed)
+        self.btn_run.setEnabled(False)
+        self.btn_select_sheet.setEnabled(False)
+        self.btn_select_xml.setEnabled(False)
+        self.btn_select_folder.setEnabled(False)
+        self.progress_bar.show()
+        self.lbl_progress.setText("Lendo arquivo...")
+        self.worker.start()
+
+    def _on_progress(self, rows, upserted, errors):
+        self.lbl_progress.setText(f"{rows} linhas lidas • {upserted} gravadas • {errors} com erro")
+
+    def _on_parsing(self, done, total):
+        self.lbl_progress.setText(f"Lendo notas: {done}/{total}")
+
+    def _finish_ui(self):
+        self.progress_bar.hide()
+        self.btn_select_sheet.setEnabled(True)
+        self.btn_select_xml.setEnabled(True)
+        self.btn_select_folder.setEnabled(True)
 
-        except Exception as e: QMessageBox.critical(self, "Erro", f"Falha no processamento: {e}")
\ No newline at end of file
+    def _on_failed(self, msg):
+        self._finish_ui()
+        self.btn_run.setEnabled(True)
+        QMessageBox.critical(self, "Erro", f"Falha no processamento: {msg}")
+
+    def _on_finished(self, report):
+        self._finish_ui()
+        errors = report["errors"]
+        msg = f"{report['upserted']} itens gravados no Bertolini ERP ({report['rows']} linhas lidas)."
+        if "entries" in report:
+            msg += f"\n{report['entries']} entradas de estoque lançadas."
+        if errors:
+            preview = "\n".join(
+                (f"Linha {e['row']}: " if e["row"] else "") + e["detail"] for e in errors[:10]
+            )
+            msg += f"\n\n{len(errors)} linhas com erro:\n{preview}"
+            if self.mode == "SPREADSHEET" and self.file_path:
+                try:
+                    msg += f"\n\nRelatório completo: {ImportEngine.write_errors(self.file_path, errors)}"
+                except Exception as e:
+                    print(f"⚠️ Não foi possível salvar o relatório de erros: {e}")
+        QMessageBox.information(self, "Concluído", msg)
+
+        if report["upserted"] and self.bus: self.bus.products_changed.emit()
+        self.lbl_progress.setText("")
+        self.xml_preview_table.hide()
+        self.scroll.hide()
@@ -1,7 +1,10 @@
 from __future__ import annotations
+import importlib
+import json
 import os
-import sqlite3
 import sys
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 
@@ -13,35 +16,44 @@ from PySide6.QtWidgets import (
     QFrame, QLineEdit, QPushButton, QLabel, QGridLayout, QCheckBox, QGraphicsDropShadowEffect, QSizePolicy
 )
 
-# --- IMPORTANDO AS PÁGINAS EXTERNAS ---
-from app.ui.master_page import MasterDashboardPage
-from app.ui.orders_page import OrdersPage
-from app.ui.dashboard_page import DashboardPage
-from app.ui.products_window import ProductsWindow
-from app.ui.pos_page import PosPage
-from app.ui.settings_page import SettingsPage
-from app.ui.sales_history_page import SalesHistoryPage
-from app.ui.admin_page import AdminPage 
-from app.ui.lock_screen import LockScreen 
-from app.ui.import_page import ImportPage
-from app.ui.purchases_page import PurchasesPage
-from app.ui.os_page import OSPage
-from app.ui.finance_page import FinancePage
-from app.ui.suppliers_window import SuppliersWindow
-from app.ui.manual_purchase_page import ManualPurchasePage
-from app.ui.inventory_page import InventoryPage
-from app.ui.fiscal_page import FiscalPage 
 from app.ui.event_bus import EventBus
-from app.clients.api_client import ApiClient
-
-# >>> IMPORTAÇÕES DE MÓDULOS DE ELITE <<<
-from app.ui.customers_window import CustomersWindow 
-from app.ui.fleet_page import FleetPage
-from app.ui.hr_page import HRPage 
-from app.ui.crm_page import CRMPage 
-from app.ui.quality_page import QualityPage 
-from app.ui.production_page import ProductionPage 
-from app.ui.monitoring_page import MonitoringPage # >>> NOVO MÓDULO NUVEM <<<
+from app.core.config import settings
+from app.core.local_db import local_db
+
+# --- REGISTRO DAS PÁGINAS EXTERNAS ---
+# Cada página é importada e montada na primeira navegação (MainWindow.page): o login abre sem
+# carregar QtCharts/reportlab nem disparar as consultas, timers e chamadas de API de 20 telas.
+# nome -> (módulo, classe, fábrica(cls, janela)); fábrica None = cls(bus=janela.bus)
+PAGE_REGISTRY = {
+    "master_page": ("app.ui.admin_page", "AdminPage", lambda cls, w: cls(w)),
+    "pos_page": ("app.ui.pos_page", "PosPage", lambda cls, w: cls(w.api_base_url, bus=w.bus)),
+    "fiscal_page": ("app.ui.fiscal_page", "FiscalPage", None),
+    "finance_page": ("app.ui.finance_page", "FinancePage", None),
+    "inventory_page": ("app.ui.inventory_page", "InventoryPage", None),
+    "os_page": ("app.ui.os_page", "OSPage", None),
+    "orders_page": ("app.ui.orders_page", "OrdersPage", None),
+    "purchases_page": ("app.ui.purchases_page", "PurchasesPage", None),
+    "manual_page": ("app.ui.manual_purchase_page", "ManualPurchasePage", None),
+    "history_page": ("app.ui.sales_history_page", "SalesHistoryPage", lambda cls, w: cls(w.api_base_url, bus=w.bus)),
+    "products_page": ("app.ui.products_window", "ProductsWindow", lambda cls, w: cls(w.api_base_url, bus=w.bus)),
+    "suppliers_page": ("app.ui.suppliers_window", "SuppliersWindow", lambda cls, w: cls(w.api_base_url, bus=w.bus)),
+    "settings_page": ("app.ui.settings_page", "SettingsPage",
+                      lambda cls, w: cls(bus=w.bus, expiry_date="2026-12-31", main_window=w)),
+    "import_page": ("app.ui.import_page", "ImportPage", None),
+    "dashboard_page": ("app.ui.dashboard_page", "DashboardPage",
+                       lambda cls, w: cls(api_base_url=w.api_base_url, business_type=w.business_type, bus=w.bus)),
+    # >>> MÓDULOS DE ELITE <<<
+    "fleet_page": ("app.ui.fleet_page", "FleetPage", None),
+    "hr_page": ("app.ui.hr_page", "HRPage", None),
+    "crm_page": ("app.ui.crm_page", "CRMPage", None),
+    "quality_page": ("app.ui.quality_page", "QualityPage", None),
+    "production_page": ("app.ui.production_page", "ProductionPage", None),
+    "monitoring_page": ("app.ui.monitoring_page", "MonitoringPage",  # >>> NOVO MÓDULO NUVEM <<<
+                        lambda cls, w: cls(bus=w.bus, api_base_url=w.api_base_url)),
+}
+
+# Espera máxima pelo servidor local (GET /health) antes de abrir a primeira área de trabalho
+API_READY_TIMEOUT_S = 20.0
 
 def get_logo_path():
     """Retorna o caminho da logo DO CLIENTE (se existir) ou Padrão. Usado no Portal."""
@@ -93,29 +105,17 @@ class LoginPage(QWidget):
         self.load_last_user()
 
     def init_db_fallback(self):
-        """Cria o banco local e a tabela clients se não existirem para evitar erro."""
+        """Garante o banco local (schema conferido uma vez) e o usuário admin padrão."""
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS clients (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    login TEXT UNIQUE,
-                    password TEXT,
-                    business_type TEXT,
-                    status TEXT
-                )
-            """)
+            local_db.ensure_schema()
             # Verifica se tem admin, se não, cria
-            cursor.execute("SELECT count(*) FROM clients")
-            if cursor.fetchone()[0] == 0:
-                print("🛠️ Criando usuário admin padrão no banco local...")
-                cursor.execute(
-                    "INSERT INTO clients (login, password, business_type, status) VALUES (?, ?, ?, ?)",
-                    ("admin", "admin", "vendas,financeiro,fiscal,estoque,frotas,rh,crm,producao,qualidade", "Ativo")
-                )
-                conn.commit()
-            conn.close()
+            with local_db.connection() as conn:
+                if conn.execute("SELECT count(*) FROM clients").fetchone()[0] == 0:
+                    print("🛠️ Criando usuário admin padrão no banco local...")
+                    conn.execute(
+                        "INSERT INTO clients (login, password, business_type, status) VALUES (?, ?, ?, ?)",
+                        ("admin", "admin", "vendas,financeiro,fiscal,estoque,frotas,rh,crm,producao,qualidade", "Ativo")
+                    )
         except Exception as e:
             print(f"⚠️ Erro ao inicializar banco local: {e}")
 
@@ -250,11 +250,7 @@ class LoginPage(QWidget):
         
         try:
             # Login via Banco de Dados Local (Licenças)
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("SELECT business_type, status FROM clients WHERE login=? AND password=?", (u, p))
-            res = cursor.fetchone()
-            conn.close()
+            res = local_db.query_one("SELECT business_type, status FROM clients WHERE login=? AND password=?", (u, p))
 
             if res:
                 modules_string, status = res
@@ -386,13 +382,14 @@ class PortalPage(QWidget):
 #  3. JANELA PRINCIPAL (ESTRUTURA COMPLETA)
 # ==========================================
 class MainWindow(QMainWindow):
-    def __init__(self, api_base_url: str):
+    def __init__(self, api_base_url: str, api_ready: threading.Event | None = None):
         super().__init__()
         
         self.api_base_url = api_base_url
+        self.api_ready = api_ready  # sinalizado pelo main.py quando /health responde
         self.bus = EventBus()
-        self.client = ApiClient(api_base_url)
         self.current_role = None # Guarda papel para toolbar dinâmica
+        self.business_type = "enterprise"
         
         self.setWindowTitle("Bertolini Globus ERP v5.0 Enterprise")
         self.resize(1280, 800)
@@ -416,47 +413,13 @@ class MainWindow(QMainWindow):
         
         self.pages = QStackedWidget(); self.layout.addWidget(self.pages)
         
-        # --- INSTANCIANDO AS PÁGINAS ---
+        # --- INSTANCIANDO AS PÁGINAS (demais sob demanda, ver PAGE_REGISTRY) ---
         self.login_page = LoginPage()
         self.portal_page = PortalPage(self)
-        self.master_page = AdminPage(self) 
-        
-        self.pos_page = PosPage(self.client.base_url, bus=self.bus)
-        self.fiscal_page = FiscalPage(bus=self.bus)
-        self.finance_page = FinancePage(bus=self.bus)
-        self.inventory_page = InventoryPage(bus=self.bus)
-        self.os_page = OSPage(bus=self.bus)
-        self.orders_page = OrdersPage(bus=self.bus) 
-        self.purchases_page = PurchasesPage(bus=self.bus)
-        self.manual_page = ManualPurchasePage(bus=self.bus)
-        self.history_page = SalesHistoryPage(self.client.base_url, bus=self.bus)
-        self.products_page = ProductsWindow(self.client.base_url, bus=self.bus)
-        self.suppliers_page = SuppliersWindow(self.client.base_url, bus=self.bus)
-        self.settings_page = SettingsPage(bus=self.bus, expiry_date="2026-12-31", main_window=self)
-        self.import_page = ImportPage(bus=self.bus)
-        self.dashboard_page = DashboardPage(api_base_url=self.api_base_url, business_type="enterprise", bus=self.bus)
-        
-        # >>> MÓDULOS DE ELITE <<<
-        self.fleet_page = FleetPage(bus=self.bus)
-        self.hr_page = HRPage(bus=self.bus)
-        self.crm_page = CRMPage(bus=self.bus) 
-        self.quality_page = QualityPage(bus=self.bus) 
-        self.production_page = ProductionPage(bus=self.bus) 
-        self.monitoring_page = MonitoringPage(bus=self.bus) # >>> NOVO MÓDULO NUVEM <<<
-
-        # Adicionando ao Stack
-        pages_list = [
-            self.login_page, self.portal_page, self.master_page, 
-            self.pos_page, self.fiscal_page, self.finance_page, 
-            self.inventory_page, self.os_page, self.orders_page, 
-            self.purchases_page, self.manual_page, self.history_page, 
-            self.products_page, self.suppliers_page, self.settings_page, 
-            self.import_page, self.dashboard_page, 
-            self.fleet_page, self.hr_page, self.crm_page,
-            self.quality_page, self.production_page, self.monitoring_page
-        ]
-        
-        for p in pages_list: self.pages.addWidget(p)
+        self._pages = {}
+        self.pages.addWidget(self.login_page)
+        self.pages.addWidget(self.portal_page)
+        self.apply_saved_theme()
 
         # --- CONEXÃO DO EVENT BUS PARA CLIENTES ---
         if hasattr(self.bus, 'subscribe'):
@@ -473,19 +436,65 @@ class MainWindow(QMainWindow):
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_F1: self.return_to_portal()
         elif event.key() == Qt.Key_F12: self.logout_system()
-        elif event.key() == Qt.Key_F9: self.pages.setCurrentWidget(self.settings_page)
+        elif event.key() == Qt.Key_F9: self.show_page("settings_page")
         super().keyPressEvent(event)
 
     def handle_login(self, role, b_type):
         self.current_role = role # IMPORTANTE: SALVA O PAPEL
+        self.business_type = b_type
+        if "dashboard_page" in self._pages:
+            self._pages["dashboard_page"].business_type = b_type
         if role == "bertolini_master":
             self.open_workspace("master_monitoring") # Abre direto na central mestre
         else:
             self.portal_page.refresh_ui(b_type)
-            self.dashboard_page.business_type = b_type
             self.pages.setCurrentWidget(self.portal_page)
         self.toolbar.hide()
 
+    def page(self, name):
+        """Página do registro, importada e montada na primeira vez que é pedida."""
+        widget = self._pages.get(name)
+        if widget is None:
+            self.wait_api_ready()
+            self.client  # registra a URL da janela como padrão antes de qualquer tela pedir get_api_client()
+            module, cls_name, factory = PAGE_REGISTRY[name]
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                cls = getattr(importlib.import_module(module), cls_name)
+                widget = factory(cls, self) if factory else cls(bus=self.bus)
+            finally:
+                QApplication.restoreOverrideCursor()
+            self._pages[name] = widget
+            self.pages.addWidget(widget)
+        return widget
+
+    @property
+    def client(self):
+        # httpx só é importado quando a primeira tela precisa da API (fora do caminho até o login)
+        from app.clients.api_client import get_api_client
+
+        return get_api_client(self.api_base_url)
+
+    def show_page(self, name):
+        self.pages.setCurrentWidget(self.page(name))
+
+    def wait_api_ready(self):
+        """As páginas carregam dados da API ao montar: espera o /health do servidor local (uma vez só)."""
+        if self.api_ready is None or self.api_ready.is_set():
+            return
+        print("⏳ Aguardando servidor local...")
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        try:
+            deadline = time.monotonic() + API_READY_TIMEOUT_S
+            # a tela continua respondendo enquanto o uvicorn termina de subir
+            while not self.api_ready.wait(0.05) and time.monotonic() < deadline:
+                QApplication.processEvents()
+        finally:
+            QApplication.restoreOverrideCursor()
+        if not self.api_ready.is_set():
+            print(f"⚠️ Servidor local não respondeu em {API_READY_TIMEOUT_S:.0f}s; seguindo sem ele.")
+        self.api_ready = None  # não espera de novo
+
     def open_workspace(self, code):
         """O Cérebro da Navegação - Configura a Toolbar e abre a página certa"""
         self.toolbar.show(); self.toolbar.clear()
@@ -496,63 +505,63 @@ class MainWindow(QMainWindow):
 
         # --- SEÇÃO MASTER (NAVEGAÇÃO NO TOPO) ---
         if self.current_role == "bertolini_master":
-            self.add_nav("stock_icon.png", "Monitoramento Nuvem", lambda: self.pages.setCurrentWidget(self.monitoring_page))
-            self.add_nav("users.png", "Gestão Master", lambda: self.pages.setCurrentWidget(self.master_page))
-            if code == "master_monitoring": self.pages.setCurrentWidget(self.monitoring_page)
+            self.add_nav("stock_icon.png", "Monitoramento Nuvem", lambda: self.show_page("monitoring_page"))
+            self.add_nav("users.png", "Gestão Master", lambda: self.show_page("master_page"))
+            if code == "master_monitoring": self.show_page("monitoring_page")
 
         # --- MÓDULOS OPERACIONAIS ---
         if code == "vendas":
-            self.add_nav("pos.png", "Frente de Caixa", lambda: self.pages.setCurrentWidget(self.pos_page))
-            self.add_nav("inventory.png", "Histórico de Vendas", lambda: self.pages.setCurrentWidget(self.history_page))
+            self.add_nav("pos.png", "Frente de Caixa", lambda: self.show_page("pos_page"))
+            self.add_nav("inventory.png", "Histórico de Vendas", lambda: self.show_page("history_page"))
             self.add_nav("users.png", "Clientes", self.open_customers_window) 
-            self.pages.setCurrentWidget(self.pos_page)
+            self.show_page("pos_page")
         
         elif code == "oficina": 
-            self.add_nav("os_icon.png", "Nova O.S.", lambda: self.pages.setCurrentWidget(self.os_page))
-            self.add_nav("inventory.png", "Consultar O.S.", lambda: self.pages.setCurrentWidget(self.os_page))
-            self.pages.setCurrentWidget(self.os_page)
+            self.add_nav("os_icon.png", "Nova O.S.", lambda: self.show_page("os_page"))
+            self.add_nav("inventory.png", "Consultar O.S.", lambda: self.show_page("os_page"))
+            self.show_page("os_page")
 
         elif code == "fiscal":
-            self.add_nav("pos.png", "Painel NFe", lambda: self.pages.setCurrentWidget(self.fiscal_page))
-            self.pages.setCurrentWidget(self.fiscal_page)
+            self.add_nav("pos.png", "Painel NFe", lambda: self.show_page("fiscal_page"))
+            self.show_page("fiscal_page")
         
         elif code == "financeiro":
-            self.add_nav("finance_icon.png", "Fluxo de Caixa", lambda: self.pages.setCurrentWidget(self.finance_page))
+            self.add_nav("finance_icon.png", "Fluxo de Caixa", lambda: self.show_page("finance_page"))
             self.add_nav("inventory.png", "DRE Gerencial", self.open_dre_tab)
-            self.pages.setCurrentWidget(self.finance_page)
+            self.show_page("finance_page")
         
         elif code == "estoque":
-            self.add_nav("stock_icon.png", "Visão Geral", lambda: self.pages.setCurrentWidget(self.inventory_page))
-            self.add_nav("inventory.png", "Produtos", lambda: self.pages.setCurrentWidget(self.products_page))
-            self.add_nav("users.png", "Fornecedores", lambda: self.pages.setCurrentWidget(self.suppliers_page))
-            self.pages.setCurrentWidget(self.inventory_page)
+            self.add_nav("stock_icon.png", "Visão Geral", lambda: self.show_page("inventory_page"))
+            self.add_nav("inventory.png", "Produtos", lambda: self.show_page("products_page"))
+            self.add_nav("users.png", "Fornecedores", lambda: self.show_page("suppliers_page"))
+            self.show_page("inventory_page")
             
         elif code == "frotas":
-            self.add_nav("shipping_icon.png", "Gestão de Frotas", lambda: self.pages.setCurrentWidget(self.fleet_page))
-            self.pages.setCurrentWidget(self.fleet_page)
+            self.add_nav("shipping_icon.png", "Gestão de Frotas", lambda: self.show_page("fleet_page"))
+            self.show_page("fleet_page")
 
         elif code == "rh":
-            self.add_nav("users.png", "Recursos Humanos", lambda: self.pages.setCurrentWidget(self.hr_page))
-            self.pages.setCurrentWidget(self.hr_page)
+            self.add_nav("users.png", "Recursos Humanos", lambda: self.show_page("hr_page"))
+            self.show_page("hr_page")
 
         elif code == "crm":
-            self.add_nav("users.png", "Agenda & CRM", lambda: self.pages.setCurrentWidget(self.crm_page))
-            self.pages.setCurrentWidget(self.crm_page)
+            self.add_nav("users.png", "Agenda & CRM", lambda: self.show_page("crm_page"))
+            self.show_page("crm_page")
 
         elif code == "producao":
-            self.add_nav("stock_icon.png", "Indústria 4.0", lambda: self.pages.setCurrentWidget(self.production_page))
-            self.pages.setCurrentWidget(self.production_page)
+            self.add_nav("stock_icon.png", "Indústria 4.0", lambda: self.show_page("production_page"))
+            self.show_page("production_page")
 
         elif code == "qualidade":
-            self.add_nav("users.png", "Laboratório LIMS", lambda: self.pages.setCurrentWidget(self.quality_page))
-            self.pages.setCurrentWidget(self.quality_page)
+            self.add_nav("users.png", "Laboratório LIMS", lambda: self.show_page("quality_page"))
+            self.show_page("quality_page")
             
         # --- CORREÇÃO DO ADDSTRETCH ---
         spacer = QWidget()
         spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Preferred)
         self.toolbar.addWidget(spacer)
 
-        self.add_nav("settings.png", "Opções (F9)", lambda: self.pages.setCurrentWidget(self.settings_page))
+        self.add_nav("settings.png", "Opções (F9)", lambda: self.show_page("settings_page"))
 
     def add_nav(self, icon_name, label, callback):
         act = QAction(get_icon(icon_name), label, self)
@@ -565,12 +574,24 @@ class MainWindow(QMainWindow):
         self.toolbar.hide(); self.pages.setCurrentWidget(self.login_page)
 
     def open_customers_window(self):
+        from app.ui.customers_window import CustomersWindow
+
+        self.wait_api_ready()
         self.customers_win = CustomersWindow(self.api_base_url)
         self.customers_win.show()
 
     def open_dre_tab(self):
-        self.pages.setCurrentWidget(self.finance_page)
-        self.finance_page.tabs.setCurrentIndex(2)
+        self.show_page("finance_page")
+        self.page("finance_page").tabs.setCurrentIndex(2)
+
+    def apply_saved_theme(self):
+        """Tema escuro salvo em settings.json (antes aplicado pela tela de configurações ao montar)."""
+        try:
+            with open("settings.json", "r", encoding="utf-8") as f:
+                if json.load(f).get("dark_mode", False):
+                    self.apply_theme(True)
+        except (OSError, ValueError):
+            pass
 
     def apply_theme(self, dark_enabled):
         """Aplica o tema escuro ou claro dinamicamente."""
@@ -580,10 +601,19 @@ class MainWindow(QMainWindow):
             QApplication.instance().setStyleSheet("")
 
     def background_cloud_sync(self):
-        """Simula a pulsação de sincronização com a nuvem"""
+        """Pulsação de sincronização com a nuvem (envio incremental do log de alterações)"""
         if self.current_role == "bertolini_master":
             # Master apenas monitora a recepção
             print("📡 [MASTER] Monitorando tráfego de dados regional...")
-        else:
-            # Clientes enviam dados
-            print("☁️ [CLIENTE] Sincronizando metadados com Bertolini Cloud...")
\ No newline at end of file
+        elif self.current_role and settings.cloud_sync_enabled:
+            # Clientes enviam só o que mudou desde o último lote confirmado (só com hub e token configurados)
+            engine = getattr(self, "_cloud_sync", None)
+            if engine is not None and engine.isRunning():
+                return
+            from app.utils.cloud_sync import CloudSyncEngine
+
+            self._cloud_sync = CloudSyncEngine()
+            self._cloud_sync.sync_finished.connect(
+                lambda ok, msg: None if ok else print(f"☁️ [CLIENTE] {msg}")
+            )
+            self._cloud_sync.start()
\ No newline at end of file
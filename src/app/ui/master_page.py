@@ -1,5 +1,3 @@
-import sqlite3
-import requests
 import uuid
 from datetime import datetime, timedelta
 from PySide6.QtWidgets import (
@@ -10,6 +8,8 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QColor, QCursor
 
+from app.core.local_db import local_db
+
 class MasterDashboardPage(QWidget):
     def __init__(self, main_window):
         super().__init__()
@@ -63,20 +63,7 @@ class MasterDashboardPage(QWidget):
     def load_clients(self):
         self.table.setRowCount(0)
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS clients (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    razao_social TEXT, nome_fantasia TEXT, cnpj TEXT, ie TEXT, im TEXT,
-                    cep TEXT, endereco TEXT, numero TEXT, bairro TEXT, cidade TEXT, uf TEXT,
-                    telefone TEXT, email TEXT, login TEXT, password TEXT, 
-                    business_type TEXT, expiry_date TEXT, license_key TEXT, status TEXT DEFAULT 'Ativo'
-                )
-            """)
-            cursor.execute("SELECT id, razao_social, cnpj, login, business_type, expiry_date, status, license_key FROM clients")
-            rows = cursor.fetchall()
-            conn.close()
+            rows = local_db.query("SELECT id, razao_social, cnpj, login, business_type, expiry_date, status, license_key FROM clients")
 
             for idx, row in enumerate(rows):
                 self.table.insertRow(idx)
@@ -102,10 +89,8 @@ class MasterDashboardPage(QWidget):
 
     def toggle_status(self, uid, current):
         new_s = "Bloqueado" if current == "Ativo" else "Ativo"
-        conn = sqlite3.connect("test.db")
-        cursor = conn.cursor()
-        cursor.execute("UPDATE clients SET status = ? WHERE id = ?", (new_s, uid))
-        conn.commit(); conn.close(); self.load_clients()
+        local_db.execute("UPDATE clients SET status = ? WHERE id = ?", (new_s, uid))
+        self.load_clients()
 
     def open_dialog(self, client_id=None):
         dlg = RegisterDialog(client_id, self)
@@ -164,6 +149,7 @@ class RegisterDialog(QDialog):
     def fetch_cnpj(self):
         cnpj = self.inp_search.text().strip().replace(".","").replace("-","").replace("/","")
         try:
+            import requests
             r = requests.get(f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}", timeout=5)
             if r.status_code == 200:
                 d = r.json()
@@ -181,6 +167,7 @@ class RegisterDialog(QDialog):
     def fetch_cep(self):
         cep = self.f["cep"].text().strip().replace("-","")
         try:
+            import requests
             r = requests.get(f"https://brasilapi.com.br/api/cep/v1/{cep}")
             if r.status_code == 200:
                 d = r.json()
@@ -192,11 +179,7 @@ class RegisterDialog(QDialog):
 
     def load_data(self):
         """Busca os dados do cliente para preencher os campos na edição"""
-        conn = sqlite3.connect("test.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM clients WHERE id=?", (self.client_id,))
-        c = cursor.fetchone()
-        conn.close()
+        c = local_db.query_one("SELECT * FROM clients WHERE id=?", (self.client_id,))
         if c:
             # Mapeia as colunas do banco para os seus campos de texto (f["key"])
             # Ordem no banco: 0:id, 1:razao, 2:fantasia, 3:cnpj... 14:user, 15:pwd
@@ -212,11 +195,8 @@ class RegisterDialog(QDialog):
         dados = [self.f[k].text() for k in ["razao", "cnpj", "cep", "end", "user", "pwd"]]
         perfil = self.combo_perfil.currentText()
         
-        conn = sqlite3.connect("test.db")
-        cursor = conn.cursor()
-        
         if self.client_id: # MODO EDIÇÃO
-            cursor.execute("""
+            local_db.execute("""
                 UPDATE clients SET razao_social=?, cnpj=?, cep=?, endereco=?, login=?, password=?, business_type=? 
                 WHERE id=?
             """, (*dados, perfil, self.client_id))
@@ -224,13 +204,11 @@ class RegisterDialog(QDialog):
         else: # MODO NOVO CADASTRO
             exp = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
             lic = str(uuid.uuid4()).upper()[:16]
-            cursor.execute("""
+            local_db.execute("""
                 INSERT INTO clients (razao_social, cnpj, cep, endereco, login, password, business_type, expiry_date, license_key)
                 VALUES (?,?,?,?,?,?,?,?,?)
             """, (*dados, perfil, exp, lic))
             msg = f"Licença Ativada! Chave: {lic}"
-            
-        conn.commit()
-        conn.close()
+
         QMessageBox.information(self, "Sucesso", msg)
         self.accept()
\ No newline at end of file
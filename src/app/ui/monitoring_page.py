@@ -1,4 +1,3 @@
-import sqlite3
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableWidget, 
     QTableWidgetItem, QHeaderView, QFrame, QProgressBar, QTextEdit
@@ -6,36 +5,52 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Qt, QTimer, QDateTime
 from PySide6.QtGui import QColor, QIcon
 
+from app.clients.api_client import get_api_client
+from app.core.config import settings
+from app.ui.tasks import EventStream
+
+# Unidade sem pulso há mais que isso aparece como OFFLINE (o cliente pulsa a cada 30s)
+ONLINE_WINDOW_S = 90
+EVENTS_PATH = "/api/sync/events"
+
 class MonitoringPage(QWidget):
-    def __init__(self, bus=None):
+    """
+    Painel Master alimentado por push: assina o fluxo SSE do hub (snapshot ao conectar, depois só as
+    lojas que pulsaram) e mexe apenas nas linhas que mudaram. Sem evento, nem banco nem tela trabalham.
+    """
+    def __init__(self, bus=None, api_base_url: str | None = None):
         super().__init__()
         self.bus = bus
-        self.check_database() # Garante que a estrutura exista
+        self.api_base_url = api_base_url or get_api_client().base_url
         self.init_ui()
-        
-        # Timer para verificar atualizações reais em tempo real
-        self.refresh_timer = QTimer(self)
-        self.refresh_timer.timeout.connect(self.update_live_data)
-        self.refresh_timer.start(5000) # Atualiza a cada 5 segundos
-
-    def check_database(self):
-        """Garante que a estrutura de vendas exista para evitar erros de SQL"""
-        try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS sales (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    total_value REAL,
-                    payment_method TEXT,
-                    items TEXT,
-                    timestamp TEXT
-                )
-            """)
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Erro ao inicializar banco master: {e}")
+        self._units: dict[str, dict] = {}     # unit_id -> último estado recebido
+        self._rows: dict[str, int] = {}       # unit_id -> linha da tabela
+        self.stream: EventStream | None = None
+
+        # ONLINE/OFFLINE depende do relógio, não de evento: reavalia em memória, sem consulta
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self._refresh_status)
+        self.status_timer.start(15000)
+
+    # --- assinatura só enquanto a tela está visível ---
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.stream is None:
+            # fluxo do hub exige o token de leitura do painel (HUB_MONITOR_TOKEN)
+            headers = {"Authorization": f"Bearer {settings.hub_monitor_token}"} if settings.hub_monitor_token else None
+            self.stream = EventStream(self.api_base_url, EVENTS_PATH, self, headers=headers)
+            self.stream.received.connect(self._on_event)
+            self.stream.connected.connect(self._on_connection)
+            self.stream.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.stop_stream()
+
+    def stop_stream(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -103,59 +118,70 @@ class MonitoringPage(QWidget):
         
         layout.addLayout(log_group)
 
-    def update_live_data(self):
-        """Busca faturamento real e popula tabela de unidades dinamicamente"""
-        try:
-            # 1. Conexão com o Banco Master
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            
-            # 2. Soma faturamento global real das unidades
-            cursor.execute("SELECT SUM(total_value) FROM sales")
-            res_total = cursor.fetchone()[0]
-            total_global = res_total if res_total else 0.0
-            self.lbl_total_sales.setText(f"Vendas Totais (Nuvem)\nR$ {total_global:,.2f}")
-            
-            # 3. Busca unidades únicas que já enviaram dados (Baseado no ID que criamos no server)
-            # Filtramos por payment_method que contenha 'SYNC_FROM_'
-            cursor.execute("""
-                SELECT 
-                    payment_method, 
-                    MAX(timestamp), 
-                    SUM(total_value) 
-                FROM sales 
-                WHERE payment_method LIKE 'SYNC_FROM_%'
-                GROUP BY payment_method
-            """)
-            unidades_reais = cursor.fetchall()
-            
+    def _on_connection(self, ok: bool):
+        if ok:
+            self.lbl_status.setText("● SISTEMA ONLINE")
+            self.lbl_status.setStyleSheet("color: #2ecc71; font-weight: bold;")
+        else:
+            self.lbl_status.setText("● HUB INDISPONÍVEL - RECONECTANDO")
+            self.lbl_status.setStyleSheet("color: #e67e22; font-weight: bold;")
+            self.log_event("ALERTA DE SISTEMA: Conexão com o hub perdida, tentando novamente...")
+
+    def _on_event(self, event: str, data: dict):
+        if event == "snapshot":
             self.table_units.setRowCount(0)
-            self.lbl_active_users.setText(f"Unidades Conectadas: {len(unidades_reais)}")
-            
-            for method, last_sync, unit_total in unidades_reais:
-                unit_id = method.replace("SYNC_FROM_", "")
-                row = self.table_units.rowCount()
-                self.table_units.insertRow(row)
-                
-                # Preenche a tabela com dados reais vindos da nuvem
-                self.table_units.setItem(row, 0, QTableWidgetItem(unit_id))
-                self.table_units.setItem(row, 1, QTableWidgetItem(last_sync))
-                
-                status_item = QTableWidgetItem("ONLINE")
-                status_item.setForeground(QColor("#27ae60")) # Verde se recebeu dados
-                self.table_units.setItem(row, 2, status_item)
-                
-                self.table_units.setItem(row, 3, QTableWidgetItem(f"R$ {unit_total:,.2f}"))
-            
-            # 4. Gera log de pulsação (Apenas se houver nova atividade ou para manter o pulso)
-            if len(unidades_reais) > 0:
-                self.log_event("Sincronização de pacotes recebida com sucesso.")
-            else:
-                self.log_event("Escutando tráfego de dados regional...")
-            
-            conn.close()
-        except Exception as e:
-            self.log_event(f"ALERTA DE SISTEMA: Falha crítica na leitura SQL -> {str(e)}")
+            self._units.clear()
+            self._rows.clear()
+            for unit in data["units"]:
+                self._apply_unit(unit)
+            self._apply_network(data.get("network"))
+            self._refresh_status()
+            self.log_event(f"Escutando tráfego de dados regional ({len(self._units)} unidades).")
+        elif event == "telemetry":
+            for unit in data["units"]:
+                self._apply_unit(unit)
+            self._apply_network(data.get("network"))
+            self._refresh_status()
+            nomes = ", ".join(u["unit_id"] for u in data["units"][:5])
+            extra = f" +{len(data['units']) - 5}" if len(data["units"]) > 5 else ""
+            self.log_event(f"Pulso recebido: {nomes}{extra}")
+        elif event == "changes":
+            self.log_event(f"Unidade {data['unit_id']}: {data['applied']} alteração(ões) sincronizada(s).")
+
+    def _apply_unit(self, unit: dict):
+        """Atualiza (ou cria) só a linha da unidade."""
+        unit_id = unit["unit_id"]
+        row = self._rows.get(unit_id)
+        if row is None:
+            row = self._rows[unit_id] = self.table_units.rowCount()
+            self.table_units.insertRow(row)
+            self.table_units.setItem(row, 0, QTableWidgetItem(unit_id))
+            self.table_units.setItem(row, 2, QTableWidgetItem())
+        self._units[unit_id] = unit
+
+        # Preenche a tabela com dados reais vindos da nuvem
+        last_sync = unit["last_received_at"] or ""
+        self.table_units.setItem(row, 1, QTableWidgetItem(last_sync[:19].replace("T", " ")))
+        self.table_units.setItem(row, 3, QTableWidgetItem(f"R$ {unit['total_sales'] or 0:,.2f}"))
+
+    def _apply_network(self, network: dict | None):
+        total_global = network["total_sales"] if network else 0.0
+        self.lbl_total_sales.setText(f"Vendas Totais (Nuvem)\nR$ {total_global:,.2f}")
+
+    def _refresh_status(self):
+        """ONLINE se pulsou dentro da janela; só troca o item quando o estado muda."""
+        limite = QDateTime.currentDateTime().addSecs(-ONLINE_WINDOW_S)
+        online = 0
+        for unit_id, unit in self._units.items():
+            visto = QDateTime.fromString((unit["last_received_at"] or "")[:19], Qt.ISODate)
+            ativo = visto.isValid() and visto >= limite
+            online += ativo
+            item = self.table_units.item(self._rows[unit_id], 2)
+            texto = "ONLINE" if ativo else "OFFLINE"
+            if item.text() != texto:
+                item.setText(texto)
+                item.setForeground(QColor("#27ae60" if ativo else "#c0392b"))  # verde se pulsou há pouco
+        self.lbl_active_users.setText(f"Unidades Conectadas: {online} de {len(self._units)}")
 
     def log_event(self, message):
         """Função para o sistema enviar logs externos para esta tela"""
@@ -11,7 +11,6 @@ from app.core.auth import current_session
 from app.utils.audit_logger import AuditLogger
 
 # Motores de Inteligência
-from app.utils.pdf_generator import gerar_pdf_os 
 from app.utils.finance_engine import FinanceEngine
 from app.utils.quality_engine import QualityEngine # Novo: Motor de Laboratório
 
@@ -137,6 +136,7 @@ class OrdersPage(QWidget):
             valor_total = self.table.item(row_index, 3).text()
             empresa = {"razao_social": "BERTOLINI ERP", "cnpj": "00.000.000/0001-00", "telefone": "(16) 9999-9999"}
             itens = [{"nome": "Item B2B", "qtd": 1, "preco": float(valor_total.replace("R$ ","").replace(".","").replace(",","."))}]
+            from app.utils.pdf_generator import gerar_pdf_os  # reportlab só quando gera o PDF
             path = gerar_pdf_os(empresa, {"nome": cliente_nome}, itens)
             if path: os.startfile(os.path.abspath(path))
         except Exception as e: QMessageBox.critical(self, "Erro PDF", str(e))
@@ -5,7 +5,6 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 # Mantendo sua importação de PDF caso queira usar depois
-from app.utils.pdf_generator import gerar_pdf_os
 import os
 
 class OSPage(QWidget):
@@ -124,6 +123,7 @@ class OSPage(QWidget):
         }
 
         try:
+            from app.utils.pdf_generator import gerar_pdf_os  # reportlab só quando gera o PDF
             arquivo = gerar_pdf_os(dados)
             os.startfile(arquivo) 
         except Exception as e:
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -16,13 +16,16 @@ from PySide6.QtWidgets import (
     QHeaderView,
 )
 
-from app.clients.api_client import ApiClient
+from app.clients.api_client import get_api_client
+from app.clients.catalog_cache import catalog_cache
+from app.ui.table_models import ProductTableModel, make_table_view, selected_source_row
+from app.ui.tasks import COALESCE, TaskRunner
 
 
 class PosPage(QWidget):
     """
     PDV/CAIXA (Opção B):
-    - Busca por nome/SKU
+    - Busca por nome/SKU no servidor (debounce + thread), SKU/código de barras exato primeiro
     - Enter no campo busca adiciona o item selecionado (ou o primeiro da lista)
     - Duplo clique na lista adiciona
     - Carrinho com edição de quantidade (duplo clique), remover por botão X, total de itens
@@ -32,18 +35,27 @@ class PosPage(QWidget):
 
     def __init__(self, api_base_url: str, bus=None):
         super().__init__()
-        self.client = ApiClient(api_base_url)
+        self.client = get_api_client(api_base_url)
         self.bus = bus
 
-        # dados em memória
-        self.all_products: list[dict] = []
+        # dados em memória (só o resultado da busca atual, não o catálogo inteiro)
         self.filtered_products: list[dict] = []
+        self.search_limit = 50
+        self._enter_pending = False   # Enter chegou antes do resultado (leitor de código de barras)
+        # API fora da thread da UI; busca nova descarta a anterior (só a mais recente é desenhada)
+        self.tasks = TaskRunner(self)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.run_search)
         self.cart: list[dict] = []  # {product_id, name, qty}
 
         # eventos (atualização)
         if self.bus:
             self.bus.products_changed.connect(self.reload_products)
-            self.bus.stock_changed.connect(self.reload_products)
+            # estoque de um produto mudou: atualiza só aquela linha
+            self.bus.stock_updated.connect(self.on_stock_updated)
 
         root = QHBoxLayout(self)
         root.setContentsMargins(10, 10, 10, 10)
@@ -58,7 +70,7 @@ class PosPage(QWidget):
         left.addWidget(QLabel("Buscar produto:"))
         self.search = QLineEdit()
         self.search.setPlaceholderText("Digite nome ou SKU... (Enter = adicionar)")
-        self.search.textChanged.connect(self.apply_filter)
+        self.search.textChanged.connect(lambda _text: self.search_timer.start())
         self.search.returnPressed.connect(self.add_best_match_to_cart)  # ENTER = adicionar
         left.addWidget(self.search)
 
@@ -72,18 +84,9 @@ class PosPage(QWidget):
         row_qty.addStretch(1)
         left.addLayout(row_qty)
 
-        self.tbl_products = QTableWidget(0, 4)
-        self.tbl_products.setHorizontalHeaderLabels(["ID", "Nome", "SKU", "Estoque"])
-        self.tbl_products.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.tbl_products.setSelectionMode(QAbstractItemView.SingleSelection)
-        self.tbl_products.setEditTriggers(QAbstractItemView.NoEditTriggers)
-        self.tbl_products.setAlternatingRowColors(True)
-        self.tbl_products.setSortingEnabled(False)
-        self.tbl_products.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)  # Nome estica
-        self.tbl_products.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
-        self.tbl_products.horizontalHeader().setSectionResizeMode(3, QHeaderView.ResizeToContents)
-        self.tbl_products.verticalHeader().setVisible(False)
-        self.tbl_products.cellDoubleClicked.connect(self.add_selected_to_cart)
+        self.products_model = ProductTableModel(parent=self)
+        self.tbl_products = make_table_view(self.products_model, stretch_column=1)  # Nome estica
+        self.tbl_products.doubleClicked.connect(self.add_selected_to_cart)
         left.addWidget(self.tbl_products, 1)
 
         btn_add = QPushButton("Adicionar ao carrinho (Enter)")
@@ -128,9 +131,9 @@ class PosPage(QWidget):
         row_actions.addWidget(btn_clear)
         right.addLayout(row_actions)
 
-        btn_finalize = QPushButton("Finalizar venda")
-        btn_finalize.clicked.connect(self.finalize_sale)
-        right.addWidget(btn_finalize)
+        self.btn_finalize = QPushButton("Finalizar venda")
+        self.btn_finalize.clicked.connect(self.finalize_sale)
+        right.addWidget(self.btn_finalize)
 
         root.addLayout(left, 2)
         root.addLayout(right, 1)
@@ -144,55 +147,65 @@ class PosPage(QWidget):
     # Produtos
     # =========================
     def reload_products(self):
-        """Recarrega produtos da API e reaplica filtro atual."""
-        try:
-            self.all_products = self.client.list_products()
-            self.apply_filter()
-        except Exception:
-            # não estoura UI se API estiver inicializando / sem conexão
-            return
-
-    def apply_filter(self):
-        q = (self.search.text() or "").strip().lower()
-
-        if not q:
-            self.filtered_products = list(self.all_products)
-        else:
-            out: list[dict] = []
-            for p in self.all_products:
-                name = (p.get("name") or "").lower()
-                sku = (p.get("sku") or "").lower()
-                if q in name or (sku and q in sku):
-                    out.append(p)
-            self.filtered_products = out
-
-        self.tbl_products.setRowCount(0)
-        for p in self.filtered_products:
-            row = self.tbl_products.rowCount()
-            self.tbl_products.insertRow(row)
-            self.tbl_products.setItem(row, 0, QTableWidgetItem(str(p["id"])))
-            self.tbl_products.setItem(row, 1, QTableWidgetItem(p.get("name") or ""))
-            self.tbl_products.setItem(row, 2, QTableWidgetItem(p.get("sku") or ""))
-            self.tbl_products.setItem(row, 3, QTableWidgetItem(str(p.get("stock_qty", 0))))
-
-        self.tbl_products.resizeColumnsToContents()
+        """Refaz a busca atual (produtos/estoque mudaram)."""
+        self.search_timer.stop()
+        self.run_search()
+
+    def run_search(self):
+        query = (self.search.text() or "").strip()
+        self.tasks.run(
+            "search", self.client.search_products, query, limit=self.search_limit,
+            on_result=self._on_search_results, on_error=self._on_search_failed,
+        )
+
+    def _search_pending(self) -> bool:
+        return self.search_timer.isActive() or self.tasks.is_running("search")
+
+    def _on_search_results(self, products: list):
+        self.apply_filter(products)
+        if self._enter_pending:
+            self._enter_pending = False
+            self.add_best_match_to_cart()
+
+    def _on_search_failed(self, _error):
+        # não estoura UI se API estiver inicializando / sem conexão
+        self._enter_pending = False
+
+    def apply_filter(self, products: list[dict] | None = None):
+        """Desenha o resultado da busca (a filtragem agora é feita no servidor)."""
+        if products is not None:
+            self.filtered_products = products
+            self.products_model.set_rows(products)
 
         # seleciona a primeira linha automaticamente (boa UX pro Enter)
-        if self.tbl_products.rowCount() > 0 and self.tbl_products.currentRow() < 0:
+        if self.products_model.rowCount() > 0:
             self.tbl_products.selectRow(0)
 
+    def on_stock_updated(self, product_id: int):
+        """Outra tela mexeu no estoque de um produto: busca só ele e atualiza a linha."""
+        if self.products_model.get(product_id) is None:
+            return
+        # vários avisos do mesmo produto em sequência viram uma consulta só
+        self.tasks.run(
+            f"stock:{product_id}", self._fetch_product, product_id, mode=COALESCE,
+            on_result=lambda p: self.products_model.apply_stock(product_id, p.get("stock_qty", 0)),
+            on_error=lambda _e: None,
+        )
+
+    def _fetch_product(self, product_id: int) -> dict:
+        # puxa só o delta do catálogo (a venda/ajuste já subiu a row_version)
+        catalog_cache.refresh(self.client, full=False)
+        return catalog_cache.get(product_id) or self.client.get_product(product_id)
+
     def _selected_product(self) -> dict | None:
-        row = self.tbl_products.currentRow()
-        if row < 0:
+        p = self.products_model.row_data(selected_source_row(self.tbl_products))
+        if not p:
             return None
-        pid = int(self.tbl_products.item(row, 0).text())
-        name = self.tbl_products.item(row, 1).text()
-        stock_txt = self.tbl_products.item(row, 3).text()
         try:
-            stock_qty = int(stock_txt)
+            stock_qty = int(p.get("stock_qty", 0))
         except Exception:
             stock_qty = 0
-        return {"product_id": pid, "name": name, "stock_qty": stock_qty}
+        return {"product_id": int(p["id"]), "name": p.get("name") or "", "stock_qty": stock_qty}
 
     # =========================
     # Carrinho
@@ -202,9 +215,17 @@ class PosPage(QWidget):
         ENTER no campo de busca:
         - se tiver seleção na tabela, usa ela
         - senão, usa o primeiro item filtrado
+        - se a busca ainda não voltou, adiciona assim que o resultado chegar
         """
+        if self._search_pending():
+            self._enter_pending = True
+            if self.search_timer.isActive():
+                self.search_timer.stop()
+                self.run_search()
+            return
+
         sel = self._selected_product()
-        if not sel and self.tbl_products.rowCount() > 0:
+        if not sel and self.products_model.rowCount() > 0:
             self.tbl_products.selectRow(0)
             sel = self._selected_product()
         if not sel:
@@ -298,23 +319,44 @@ class PosPage(QWidget):
         if not self.cart:
             QMessageBox.information(self, "Caixa", "Carrinho vazio.")
             return
+        if self.tasks.is_running("sale"):
+            return  # duplo clique: a venda já está a caminho
+
+        items = [{"product_id": it["product_id"], "qty": int(it["qty"])} for it in self.cart]
+        self.btn_finalize.setEnabled(False)
+        self.tasks.run(
+            "sale", self.client.create_sale, items=items,
+            on_result=lambda res: self._on_sale_done(items, res),
+            on_error=self._on_sale_failed,
+        )
+
+    def _on_sale_done(self, items: list[dict], res: dict):
+        self.btn_finalize.setEnabled(True)
+        sold: dict[int, int] = {}
+        for it in items:
+            sold[it["product_id"]] = sold.get(it["product_id"], 0) + it["qty"]
 
-        try:
-            items = [{"product_id": it["product_id"], "qty": int(it["qty"])} for it in self.cart]
-            res = self.client.create_sale(items=items)
+        self.cart.clear()
+        self.render_cart()
 
-            self.cart.clear()
-            self.render_cart()
-            self.reload_products()
+        # baixa local nas linhas visíveis, sem recarregar a busca
+        for pid, qty in sold.items():
+            row = self.products_model.get(pid)
+            if row:
+                self.products_model.apply_stock(pid, int(row.get("stock_qty", 0)) - qty)
+
+        if self.bus:
+            for pid in sold:
+                self.bus.stock_updated.emit(pid)
+            # estoque mudou e relatórios/dashboard dependem disso
+            self.bus.stock_changed.emit()
 
-            if self.bus:
-                # estoque mudou e relatórios/dashboard dependem disso
-                self.bus.stock_changed.emit()
+        QMessageBox.information(self, "Venda finalizada", f"Venda #{res['id']} registrada com sucesso!")
+        self.search.setFocus()
 
-            QMessageBox.information(self, "Venda finalizada", f"Venda #{res['id']} registrada com sucesso!")
-            self.search.setFocus()
-        except Exception as e:
-            QMessageBox.critical(self, "Erro ao finalizar venda", str(e))
+    def _on_sale_failed(self, error):
+        self.btn_finalize.setEnabled(True)
+        QMessageBox.critical(self, "Erro ao finalizar venda", str(error))
 
     def on_cart_qty_changed(self, item: QTableWidgetItem):
         if item.column() != 1:
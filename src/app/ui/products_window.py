@@ -3,31 +3,39 @@ from PySide6.QtWidgets import (
     QVBoxLayout,
     QHBoxLayout,
     QPushButton,
-    QTableWidget,
-    QTableWidgetItem,
+    QLineEdit,
     QMessageBox,
-    QAbstractItemView,
     QDialog,
 )
 
-from app.clients.api_client import ApiClient
+from app.clients.api_client import get_api_client
+from app.clients.catalog_cache import catalog_cache
 from app.ui.product_dialog import ProductDialog
 from app.ui.stock_dialog import StockDialog
+from app.ui.table_models import ProductTableModel, make_filter_proxy, make_table_view, selected_source_row
 
 
 class ProductsWindow(QWidget):
     def __init__(self, api_base_url: str, bus=None):
         super().__init__()
 
-        self.client = ApiClient(api_base_url)
+        self.client = get_api_client(api_base_url)
         self.bus = bus
 
+        if self.bus:
+            self.bus.stock_updated.connect(self.on_stock_updated)
+
         layout = QVBoxLayout(self)
 
-        self.table = QTableWidget(0, 4)
-        self.table.setHorizontalHeaderLabels(["ID", "Nome", "SKU", "Estoque"])
-        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        # modelo + proxy: filtro e ordenação sem recriar células
+        self.model = ProductTableModel(parent=self)
+        self.proxy = make_filter_proxy(self.model, parent=self)
+        self.table = make_table_view(self.proxy, stretch_column=1)
+        self.table.setSortingEnabled(True)
+
+        self.filter = QLineEdit()
+        self.filter.setPlaceholderText("Filtrar por nome ou SKU...")
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
 
         actions = QHBoxLayout()
 
@@ -51,6 +59,7 @@ class ProductsWindow(QWidget):
         actions.addWidget(btn_edit)
         actions.addWidget(btn_delete)
         actions.addStretch(1)
+        actions.addWidget(self.filter)
         actions.addWidget(btn_refresh)
 
         layout.addLayout(actions)
@@ -59,57 +68,45 @@ class ProductsWindow(QWidget):
         self.load_products()
 
     def _selected_product_id(self) -> int | None:
-        row = self.table.currentRow()
-        if row < 0:
-            return None
-        return int(self.table.item(row, 0).text())
+        p = self.model.row_data(selected_source_row(self.table))
+        return int(p["id"]) if p else None
 
     def _selected_product(self) -> dict | None:
-        row = self.table.currentRow()
-        if row < 0:
+        p = self.model.row_data(selected_source_row(self.table))
+        if not p:
             return None
 
-        product_id = int(self.table.item(row, 0).text())
-        name = self.table.item(row, 1).text()
-        sku = self.table.item(row, 2).text() or None
-
-        stock_txt = self.table.item(row, 3).text() if self.table.columnCount() > 3 else "0"
         try:
-            stock_qty = int(stock_txt)
+            stock_qty = int(p.get("stock_qty", 0))
         except Exception:
             stock_qty = 0
 
         return {
-            "id": product_id,
-            "name": name,
-            "sku": sku,
+            "id": int(p["id"]),
+            "name": p["name"],
+            "sku": p.get("sku") or None,
             "stock_qty": stock_qty,
         }
 
-    def _row_data(self, row: int) -> dict:
-        return {
-            "id": int(self.table.item(row, 0).text()),
-            "name": self.table.item(row, 1).text(),
-            "sku": self.table.item(row, 2).text() or None,
-        }
-
     def load_products(self):
         try:
-            products = self.client.list_products()
-            self.table.setRowCount(0)
-
-            for p in products:
-                row = self.table.rowCount()
-                self.table.insertRow(row)
-                self.table.setItem(row, 0, QTableWidgetItem(str(p["id"])))
-                self.table.setItem(row, 1, QTableWidgetItem(p["name"]))
-                self.table.setItem(row, 2, QTableWidgetItem(p.get("sku") or ""))
-                self.table.setItem(row, 3, QTableWidgetItem(str(p.get("stock_qty", 0))))
-
-            self.table.resizeColumnsToContents()
+            # cache compartilhado: depois da 1ª carga só o delta vem da API
+            self.model.set_rows(catalog_cache.products(self.client))
         except Exception as e:
             QMessageBox.critical(self, "Erro", str(e))
 
+    def on_stock_updated(self, product_id: int):
+        """Venda/ajuste em outra tela: atualiza só a linha do produto."""
+        if self.model.get(product_id) is None:
+            return
+        try:
+            # puxa só o delta do catálogo (a venda/ajuste já subiu a row_version)
+            catalog_cache.refresh(self.client, full=False)
+            p = catalog_cache.get(product_id) or self.client.get_product(product_id)
+            self.model.apply_stock(product_id, p.get("stock_qty", 0))
+        except Exception:
+            return
+
     def create_new(self):
         dlg = ProductDialog(self, title="Novo produto")
         if dlg.exec() != QDialog.Accepted:
@@ -128,12 +125,11 @@ class ProductsWindow(QWidget):
             QMessageBox.critical(self, "Erro", str(e))
 
     def edit_selected(self):
-        row = self.table.currentRow()
-        if row < 0:
+        data = self._selected_product()
+        if not data:
             QMessageBox.warning(self, "Atenção", "Selecione um produto.")
             return
 
-        data = self._row_data(row)
         dlg = ProductDialog(
             self,
             title=f"Editar produto #{data['id']}",
@@ -188,16 +184,16 @@ class ProductsWindow(QWidget):
         delta, reason = dlg.values()
 
         try:
-            self.client.adjust_stock(
+            res = self.client.adjust_stock(
                 product_id=data["id"],
                 delta=delta,
                 reason=reason,
             )
-            self.load_products()
+            self.model.apply_stock(data["id"], res.get("stock_qty", data["stock_qty"] + delta))
 
             if self.bus:
+                self.bus.stock_updated.emit(data["id"])
                 self.bus.stock_changed.emit()
-                self.bus.products_changed.emit()
 
         except Exception as e:
             QMessageBox.critical(self, "Erro", str(e))
@@ -4,7 +4,7 @@ from PySide6.QtWidgets import (
     QHeaderView, QFrame, QGroupBox
 )
 from PySide6.QtCore import Qt
-import xml.etree.ElementTree as ET # Biblioteca para ler o XML da nota
+from app.utils.nfe_parser import NFeParser # Leitura do XML da nota em streaming
 
 class PurchasesPage(QWidget):
     def __init__(self, bus=None):
@@ -66,35 +66,21 @@ class PurchasesPage(QWidget):
         if not file_path: return
 
         try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
-            
-            # O XML da NFe usa "namespaces", precisamos lidar com isso
-            ns = {'nfe': 'http://www.portalfiscal.inf.br/nfe'}
+            nota = NFeParser.parse(file_path)
+            self.xml_data = nota
 
-            # 1. Extrair Fornecedor (emit)
-            emit = root.find('.//nfe:emit', ns)
-            nome_fantasia = emit.find('nfe:xFant', ns).text if emit.find('nfe:xFant', ns) is not None else emit.find('nfe:xNome', ns).text
-            cnpj = emit.find('nfe:CNPJ', ns).text
-            self.lbl_sup_info.setText(f"Fornecedor: {nome_fantasia}\nCNPJ: {cnpj}")
+            # 1. Fornecedor (emit)
+            self.lbl_sup_info.setText(f"Fornecedor: {nota['fornecedor']}\nCNPJ: {nota['cnpj']}")
             self.group_supplier.show()
 
-            # 2. Extrair Itens (det)
-            self.table_items.setRowCount(0)
-            items = root.findall('.//nfe:det', ns)
-            for det in items:
-                prod = det.find('nfe:prod', ns)
-                sku = prod.find('nfe:cProd', ns).text
-                nome = prod.find('nfe:xProd', ns).text
-                qtd = prod.find('nfe:qCom', ns).text
-                v_unit = prod.find('nfe:vUnCom', ns).text
-
-                row = self.table_items.rowCount()
-                self.table_items.insertRow(row)
-                self.table_items.setItem(row, 0, QTableWidgetItem(sku))
-                self.table_items.setItem(row, 1, QTableWidgetItem(nome))
-                self.table_items.setItem(row, 2, QTableWidgetItem(str(float(qtd))))
-                self.table_items.setItem(row, 3, QTableWidgetItem(f"R$ {float(v_unit):.2f}"))
+            # 2. Itens (det)
+            itens = nota["itens"]
+            self.table_items.setRowCount(len(itens))
+            for row, it in enumerate(itens):
+                self.table_items.setItem(row, 0, QTableWidgetItem(it["sku"]))
+                self.table_items.setItem(row, 1, QTableWidgetItem(it["name"]))
+                self.table_items.setItem(row, 2, QTableWidgetItem(str(it["qty"])))
+                self.table_items.setItem(row, 3, QTableWidgetItem(f"R$ {it['unit_cost']:.2f}"))
 
             self.table_items.show()
             self.lbl_items.show()
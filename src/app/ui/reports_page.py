@@ -1,18 +1,22 @@
+import asyncio
 from datetime import date, timedelta
 
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QDateEdit, QTableWidget, QTableWidgetItem, QMessageBox
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QDateEdit, QTableWidget, QTableWidgetItem, QMessageBox,
+    QFileDialog, QApplication
 )
-from PySide6.QtCore import QDate
+from PySide6.QtCore import QDate, Qt
 
-from app.clients.api_client import ApiClient
+from app.clients.api_client import get_api_client, run_async
+from app.ui.tasks import TaskRunner
 
 
 class ReportsPage(QWidget):
     def __init__(self, api_base_url: str, bus=None):
         super().__init__()
-        self.client = ApiClient(api_base_url)
+        self.client = get_api_client(api_base_url)
         self.bus = bus
+        self.tasks = TaskRunner(self)
 
         if self.bus:
             self.bus.stock_changed.connect(self.load)
@@ -37,11 +41,16 @@ class ReportsPage(QWidget):
         btn_load = QPushButton("Carregar")
         btn_load.clicked.connect(self.load)
 
+        # a tabela mostra só os 500 mais recentes; a exportação leva o período inteiro
+        btn_export = QPushButton("Exportar CSV")
+        btn_export.clicked.connect(self.export_csv)
+
         controls.addWidget(QLabel("Início:"))
         controls.addWidget(self.dt_start)
         controls.addWidget(QLabel("Fim:"))
         controls.addWidget(self.dt_end)
         controls.addWidget(btn_load)
+        controls.addWidget(btn_export)
         controls.addStretch(1)
         layout.addLayout(controls)
 
@@ -52,25 +61,48 @@ class ReportsPage(QWidget):
         self.load()
 
     def load(self):
+        start = self.dt_start.date().toPython().isoformat()
+        end = self.dt_end.date().toPython().isoformat()
+        # resumo e período saem juntos (AsyncApiClient), fora da thread da interface
+        self.tasks.run(
+            "load", run_async,
+            lambda ac: asyncio.gather(ac.reports_summary(), ac.reports_stock_moves_range(start, end)),
+            self.client.base_url,
+            on_result=self._apply_data,
+            on_error=lambda e: QMessageBox.critical(self, "Erro", str(e)),
+        )
+
+    def _apply_data(self, data):
+        s, moves = data
+        self.lbl_summary.setText(
+            f"Resumo: {s['total_products']} produtos | estoque total {s['total_stock']} | abaixo do mínimo: {s['low_stock']}"
+        )
+
+        self.table.setRowCount(0)
+        for it in moves["items"]:
+            row = self.table.rowCount()
+            self.table.insertRow(row)
+            self.table.setItem(row, 0, QTableWidgetItem(it.get("created_at", "")))
+            self.table.setItem(row, 1, QTableWidgetItem(it.get("product_name", "")))
+            self.table.setItem(row, 2, QTableWidgetItem(str(it.get("delta", 0))))
+            self.table.setItem(row, 3, QTableWidgetItem(it.get("reason", "")))
+
+        self.table.resizeColumnsToContents()
+
+    def export_csv(self):
+        start = self.dt_start.date().toPython()
+        end = self.dt_end.date().toPython()
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exportar movimentos", f"movimentos_{start.isoformat()}_{end.isoformat()}.csv", "CSV (*.csv)"
+        )
+        if not path:
+            return
+        QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
-            s = self.client.reports_summary()
-            self.lbl_summary.setText(
-                f"Resumo: {s['total_products']} produtos | estoque total {s['total_stock']} | baixo (<=5): {s['low_stock']}"
-            )
-
-            start = self.dt_start.date().toPython()
-            end = self.dt_end.date().toPython()
-            data = self.client.reports_stock_moves_range(start=start.isoformat(), end=end.isoformat())["items"]
-
-            self.table.setRowCount(0)
-            for it in data:
-                row = self.table.rowCount()
-                self.table.insertRow(row)
-                self.table.setItem(row, 0, QTableWidgetItem(it.get("created_at", "")))
-                self.table.setItem(row, 1, QTableWidgetItem(it.get("product_name", "")))
-                self.table.setItem(row, 2, QTableWidgetItem(str(it.get("delta", 0))))
-                self.table.setItem(row, 3, QTableWidgetItem(it.get("reason", "")))
-
-            self.table.resizeColumnsToContents()
+            self.client.export_stock_moves(start.isoformat(), end.isoformat(), path)
         except Exception as e:
-            QMessageBox.critical(self, "Erro", str(e))
+            QMessageBox.critical(self, "Erro", f"Falha na exportação: {e}")
+            return
+        finally:
+            QApplication.restoreOverrideCursor()
+        QMessageBox.information(self, "Exportação", f"Arquivo salvo em:\n{path}")
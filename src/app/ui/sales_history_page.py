@@ -1,20 +1,28 @@
 from __future__ import annotations
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, 
-    QTableWidgetItem, QMessageBox, QAbstractItemView, QHeaderView, QLabel, QFrame
+    QWidget, QVBoxLayout, QHBoxLayout, QPushButton, 
+    QMessageBox, QAbstractItemView, QHeaderView, QLabel, QFrame
 )
 from PySide6.QtCore import Qt
-from app.clients.api_client import ApiClient
+from app.clients.api_client import get_api_client
 from app.core.auth import current_session
 from app.utils.audit_logger import AuditLogger
 from app.utils.commission_engine import CommissionEngine
+from app.ui.table_models import SalesTableModel, make_table_view, selected_source_row
+from app.ui.tasks import TaskRunner
 
 class SalesHistoryPage(QWidget):
     def __init__(self, api_base_url: str, bus=None):
         super().__init__()
-        self.client = ApiClient(api_base_url)
+        self.client = get_api_client(api_base_url)
         self.bus = bus
 
+        # paginação por cursor: só a página visível vem da API
+        self.page_size = 200
+        self.next_cursor = None
+        self.total_comissoes_acumuladas = 0.0
+        self.tasks = TaskRunner(self)
+
         if self.bus:
             # Inscreve para atualizar quando houver mudanças no sistema
             self.bus.subscribe("stock_changed", self.load_sales)
@@ -47,13 +55,17 @@ class SalesHistoryPage(QWidget):
         self.main_layout.addLayout(header_lay)
 
         # 2. TABELA DE VENDAS (Expandida para Auditoria)
-        self.table = QTableWidget(0, 5)
-        self.table.setHorizontalHeaderLabels(["ID Venda", "Data/Hora", "Vendedor", "Total (R$)", "Comissão"])
-        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.model = SalesTableModel([
+            ("id", "ID Venda", lambda v, _s: f"#{v}"),
+            ("created_at", "Data/Hora", lambda v, _s: (v or "---")[:19]),
+            ("seller_name", "Vendedor", lambda v, _s: v or "Caixa Principal"),
+            ("total", "Total (R$)", lambda v, _s: f"{(v or 0.0):.2f}"),
+            # Sigilo: Vendedor não vê comissão dos outros
+            ("commission", "Comissão", lambda v, _s: f"{v:.2f}" if current_session.has_permission("gerente") else "***"),
+        ], parent=self)
+        self.table = make_table_view(self.model, stretch_column=None)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setAlternatingRowColors(True)
-        self.table.setStyleSheet("QTableWidget { background-color: white; border-radius: 10px; }")
+        self.table.setStyleSheet("QTableView { background-color: white; border-radius: 10px; }")
         self.main_layout.addWidget(self.table)
 
         # 3. BARRA DE AÇÕES INFERIOR
@@ -73,8 +85,14 @@ class SalesHistoryPage(QWidget):
         self.btn_refresh.setFixedHeight(40)
         self.btn_refresh.clicked.connect(self.load_sales)
         
+        self.btn_more = QPushButton("⬇️ Carregar mais")
+        self.btn_more.setFixedHeight(40)
+        self.btn_more.setEnabled(False)
+        self.btn_more.clicked.connect(self.load_more_sales)
+
         actions.addWidget(self.btn_cancel)
         actions.addStretch(1)
+        actions.addWidget(self.btn_more)
         actions.addWidget(self.btn_refresh)
         self.main_layout.addLayout(actions)
 
@@ -91,35 +109,44 @@ class SalesHistoryPage(QWidget):
         return card
 
     def load_sales(self):
+        """Recarrega do início (página mais recente); descarta qualquer carga em andamento."""
+        self._fetch_page(None)
+
+    def load_more_sales(self):
+        if self.next_cursor and not self.tasks.is_running("sales"):
+            self._fetch_page(self.next_cursor)
+
+    def _fetch_page(self, cursor=None):
+        self.btn_more.setEnabled(False)
+        self.tasks.run(
+            "sales", self.client.list_sales_page, limit=self.page_size, cursor=cursor,
+            on_result=lambda page: self._apply_page(page, reset=cursor is None),
+            on_error=self._on_page_failed,
+        )
+
+    def _on_page_failed(self, error):
+        self.btn_more.setEnabled(bool(self.next_cursor))
+        print(f"Erro ao carregar histórico: {error}")
+
+    def _apply_page(self, page: dict, reset: bool):
         try:
-            sales = self.client.list_sales()
-            self.table.setRowCount(0)
-            
-            total_comissoes_acumuladas = 0.0
-            
+            if reset:
+                self.model.set_rows([])
+                self.total_comissoes_acumuladas = 0.0
+            sales = page.get("items", [])
+            self.next_cursor = page.get("next_cursor")
+            self.btn_more.setEnabled(bool(self.next_cursor))
+
             for s in sales:
-                row = self.table.rowCount()
-                self.table.insertRow(row)
-                
-                vendedor = s.get("seller_name", "Caixa Principal")
-                total_venda = s.get('total', 0.0)
                 # Cálculo de comissão via Motor (Simulação de 5%)
-                comissao = CommissionEngine.calcular_comissao(total_venda, 5.0)
-                total_comissoes_acumuladas += comissao
+                s["commission"] = CommissionEngine.calcular_comissao(s.get("total", 0.0), 5.0)
+                self.total_comissoes_acumuladas += s["commission"]
 
-                self.table.setItem(row, 0, QTableWidgetItem(f"#{s['id']}"))
-                self.table.setItem(row, 1, QTableWidgetItem(s.get("created_at", "---")[:19]))
-                self.table.setItem(row, 2, QTableWidgetItem(vendedor))
-                self.table.setItem(row, 3, QTableWidgetItem(f"{total_venda:.2f}"))
-                
-                # Sigilo: Vendedor não vê comissão dos outros
-                item_com = QTableWidgetItem(f"{comissao:.2f}")
-                if not current_session.has_permission("gerente"):
-                    item_com.setText("***")
-                self.table.setItem(row, 4, item_com)
+            # página nova entra no fim, o que já estava na tela não é redesenhado
+            self.model.append_rows(sales)
 
-            # Atualiza os Cards de Performance
-            self.update_performance_cards(sales, total_comissoes_acumuladas)
+            # Atualiza os Cards de Performance (sobre o que já foi carregado)
+            self.update_performance_cards(self.model.rows(), self.total_comissoes_acumuladas)
 
         except Exception as e:
             print(f"Erro ao carregar histórico: {e}")
@@ -141,13 +168,12 @@ class SalesHistoryPage(QWidget):
                 self.card_total_comissao.findChildren(QLabel)[1].setText(f"R$ {total_comissoes:.2f}")
 
     def cancel_sale(self):
-        row = self.table.currentRow()
-        if row < 0:
+        sale = self.model.row_data(selected_source_row(self.table))
+        if not sale:
             QMessageBox.warning(self, "Atenção", "Selecione uma venda para cancelar.")
             return
         
-        sale_id_str = self.table.item(row, 0).text().replace("#", "")
-        sale_id = int(sale_id_str)
+        sale_id = int(sale["id"])
         
         confirm = QMessageBox.question(
             self, "Confirmar Cancelamento",
@@ -1,5 +1,3 @@
-import sqlite3
-import requests
 import re
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
@@ -9,7 +7,8 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QIcon, QCursor
-from app.clients.api_client import ApiClient
+from app.clients.api_client import get_api_client
+from app.core.local_db import local_db
 
 # Pequena classe auxiliar para o Dialog de Edição
 class SupplierDialog(QDialog):
@@ -38,21 +37,14 @@ class SupplierDialog(QDialog):
 class SuppliersWindow(QWidget):
     def __init__(self, api_base_url: str, bus=None):
         super().__init__()
-        self.client = ApiClient(api_base_url)
+        self.client = get_api_client(api_base_url)
         self.bus = bus
         self.setWindowTitle("Gestão de Fornecedores - Bertolini ERP")
         self.resize(1000, 700)
         
-        self.check_db() # Garante tabela local
         self.init_ui()
         self.load_suppliers()
 
-    def check_db(self):
-        """Garante tabela local para cache ou uso offline"""
-        conn = sqlite3.connect("test.db")
-        conn.execute("CREATE TABLE IF NOT EXISTS suppliers (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, document TEXT, phone TEXT, email TEXT, address TEXT)")
-        conn.close()
-
     def init_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -138,6 +130,7 @@ class SuppliersWindow(QWidget):
         if len(cnpj) != 14: return
         QApplication.setOverrideCursor(Qt.WaitCursor)
         try:
+            import requests
             r = requests.get(f"https://brasilapi.com.br/api/cnpj/v1/{cnpj}", timeout=3)
             if r.status_code == 200:
                 d = r.json()
@@ -159,6 +152,7 @@ class SuppliersWindow(QWidget):
         cep = re.sub(r'\D', '', self.inp_cep.text())
         if len(cep) != 8: return
         try:
+            import requests
             r = requests.get(f"https://brasilapi.com.br/api/cep/v2/{cep}", timeout=3)
             if r.status_code == 200:
                 d = r.json()
@@ -169,13 +163,11 @@ class SuppliersWindow(QWidget):
     def load_suppliers(self):
         self.table.setRowCount(0)
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.execute("SELECT id, name, document, phone, email, address FROM suppliers")
-            for row_data in cursor:
+            rows = local_db.query("SELECT id, name, document, phone, email, address FROM suppliers")
+            for row_data in rows:
                 row = self.table.rowCount(); self.table.insertRow(row)
                 for i, val in enumerate(row_data):
                     self.table.setItem(row, i, QTableWidgetItem(str(val)))
-            conn.close()
         except Exception as e:
             print(f"Erro load: {e}")
 
@@ -184,10 +176,8 @@ class SuppliersWindow(QWidget):
         if not name: return QMessageBox.warning(self, "Erro", "Nome é obrigatório")
         
         try:
-            conn = sqlite3.connect("test.db")
-            conn.execute("INSERT INTO suppliers (name, document, phone, email, address) VALUES (?,?,?,?,?)",
+            local_db.execute("INSERT INTO suppliers (name, document, phone, email, address) VALUES (?,?,?,?,?)",
                         (name, self.inp_cnpj.text(), self.inp_phone.text(), self.inp_email.text(), self.inp_address.text()))
-            conn.commit(); conn.close()
             self.load_suppliers()
             # Limpa campos
             self.inp_nome.clear(); self.inp_cnpj.clear(); self.inp_phone.clear(); self.inp_email.clear(); self.inp_address.clear(); self.inp_cep.clear()
@@ -207,9 +197,7 @@ class SuppliersWindow(QWidget):
         dlg = SupplierDialog(self, f"Editar ID {sid}", name, doc, phone, email)
         if dlg.exec():
             n, d, p, e = dlg.values()
-            conn = sqlite3.connect("test.db")
-            conn.execute("UPDATE suppliers SET name=?, document=?, phone=?, email=? WHERE id=?", (n, d, p, e, sid))
-            conn.commit(); conn.close()
+            local_db.execute("UPDATE suppliers SET name=?, document=?, phone=?, email=? WHERE id=?", (n, d, p, e, sid))
             self.load_suppliers()
 
     def delete_selected(self):
@@ -217,7 +205,5 @@ class SuppliersWindow(QWidget):
         if row < 0: return
         sid = self.table.item(row, 0).text()
         if QMessageBox.question(self, "Excluir", "Tem certeza?", QMessageBox.Yes|QMessageBox.No) == QMessageBox.Yes:
-            conn = sqlite3.connect("test.db")
-            conn.execute("DELETE FROM suppliers WHERE id=?", (sid,))
-            conn.commit(); conn.close()
+            local_db.execute("DELETE FROM suppliers WHERE id=?", (sid,))
             self.load_suppliers()
\ No newline at end of file
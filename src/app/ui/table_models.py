@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from PySide6.QtGui import QColor
+from PySide6.QtWidgets import QAbstractItemView, QHeaderView, QTableView
+
+
+class DictTableModel(QAbstractTableModel):
+    """
+    Modelo de tabela sobre uma lista de dicts (o mesmo formato que vem da API).
+    Nada de QTableWidgetItem por célula: a view só pede o texto das linhas visíveis,
+    e atualizações de um produto viram um dataChanged de uma linha só.
+
+    columns: lista de (chave, título) ou (chave, título, formatador)
+    """
+
+    def __init__(self, columns, key="id", parent=None):
+        super().__init__(parent)
+        self.columns = [c if len(c) == 3 else (c[0], c[1], None) for c in columns]
+        self.key = key
+        self._rows: list[dict] = []
+        self._pos: dict = {}  # id -> índice da linha
+
+    # --- API do Qt ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][1]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        key, _title, fmt = self.columns[index.column()]
+        if role == Qt.DisplayRole:
+            value = row.get(key)
+            if fmt:
+                return fmt(value, row)
+            return "" if value is None else str(value)
+        if role == Qt.UserRole:
+            # valor cru, usado na ordenação do proxy
+            return row.get(key)
+        if role == Qt.ForegroundRole:
+            return self.foreground(row, key)
+        return None
+
+    def foreground(self, row: dict, key: str) -> QColor | None:
+        """Sobrescreva para colorir células (ex.: estoque zerado em vermelho)."""
+        return None
+
+    # --- carga e atualização ---
+    def set_rows(self, rows: list[dict]):
+        """Troca o conteúdo inteiro (a lista antiga é liberada, memória não cresce)."""
+        self.beginResetModel()
+        self._rows = list(rows)
+        self._reindex()
+        self.endResetModel()
+
+    def append_rows(self, rows: list[dict]):
+        """Acrescenta no fim (paginação), sem redesenhar o que já estava na tela."""
+        if not rows:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for i, r in enumerate(rows, start=first):
+            self._rows.append(r)
+            self._pos[r.get(self.key)] = i
+        self.endInsertRows()
+
+    def update_row(self, key_value, changes: dict) -> bool:
+        """Atualiza uma linha pelo id; retorna False se ela não está no modelo."""
+        i = self._pos.get(key_value)
+        if i is None:
+            return False
+        self._rows[i].update(changes)
+        self.dataChanged.emit(self.index(i, 0), self.index(i, len(self.columns) - 1))
+        return True
+
+    def remove_row(self, key_value) -> bool:
+        i = self._pos.get(key_value)
+        if i is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), i, i)
+        self._rows.pop(i)
+        self._reindex()
+        self.endRemoveRows()
+        return True
+
+    def row_data(self, row: int) -> dict | None:
+        if 0 <= row < len(self._rows):
+            return self._rows[row]
+        return None
+
+    def get(self, key_value) -> dict | None:
+        """Linha pelo id (O(1)), ou None se não estiver carregada."""
+        i = self._pos.get(key_value)
+        return None if i is None else self._rows[i]
+
+    def rows(self) -> list[dict]:
+        return self._rows
+
+    def _reindex(self):
+        self._pos = {r.get(self.key): i for i, r in enumerate(self._rows)}
+
+
+class ProductTableModel(DictTableModel):
+    """Grade de produtos compartilhada (PDV, cadastro, alertas do dashboard)."""
+
+    DEFAULT_COLUMNS = [("id", "ID"), ("name", "Nome"), ("sku", "SKU"), ("stock_qty", "Estoque")]
+
+    def __init__(self, columns=None, parent=None):
+        super().__init__(columns or self.DEFAULT_COLUMNS, key="id", parent=parent)
+
+    def foreground(self, row, key):
+        if key == "stock_qty" and (row.get("stock_qty") or 0) <= 0:
+            return QColor("red")
+        return None
+
+    def apply_stock(self, product_id: int, stock_qty) -> bool:
+        return self.update_row(product_id, {"stock_qty": stock_qty})
+
+
+class SalesTableModel(DictTableModel):
+    """Histórico de vendas (cresce página a página com append_rows)."""
+
+    def __init__(self, columns, parent=None):
+        super().__init__(columns, key="id", parent=parent)
+
+
+def make_filter_proxy(model: QAbstractTableModel, parent=None) -> QSortFilterProxyModel:
+    """Filtro de texto em todas as colunas, sem diferenciar maiúsculas."""
+    proxy = QSortFilterProxyModel(parent)
+    proxy.setSourceModel(model)
+    proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+    proxy.setFilterKeyColumn(-1)
+    proxy.setSortRole(Qt.UserRole)
+    return proxy
+
+
+def make_table_view(model, stretch_column: int | None = 1, parent=None) -> QTableView:
+    """
+    QTableView com altura de linha fixa: a view calcula a rolagem sem medir linha
+    por linha, então 50k linhas custam o mesmo que 50 para desenhar.
+    """
+    view = QTableView(parent)
+    view.setModel(model)
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)
+    view.setSelectionMode(QAbstractItemView.SingleSelection)
+    view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+    view.setAlternatingRowColors(True)
+    view.setWordWrap(False)
+    view.verticalHeader().setVisible(False)
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.verticalHeader().setDefaultSectionSize(24)
+    header = view.horizontalHeader()
+    header.setSectionResizeMode(QHeaderView.Interactive)
+    if stretch_column is not None:
+        header.setSectionResizeMode(stretch_column, QHeaderView.Stretch)
+    return view
+
+
+def selected_source_row(view: QTableView) -> int:
+    """Linha selecionada no modelo de origem (atravessa o proxy, se houver)."""
+    index = view.currentIndex()
+    if not index.isValid():
+        return -1
+    model = view.model()
+    if isinstance(model, QSortFilterProxyModel):
+        index = model.mapToSource(index)
+    return index.row()
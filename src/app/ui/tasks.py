@@ -0,0 +1,221 @@
+"""
+Tarefas de I/O fora da thread da interface (QThreadPool + QRunnable).
+
+Cada tela cria um TaskRunner e dispara chamadas de API/SQLite por chave:
+
+    self.tasks = TaskRunner(self)
+    self.tasks.run("busca", self.client.search_products, texto, on_result=self.mostrar)
+
+- LATEST (padrão): um pedido novo com a mesma chave substitui o anterior. Se o antigo ainda
+  estava na fila ele nem roda; se já estava rodando, o resultado é descartado (busca digitando rápido).
+- COALESCE: se já tem um rodando, não dispara outro; guarda só o último pedido e roda uma vez
+  quando o atual terminar (rajada de sinais do EventBus vira uma recarga só).
+
+on_result/on_error sempre rodam na thread da UI (sinal com conexão enfileirada até o runner).
+
+EventStream é o caso contínuo: uma assinatura SSE numa QThread própria (não ocupa o pool),
+que reconecta sozinha e entrega cada evento por sinal.
+"""
+from __future__ import annotations
+
+import itertools
+import socket
+import threading
+
+import httpx
+from PySide6.QtCore import QObject, QRunnable, QThread, QThreadPool, Signal, Slot
+
+from app.clients.api_client import TIMEOUTS, iter_sse
+
+LATEST = "latest"
+COALESCE = "coalesce"
+
+# Chamadas HTTP/SQLite passam a maior parte do tempo esperando: mais threads que núcleos
+IO_THREADS = 6
+
+_io_pool: QThreadPool | None = None
+_ids = itertools.count(1)
+# referência até o fim do run(): a tela (e o runner) pode fechar com a tarefa ainda rodando
+_in_flight: set["_Task"] = set()
+
+
+def io_pool() -> QThreadPool:
+    """Pool compartilhado pelas telas (o globalInstance fica livre para quem usa CPU)."""
+    global _io_pool
+    if _io_pool is None:
+        _io_pool = QThreadPool()
+        _io_pool.setMaxThreadCount(IO_THREADS)
+        _io_pool.setExpiryTimeout(30000)
+    return _io_pool
+
+
+class _TaskSignals(QObject):
+    succeeded = Signal(int, object)
+    failed = Signal(int, object)
+    done = Signal(int)
+
+
+class _Task(QRunnable):
+    def __init__(self, task_id: int, fn, args, kwargs):
+        super().__init__()
+        self.task_id = task_id
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.signals = _TaskSignals()
+        # quem segura o objeto é _in_flight; o pool não pode apagar por conta própria
+        self.setAutoDelete(False)
+
+    def run(self):
+        try:
+            if self.cancelled:
+                return
+            try:
+                result = self.fn(*self.args, **self.kwargs)
+            except Exception as e:
+                if not self.cancelled:
+                    self.signals.failed.emit(self.task_id, e)
+                return
+            if not self.cancelled:
+                self.signals.succeeded.emit(self.task_id, result)
+        finally:
+            self.signals.done.emit(self.task_id)
+            _in_flight.discard(self)
+
+
+class TaskRunner(QObject):
+    """Disparador de tarefas de uma tela. Vive na thread da UI; os callbacks também."""
+
+    def __init__(self, parent=None, pool: QThreadPool | None = None):
+        super().__init__(parent)
+        self.pool = pool or io_pool()
+        self._current: dict[str, _Task] = {}                 # chave -> tarefa mais recente
+        self._callbacks: dict[int, tuple[str, object, object]] = {}
+        self._pending: dict[str, tuple] = {}                 # COALESCE: último pedido à espera
+
+    def run(self, key: str, fn, *args, on_result=None, on_error=None, mode: str = LATEST, **kwargs) -> None:
+        running = self._current.get(key)
+        if running is not None and mode == COALESCE:
+            self._pending[key] = (fn, args, kwargs, on_result, on_error)
+            return
+        if running is not None:
+            self._cancel_task(running)
+
+        task = _Task(next(_ids), fn, args, kwargs)
+        task.signals.succeeded.connect(self._on_succeeded)
+        task.signals.failed.connect(self._on_failed)
+        task.signals.done.connect(self._on_done)
+        self._current[key] = task
+        self._callbacks[task.task_id] = (key, on_result, on_error)
+        _in_flight.add(task)
+        self.pool.start(task)
+
+    def is_running(self, key: str) -> bool:
+        return key in self._current
+
+    def cancel(self, key: str) -> None:
+        """Descarta o resultado da tarefa da chave (e o pedido guardado, se houver)."""
+        self._pending.pop(key, None)
+        task = self._current.pop(key, None)
+        if task is not None:
+            self._cancel_task(task)
+
+    def cancel_all(self) -> None:
+        for key in list(self._current):
+            self.cancel(key)
+
+    def _cancel_task(self, task: _Task) -> None:
+        task.cancelled = True
+        self._callbacks.pop(task.task_id, None)
+        # ainda na fila: sai sem rodar
+        if self.pool.tryTake(task):
+            _in_flight.discard(task)
+        self._release(task.task_id)
+
+    def _release(self, task_id: int) -> None:
+        for key, current in list(self._current.items()):
+            if current.task_id == task_id:
+                del self._current[key]
+
+    @Slot(int, object)
+    def _on_succeeded(self, task_id: int, result):
+        entry = self._callbacks.get(task_id)
+        if entry and entry[1]:
+            entry[1](result)
+
+    @Slot(int, object)
+    def _on_failed(self, task_id: int, error):
+        entry = self._callbacks.get(task_id)
+        if not entry:
+            return
+        if entry[2]:
+            entry[2](error)
+        else:
+            print(f"⚠️ Tarefa '{entry[0]}' falhou: {error}")
+
+    @Slot(int)
+    def _on_done(self, task_id: int):
+        entry = self._callbacks.pop(task_id, None)
+        self._release(task_id)
+        if entry is None:
+            return
+        key = entry[0]
+        pending = self._pending.pop(key, None)
+        if pending is not None and key not in self._current:
+            fn, args, kwargs, on_result, on_error = pending
+            self.run(key, fn, *args, on_result=on_result, on_error=on_error, mode=COALESCE, **kwargs)
+
+
+class EventStream(QThread):
+    """
+    Assina um endpoint SSE até stop(). received(evento, dados) e connected(bool) chegam na thread da UI.
+    Depois de uma queda, espera 1, 2, 4... até 30s e reconecta (o servidor manda snapshot de novo).
+    """
+    received = Signal(str, object)
+    connected = Signal(bool)
+
+    MAX_BACKOFF = 30.0
+
+    def __init__(self, base_url: str, path: str, parent=None, headers: dict | None = None):
+        super().__init__(parent)
+        self.base_url = base_url.rstrip("/")
+        self.path = path
+        self.headers = {"Accept": "text/event-stream", **(headers or {})}  # ex.: Authorization do painel
+        self._stop = threading.Event()
+        self._sock = None
+
+    def run(self):
+        attempt = 0
+        while not self._stop.is_set():
+            try:
+                # cliente próprio: conexão longa não prende vaga do pool compartilhado das telas
+                with httpx.Client(base_url=self.base_url, timeout=TIMEOUTS["stream"]) as client:
+                    with client.stream("GET", self.path, headers=self.headers) as r:
+                        r.raise_for_status()
+                        stream = r.extensions.get("network_stream")
+                        self._sock = stream.get_extra_info("socket") if stream is not None else None
+                        self.connected.emit(True)
+                        attempt = 0
+                        for event, data in iter_sse(r.iter_lines()):
+                            self.received.emit(event, data)
+            except Exception as e:
+                if not self._stop.is_set():
+                    print(f"⚠️ Fluxo {self.path} caiu: {e}")
+            finally:
+                self._sock = None
+            if self._stop.is_set():
+                break
+            self.connected.emit(False)
+            self._stop.wait(min(2 ** attempt, self.MAX_BACKOFF))
+            attempt += 1
+
+    def stop(self, wait_ms: int = 3000) -> None:
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)  # destrava o recv bloqueado (close() de outra thread não acorda)
+            except OSError:
+                pass
+        self.wait(wait_ms)
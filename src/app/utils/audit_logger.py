@@ -1,52 +1,158 @@
-import sqlite3
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime
 from app.core.auth import current_session
+from app.core.local_db import local_db
+
+INSERT_SQL = """
+    INSERT INTO audit_logs (timestamp, user_name, user_role, action, detail, level)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+
+class AuditWriter:
+    """
+    Gravador de auditoria em segundo plano.
+    O log() só enfileira a linha (fila limitada); uma thread grava em lote
+    (executemany, uma transação) quando junta `batch_size` linhas ou a cada `flush_interval` s.
+
+    Durabilidade:
+      - "batch" (padrão): em queda de energia/kill, perde no máximo o lote ainda na fila
+        (até flush_interval segundos). Fechamento normal do app sempre grava tudo (shutdown/atexit).
+      - "critical": igual ao batch, mas log de nível CRITICAL espera o próprio lote ser gravado
+        antes de retornar (cancelamentos, faturamento). Só esses eventos raros pagam a espera.
+    Fila cheia: INFO/WARNING são descartados (e contados em `dropped`); CRITICAL nunca é descartado.
+    """
+
+    def __init__(self, batch_size=200, flush_interval=1.0, max_queue=10000, durability="batch"):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.durability = durability
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: tuple, level: str):
+        if self._stopped:
+            # depois do shutdown não há thread: grava direto
+            self._write([row])
+            return
+        self._ensure_worker()
+        if level == "CRITICAL":
+            self._queue.put(row)
+            if self.durability == "critical":
+                self.flush()
+            return
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"⚠️ Fila de auditoria cheia: {self.dropped} registros descartados")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Bloqueia até tudo que já estava na fila ser gravado."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Grava o que sobrou e encerra a thread (chamado ao fechar o app)."""
+        if self._stopped:
+            return
+        self.flush(timeout)
+        self._stopped = True
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    # --- thread de gravação ---
+    def _run(self):
+        batch: list[tuple] = []
+        waiters: list[threading.Event] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = ...
+            stop = item is None
+            if isinstance(item, threading.Event):
+                waiters.append(item)
+            elif isinstance(item, tuple):
+                batch.append(item)
+
+            if stop or waiters or len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                for w in waiters:
+                    w.set()
+                waiters = []
+                deadline = time.monotonic() + self.flush_interval
+            if stop:
+                return
+
+    @staticmethod
+    def _write(batch: list[tuple]):
+        try:
+            local_db.executemany(INSERT_SQL, batch)
+        except Exception as e:
+            print(f"❌ Erro ao gravar log ({len(batch)} registros): {e}")
+
 
 class AuditLogger:
+    writer = AuditWriter()
+
     @staticmethod
     def log(action: str, detail: str, level="INFO"):
-        """Grava a ação do usuário no banco de dados de logs."""
+        """Registra a ação do usuário (gravação em lote, fora da thread da interface)."""
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
-            
-            # Garante que a tabela de logs existe
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS audit_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME,
-                    user_name TEXT,
-                    user_role TEXT,
-                    action TEXT,
-                    detail TEXT,
-                    level TEXT
-                )
-            """)
-            
-            cursor.execute("""
-                INSERT INTO audit_logs (timestamp, user_name, user_role, action, detail, level)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
+            row = (
                 datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 current_session.user_name,
                 current_session.role,
                 action,
                 detail,
                 level
-            ))
-            
-            conn.commit()
-            conn.close()
+            )
+            AuditLogger.writer.submit(row, level)
         except Exception as e:
             print(f"❌ Erro ao gravar log: {e}")
 
+    @staticmethod
+    def flush(timeout: float = 5.0) -> bool:
+        return AuditLogger.writer.flush(timeout)
+
+    @staticmethod
+    def shutdown():
+        AuditLogger.writer.shutdown()
+
+
+# Garantia de gravação mesmo se o app sair sem passar pelo main()
+atexit.register(AuditLogger.shutdown)
+
 print("🛡️ Sentinela de Auditoria Ativado!")
 
 @staticmethod
 def log(action: str, detail: str, level="INFO"):
         # ... (seu código de gravar no banco continua igual)
-        
+
         # Se o nível for CRITICAL, avisa o dono na hora!
         if level == "CRITICAL":
             from app.utils.bot_engine import BotEngine
-            BotEngine.enviar_alerta(f"*AÇÃO CRÍTICA:* {action}\n*DETALHE:* {detail}", nivel="CRITICAL")
\ No newline at end of file
+            BotEngine.enviar_alerta(f"*AÇÃO CRÍTICA:* {action}\n*DETALHE:* {detail}", nivel="CRITICAL")
@@ -1,32 +1,332 @@
-import shutil
+"""
+Backup incremental com deduplicação.
+
+1. Cópia consistente do banco pela API de backup online do SQLite (funciona com o banco em uso).
+2. A cópia é dividida em blocos definidos pelo conteúdo: cada página do SQLite ganha um hash e a
+   página cujo hash "bate" na máscara fecha o bloco (média de CHUNK_AVG bytes). Mudar uma linha
+   altera só o bloco da página dela, e páginas que apenas mudam de posição voltam a alinhar no
+   bloco seguinte. (VACUUM reempacota quase todas as páginas: o snapshot seguinte sai quase cheio.)
+3. Só os blocos novos são gravados (comprimidos, nome = hash), e cada snapshot é um manifesto JSON
+   com a lista de blocos. Retenção + limpeza apagam manifestos velhos e blocos sem referência.
+
+    backups/store/chunks/ab/abcdef...   (zlib)
+    backups/store/snapshots/test_20261018_153000_000123.json
+
+Restauração / manutenção:
+    python -m app.utils.backup_engine --list
+    python -m app.utils.backup_engine --restore backups/store/snapshots/<arquivo>.json destino.db
+    python -m app.utils.backup_engine --prune
+"""
+import argparse
+import hashlib
+import json
 import os
-from datetime import datetime
 import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+BACKUP_DIR = "backups"
+BACKUP_DBS = ["test.db"]  # + settings.db_file_path (storage.db), resolvido em realizar_backup
+
+CHUNK_AVG = 64 * 1024
+CHUNK_MIN = 16 * 1024
+CHUNK_MAX = 256 * 1024
+
+# Retenção padrão (por banco): últimos N + um por dia + um por mês
+KEEP_LAST = 10
+KEEP_DAILY = 14
+KEEP_MONTHLY = 6
+
+
+def _store(backup_dir: str) -> tuple[Path, Path]:
+    root = Path(backup_dir) / "store"
+    chunks, snaps = root / "chunks", root / "snapshots"
+    chunks.mkdir(parents=True, exist_ok=True)
+    snaps.mkdir(parents=True, exist_ok=True)
+    return chunks, snaps
+
+
+@contextmanager
+def _store_lock(backup_dir: str):
+    """
+    Trava exclusiva do repositório (backups/store/.lock), entre processos e threads: snapshot e prune
+    nunca rodam juntos, senão a varredura apagaria blocos que um snapshot em andamento já gravou mas
+    que o manifesto dele ainda não lista. O sistema solta a trava se o processo morrer.
+    """
+    root = Path(backup_dir) / "store"
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            yield  # fechar o arquivo solta o flock
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
 
 class BackupEngine:
     @staticmethod
-    def realizar_backup():
-        """Copia o banco de dados para uma pasta de backup com data e hora"""
-        db_path = "test.db"
-        backup_dir = "backups"
-        
-        if not os.path.exists(db_path):
-            return False
-            
-        if not os.path.exists(backup_dir):
-            os.makedirs(backup_dir)
-            
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = os.path.join(backup_dir, f"backup_bertolini_{timestamp}.db")
-        
+    def realizar_backup(dbs: list[str] | None = None, backup_dir: str = BACKUP_DIR, prune: bool = True):
+        """
+        Snapshot incremental de cada banco (padrão: test.db e storage.db) e limpeza pela retenção.
+        Retorna a lista de manifestos gravados, ou False se nenhum banco existia.
+        """
+        if dbs is None:
+            from app.core.config import settings
+
+            dbs = BACKUP_DBS + [settings.db_file_path]
+        feitos = []
+        for db_path in dbs:
+            if not os.path.exists(db_path):
+                continue
+            try:
+                manifest = BackupEngine.snapshot(db_path, backup_dir)
+                feitos.append(manifest["path"])
+                print(
+                    f"📦 Backup {manifest['db']}: {manifest['new_chunks']}/{len(manifest['chunks'])} blocos novos "
+                    f"({manifest['new_bytes'] / 1024:.0f} KB gravados de {manifest['size'] / 1024 / 1024:.1f} MB)"
+                )
+            except Exception as e:
+                print(f"Erro no backup de {db_path}: {e}")
+        if prune and feitos:
+            try:
+                BackupEngine.prune(backup_dir)
+            except Exception as e:
+                print(f"⚠️ Falha na limpeza dos backups: {e}")
+        return feitos or False
+
+    @staticmethod
+    def snapshot(db_path: str, backup_dir: str = BACKUP_DIR) -> dict:
+        """Cópia online -> blocos -> grava só os blocos que o repositório ainda não tem -> manifesto."""
+        with _store_lock(backup_dir):
+            return BackupEngine._snapshot(db_path, backup_dir)
+
+    @staticmethod
+    def _snapshot(db_path: str, backup_dir: str) -> dict:
+        chunks_dir, snaps_dir = _store(backup_dir)
+        db_name = Path(db_path).stem
+        now = datetime.now()
+        tmp_copy = snaps_dir / f".{db_name}.snapshot.tmp"
+        try:
+            BackupEngine._online_copy(db_path, str(tmp_copy))
+            size = tmp_copy.stat().st_size
+            file_hash = hashlib.blake2b(digest_size=32)
+            chunk_ids, new_chunks, new_bytes = [], 0, 0
+            for chunk in BackupEngine.iter_chunks(str(tmp_copy)):
+                file_hash.update(chunk)
+                cid = hashlib.blake2b(chunk, digest_size=32).hexdigest()
+                chunk_ids.append(cid)
+                target = chunks_dir / cid[:2] / cid
+                if not target.exists():
+                    target.parent.mkdir(exist_ok=True)
+                    data = zlib.compress(chunk, 6)
+                    _write_atomic(target, data)
+                    new_chunks += 1
+                    new_bytes += len(data)
+        finally:
+            if tmp_copy.exists():
+                tmp_copy.unlink()
+
+        manifest = {
+            "db": Path(db_path).name,
+            "source": os.path.abspath(db_path),
+            "created": now.isoformat(timespec="seconds"),
+            "size": size,
+            "blake2b": file_hash.hexdigest(),
+            "chunks": chunk_ids,
+            "new_chunks": new_chunks,
+            "new_bytes": new_bytes,
+        }
+        path = snaps_dir / f"{db_name}_{now.strftime('%Y%m%d_%H%M%S_%f')}.json"
+        # manifesto por último: snapshot só "existe" depois que todos os blocos estão no disco
+        _write_atomic(path, json.dumps(manifest).encode("utf-8"))
+        manifest["path"] = str(path)
+        return manifest
+
+    @staticmethod
+    def _online_copy(db_path: str, dest: str) -> None:
+        """Cópia consistente mesmo com o app/API escrevendo (sqlite3.Connection.backup)."""
+        src = sqlite3.connect(db_path, timeout=30)
+        dst = sqlite3.connect(dest)
         try:
-            # Garante que o banco não está travado antes de copiar
-            conn = sqlite3.connect(db_path)
-            conn.execute("PRAGMA wal_checkpoint(FULL)")
-            conn.close()
-            
-            shutil.copy2(db_path, backup_path)
-            return backup_path
-        except Exception as e:
-            print(f"Erro no backup: {e}")
-            return False
\ No newline at end of file
+            src.backup(dst, pages=4096)  # em passos: escritores não ficam presos durante a cópia inteira
+            # a cópia sai em modo rollback journal: arquivo único, sem -wal ao lado
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+            src.close()
+
+    @staticmethod
+    def _page_size(path: str) -> int:
+        with open(path, "rb") as f:
+            header = f.read(100)
+        if len(header) < 18 or not header.startswith(b"SQLite format 3\x00"):
+            return 4096  # não é banco SQLite: cai em blocos de 4 KB
+        size = int.from_bytes(header[16:18], "big")
+        return 65536 if size == 1 else size
+
+    @staticmethod
+    def iter_chunks(path: str):
+        """
+        Divide o arquivo em blocos definidos pelo conteúdo, sempre em fronteira de página.
+        Memória constante: no máximo um bloco (CHUNK_MAX) por vez.
+        """
+        page = BackupEngine._page_size(path)
+        avg_pages = max(1, CHUNK_AVG // page)
+        mask = (1 << max(0, avg_pages.bit_length() - 1)) - 1
+        min_pages = max(1, CHUNK_MIN // page)
+        max_pages = max(min_pages, CHUNK_MAX // page)
+
+        buf, n = [], 0
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(page)
+                if not data:
+                    break
+                buf.append(data)
+                n += 1
+                if n < min_pages:
+                    continue
+                h = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest()[:4], "little")
+                if (h & mask) == 0 or n >= max_pages:
+                    yield b"".join(buf)
+                    buf, n = [], 0
+        if buf:
+            yield b"".join(buf)
+
+    @staticmethod
+    def list_snapshots(backup_dir: str = BACKUP_DIR, db: str | None = None) -> list[dict]:
+        """Manifestos do repositório (mais antigo primeiro); `db` filtra pelo nome do arquivo (test.db)."""
+        _, snaps_dir = _store(backup_dir)
+        out = []
+        for p in snaps_dir.glob("*.json"):
+            try:
+                m = json.loads(p.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if db and m.get("db") != db:
+                continue
+            m["path"] = str(p)
+            out.append(m)
+        return sorted(out, key=lambda m: (m["created"], m["path"]))
+
+    @staticmethod
+    def restaurar(manifest_path: str, destino: str, backup_dir: str = BACKUP_DIR) -> str:
+        """Remonta o banco do snapshot em `destino` e confere o hash do arquivo inteiro."""
+        chunks_dir, _ = _store(backup_dir)
+        manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+        file_hash = hashlib.blake2b(digest_size=32)
+        tmp = Path(destino).with_name(Path(destino).name + ".restore.tmp")
+        with open(tmp, "wb") as out:
+            for cid in manifest["chunks"]:
+                data = zlib.decompress((chunks_dir / cid[:2] / cid).read_bytes())
+                file_hash.update(data)
+                out.write(data)
+        if file_hash.hexdigest() != manifest["blake2b"]:
+            tmp.unlink()
+            raise ValueError(f"Snapshot corrompido: hash não confere ({manifest_path})")
+        os.replace(tmp, destino)
+        return destino
+
+    @staticmethod
+    def retained(snapshots: list[dict], keep_last: int = KEEP_LAST, keep_daily: int = KEEP_DAILY,
+                 keep_monthly: int = KEEP_MONTHLY) -> set[str]:
+        """Manifestos que ficam (de um banco): os últimos N, o mais novo de cada dia e de cada mês."""
+        # created é por segundo; o nome do manifesto tem microssegundos e desempata (mais novo primeiro)
+        ordered = sorted(snapshots, key=lambda m: (m["created"], m["path"]), reverse=True)
+        keep = {m["path"] for m in ordered[:keep_last]}
+        days, months = [], []
+        for m in ordered:
+            day, month = m["created"][:10], m["created"][:7]
+            if day not in days and len(days) < keep_daily:
+                days.append(day)
+                keep.add(m["path"])
+            if month not in months and len(months) < keep_monthly:
+                months.append(month)
+                keep.add(m["path"])
+        return keep
+
+    @staticmethod
+    def prune(backup_dir: str = BACKUP_DIR, **retention) -> dict:
+        """Aplica a retenção por banco e apaga os blocos que nenhum manifesto restante usa."""
+        with _store_lock(backup_dir):
+            return BackupEngine._prune(backup_dir, **retention)
+
+    @staticmethod
+    def _prune(backup_dir: str, **retention) -> dict:
+        chunks_dir, _ = _store(backup_dir)
+        snapshots = BackupEngine.list_snapshots(backup_dir)
+        by_db: dict[str, list[dict]] = {}
+        for m in snapshots:
+            by_db.setdefault(m["db"], []).append(m)
+
+        keep = set()
+        for snaps in by_db.values():
+            keep |= BackupEngine.retained(snaps, **retention)
+        removed = 0
+        for m in snapshots:
+            if m["path"] not in keep:
+                os.remove(m["path"])
+                removed += 1
+
+        # marca e varre: manifesto é apagado antes dos blocos, então nunca sobra snapshot quebrado
+        live = {cid for m in snapshots if m["path"] in keep for cid in m["chunks"]}
+        freed, removed_chunks = 0, 0
+        for p in chunks_dir.glob("*/*"):
+            if p.name.endswith(".tmp") or p.name not in live:
+                freed += p.stat().st_size
+                p.unlink()
+                removed_chunks += 1
+        if removed or removed_chunks:
+            print(f"🧹 Backups: {removed} snapshots e {removed_chunks} blocos removidos ({freed / 1024 / 1024:.1f} MB)")
+        return {"snapshots": removed, "chunks": removed_chunks, "bytes": freed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backup incremental (repositório de blocos deduplicados)")
+    parser.add_argument("--dir", default=BACKUP_DIR)
+    parser.add_argument("--list", action="store_true", help="lista os snapshots")
+    parser.add_argument("--restore", nargs=2, metavar=("MANIFESTO", "DESTINO"))
+    parser.add_argument("--prune", action="store_true", help="aplica a retenção e apaga blocos órfãos")
+    parser.add_argument("--backup", nargs="*", metavar="BANCO", help="faz snapshot agora (padrão: bancos do app)")
+    args = parser.parse_args()
+
+    if args.backup is not None:
+        BackupEngine.realizar_backup(args.backup or None, args.dir)
+    if args.list:
+        for m in BackupEngine.list_snapshots(args.dir):
+            print(f"{m['created']}  {m['db']:<12} {m['size'] / 1024 / 1024:8.1f} MB  {len(m['chunks']):6} blocos  {m['path']}")
+    if args.restore:
+        print(f"✅ Restaurado em {BackupEngine.restaurar(args.restore[0], args.restore[1], args.dir)}")
+    if args.prune:
+        BackupEngine.prune(args.dir)
+
+
+if __name__ == "__main__":
+    main()
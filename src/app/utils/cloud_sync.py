@@ -1,99 +1,166 @@
-import os
-import hashlib
-import shutil
-import requests
+import gzip
+import json
 from datetime import datetime
+
+import httpx
 from PySide6.QtCore import QThread, Signal
-from app.core.security_vault import SecurityVault 
+
+from app.core.config import settings
+from app.core.local_db import get_local_db
+from app.db.change_log import SYNC_TABLES
+
+
+class ChangeFeed:
+    """
+    Lê o log de alterações da loja (sync_changes) em lotes a partir do último cursor confirmado.
+    Várias alterações da mesma linha num lote viram uma só, com o estado atual da linha.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self) -> int:
+        row = self.db.query_one("SELECT value FROM sync_state WHERE key = 'cursor'")
+        return int(row[0]) if row else 0
+
+    def pending(self) -> int:
+        return self.db.query_one("SELECT count(*) FROM sync_changes WHERE seq > ?", (self.cursor(),))[0]
+
+    def next_batch(self, limit: int = 500) -> dict | None:
+        cursor = self.cursor()
+        with self.db.connection() as conn:
+            conn.execute("BEGIN")  # log e linhas lidos do mesmo instante
+            log = conn.execute(
+                "SELECT seq, tbl, pk, op FROM sync_changes WHERE seq > ? ORDER BY seq LIMIT ?", (cursor, limit)
+            ).fetchall()
+            if not log:
+                return None
+            latest: dict[tuple[str, int], int] = {}
+            for seq, tbl, pk, _ in log:
+                if tbl in SYNC_TABLES:
+                    latest[(tbl, pk)] = seq
+
+            rows = {}
+            for tbl in {t for t, _ in latest}:
+                pks = [pk for t, pk in latest if t == tbl]
+                for i in range(0, len(pks), 500):
+                    part = pks[i:i + 500]
+                    cur = conn.execute(f"SELECT * FROM {tbl} WHERE id IN ({','.join('?' * len(part))})", part)
+                    cols = [d[0] for d in cur.description]
+                    for values in cur.fetchall():
+                        row = dict(zip(cols, values))
+                        rows[(tbl, row["id"])] = row
+
+        changes = []
+        for (tbl, pk), seq in sorted(latest.items(), key=lambda kv: kv[1]):
+            row = rows.get((tbl, pk))
+            # linha sumiu (DELETE agora ou mais adiante no log): vai como exclusão
+            changes.append({"tbl": tbl, "pk": pk, "op": "D" if row is None else "U", "v": seq, "row": row})
+        return {"from_seq": cursor, "to_seq": log[-1][0], "changes": changes}
+
+    def ack(self, seq: int) -> None:
+        """Hub confirmou até `seq`: avança o cursor e descarta o log já entregue."""
+        with self.db.connection() as conn:
+            conn.execute(
+                """INSERT INTO sync_state (key, value) VALUES ('cursor', ?)
+                   ON CONFLICT (key) DO UPDATE SET value = max(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))""",
+                (seq,),
+            )
+            conn.execute("DELETE FROM sync_changes WHERE seq <= ?", (seq,))
+
 
 class CloudSyncEngine(QThread):
     """
-    Motor de Sincronização Bertolini Cloud v3.0
-    Blindagem AES-256 + Telemetria em Tempo Real para o Painel Master.
+    Motor de Sincronização Bertolini Cloud v4.0
+    Envio incremental (log de alterações, lotes gzip) + Telemetria em Tempo Real para o Painel Master.
+    O custo de cada sincronização acompanha o que mudou desde a última, não o tamanho do banco.
     """
     sync_finished = Signal(bool, str)
 
-    def __init__(self, db_path="test.db"):
+    def __init__(self, db_path="test.db", hub_url=None, unit_id=None, token=None, http: httpx.Client | None = None):
         super().__init__()
         self.db_path = db_path
-        
-        # --- CORREÇÃO DE SEGURANÇA ---
-        # A chave agora é um formato Fernet válido (32 bytes em Base64)
-        self.master_key = b'kMh_vT8Y1P9I6Q9G1Y8_m8_T9K_v5L_v7X_9R_9I_20=' 
-        
-        # --- URL OFICIAL DA NUVEM ---
-        self.cloud_hub_url = "https://erp-pdv-desktop-python-production.up.railway.app/api/sync" 
+        self.unit_id = unit_id or settings.unit_id
+
+        # hub e token vêm da configuração da loja (sem os dois, nada é enviado)
+        self.cloud_hub_url = (hub_url or settings.cloud_hub_url).rstrip("/")
+        self.token = token or settings.cloud_sync_token
+        # http injetável: nos testes entra o TestClient do FastAPI no lugar do hub real
+        self.http = http
+
+    @property
+    def headers(self) -> dict:
+        """Identificação da loja no hub (as rotas de /api/sync recusam envio sem token)."""
+        return {"X-Unit-Id": self.unit_id, "Authorization": f"Bearer {self.token}"}
 
     def run(self):
-        vault_path = None
+        if not self.cloud_hub_url or not self.token:
+            self.sync_finished.emit(False, "Sincronização desligada: configure CLOUD_HUB_URL e CLOUD_SYNC_TOKEN.")
+            return
+        http = self.http or httpx.Client(timeout=30)
         try:
-            # 1. Validação de existência
-            if not os.path.exists(self.db_path):
-                self.sync_finished.emit(False, "Arquivo de banco de dados não encontrado.")
-                return
-
-            # 2. Gera o Checksum (Integridade)
-            with open(self.db_path, "rb") as f:
-                file_hash = hashlib.md5(f.read()).hexdigest()
-
-            # 3. BLINDAGEM AES-256
-            vault_path = SecurityVault.criptografar_arquivo(self.db_path, self.master_key)
-
-            # 4. TELEMETRIA EM TEMPO REAL
-            # Envia o pulso de dados para o seu monitoramento Master
-            self.enviar_resumo_vendas(file_hash)
-
-            # 5. BACKUP EM NUVEM (Registro Local de Envio)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            if not os.path.exists("cloud_backups"): 
-                os.makedirs("cloud_backups")
-            
-            backup_name = f"cloud_backups/backup_{timestamp}.db.vault"
-            shutil.copy2(vault_path, backup_name)
-
-            # 6. LIMPEZA DE RASTROS
-            if vault_path and os.path.exists(vault_path):
-                os.remove(vault_path)
+            db = get_local_db(self.db_path)
+            db.ensure_schema()
+            feed = ChangeFeed(db)
+
+            enviados, lotes = 0, 0
+            while True:
+                batch = feed.next_batch(settings.sync_batch_size)
+                if batch is None:
+                    break
+                ack = self.enviar_lote(http, batch)
+                if ack < batch["to_seq"]:
+                    raise RuntimeError(f"Hub confirmou só até {ack} (lote ia até {batch['to_seq']})")
+                feed.ack(batch["to_seq"])
+                enviados += len(batch["changes"])
+                lotes += 1
+
+            # TELEMETRIA EM TEMPO REAL (pulso para o monitoramento Master)
+            self.enviar_resumo_vendas(http, db, feed.cursor())
 
             self.sync_finished.emit(
-                True, 
-                f"Sincronização Blindada Concluída!\nIntegridade: {file_hash[:8]}..."
+                True,
+                f"Sincronização Concluída!\n{enviados} alterações em {lotes} lote(s) (cursor {feed.cursor()})",
             )
-
         except Exception as e:
-            if vault_path and os.path.exists(vault_path):
-                os.remove(vault_path)
             self.sync_finished.emit(False, f"Falha na Sincronização: {str(e)}")
+        finally:
+            if self.http is None:
+                http.close()
+
+    def enviar_lote(self, http: httpx.Client, batch: dict) -> int:
+        """Envia um lote compactado; devolve o cursor que o hub confirmou."""
+        body = gzip.compress(json.dumps({"unit_id": self.unit_id, **batch}, default=str).encode("utf-8"), 6)
+        response = http.post(
+            f"{self.cloud_hub_url}/changes",
+            content=body,
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip", **self.headers},
+        )
+        response.raise_for_status()
+        return int(response.json()["ack"])
 
-    def enviar_resumo_vendas(self, checksum):
+    def enviar_resumo_vendas(self, http: httpx.Client, db, cursor: int):
         """
-        [MÉDULO CLOUD]
-        Envia os dados de faturamento para o hub central no Railway.
+        [MÓDULO CLOUD]
+        Envia os dados de faturamento para o hub central.
         """
         try:
-            import sqlite3
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Pega o faturamento real para atualizar seu monitoramento
-            cursor.execute("SELECT SUM(total_value) FROM sales")
-            total = cursor.fetchone()[0] or 0.0
-            
+            total = db.query_one("SELECT SUM(total_value) FROM sales")[0] or 0.0
+
             payload = {
-                "unit_id": "001", 
+                "unit_id": self.unit_id,
                 "total_sales": total,
-                "last_checksum": checksum,
+                "sync_cursor": cursor,
                 "timestamp": datetime.now().isoformat()
             }
-            
+
             # ENVIO REAL PARA A NUVEM
-            response = requests.post(self.cloud_hub_url, json=payload, timeout=8)
-            
+            response = http.post(self.cloud_hub_url, json=payload, headers=self.headers, timeout=8)
+
             if response.status_code == 200:
                 print(f"📡 [NUVEM] Telemetria entregue: R$ {total:.2f}")
             else:
                 print(f"⚠️ [NUVEM] Erro no servidor: {response.status_code}")
-            
-            conn.close()
         except Exception as e:
-            print(f"⚠️ [NUVEM] Falha de conexão: {str(e)}")
\ No newline at end of file
+            print(f"⚠️ [NUVEM] Falha de conexão: {str(e)}")
@@ -0,0 +1,245 @@
+"""
+Motor de importação de planilhas (migração de cadastro).
+
+Lê o arquivo em blocos (CSV com chunksize, Excel em modo read-only linha a linha),
+converte cada bloco de uma vez só com operações vetorizadas do pandas e envia o bloco
+para POST /products/bulk. Memória constante e uma requisição por bloco, não por produto.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+IGNORE = "(Não Importar)"
+
+# Campos do ERP que a tela deixa mapear (chave -> rótulo)
+FIELDS = {
+    "name": "Nome do Produto*",
+    "price": "Preço de Venda (R$)*",
+    "cost_price": "Preço de Custo (R$)",
+    "sku": "Código / SKU",
+    "stock_qty": "Estoque Inicial",
+    "ncm_code": "NCM (Fiscal)",
+}
+
+DEFAULT_CHUNK = 1000
+
+# NFe de compra em SKU já cadastrado: só o custo muda (nome, preço de venda e fiscal são da loja)
+NFE_UPDATE_FIELDS = ["cost_price"]
+
+
+class ImportEngine:
+    @staticmethod
+    def read_header(path: str) -> list[str]:
+        """Só o cabeçalho (para montar o tradutor de colunas sem carregar o arquivo)."""
+        import pandas as pd
+
+        if path.lower().endswith(".csv"):
+            return [str(c) for c in pd.read_csv(path, nrows=0, sep=None, engine="python").columns]
+        if path.lower().endswith(".xlsx"):
+            from openpyxl import load_workbook
+
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                first = next(wb.active.iter_rows(max_row=1, values_only=True), ())
+            finally:
+                wb.close()
+            return [str(c) for c in first if c is not None]
+        return [str(c) for c in pd.read_excel(path, nrows=0).columns]
+
+    @staticmethod
+    def iter_chunks(path: str, chunk_size: int = DEFAULT_CHUNK):
+        """
+        Gera DataFrames de até `chunk_size` linhas, tudo como texto
+        (a conversão de tipos fica no map_chunk, igual para CSV e Excel).
+        """
+        import pandas as pd
+
+        low = path.lower()
+        if low.endswith(".csv"):
+            yield from pd.read_csv(
+                path, sep=None, engine="python", dtype=str, keep_default_na=False, chunksize=chunk_size
+            )
+            return
+        if low.endswith(".xlsx"):
+            from openpyxl import load_workbook
+
+            wb = load_workbook(path, read_only=True, data_only=True)
+            try:
+                rows = wb.active.iter_rows(values_only=True)
+                header = [str(c) if c is not None else f"col{i}" for i, c in enumerate(next(rows, ()))]
+                width = len(header)
+                buf = []
+                for r in rows:
+                    # o modo read-only corta as células vazias do fim da linha
+                    cells = [ImportEngine._cell_text(v) for v in r[:width]]
+                    buf.append(cells + [""] * (width - len(cells)))
+                    if len(buf) >= chunk_size:
+                        yield pd.DataFrame(buf, columns=header)
+                        buf = []
+                if buf:
+                    yield pd.DataFrame(buf, columns=header)
+            finally:
+                wb.close()
+            return
+        # .xls antigo: o xlrd não lê em streaming, carrega e fatia
+        df = pd.read_excel(path, dtype=str, keep_default_na=False)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+    @staticmethod
+    def _cell_text(v) -> str:
+        # código de barras vindo como 7891234567890.0 no Excel
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return "" if v is None else str(v)
+
+    @staticmethod
+    def _to_number(s):
+        """'R$ 1.234,56' / '1234.56' / '' -> float (vazio = 0, lixo = NaN)."""
+        import pandas as pd
+
+        s = s.astype(str).str.replace(r"[R$\s]", "", regex=True)
+        brl = s.str.contains(",", regex=False)
+        s = s.where(~brl, s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        out = pd.to_numeric(s, errors="coerce")
+        return out.where(s != "", 0.0)
+
+    @staticmethod
+    def map_chunk(df, mapping: dict[str, str], first_row: int) -> tuple[list[dict], list[dict]]:
+        """
+        Aplica o mapeamento {campo_erp: coluna_planilha} ao bloco inteiro.
+        Retorna (itens_válidos, erros) — erros com o número da linha na planilha.
+        """
+        import pandas as pd
+
+        n = len(df)
+        out = pd.DataFrame(index=df.index)
+
+        def col(key):
+            c = mapping.get(key)
+            if c and c != IGNORE and c in df.columns:
+                return df[c].astype(str).str.strip()
+            return None
+
+        name = col("name")
+        out["name"] = name.str.slice(0, 120) if name is not None else ""
+        sku = col("sku")
+        out["sku"] = sku if sku is not None else ""
+
+        motivo = pd.Series("", index=df.index, dtype=object)
+        motivo[out["name"] == ""] = "Nome vazio"
+        # só vai no item o que foi mapeado: campo ausente não mexe no cadastro de SKU existente
+        # (e em produto novo fica com o default da API)
+        for key in ("price", "cost_price", "stock_qty"):
+            raw = col(key)
+            if raw is None:
+                continue
+            num = ImportEngine._to_number(raw)
+            ruim = num.isna() & (motivo == "")
+            motivo[ruim] = f"{FIELDS[key].rstrip('*')} inválido: " + raw[ruim]
+            out[key] = num.fillna(0.0)
+        if "stock_qty" in out:
+            out["stock_qty"] = out["stock_qty"].astype(float).astype(int)
+
+        ncm = col("ncm_code")
+        if ncm is not None:
+            ncm = ncm.str.replace(r"\D", "", regex=True).str.slice(0, 8)
+            out["ncm_code"] = ncm.where(ncm != "", "00000000")
+
+        longo = (out["sku"].str.len() > 60) & (motivo == "")
+        motivo[longo] = "SKU com mais de 60 caracteres"
+
+        linhas = pd.Series(range(first_row, first_row + n), index=df.index)
+        ok = motivo == ""
+        erros = [
+            {"row": int(r), "sku": s or None, "detail": m}
+            for r, s, m in zip(linhas[~ok], out["sku"][~ok], motivo[~ok])
+        ]
+        itens = out[ok].to_dict("records")
+        for it in itens:
+            it["sku"] = it["sku"] or None  # SKU vazio = produto novo sem chave de upsert
+        return itens, erros
+
+    @staticmethod
+    def run(client, path: str, mapping: dict[str, str], chunk_size: int = DEFAULT_CHUNK,
+            progress=None, should_stop=None) -> dict:
+        """
+        Importa o arquivo inteiro, bloco a bloco.
+        progress(linhas_lidas, gravados, erros) é chamado a cada bloco; should_stop() cancela entre blocos.
+        Retorna {"rows", "upserted", "errors": [{"row", "sku", "detail"}], "cancelled"}.
+        """
+        # linha 1 é o cabeçalho
+        report = {"rows": 0, "upserted": 0, "errors": [], "cancelled": False}
+        for df in ImportEngine.iter_chunks(path, chunk_size):
+            if should_stop and should_stop():
+                report["cancelled"] = True
+                break
+            first_row = report["rows"] + 2
+            itens, erros = ImportEngine.map_chunk(df, mapping, first_row)
+            report["rows"] += len(df)
+            report["errors"].extend(erros)
+            if itens:
+                ImportEngine.send(client, itens, first_row, report)
+            if progress:
+                progress(report["rows"], report["upserted"], len(report["errors"]))
+        return report
+
+    @staticmethod
+    def send(client, itens: list[dict], first_row: int, report: dict, update_fields: list[str] | None = None):
+        """Um POST /products/bulk; se o bloco falhar, todas as suas linhas viram erro."""
+        try:
+            res = client.bulk_upsert_products(itens, update_fields=update_fields)
+            report["upserted"] += int(res.get("upserted", len(itens)))
+        except Exception as e:
+            report["errors"].append({
+                "row": first_row, "sku": None,
+                "detail": f"Bloco de {len(itens)} linhas (a partir da linha {first_row}) recusado: {e}",
+            })
+
+    @staticmethod
+    def import_nfe(client, notas: list[dict], chunk_size: int = DEFAULT_CHUNK, progress=None) -> dict:
+        """
+        Notas já lidas pelo NFeParser: cadastro via POST /products/bulk e, depois,
+        o saldo via POST /products/stock-entries (um movimento de estoque por item da nota).
+        SKU já cadastrado só tem o custo atualizado; nome e preço derivado da nota valem para SKU novo.
+        """
+        from app.utils.nfe_parser import NFeParser
+
+        report = {"rows": 0, "upserted": 0, "entries": 0, "errors": [], "cancelled": False}
+        for nota in notas:
+            if nota.get("error"):
+                report["errors"].append({"row": None, "sku": None, "detail": f"{Path(nota['path']).name}: {nota['error']}"})
+        produtos, entradas = NFeParser.to_bulk(notas)
+
+        for start in range(0, len(produtos), chunk_size):
+            part = produtos[start:start + chunk_size]
+            report["rows"] += len(part)
+            ImportEngine.send(client, part, start + 1, report, update_fields=NFE_UPDATE_FIELDS)
+            if progress:
+                progress(report["rows"], report["upserted"], len(report["errors"]))
+
+        for start in range(0, len(entradas), chunk_size):
+            part = entradas[start:start + chunk_size]
+            try:
+                res = client.stock_entries(part)
+                missing = set(res.get("missing", []))
+                report["entries"] += sum(1 for e in part if e["sku"] not in missing)
+                for sku in sorted(missing):
+                    report["errors"].append({"row": None, "sku": sku, "detail": "SKU não cadastrado: entrada não lançada"})
+            except Exception as e:
+                report["errors"].append({"row": None, "sku": None, "detail": f"Entrada de {len(part)} itens recusada: {e}"})
+            if progress:
+                progress(report["rows"], report["upserted"], len(report["errors"]))
+        return report
+
+    @staticmethod
+    def write_errors(path: str, errors: list[dict]) -> str:
+        """Salva o relatório de erros ao lado da planilha (<arquivo>_erros.csv)."""
+        import csv
+
+        out = Path(path).with_name(Path(path).stem + "_erros.csv")
+        with open(out, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.DictWriter(f, fieldnames=["row", "sku", "detail"], delimiter=";")
+            w.writeheader()
+            w.writerows(errors)
+        return str(out)
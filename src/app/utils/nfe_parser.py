@@ -0,0 +1,163 @@
+"""
+Leitura de XML de NFe (nota de compra) em streaming.
+
+iterparse entrega cada <det> assim que ele fecha; o item é convertido e o subtree
+é limpo, então uma nota de 5.000 itens não monta a árvore inteira na memória.
+Pastas inteiras de XML são distribuídas num pool de processos (parse_many).
+"""
+from __future__ import annotations
+
+import os
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+NFE_NS = "{http://www.portalfiscal.inf.br/nfe}"
+
+# Abaixo disso o custo de subir os processos não compensa
+POOL_MIN_FILES = 8
+
+
+def _tag(elem) -> str:
+    # funciona com ou sem namespace (alguns emissores mandam XML "pelado")
+    return elem.tag.rpartition("}")[2]
+
+
+def _children(elem) -> dict:
+    return {_tag(c): c.text for c in elem}
+
+
+def _float(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class NFeParser:
+    @staticmethod
+    def iter_items(source, header: dict | None = None):
+        """
+        Gera os itens (det/prod) da nota, um a um.
+        `header`, se passado, é preenchido com número, fornecedor e total conforme aparecem
+        (a chave vem no fechamento de infNFe, depois do último item).
+        """
+        header = header if header is not None else {}
+        # só eventos "end": com "start" o custo por elemento quase dobra em notas pequenas
+        for _event, elem in ET.iterparse(source, events=("end",)):
+            tag = _tag(elem)
+            if tag == "det":
+                prod = next((c for c in elem if _tag(c) == "prod"), None)
+                if prod is not None:
+                    p = _children(prod)
+                    yield {
+                        "n_item": int(elem.get("nItem") or 0),
+                        "sku": (p.get("cProd") or "").strip(),
+                        "ean": p.get("cEAN"),
+                        "name": (p.get("xProd") or "").strip(),
+                        "ncm_code": p.get("NCM") or "00000000",
+                        "cfop": p.get("CFOP"),
+                        "unit": p.get("uCom"),
+                        "qty": _float(p.get("qCom")),
+                        "unit_cost": _float(p.get("vUnCom")),
+                        "total": _float(p.get("vProd")),
+                    }
+                # libera o subtree do item já lido (fica só o nó vazio, poucos bytes)
+                elem.clear()
+            elif tag == "ide":
+                header["numero"] = _children(elem).get("nNF")
+            elif tag == "emit":
+                e = _children(elem)
+                header["cnpj"] = e.get("CNPJ") or e.get("CPF")
+                header["fornecedor"] = e.get("xFant") or e.get("xNome")
+                elem.clear()
+            elif tag == "infNFe":
+                header["chave"] = (elem.get("Id") or "").removeprefix("NFe")
+            elif tag == "ICMSTot":
+                header["total"] = _float(_children(elem).get("vNF"))
+
+    @staticmethod
+    def parse(source) -> dict:
+        """Nota inteira: {chave, numero, cnpj, fornecedor, total, itens: [...]}."""
+        header: dict = {"chave": "", "numero": None, "cnpj": None, "fornecedor": None, "total": 0.0}
+        itens = list(NFeParser.iter_items(source, header))
+        header["itens"] = itens
+        return header
+
+    @staticmethod
+    def parse_file(path: str) -> dict:
+        """Versão segura para o pool: erro vira {"path", "error"} em vez de derrubar o lote."""
+        try:
+            nota = NFeParser.parse(path)
+            nota["path"] = path
+            return nota
+        except Exception as e:
+            return {"path": path, "error": str(e)}
+
+    @staticmethod
+    def list_folder(folder: str) -> list[str]:
+        return sorted(
+            os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(".xml")
+        )
+
+    @staticmethod
+    def parse_many(paths: list[str], workers: int | None = None, progress=None) -> list[dict]:
+        """
+        Lê várias notas em paralelo (processos, o parse é CPU puro e o GIL não deixaria threads escalarem).
+        Mantém a ordem de `paths`. progress(lidas, total) a cada nota.
+        """
+        total = len(paths)
+        results: list[dict] = []
+        if workers is None and (os.cpu_count() or 1) < 2:
+            workers = 1  # máquina de um núcleo: o pool só somaria custo
+        if workers == 1 or total < POOL_MIN_FILES:
+            for i, p in enumerate(paths, start=1):
+                results.append(NFeParser.parse_file(p))
+                if progress:
+                    progress(i, total)
+            return results
+
+        workers = workers or min(os.cpu_count() or 2, 8)
+        chunksize = max(1, min(32, total // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for i, nota in enumerate(pool.map(NFeParser.parse_file, paths, chunksize=chunksize), start=1):
+                results.append(nota)
+                if progress:
+                    progress(i, total)
+        return results
+
+    @staticmethod
+    def to_bulk(notas: list[dict], margin: float = 1.5) -> tuple[list[dict], list[dict]]:
+        """
+        Converte notas lidas em (produtos para POST /products/bulk, entradas para POST /products/stock-entries).
+        O cadastro vai com estoque 0: o saldo entra pelas entradas, cada uma com seu movimento de estoque.
+        Nome, NCM e preço (custo x margem) são o cadastro de SKU novo; o envio (ImportEngine.import_nfe)
+        pede que SKU existente só tenha o custo atualizado.
+        """
+        produtos: dict[str, dict] = {}
+        entradas: dict[tuple[str, str], dict] = {}
+        for nota in notas:
+            if nota.get("error"):
+                continue
+            motivo = f"ENTRADA NFe {nota.get('numero') or nota.get('chave', '')}".strip()[:200]
+            for it in nota["itens"]:
+                sku = it["sku"][:60]
+                if not sku:
+                    continue
+                produtos[sku] = {
+                    "name": it["name"][:120] or sku,
+                    "sku": sku,
+                    "ncm_code": (it["ncm_code"] or "00000000")[:8],
+                    "cost_price": it["unit_cost"],
+                    "price": round(it["unit_cost"] * margin, 2),
+                    "stock_qty": 0,
+                    "type": "PRODUTO",
+                }
+                key = (motivo, sku)
+                if key in entradas:
+                    entradas[key]["qty"] += it["qty"]
+                else:
+                    entradas[key] = {"sku": sku, "qty": it["qty"], "reason": motivo}
+        stock = [
+            {**e, "qty": int(round(e["qty"]))} for e in entradas.values() if int(round(e["qty"])) > 0
+        ]
+        return list(produtos.values()), stock
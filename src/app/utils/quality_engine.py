@@ -1,5 +1,6 @@
 import json
-import sqlite3
+
+from app.core.local_db import local_db
 
 class QualityEngine:
     @staticmethod
@@ -30,18 +31,13 @@ class QualityEngine:
     def is_lote_aprovado(lote_num):
         """Verifica no banco se o lote está liberado para venda."""
         try:
-            conn = sqlite3.connect("test.db")
-            cursor = conn.cursor()
             # Busca o último laudo desse lote
-            cursor.execute("""
+            resultado = local_db.query_one("""
                 SELECT status FROM quality_logs 
                 WHERE lot_number = ? 
                 ORDER BY analysis_date DESC LIMIT 1
             """, (lote_num,))
             
-            resultado = cursor.fetchone()
-            conn.close()
-            
             if resultado and resultado[0] == "APROVADO":
                 return True
             return False
@@ -0,0 +1,189 @@
+from datetime import datetime
+
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.catalog_version import next_catalog_version
+from app.db.models.product import Product
+from app.db.models.sales import Sale, SaleItem
+from app.db.models.stock_move import StockMove
+
+
+class SaleError(Exception):
+    """Erro de regra de negócio na venda (vira HTTP 400/404 no router)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class SaleEngine:
+    """
+    Motor de Vendas do Bertolini ERP.
+    Baixa o estoque com um único UPDATE condicional (sem ler os produtos antes),
+    então duas frentes de caixa vendendo o mesmo SKU nunca deixam o estoque negativo.
+    """
+
+    @staticmethod
+    def agrupar_itens(items) -> dict[int, int]:
+        """Soma as quantidades por produto (o mesmo SKU pode vir em várias linhas)."""
+        qty_by_id: dict[int, int] = {}
+        for it in items:
+            if int(it.qty) <= 0:
+                raise SaleError(400, "qty inválido")
+            qty_by_id[int(it.product_id)] = qty_by_id.get(int(it.product_id), 0) + int(it.qty)
+        return qty_by_id
+
+    @staticmethod
+    async def baixar_estoque(db: AsyncSession, qty_by_id: dict[int, int]) -> set[int]:
+        """
+        UPDATE products SET stock_qty = stock_qty - :qty
+        WHERE id IN (...) AND stock_qty >= :qty   -- tudo em um round trip.
+        Se alguma linha ficar de fora, devolve o que já foi baixado e retorna os ids que falharam.
+        """
+        qty_expr = case(qty_by_id, value=Product.id)
+        version = await next_catalog_version(db)  # clientes com cache puxam só estas linhas
+        res = await db.execute(
+            update(Product)
+            .where(Product.id.in_(list(qty_by_id)), Product.stock_qty >= qty_expr)
+            .values(stock_qty=Product.stock_qty - qty_expr, row_version=version)
+            .returning(Product.id)
+            .execution_options(synchronize_session=False)
+        )
+        baixados = set(res.scalars().all())
+        falhas = set(qty_by_id) - baixados
+        if falhas and baixados:
+            # Estorno das linhas que passaram, para a transação continuar coerente (ex.: lote)
+            estorno = {pid: qty_by_id[pid] for pid in baixados}
+            await db.execute(
+                update(Product)
+                .where(Product.id.in_(list(estorno)))
+                .values(stock_qty=Product.stock_qty + case(estorno, value=Product.id))
+                .execution_options(synchronize_session=False)
+            )
+        return falhas
+
+    @staticmethod
+    async def diagnosticar_falha(db: AsyncSession, qty_by_id: dict[int, int], falhas: set[int]) -> SaleError:
+        """Descobre qual linha barrou a venda para devolver a mesma mensagem de antes."""
+        res = await db.execute(select(Product.id, Product.name).where(Product.id.in_(list(falhas))))
+        nomes = {r.id: r.name for r in res.all()}
+        for pid in qty_by_id:
+            if pid not in falhas:
+                continue
+            if pid not in nomes:
+                return SaleError(404, f"Produto {pid} não existe")
+            return SaleError(400, f"Estoque insuficiente: {nomes[pid]}")
+        return SaleError(400, "Estoque insuficiente")
+
+    @staticmethod
+    async def registrar_venda(db: AsyncSession, items, now: datetime | None = None) -> int:
+        """
+        Grava a venda dentro da transação corrente (quem chama faz commit/rollback).
+        Ordem: baixa de estoque -> cabeçalho -> INSERT em lote de itens e movimentos.
+        """
+        if not items:
+            raise SaleError(400, "items vazio")
+
+        qty_by_id = SaleEngine.agrupar_itens(items)
+        falhas = await SaleEngine.baixar_estoque(db, qty_by_id)
+        if falhas:
+            raise await SaleEngine.diagnosticar_falha(db, qty_by_id, falhas)
+
+        now = now or datetime.utcnow()
+        sale_id = (await db.execute(insert(Sale).values(created_at=now).returning(Sale.id))).scalar_one()
+
+        await db.execute(
+            insert(SaleItem),
+            [{"sale_id": sale_id, "product_id": int(it.product_id), "qty": int(it.qty)} for it in items],
+        )
+        await db.execute(
+            insert(StockMove),
+            [
+                {"product_id": int(it.product_id), "delta": -int(it.qty), "reason": f"VENDA #{sale_id}", "created_at": now}
+                for it in items
+            ],
+        )
+        return sale_id
+
+    @staticmethod
+    async def criar_venda(db: AsyncSession, items) -> int:
+        """Fluxo completo de uma venda: registra e confirma, ou desfaz tudo."""
+        try:
+            sale_id = await SaleEngine.registrar_venda(db, items)
+            await db.commit()
+            return sale_id
+        except Exception:
+            await db.rollback()
+            raise
+
+    @staticmethod
+    async def pre_validar_lote(db: AsyncSession, vendas) -> dict[int, SaleError]:
+        """
+        Uma única consulta de produtos para o lote inteiro; simula o saldo venda a venda,
+        na ordem recebida, e devolve {índice: erro} das que já sabemos que vão falhar.
+        """
+        ids = {int(it.product_id) for v in vendas for it in v.items}
+        res = await db.execute(select(Product.id, Product.name, Product.stock_qty).where(Product.id.in_(list(ids))))
+        rows = res.all()
+        saldo = {r.id: int(r.stock_qty) for r in rows}
+        nomes = {r.id: r.name for r in rows}
+
+        erros: dict[int, SaleError] = {}
+        for idx, venda in enumerate(vendas):
+            try:
+                if not venda.items:
+                    raise SaleError(400, "items vazio")
+                qty_by_id = SaleEngine.agrupar_itens(venda.items)
+                for pid, qty in qty_by_id.items():
+                    if pid not in saldo:
+                        raise SaleError(404, f"Produto {pid} não existe")
+                    if saldo[pid] < qty:
+                        raise SaleError(400, f"Estoque insuficiente: {nomes[pid]}")
+            except SaleError as e:
+                erros[idx] = e
+                continue
+            for pid, qty in qty_by_id.items():
+                saldo[pid] -= qty
+        return erros
+
+    @staticmethod
+    async def criar_lote(db: AsyncSession, vendas, chunk_size: int = 100) -> list[dict]:
+        """
+        Ingestão de vendas enfileiradas offline.
+        Cada venda tem seu próprio resultado: uma recusa não derruba as outras.
+        As aprovadas na pré-validação são gravadas em transações de até `chunk_size` vendas.
+        """
+        erros = await SaleEngine.pre_validar_lote(db, vendas)
+        resultados: list[dict] = [
+            {"index": idx, "ok": False, "status_code": erros[idx].status_code, "detail": erros[idx].detail}
+            if idx in erros else None
+            for idx in range(len(vendas))
+        ]
+        # fecha a transação de leitura antes de começar a escrever
+        await db.rollback()
+
+        pendentes = [idx for idx in range(len(vendas)) if idx not in erros]
+        for start in range(0, len(pendentes), chunk_size):
+            chunk = pendentes[start:start + chunk_size]
+            gravadas: list[tuple[int, int]] = []
+            try:
+                for idx in chunk:
+                    try:
+                        # o UPDATE condicional continua valendo: outro caixa pode ter vendido no meio
+                        sale_id = await SaleEngine.registrar_venda(db, vendas[idx].items)
+                        gravadas.append((idx, sale_id))
+                    except SaleError as e:
+                        resultados[idx] = {"index": idx, "ok": False, "status_code": e.status_code, "detail": e.detail}
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                # nada do bloco foi gravado: marca tudo que ainda não tinha resultado
+                for idx in chunk:
+                    if resultados[idx] is None:
+                        resultados[idx] = {"index": idx, "ok": False, "status_code": 500, "detail": str(e)}
+                continue
+            for idx, sale_id in gravadas:
+                resultados[idx] = {"index": idx, "ok": True, "id": sale_id}
+        return resultados